@@ -10,10 +10,12 @@ from datetime import datetime, timedelta
 from urllib.parse import urlparse
 import re
 
-from app.services.auth_service import get_current_user
+from app.config import settings
+from app.services.auth_service import get_current_user, get_current_claims
 from app.db.moderation import (
-    is_moderator_or_admin, is_admin, get_all_moderators, set_user_role,
+    get_all_moderators, set_user_role,
     get_pending_reports, get_report, assign_report, resolve_report,
+    get_pending_disputes, resolve_dispute,
     suspend_user, unsuspend_user, get_user_report_count,
     log_moderator_action, get_moderator_actions, get_moderation_dashboard_stats
 )
@@ -24,6 +26,7 @@ from app.db.welcome_message import (
 )
 from app.db.broadcast_posts import create_broadcast_post, get_broadcast_posts, delete_broadcast_post
 from app.db.postgres import PostgresDB
+from app.db.query_stats import QueryStats
 from app.db.site_settings import get_site_setting, set_site_setting, get_all_site_settings
 from app.db.email_templates import (
     get_all_templates, get_template, save_template, get_notification_types
@@ -41,6 +44,11 @@ class ResolveReportRequest(BaseModel):
     action: Optional[str] = None
 
 
+class ResolveDisputeRequest(BaseModel):
+    resolution: str
+    overturn: bool = False
+
+
 class SuspendUserRequest(BaseModel):
     reason: str
     duration_days: Optional[int] = None
@@ -80,14 +88,15 @@ class EmailTemplateRequest(BaseModel):
     body: str
 
 
-async def require_moderator(current_user: dict = Depends(get_current_user)) -> dict:
-    if not await is_moderator_or_admin(current_user["uid"]):
+# Rolle kommt aus dem Principal; Rollenwechsel invalidieren Cache und Tokens
+async def require_moderator(current_user: dict = Depends(get_current_claims)) -> dict:
+    if current_user.get("role") not in ("moderator", "admin"):
         raise HTTPException(status_code=403, detail="Moderator access required")
     return current_user
 
 
-async def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
-    if not await is_admin(current_user["uid"]):
+async def require_admin(current_user: dict = Depends(get_current_claims)) -> dict:
+    if current_user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
@@ -97,6 +106,14 @@ async def get_dashboard(moderator: dict = Depends(require_moderator)):
     return await get_moderation_dashboard_stats()
 
 
+@router.get("/dashboard/moderation-trends")
+async def get_moderation_trends(days: int = 30, moderator: dict = Depends(require_moderator)):
+    """KI-Moderation: Kategorien und Flag-Raten pro Tag aus den kompaktierten Report-Archiven"""
+    from app.safespace.compaction import get_archive_aggregates
+
+    return await get_archive_aggregates(max(1, min(days, 365)))
+
+
 @router.get("/moderators")
 async def list_moderators(admin: dict = Depends(require_admin)):
     return await get_all_moderators()
@@ -143,6 +160,22 @@ async def resolve_report_endpoint(report_id: int, request: ResolveReportRequest,
     return {"message": "Report resolved"}
 
 
+@router.get("/disputes")
+async def list_disputes(limit: int = 50, moderator: dict = Depends(require_moderator)):
+    return {"disputes": await get_pending_disputes(limit)}
+
+
+@router.post("/disputes/{dispute_id}/resolve")
+async def resolve_dispute_endpoint(dispute_id: int, request: ResolveDisputeRequest, moderator: dict = Depends(require_moderator)):
+    dispute = await resolve_dispute(dispute_id, moderator["uid"], request.resolution, request.overturn)
+    if not dispute:
+        raise HTTPException(status_code=404, detail="Dispute not found or already resolved")
+    await log_moderator_action(moderator["uid"], "overturn" if request.overturn else "reject_dispute",
+                               target_post_id=dispute["post_id"], target_user_uid=dispute["user_uid"],
+                               reason=request.resolution)
+    return {"message": "Dispute resolved", "status": dispute["status"]}
+
+
 @router.post("/users/{user_uid}/suspend")
 async def suspend_user_endpoint(user_uid: int, request: SuspendUserRequest, moderator: dict = Depends(require_moderator)):
     await suspend_user(user_uid, request.reason, request.duration_days, moderator["uid"])
@@ -366,6 +399,80 @@ async def get_system_status(moderator: dict = Depends(require_moderator)):
     }
 
 
+# === Database Statistics Endpoint ===
+
+@router.get("/db-stats")
+async def get_db_stats(limit: int = 20, admin: dict = Depends(require_admin)):
+    """
+    Pool-Statistiken und Top-N Statements dieses Workers seit dem Start.
+    Hilft beim Dimensionieren von min/max Pool-Größe pro Worker.
+    """
+    import os
+
+    limit = max(1, min(limit, 100))
+    return {
+        "worker_pid": os.getpid(),
+        "uptime_seconds": QueryStats.uptime_seconds(),
+        "slow_query_threshold_ms": settings.slow_query_threshold_ms,
+        "pool": PostgresDB.pool_stats(),
+        "slowest": QueryStats.top_queries(limit, order_by="max_ms"),
+        "most_time_consuming": QueryStats.top_queries(limit, order_by="total_ms"),
+        "most_frequent": QueryStats.top_queries(limit, order_by="calls")
+    }
+
+
+# === Scheduler Endpoint ===
+
+@router.get("/scheduler")
+async def get_scheduler_status(limit: int = 50, job: Optional[str] = None, admin: dict = Depends(require_admin)):
+    """Registrierte periodische Jobs und Run-History (alle Worker)"""
+    from app.services.scheduler import Scheduler
+
+    limit = max(1, min(limit, 500))
+    return {
+        "jobs": [
+            {"name": j.name, "schedule": j.schedule, "running": j.running}
+            for j in Scheduler.jobs()
+        ],
+        "is_leader": Scheduler.is_leader(),
+        "runs": await Scheduler.recent_runs(limit, job)
+    }
+
+
+# === SafeSpace Dead-Letter-Queue ===
+
+@router.get("/moderation/dead-letters")
+async def get_moderation_dead_letters(limit: int = 100, admin: dict = Depends(require_admin)):
+    """Endgültig fehlgeschlagene Moderationen (neueste zuerst)"""
+    from app.safespace.dead_letters import list_dead_letters
+
+    limit = max(1, min(limit, 500))
+    try:
+        return await list_dead_letters(limit)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Kafka unavailable: {e}")
+
+
+@router.post("/moderation/dead-letters/{entry_id}/replay")
+async def replay_moderation_dead_letter(entry_id: str, admin: dict = Depends(require_admin)):
+    """Schickt einen DLQ-Eintrag (partition:offset) erneut in die Moderation"""
+    from app.safespace.dead_letters import replay_dead_letter
+
+    try:
+        entry = await replay_dead_letter(entry_id)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Kafka unavailable: {e}")
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Dead-letter entry not found")
+
+    await log_moderator_action(
+        admin["uid"], "dlq_replay",
+        target_post_id=entry["post_id"], target_user_uid=entry["author_uid"],
+        reason=entry["error"]
+    )
+    return entry
+
+
 # === Site Settings Endpoints ===
 
 @router.get("/site-settings")
@@ -694,9 +801,13 @@ async def send_test_email(request: TestEmailRequest, admin: dict = Depends(requi
             detail="E-Mail ist deaktiviert. Setze SAFESPACE_EMAIL_ENABLED=true in der Konfiguration."
         )
 
+    # require_admin liefert nur uid und Rolle aus dem Token
+    from app.db.postgres import get_user_by_uid
+    admin_user = await get_user_by_uid(admin["uid"])
+
     html_content = EmailService._wrap_email_html(
         "✅ Test-E-Mail erfolgreich!",
-        f"""<p>Hallo <strong>{admin['username']}</strong>,</p>
+        f"""<p>Hallo <strong>{admin_user['username']}</strong>,</p>
         <p>Diese Test-E-Mail bestätigt, dass die SMTP-Konfiguration korrekt funktioniert.</p>
         <div style="background: #f0f2f5; padding: 16px; border-radius: 8px; margin: 16px 0;">
             <p style="margin: 4px 0;"><strong>SMTP Host:</strong> {app_settings.smtp_host}</p>
@@ -707,7 +818,8 @@ async def send_test_email(request: TestEmailRequest, admin: dict = Depends(requi
         <p>Die E-Mail-Benachrichtigungen sind einsatzbereit.</p>"""
     )
 
-    success = await EmailService.send_email(
+    # Direkt senden statt Outbox, damit SMTP-Fehler sofort sichtbar sind
+    success = await EmailService.send_email_now(
         to_email=request.to_email,
         subject="✅ SafeSpace - Test-E-Mail",
         html_content=html_content,
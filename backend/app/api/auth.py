@@ -1,18 +1,22 @@
-from datetime import timedelta, datetime, date
+from datetime import datetime, date
 import secrets
 
 from fastapi import APIRouter, HTTPException, status, Depends, Request
 from fastapi.security import OAuth2PasswordRequestForm
 
-from app.models.schemas import UserCreate, UserLogin, Token, UserProfile
+from app.models.schemas import UserCreate, UserLogin, Token, RefreshTokenRequest, UserProfile
 from app.services.auth_service import (
     authenticate_user,
     register_user,
-    create_access_token,
-    get_current_user
+    create_token_pair,
+    consume_refresh_token,
+    revoke_token,
+    is_ban_active,
+    get_current_user,
+    oauth2_scheme_optional
 )
-from app.config import settings
-from app.db.postgres import get_user_by_username, get_user_by_email, PostgresDB
+from app.cache.redis_cache import SessionCache
+from app.db.postgres import get_user_by_username, get_user_by_email, get_user_by_uid, PostgresDB
 from app.db.notifications import create_notification
 
 
@@ -285,6 +289,13 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
             detail="Parental consent pending"
         )
 
+    # Prüfen ob der Account gesperrt ist
+    if is_ban_active(user.get("is_banned"), user.get("banned_until")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account suspended"
+        )
+
     # Update last_login timestamp
     async with PostgresDB.connection() as conn:
         await conn.execute(
@@ -293,12 +304,33 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         )
         await conn.commit()
 
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": str(user["uid"])},  # JWT standard requires sub to be a string
-        expires_delta=access_token_expires
-    )
-    return Token(access_token=access_token)
+    return Token(**await create_token_pair(user))
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshTokenRequest):
+    """
+    Erneuert den kurzlebigen Access-Token mit einem Refresh-Token.
+    Rolle und Bann-Status werden dabei frisch aus der Datenbank gelesen.
+    Der Refresh-Token ist danach verbraucht; der Client erhält einen neuen.
+    """
+    payload = await consume_refresh_token(data.refresh_token)
+
+    user = await get_user_by_uid(payload["uid"])
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if is_ban_active(user.get("is_banned"), user.get("banned_until")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account suspended"
+        )
+
+    return Token(**await create_token_pair(user))
 
 
 @router.get("/me", response_model=UserProfile)
@@ -315,14 +347,39 @@ async def get_me(current_user: dict = Depends(get_current_user)):
         first_name=current_user.get("first_name"),
         last_name=current_user.get("last_name"),
         preferred_language=current_user.get("preferred_language"),
-        birthday=current_user.get("birthday")
+        birthday=current_user.get("birthday"),
+        timezone=current_user.get("timezone")
     )
 
 
 @router.post("/logout")
-async def logout(current_user: dict = Depends(get_current_user)):
+async def logout(
+    data: RefreshTokenRequest | None = None,
+    token: str | None = Depends(oauth2_scheme_optional)
+):
     """
-    Logout - im Moment nur clientseitig relevant.
-    Bei Bedarf kann hier Token-Blacklisting implementiert werden.
+    Logout - widerruft den Access-Token und (falls mitgeschickt) den Refresh-Token.
+    Der Access-Token darf abgelaufen sein, damit sich der Refresh-Token immer widerrufen lässt.
     """
+    if not token and not (data and data.refresh_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    for presented, token_type in ((token, "access"), (data.refresh_token if data else None, "refresh")):
+        if presented:
+            try:
+                await revoke_token(presented, expected_type=token_type)
+            except HTTPException:
+                pass  # Bereits abgelaufen oder widerrufen
+
     return {"message": "Successfully logged out"}
+
+
+@router.post("/logout-all")
+async def logout_all(current_user: dict = Depends(get_current_user)):
+    """Meldet den User auf allen Geräten ab (macht alle Tokens ungültig)"""
+    await SessionCache.revoke_all(current_user["uid"])
+    return {"message": "Successfully logged out on all devices"}
@@ -275,29 +275,22 @@ async def add_comment(
     content: str,
     current_user: dict = Depends(get_current_user)
 ):
-    """Fügt Kommentar zu einem Post hinzu"""
+    """
+    Fügt Kommentar zu einem Post hinzu.
+
+    Eindeutige Fälle entscheiden die Regeln sofort; alle anderen Kommentare werden
+    als 'pending' gespeichert (nur für den Verfasser sichtbar) und asynchron von
+    DeepSeek moderiert (app.safespace.comment_moderation).
+    """
+    from app.safespace.comment_moderation import CommentModeration, STATUS_APPROVED, STATUS_PENDING
 
     # Hatespeech-Prüfung für Kommentar
+    moderation_status = STATUS_APPROVED
     try:
-        from app.safespace.models import PostMessage
-        from app.safespace.deepseek_moderator import DeepSeekModerator
-        from datetime import datetime
-
-        # Temporäre PostMessage für Moderation
-        temp_message = PostMessage(
-            post_id=post_id,
-            author_uid=current_user["uid"],
-            author_username=current_user["username"],
-            content=content,
-            visibility="public",
-            created_at=datetime.utcnow()
-        )
-
-        # Moderieren
-        moderation_result = await DeepSeekModerator.moderate_post(temp_message)
+        moderation_status, moderation_result = await CommentModeration.screen(post_id, current_user, content)
 
         # Wenn Hassrede erkannt wurde und der Confidence-Score hoch ist, ablehnen
-        if moderation_result.is_hate_speech and moderation_result.confidence_score >= 0.8:
+        if moderation_result is not None and CommentModeration.is_rejected(moderation_result):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail={
@@ -318,12 +311,20 @@ async def add_comment(
         author_uid=author_uid,
         post_id=post_id,
         commenter_uid=current_user["uid"],
-        content=content
+        content=content,
+        moderation_status=moderation_status
     )
 
-    # Erstelle Benachrichtigung für Post-Author
-    if comment:
-        from app.db.notifications import create_notification
+    if comment and moderation_status == STATUS_PENDING:
+        # Benachrichtigungen folgen mit dem Moderations-Ergebnis
+        try:
+            comment["moderation_status"] = await CommentModeration.submit(
+                author_uid, comment, current_user["username"]
+            )
+        except Exception as e:
+            print(f"⚠️ Comment moderation error: {e}")
+    elif comment:
+        # Erstelle Benachrichtigung für Post-Author
         await create_notification(
             user_uid=author_uid,
             actor_uid=current_user["uid"],
@@ -348,7 +349,7 @@ async def get_comments(
 ):
     """Lädt Kommentare eines Posts"""
 
-    comments = await PostService.get_comments(author_uid, post_id)
+    comments = await PostService.get_comments(author_uid, post_id, viewer_uid=current_user["uid"])
 
     # Usernamen laden
     commenter_uids = list(set(c["user_uid"] for c in comments))
@@ -402,7 +403,7 @@ async def update_comment(
 
     # Überprüfen ob der Kommentar dem aktuellen User gehört
     posts_db = UserPostsDB(author_uid)
-    comments = await posts_db.get_comments(post_id)
+    comments = await posts_db.get_comments(post_id, viewer_uid=current_user["uid"])
     comment = next((c for c in comments if c["comment_id"] == comment_id), None)
 
     if not comment:
@@ -425,6 +426,17 @@ async def update_comment(
             detail="Comment not found"
         )
 
+    # Noch nicht moderierte Kommentare mit dem neuen Inhalt erneut einreihen;
+    # das Ergebnis zum alten Inhalt wird verworfen
+    if updated_comment["moderation_status"] == "pending":
+        try:
+            from app.safespace.comment_moderation import CommentModeration
+            updated_comment["moderation_status"] = await CommentModeration.submit(
+                author_uid, updated_comment, current_user["username"]
+            )
+        except Exception as e:
+            print(f"⚠️ Comment moderation error: {e}")
+
     # Usernamen hinzufügen
     updated_comment["author_username"] = current_user["username"]
 
@@ -442,7 +454,7 @@ async def delete_comment(
 
     # Überprüfen ob der Kommentar dem aktuellen User gehört
     posts_db = UserPostsDB(author_uid)
-    comments = await posts_db.get_comments(post_id)
+    comments = await posts_db.get_comments(post_id, viewer_uid=current_user["uid"])
     comment = next((c for c in comments if c["comment_id"] == comment_id), None)
 
     if not comment:
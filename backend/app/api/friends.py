@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 
 from app.models.schemas import FriendRequest, UserPublic
-from app.services.auth_service import get_current_user
+from app.services.auth_service import get_current_claims
 from app.db.postgres import (
     get_friends_with_info,
     send_friend_request,
@@ -28,32 +28,32 @@ class SetRelationshipRequest(BaseModel):
 
 
 @router.get("")
-async def get_friends(current_user: dict = Depends(get_current_user)):
+async def get_friends(current_user: dict = Depends(get_current_claims)):
     """Gibt alle Freunde mit Beziehungstyp zurück"""
     friends = await get_friends_by_relationship(current_user["uid"])
     return {"friends": friends}
 
 
 @router.get("/family")
-async def get_family(current_user: dict = Depends(get_current_user)):
+async def get_family(current_user: dict = Depends(get_current_claims)):
     """Gibt nur Familie zurück"""
     return {"friends": await get_friends_by_relationship(current_user["uid"], "family")}
 
 
 @router.get("/close")
-async def get_close_friends(current_user: dict = Depends(get_current_user)):
+async def get_close_friends(current_user: dict = Depends(get_current_claims)):
     """Gibt enge Freunde zurück"""
     return {"friends": await get_friends_by_relationship(current_user["uid"], "close_friend")}
 
 
 @router.get("/acquaintances")
-async def get_acquaintances(current_user: dict = Depends(get_current_user)):
+async def get_acquaintances(current_user: dict = Depends(get_current_claims)):
     """Gibt Bekannte zurück"""
     return {"friends": await get_friends_by_relationship(current_user["uid"], "acquaintance")}
 
 
 @router.get("/online")
-async def get_online_friends(current_user: dict = Depends(get_current_user)):
+async def get_online_friends(current_user: dict = Depends(get_current_claims)):
     """Gibt alle online Freunde zurück"""
     
     friends = await get_friends_with_info(current_user["uid"])
@@ -66,7 +66,7 @@ async def get_online_friends(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/requests")
-async def get_friend_requests(current_user: dict = Depends(get_current_user)):
+async def get_friend_requests(current_user: dict = Depends(get_current_claims)):
     """Gibt ausstehende Freundschaftsanfragen zurück"""
     
     requests = await get_pending_requests(current_user["uid"])
@@ -76,7 +76,7 @@ async def get_friend_requests(current_user: dict = Depends(get_current_user)):
 @router.post("/request")
 async def send_request(
     request: FriendRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_claims)
 ):
     """Sendet eine Freundschaftsanfrage"""
     
@@ -115,7 +115,7 @@ async def send_request(
 @router.post("/accept/{requester_uid}")
 async def accept_request(
     requester_uid: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_claims)
 ):
     """Akzeptiert eine Freundschaftsanfrage"""
     
@@ -144,7 +144,7 @@ async def accept_request(
 @router.delete("/{friend_uid}")
 async def unfriend(
     friend_uid: int,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_claims)
 ):
     """Entfernt einen Freund"""
     if friend_uid == current_user["uid"]:
@@ -172,7 +172,7 @@ async def unfriend(
 async def update_relationship(
     friend_uid: int,
     request: SetRelationshipRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_claims)
 ):
     """Setzt den Beziehungstyp zu einem Freund"""
     if request.relationship not in ("family", "close_friend", "friend", "acquaintance"):
@@ -7,7 +7,7 @@ from typing import Optional
 from app.services.auth_service import get_current_user
 from app.db.postgres import PostgresDB, get_username_map, get_user_profile_data_map
 from app.db.sqlite_group_posts import GroupPostsDB
-from app.db.notifications import create_notification
+from app.db.notifications import create_notifications_bulk
 from app.services.media_service import MediaService
 
 router = APIRouter(prefix="/groups", tags=["groups"])
@@ -291,17 +291,19 @@ async def join_group(group_id: int, current_user: dict = Depends(get_current_use
         group_name = group.get("name", "")
 
         # Send notification to each admin/owner
-        for admin in admins:
-            try:
-                await create_notification(
-                    user_uid=admin["user_uid"],
-                    actor_uid=uid,
-                    notification_type="group_join_request",
-                    group_id=group_id,
-                    group_name=group_name
-                )
-            except Exception as e:
-                print(f"Error creating group join request notification: {e}")
+        try:
+            await create_notifications_bulk([
+                {
+                    "user_uid": admin["user_uid"],
+                    "actor_uid": uid,
+                    "type": "group_join_request",
+                    "group_id": group_id,
+                    "group_name": group_name
+                }
+                for admin in admins
+            ])
+        except Exception as e:
+            print(f"Error creating group join request notifications: {e}")
 
         return {"message": "Join request sent", "status": "pending"}
     return {"message": "Joined group", "status": "active"}
@@ -677,17 +679,19 @@ async def create_group_post(
         )
         members = await members_result.fetchall()
 
-    for member in members:
-        try:
-            await create_notification(
-                user_uid=member["user_uid"],
-                actor_uid=uid,
-                notification_type="group_post",
-                post_id=post["post_id"],
-                post_author_uid=uid
-            )
-        except Exception as e:
-            print(f"Error creating group notification: {e}")
+    try:
+        await create_notifications_bulk([
+            {
+                "user_uid": member["user_uid"],
+                "actor_uid": uid,
+                "type": "group_post",
+                "post_id": post["post_id"],
+                "post_author_uid": uid
+            }
+            for member in members
+        ])
+    except Exception as e:
+        print(f"Error creating group notifications: {e}")
 
     return {
         "post": {
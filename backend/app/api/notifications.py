@@ -1,7 +1,9 @@
 """Notifications API für User-Benachrichtigungen"""
 
+from typing import Optional
+
 from fastapi import APIRouter, Depends
-from app.services.auth_service import get_current_user
+from app.services.auth_service import get_current_claims
 from app.db.notifications import (
     get_notifications,
     get_unread_count,
@@ -18,41 +20,48 @@ async def get_user_notifications(
     limit: int = 50,
     offset: int = 0,
     unread_only: bool = False,
-    current_user: dict = Depends(get_current_user)
+    cursor: Optional[int] = None,
+    current_user: dict = Depends(get_current_claims)
 ):
-    """Holt alle Benachrichtigungen des eingeloggten Users"""
+    """
+    Holt die Benachrichtigungen des eingeloggten Users.
+    Für weitere Seiten `next_cursor` der Antwort als `cursor` übergeben.
+    """
+    limit = max(1, min(limit, 100))
     notifications = await get_notifications(
         current_user["uid"],
         limit=limit,
         offset=offset,
-        unread_only=unread_only
+        unread_only=unread_only,
+        before_id=cursor
     )
-    return {"notifications": notifications}
+    next_cursor = notifications[-1]["notification_id"] if len(notifications) == limit else None
+    return {"notifications": notifications, "next_cursor": next_cursor}
 
 
 @router.get("/unread-count")
-async def get_unread_notifications_count(current_user: dict = Depends(get_current_user)):
+async def get_unread_notifications_count(current_user: dict = Depends(get_current_claims)):
     """Gibt die Anzahl ungelesener Benachrichtigungen zurück"""
     count = await get_unread_count(current_user["uid"])
     return {"count": count}
 
 
 @router.post("/{notification_id}/read")
-async def mark_as_read(notification_id: int, current_user: dict = Depends(get_current_user)):
+async def mark_as_read(notification_id: int, current_user: dict = Depends(get_current_claims)):
     """Markiert eine Benachrichtigung als gelesen"""
     await mark_notification_as_read(notification_id, current_user["uid"])
     return {"success": True}
 
 
 @router.post("/mark-all-read")
-async def mark_all_notifications_as_read(current_user: dict = Depends(get_current_user)):
+async def mark_all_notifications_as_read(current_user: dict = Depends(get_current_claims)):
     """Markiert alle Benachrichtigungen als gelesen"""
     await mark_all_as_read(current_user["uid"])
     return {"success": True}
 
 
 @router.delete("/{notification_id}")
-async def delete_user_notification(notification_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_user_notification(notification_id: int, current_user: dict = Depends(get_current_claims)):
     """Löscht eine Benachrichtigung"""
     await delete_notification(notification_id, current_user["uid"])
     return {"success": True}
@@ -8,7 +8,8 @@ from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, EmailStr
 
 from app.db.postgres import PostgresDB, get_user_by_email
-from app.services.auth_service import get_password_hash
+from app.services.auth_service import get_password_hash_async
+from app.cache.redis_cache import SessionCache
 from app.services.email_service import EmailService
 from app.db.site_settings import get_site_url, get_site_title
 
@@ -121,6 +122,9 @@ async def update_user_password(user_uid: int, password_hash: str):
         )
         await conn.commit()
 
+    # Bestehende Sitzungen nach dem Reset abmelden
+    await SessionCache.revoke_all(user_uid)
+
 
 @router.post("/request")
 async def request_password_reset(data: PasswordResetRequest):
@@ -205,7 +209,7 @@ async def reset_password(data: PasswordResetConfirm):
         )
 
     # Neues Passwort hashen und speichern
-    password_hash = get_password_hash(data.new_password)
+    password_hash = await get_password_hash_async(data.new_password)
     await update_user_password(user_uid, password_hash)
 
     # Token als benutzt markieren
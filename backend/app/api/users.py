@@ -1,11 +1,12 @@
 from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import date
 
-from app.services.auth_service import get_current_user, verify_password, get_password_hash
+from app.services.auth_service import get_current_user, verify_password_async, get_password_hash_async, create_token_pair
 from app.services.media_service import MediaService
 from app.db.postgres import PostgresDB
+from app.cache.redis_cache import UserCache, SessionCache, UnreadCounter
 from app.db.moderation import is_admin
 from app.models.schemas import UserWithStats, UserRole
 
@@ -28,6 +29,10 @@ class LanguageUpdateRequest(BaseModel):
     preferred_language: str
 
 
+class TimezoneUpdateRequest(BaseModel):
+    timezone: str  # IANA-Name, z.B. "Europe/Berlin"
+
+
 class NotificationPreferencesRequest(BaseModel):
     post_liked: bool = True
     post_commented: bool = True
@@ -36,6 +41,7 @@ class NotificationPreferencesRequest(BaseModel):
     group_post: bool = True
     friend_request: bool = True
     friend_request_accepted: bool = True
+    email_digest: Literal["off", "hourly", "daily"] = "off"  # statt Einzel-E-Mails gesammelt
 
 
 class ScreenTimeSettingsRequest(BaseModel):
@@ -89,15 +95,20 @@ async def update_user_profile(
     async with PostgresDB.connection() as conn:
         # Passwort ändern wenn angegeben
         if update_data.current_password and update_data.new_password:
-            # Aktuelles Passwort überprüfen
-            if not verify_password(update_data.current_password, current_user["password_hash"]):
+            # Aktuelles Passwort überprüfen (Hash ist nicht im Principal-Cache)
+            result = await conn.execute(
+                "SELECT password_hash FROM users WHERE uid = %s",
+                (current_user["uid"],)
+            )
+            row = await result.fetchone()
+            if not row or not await verify_password_async(update_data.current_password, row["password_hash"]):
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Aktuelles Passwort ist falsch"
                 )
 
             # Neues Passwort hashen und speichern
-            new_hash = get_password_hash(update_data.new_password)
+            new_hash = await get_password_hash_async(update_data.new_password)
             await conn.execute(
                 "UPDATE users SET email = %s, bio = %s, first_name = %s, last_name = %s, password_hash = %s, preferred_language = %s, birthday = %s WHERE uid = %s",
                 (update_data.email, update_data.bio, update_data.first_name, update_data.last_name, new_hash, update_data.preferred_language, update_data.birthday, current_user["uid"])
@@ -111,7 +122,14 @@ async def update_user_profile(
 
         await conn.commit()
 
-        return {"message": "Profil erfolgreich aktualisiert"}
+    await UserCache.invalidate(current_user["uid"])
+
+    if update_data.current_password and update_data.new_password:
+        # Passwortänderung meldet alle Sitzungen ab, diese erhält neue Tokens
+        await SessionCache.revoke_all(current_user["uid"])
+        return {"message": "Profil erfolgreich aktualisiert", **await create_token_pair(current_user)}
+
+    return {"message": "Profil erfolgreich aktualisiert"}
 
 
 @router.patch("/me/language")
@@ -127,9 +145,39 @@ async def update_user_language(
         )
         await conn.commit()
 
+    await UserCache.invalidate(current_user["uid"])
+
     return {"message": "Language updated", "preferred_language": lang_data.preferred_language}
 
 
+@router.patch("/me/timezone")
+async def update_user_timezone(
+    tz_data: TimezoneUpdateRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Speichert die Zeitzone des Browsers (Geburtstags-Benachrichtigungen nach lokaler Mitternacht)"""
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+    try:
+        ZoneInfo(tz_data.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unbekannte Zeitzone"
+        )
+
+    async with PostgresDB.connection() as conn:
+        await conn.execute(
+            "UPDATE users SET timezone = %s WHERE uid = %s",
+            (tz_data.timezone, current_user["uid"])
+        )
+        await conn.commit()
+
+    await UserCache.invalidate(current_user["uid"])
+
+    return {"message": "Timezone updated", "timezone": tz_data.timezone}
+
+
 @router.get("/me/notification-preferences")
 async def get_notification_preferences(current_user: dict = Depends(get_current_user)):
     """Gibt die E-Mail-Benachrichtigungseinstellungen zurück"""
@@ -152,7 +200,8 @@ async def get_notification_preferences(current_user: dict = Depends(get_current_
         "birthday": True,
         "group_post": True,
         "friend_request": True,
-        "friend_request_accepted": True
+        "friend_request_accepted": True,
+        "email_digest": "off"
     }
 
     # Merge defaults mit gespeicherten Preferences
@@ -300,6 +349,8 @@ async def upload_profile_picture(
             )
             await conn.commit()
 
+        await UserCache.invalidate(current_user["uid"])
+
         return {
             "message": "Profilbild erfolgreich hochgeladen",
             "profile_picture": profile_picture_url
@@ -569,7 +620,7 @@ async def get_my_commented_posts(
 
             for post in friend_posts:
                 # Check if current user has commented on this post
-                comments = await posts_db.get_comments(post["post_id"])
+                comments = await posts_db.get_comments(post["post_id"], viewer_uid=user_uid)
                 has_commented = any(comment["user_uid"] == user_uid for comment in comments)
 
                 if has_commented:
@@ -865,7 +916,10 @@ async def ban_user(
 
         await conn.commit()
 
-        return {"message": "User erfolgreich gebannt"}
+    await UserCache.invalidate(user_uid)
+    await SessionCache.revoke_all(user_uid)
+
+    return {"message": "User erfolgreich gebannt"}
 
 
 @router.post("/{user_uid}/unban")
@@ -895,7 +949,9 @@ async def unban_user(
 
         await conn.commit()
 
-        return {"message": "Bann erfolgreich aufgehoben"}
+    await UserCache.invalidate(user_uid)
+
+    return {"message": "Bann erfolgreich aufgehoben"}
 
 
 @router.delete("/{user_uid}")
@@ -983,6 +1039,10 @@ async def delete_user_by_admin(
 
         await conn.commit()
 
+    await UserCache.invalidate(user_uid)
+    await SessionCache.revoke_all(user_uid)  # get_current_claims prüft nur den Token
+    await UnreadCounter.invalidate(user_uid)
+
     return {"message": f"User {user_uid} wurde vollständig gelöscht"}
 
 
@@ -1182,6 +1242,10 @@ async def delete_account(
 
         await conn.commit()
 
+    await UserCache.invalidate(user_uid)
+    await SessionCache.revoke_all(user_uid)  # get_current_claims prüft nur den Token
+    await UnreadCounter.invalidate(user_uid)
+
     return {"message": "Account erfolgreich gelöscht"}
 
 
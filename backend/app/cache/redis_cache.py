@@ -1,6 +1,8 @@
 import redis.asyncio as redis
 import json
-from datetime import datetime
+import time
+from collections import OrderedDict
+from datetime import date, datetime
 from typing import Optional
 
 from app.config import settings
@@ -84,36 +86,274 @@ class FeedCache:
             await RedisCache.client().delete(*keys)
 
 
+class UserCache:
+    """
+    Cached den authentifizierten User (Principal) für get_current_user.
+    Zwei Ebenen: prozesslokaler LRU mit sehr kurzer TTL und Redis.
+    Key-Schema: user:{uid}
+
+    Invalidierung erfolgt explizit bei Profil-, Rollen- und Ban-Änderungen
+    sowie beim Löschen. Andere Worker sehen die Änderung spätestens nach
+    LOCAL_TTL Sekunden, da ihr lokaler Eintrag dann abläuft.
+    """
+
+    PREFIX = "user"
+    TTL = settings.user_cache_ttl
+    LOCAL_TTL = settings.user_cache_local_ttl
+    LOCAL_MAX_SIZE = settings.user_cache_local_max_size
+
+    # Felder, die nicht gecached werden (werden bei Bedarf frisch geladen)
+    EXCLUDED_FIELDS = ("password_hash",)
+    DATETIME_FIELDS = ("created_at", "banned_until")
+    DATE_FIELDS = ("birthday",)
+
+    _local: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+
+    @classmethod
+    def _key(cls, uid: int) -> str:
+        return f"{cls.PREFIX}:{uid}"
+
+    @classmethod
+    def principal(cls, user: dict) -> dict:
+        """Entfernt sensible Felder aus dem User-Dict"""
+        return {k: v for k, v in user.items() if k not in cls.EXCLUDED_FIELDS}
+
+    @classmethod
+    def _deserialize(cls, data: str) -> dict:
+        user = json.loads(data)
+        for field in cls.DATETIME_FIELDS:
+            if user.get(field):
+                user[field] = datetime.fromisoformat(user[field])
+        for field in cls.DATE_FIELDS:
+            if user.get(field):
+                user[field] = date.fromisoformat(user[field])
+        return user
+
+    @classmethod
+    def _set_local(cls, uid: int, user: dict) -> None:
+        cls._local[uid] = (time.monotonic() + cls.LOCAL_TTL, user)
+        cls._local.move_to_end(uid)
+        while len(cls._local) > cls.LOCAL_MAX_SIZE:
+            cls._local.popitem(last=False)
+
+    @classmethod
+    async def get(cls, uid: int) -> dict | None:
+        """Holt den Principal aus lokalem LRU oder Redis (Kopie)"""
+        if not settings.user_cache_enabled:
+            return None
+
+        entry = cls._local.get(uid)
+        if entry:
+            expires_at, user = entry
+            if expires_at > time.monotonic():
+                cls._local.move_to_end(uid)
+                return dict(user)
+            cls._local.pop(uid, None)
+
+        try:
+            data = await RedisCache.client().get(cls._key(uid))
+        except Exception as e:
+            print(f"⚠️ UserCache Redis get failed: {e}")
+            return None
+
+        if not data:
+            return None
+
+        user = cls._deserialize(data)
+        cls._set_local(uid, user)
+        return dict(user)
+
+    @classmethod
+    async def set(cls, uid: int, user: dict) -> None:
+        """Cached den Principal lokal und in Redis"""
+        if not settings.user_cache_enabled:
+            return
+
+        user = cls.principal(user)
+        cls._set_local(uid, user)
+        try:
+            await RedisCache.client().setex(
+                cls._key(uid),
+                cls.TTL,
+                json.dumps(user, default=lambda v: v.isoformat() if isinstance(v, (date, datetime)) else str(v))
+            )
+        except Exception as e:
+            print(f"⚠️ UserCache Redis set failed: {e}")
+
+    @classmethod
+    async def invalidate(cls, uid: int) -> None:
+        """Invalidiert den Principal eines Users (lokal und in Redis)"""
+        cls._local.pop(uid, None)
+        try:
+            await RedisCache.client().delete(cls._key(uid))
+        except Exception as e:
+            print(f"⚠️ UserCache Redis invalidate failed: {e}")
+
+
 class SessionCache:
     """
-    Optional: Session-basiertes Caching für Auth-Tokens.
-    Kann genutzt werden um Tokens zu invalidieren.
+    Token-Versionen und Revocation-Liste für JWTs.
+    Key-Schema: session:{uid} (Token-Version), session:revoked:{jti}
+
+    Jeder Token trägt die Version des Users zum Ausstellungszeitpunkt.
+    Ein Hochzählen der Version (Ban, Rollenwechsel, Passwortänderung,
+    Logout überall) macht alle bisher ausgestellten Tokens ungültig.
+    Die Version hat kein TTL: fiele sie auf 0 zurück, wären zuvor
+    ungültig gemachte Tokens mit Version 0 wieder gültig.
+    Einzelne Tokens (Logout, eingelöste Refresh-Tokens) landen bis zu
+    ihrem Ablauf auf der Revocation-Liste.
     """
     
     PREFIX = "session"
-    TTL = 60 * 60 * 24  # 24 Stunden
     
     @classmethod
     def _key(cls, uid: int) -> str:
         return f"{cls.PREFIX}:{uid}"
     
     @classmethod
-    async def set_session(cls, uid: int, token_data: dict) -> None:
-        await RedisCache.client().setex(
-            cls._key(uid),
-            cls.TTL,
-            json.dumps(token_data)
-        )
+    def _revoked_key(cls, jti: str) -> str:
+        return f"{cls.PREFIX}:revoked:{jti}"
     
     @classmethod
-    async def get_session(cls, uid: int) -> dict | None:
-        data = await RedisCache.client().get(cls._key(uid))
-        return json.loads(data) if data else None
+    async def current_version(cls, uid: int) -> int:
+        """Gibt die aktuelle Token-Version zurück (beim Ausstellen von Tokens)"""
+        version = await RedisCache.client().get(cls._key(uid))
+        return int(version) if version else 0
+    
+    @classmethod
+    async def revoke_all(cls, uid: int) -> int:
+        """Macht alle Tokens eines Users ungültig"""
+        pipeline = RedisCache.client().pipeline()
+        pipeline.incr(cls._key(uid))
+        # Versionen aus älteren Deployments hatten ein TTL
+        pipeline.persist(cls._key(uid))
+        version, _ = await pipeline.execute()
+        return int(version)
+    
+    @classmethod
+    async def revoke_token(cls, jti: str, expires_at: int) -> None:
+        """Setzt einen einzelnen Token bis zu seinem Ablauf auf die Revocation-Liste"""
+        ttl = int(expires_at - time.time())
+        if ttl > 0:
+            await RedisCache.client().setex(cls._revoked_key(jti), ttl, "1")
     
     @classmethod
-    async def invalidate_session(cls, uid: int) -> None:
+    async def consume_token(cls, jti: str, expires_at: int) -> bool:
+        """
+        Widerruft einen Token atomar (Refresh-Token-Rotation).
+        Returns: False, wenn er bereits widerrufen war (erneute Verwendung)
+        """
+        ttl = max(int(expires_at - time.time()), 1)
+        return bool(await RedisCache.client().set(cls._revoked_key(jti), "1", ex=ttl, nx=True))
+    
+    @classmethod
+    async def check_token(cls, uid: int, jti: str) -> tuple[int, bool]:
+        """
+        Prüft Token-Version und Revocation in einem Roundtrip.
+        Returns: (aktuelle Version, ist_revoked)
+        """
+        pipeline = RedisCache.client().pipeline()
+        pipeline.get(cls._key(uid))
+        pipeline.exists(cls._revoked_key(jti))
+        version, revoked = await pipeline.execute()
+        return (int(version) if version else 0), revoked > 0
+
+
+class UnreadCounter:
+    """
+    Zähler ungelesener Benachrichtigungen pro User.
+    Key-Schema: unread:{uid}
+
+    Erhöhen/Verringern wirkt nur auf vorhandene Keys; fehlt ein Key,
+    wird er beim nächsten Lesen aus PostgreSQL neu aufgebaut.
+    Ein periodischer Abgleich korrigiert Abweichungen.
+    """
+
+    PREFIX = "unread"
+    TTL = 60 * 60 * 24  # 24 Stunden ohne Zugriff -> Neuaufbau beim nächsten Lesen
+
+    # Nur vorhandene Keys ändern; negative Werte verwerfen (Neuaufbau)
+    _ADJUST_SCRIPT = """
+        if redis.call('EXISTS', KEYS[1]) == 0 then
+            return nil
+        end
+        local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+        if value < 0 then
+            redis.call('DEL', KEYS[1])
+            return nil
+        end
+        return value
+    """
+    _adjust = None
+
+    @classmethod
+    def _key(cls, uid: int) -> str:
+        return f"{cls.PREFIX}:{uid}"
+
+    @classmethod
+    def _script(cls):
+        if cls._adjust is None:
+            cls._adjust = RedisCache.client().register_script(cls._ADJUST_SCRIPT)
+        return cls._adjust
+
+    @classmethod
+    async def get(cls, uid: int) -> int | None:
+        value = await RedisCache.client().get(cls._key(uid))
+        return int(value) if value is not None else None
+
+    @classmethod
+    async def set(cls, uid: int, count: int) -> None:
+        await RedisCache.client().setex(cls._key(uid), cls.TTL, max(count, 0))
+
+    @classmethod
+    async def get_many(cls, uids: list[int]) -> dict[int, int | None]:
+        values = await RedisCache.client().mget([cls._key(uid) for uid in uids])
+        return {uid: int(v) if v is not None else None for uid, v in zip(uids, values)}
+
+    @classmethod
+    async def set_many(cls, counts: dict[int, int]) -> None:
+        if not counts:
+            return
+        pipeline = RedisCache.client().pipeline()
+        for uid, count in counts.items():
+            pipeline.setex(cls._key(uid), cls.TTL, max(count, 0))
+        await pipeline.execute()
+
+    @classmethod
+    async def adjust(cls, uid: int, delta: int) -> None:
+        """Ändert einen vorhandenen Zähler um delta"""
+        await cls._script()(keys=[cls._key(uid)], args=[delta])
+
+    @classmethod
+    async def adjust_many(cls, deltas: dict[int, int]) -> None:
+        """Ändert mehrere vorhandene Zähler in einem Roundtrip"""
+        if not deltas:
+            return
+        script = cls._script()
+        pipeline = RedisCache.client().pipeline()
+        for uid, delta in deltas.items():
+            await script(keys=[cls._key(uid)], args=[delta], client=pipeline)
+        await pipeline.execute()
+
+    @classmethod
+    async def invalidate(cls, uid: int) -> None:
         await RedisCache.client().delete(cls._key(uid))
 
+    @classmethod
+    async def tracked_uids(cls, batch_size: int = 500):
+        """Iteriert (in Batches) über alle User mit gecachtem Zähler"""
+        batch = []
+        async for key in RedisCache.client().scan_iter(match=f"{cls.PREFIX}:*", count=batch_size):
+            try:
+                batch.append(int(key.split(":", 1)[1]))
+            except ValueError:
+                continue
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
 
 class OnlineStatus:
     """
@@ -123,6 +363,9 @@ class OnlineStatus:
     
     PREFIX = "online"
     TTL = 60  # 1 Minute ohne Aktivität = offline
+    REFRESH_INTERVAL = 20  # Key höchstens alle 20 Sekunden pro Worker erneuern
+
+    _last_refresh: dict[int, float] = {}
     
     @classmethod
     def _key(cls, uid: int) -> str:
@@ -130,7 +373,15 @@ class OnlineStatus:
     
     @classmethod
     async def set_online(cls, uid: int) -> None:
-        """Markiert User als online"""
+        """Markiert User als online (gedrosselt, da bei jedem Request aufgerufen)"""
+        now = time.monotonic()
+        last = cls._last_refresh.get(uid)
+        if last is not None and now - last < cls.REFRESH_INTERVAL:
+            return
+        if len(cls._last_refresh) > 50000:
+            cls._last_refresh.clear()
+        cls._last_refresh[uid] = now
+
         await RedisCache.client().setex(
             cls._key(uid),
             cls.TTL,
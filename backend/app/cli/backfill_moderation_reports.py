@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Backfill des Moderation-Report-Katalogs
+
+Liest bestehende Reports aus MinIO und trägt sie in moderation_reports ein.
+Bereits indexierte Objekte werden übersprungen, der Lauf kann also jederzeit
+abgebrochen und wiederholt werden.
+
+Verwendung:
+    # Alle Reports
+    python -m app.cli.backfill_moderation_reports
+
+    # Nur ein Zeitraum (Präfix reports/YYYY/MM/DD/)
+    python -m app.cli.backfill_moderation_reports --prefix reports/2025/06/
+
+    # Nur zählen, nichts schreiben
+    python -m app.cli.backfill_moderation_reports --dry-run
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+# Für direkten Import
+sys.path.insert(0, '/app')
+
+from app.db.postgres import PostgresDB
+from app.db.moderation_reports import (
+    create_moderation_reports_table,
+    get_indexed_object_keys,
+    index_moderation_reports,
+)
+from app.safespace.minio_service import MinIOService
+
+
+async def _index_batch(keys: list[str], concurrency: int, dry_run: bool) -> tuple[int, int, int]:
+    """
+    Lädt die noch nicht indexierten Reports eines Batches und trägt sie ein.
+    Returns: (neu indexiert, übersprungen, fehlerhaft)
+    """
+    indexed_keys = await get_indexed_object_keys(keys)
+    missing = [key for key in keys if key not in indexed_keys]
+    skipped = len(keys) - len(missing)
+    if dry_run or not missing:
+        return len(missing), skipped, 0
+
+    # Parallele Downloads, begrenzt durch concurrency (und den Storage-Thread-Pool)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(key: str):
+        async with semaphore:
+            return await MinIOService.get_moderation_report(key)
+
+    reports = await asyncio.gather(*(load(key) for key in missing), return_exceptions=True)
+
+    entries = []
+    failed = 0
+    for key, report in zip(missing, reports):
+        if report is None or isinstance(report, Exception):
+            failed += 1
+            print(f"⚠️ {key}: {report or 'nicht lesbar'}")
+            continue
+        entries.append((report, key))
+
+    indexed = await index_moderation_reports(entries)
+    return indexed, skipped + len(entries) - indexed, failed
+
+
+async def backfill(prefix: str, batch_size: int, concurrency: int, dry_run: bool):
+    """Indexiert alle Report-Objekte unter prefix"""
+    await PostgresDB.init_pool()
+
+    try:
+        await create_moderation_reports_table()
+
+        totals = [0, 0, 0]
+        start = time.perf_counter()
+        batch: list[str] = []
+
+        async def flush():
+            counts = await _index_batch(batch, concurrency, dry_run)
+            for i, count in enumerate(counts):
+                totals[i] += count
+            batch.clear()
+            print(f"   {totals[0]} {'fehlend' if dry_run else 'indexiert'}, "
+                  f"{totals[1]} übersprungen, {totals[2]} Fehler")
+
+        print(f"🔎 Backfill {prefix} ({'dry run' if dry_run else 'schreibend'})")
+        async for key in MinIOService.iter_report_keys(prefix):
+            if not key.endswith(".json"):
+                continue
+            batch.append(key)
+            if len(batch) >= batch_size:
+                await flush()
+        if batch:
+            await flush()
+
+        print(f"✅ Fertig in {time.perf_counter() - start:.1f}s")
+
+    finally:
+        await MinIOService.close()
+        await PostgresDB.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Moderation Reports aus MinIO in PostgreSQL indexieren")
+    parser.add_argument("--prefix", default="reports/")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallele MinIO-Downloads")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.prefix, args.batch_size, args.concurrency, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+"""
+Benchmark CLI
+
+Verwendung:
+    # Requests/Sekunde auf einem trivialen authentifizierten Endpoint (/api/auth/me)
+    python -m app.cli.benchmark auth --username alice --password secret
+
+    # get_current_user direkt im Prozess messen (ohne vs. mit Principal-Cache)
+    python -m app.cli.benchmark auth --username alice --in-process
+
+    # Latenz eines unbeteiligten Endpoints (/health) während eines Login-Sturms
+    python -m app.cli.benchmark login-storm --username alice --password secret
+
+    # Notifications: OFFSET vs. Keyset, COUNT vs. Partial Index (eigenes Schema)
+    python -m app.cli.benchmark notifications --rows 100000000 --users 1000000
+
+    # E-Mail-Templates: Datei lesen + str.replace pro E-Mail vs. kompilierte Registry
+    python -m app.cli.benchmark templates --renders 10000
+
+    # Moderation-Worker: Durchsatz nach max_in_flight (gemockter Moderator, ohne Kafka)
+    python -m app.cli.benchmark worker --messages 2000 --latency-ms 800
+
+    # SimpleModerator: re.search pro Regel vs. kompilierte Regeln, Stufen der Kaskade (synthetische Posts)
+    python -m app.cli.benchmark simple-moderator --posts 100000
+
+Für einen Vorher/Nachher-Vergleich über HTTP den Server einmal mit
+USER_CACHE_ENABLED=false und einmal mit Default-Einstellungen starten.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+# Für direkten Import
+sys.path.insert(0, '/app')
+
+
+def _print_result(label: str, latencies_ms: list[float], elapsed: float, errors: int = 0):
+    """Gibt Durchsatz und Latenz-Perzentile aus"""
+    count = len(latencies_ms)
+    if not count:
+        print(f"❌ {label}: keine erfolgreichen Requests ({errors} Fehler)")
+        return
+
+    latencies_ms = sorted(latencies_ms)
+    p50 = latencies_ms[int(count * 0.50)]
+    p95 = latencies_ms[min(int(count * 0.95), count - 1)]
+    p99 = latencies_ms[min(int(count * 0.99), count - 1)]
+
+    print(f"📊 {label}")
+    print(f"   Requests:   {count} ({errors} Fehler)")
+    print(f"   Dauer:      {elapsed:.2f}s")
+    print(f"   Durchsatz:  {count / elapsed:.1f} req/s")
+    print(f"   Latenz:     avg {statistics.mean(latencies_ms):.2f}ms, "
+          f"p50 {p50:.2f}ms, p95 {p95:.2f}ms, p99 {p99:.2f}ms")
+
+
+async def _run_concurrent(worker, total: int, concurrency: int) -> tuple[list[float], int, float]:
+    """
+    Führt `worker()` insgesamt `total` mal mit `concurrency` parallelen Tasks aus.
+    Returns: (Latenzen in ms, Anzahl Fehler, Gesamtdauer in s)
+    """
+    latencies: list[float] = []
+    errors = 0
+    remaining = total
+
+    async def run():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                await worker()
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+# === auth: Principal-Auflösung in get_current_user ===
+
+async def bench_auth_http(url: str, username: str, password: str, total: int, concurrency: int):
+    """Misst Requests/Sekunde auf GET /api/auth/me"""
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=30.0) as client:
+        response = await client.post(
+            "/api/auth/login",
+            data={"username": username, "password": password}
+        )
+        if response.status_code != 200:
+            print(f"❌ Login fehlgeschlagen: {response.status_code} {response.text}")
+            return
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        async def request():
+            r = await client.get("/api/auth/me", headers=headers)
+            r.raise_for_status()
+
+        # Warmup (füllt Caches und Verbindungen)
+        await _run_concurrent(request, min(total, 100), concurrency)
+
+        latencies, errors, elapsed = await _run_concurrent(request, total, concurrency)
+        _print_result(f"GET /api/auth/me ({concurrency} parallel)", latencies, elapsed, errors)
+
+
+async def bench_auth_in_process(username: str, total: int, concurrency: int):
+    """Misst get_current_user ohne und mit Principal-Cache sowie get_current_claims im selben Prozess"""
+    from app.config import settings
+    from app.db.postgres import PostgresDB, get_user_by_username
+    from app.cache.redis_cache import RedisCache, UserCache
+    from app.services.auth_service import create_token_pair, get_current_user, get_current_claims
+
+    await PostgresDB.init_pool()
+    await RedisCache.init()
+
+    try:
+        user = await get_user_by_username(username)
+        if not user:
+            print(f"❌ User '{username}' nicht gefunden!")
+            return
+        token = (await create_token_pair(user))["access_token"]
+
+        async def resolve():
+            await get_current_user(token)
+
+        for enabled in (False, True):
+            settings.user_cache_enabled = enabled
+            await UserCache.invalidate(user["uid"])
+            await _run_concurrent(resolve, min(total, 100), concurrency)
+
+            latencies, errors, elapsed = await _run_concurrent(resolve, total, concurrency)
+            label = "mit Principal-Cache" if enabled else "ohne Principal-Cache"
+            _print_result(f"get_current_user {label} ({concurrency} parallel)", latencies, elapsed, errors)
+
+        async def resolve_claims():
+            await get_current_claims(token)
+
+        await _run_concurrent(resolve_claims, min(total, 100), concurrency)
+        latencies, errors, elapsed = await _run_concurrent(resolve_claims, total, concurrency)
+        _print_result(f"get_current_claims, nur Token ({concurrency} parallel)", latencies, elapsed, errors)
+
+    finally:
+        await PostgresDB.close_pool()
+        await RedisCache.close()
+
+
+# === login-storm: Event-Loop-Blockade durch Passwort-Hashing ===
+
+async def _probe(client, path: str, stop: asyncio.Event, interval: float) -> list[float]:
+    """Ruft `path` in festem Takt auf, bis `stop` gesetzt ist"""
+    latencies: list[float] = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            r = await client.get(path)
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            pass
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def bench_login_storm(url: str, username: str, password: str, logins: int,
+                            concurrency: int, probe_path: str, baseline_seconds: float):
+    """
+    Misst die p99-Latenz eines unbeteiligten Endpoints ohne und während
+    gleichzeitiger Logins (bcrypt auf dem Event-Loop blockiert alle Requests).
+    """
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency + 10)
+    async with httpx.AsyncClient(base_url=url, timeout=60.0, limits=limits) as client:
+        # Baseline ohne Last
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, probe_path, stop, 0.01))
+        await asyncio.sleep(baseline_seconds)
+        stop.set()
+        baseline = await probe
+        _print_result(f"GET {probe_path} ohne Last", baseline, baseline_seconds)
+
+        async def login():
+            r = await client.post("/api/auth/login", data={"username": username, "password": password})
+            r.raise_for_status()
+
+        # Login-Sturm mit parallelem Probe
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, probe_path, stop, 0.01))
+        latencies, errors, elapsed = await _run_concurrent(login, logins, concurrency)
+        stop.set()
+        during = await probe
+
+        _print_result(f"POST /api/auth/login ({concurrency} parallel)", latencies, elapsed, errors)
+        _print_result(f"GET {probe_path} während Login-Sturm", during, elapsed)
+
+
+# === notifications: flache Tabelle (OFFSET) vs. partitioniert (Keyset) ===
+
+BENCH_SCHEMA = "bench_notifications"
+
+
+async def _seed_notifications(conn, table: str, rows: int, users: int, months: int, chunk: int):
+    """Füllt eine Benchmark-Tabelle serverseitig über generate_series"""
+    from psycopg import sql
+
+    inserted = 0
+    while inserted < rows:
+        batch = min(chunk, rows - inserted)
+        await conn.execute(
+            sql.SQL("""
+                INSERT INTO {} (user_uid, actor_uid, type, is_read, created_at)
+                SELECT (random() * %s)::int + 1,
+                       (random() * %s)::int + 1,
+                       'post_liked',
+                       random() > 0.1,
+                       date_trunc('month', now()) - (random() * %s * interval '1 month')
+                FROM generate_series(1, %s)
+            """).format(sql.Identifier(BENCH_SCHEMA, table)),
+            (users - 1, users - 1, months - 1, batch)
+        )
+        await conn.commit()
+        inserted += batch
+        print(f"   {table}: {inserted:,}/{rows:,} Zeilen")
+
+
+async def _time_query(conn, query, params_list: list[tuple]) -> list[float]:
+    latencies = []
+    for params in params_list:
+        start = time.perf_counter()
+        result = await conn.execute(query, params)
+        await result.fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def bench_notifications(rows: int, users: int, months: int, depth: int,
+                              samples: int, chunk: int, keep: bool):
+    """
+    Vergleicht das alte Layout (flache Tabelle, LIMIT/OFFSET, COUNT über
+    (user_uid, is_read, created_at)) mit dem partitionierten Layout
+    (Keyset auf (user_uid, notification_id DESC), Partial Index auf ungelesene).
+    """
+    import random
+    from psycopg import sql
+    from app.db.postgres import PostgresDB
+    from app.db.notifications import _add_months, _month_start, _partition_name
+    from datetime import date
+
+    await PostgresDB.init_pool()
+
+    try:
+        async with PostgresDB.connection() as conn:
+            result = await conn.execute(
+                "SELECT to_regclass(%s) AS existing", (f"{BENCH_SCHEMA}.flat",)
+            )
+            seeded = (await result.fetchone())["existing"] is not None
+
+            if not seeded:
+                print(f"🌱 Erzeuge {rows:,} Zeilen für {users:,} User über {months} Monate in {BENCH_SCHEMA}...")
+                await conn.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(BENCH_SCHEMA)))
+                await conn.execute(sql.SQL("""
+                    CREATE TABLE {} (
+                        notification_id BIGSERIAL PRIMARY KEY,
+                        user_uid INTEGER, actor_uid INTEGER, type VARCHAR(50) NOT NULL,
+                        is_read BOOLEAN DEFAULT FALSE,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """).format(sql.Identifier(BENCH_SCHEMA, "flat")))
+                await conn.execute(sql.SQL("""
+                    CREATE TABLE {} (
+                        notification_id BIGSERIAL,
+                        user_uid INTEGER, actor_uid INTEGER, type VARCHAR(50) NOT NULL,
+                        is_read BOOLEAN DEFAULT FALSE,
+                        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (notification_id, created_at)
+                    ) PARTITION BY RANGE (created_at)
+                """).format(sql.Identifier(BENCH_SCHEMA, "partitioned")))
+
+                month = _add_months(_month_start(date.today()), -months)
+                while month <= _month_start(date.today()):
+                    await conn.execute(
+                        sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM ({}) TO ({})").format(
+                            sql.Identifier(BENCH_SCHEMA, _partition_name(month)),
+                            sql.Identifier(BENCH_SCHEMA, "partitioned"),
+                            sql.Literal(month), sql.Literal(_add_months(month, 1))
+                        )
+                    )
+                    month = _add_months(month, 1)
+                await conn.commit()
+
+                # Indizes erst nach dem Laden anlegen
+                await _seed_notifications(conn, "flat", rows, users, months, chunk)
+                await _seed_notifications(conn, "partitioned", rows, users, months, chunk)
+
+                await conn.execute(sql.SQL("CREATE INDEX ON {} (user_uid, is_read, created_at DESC)").format(
+                    sql.Identifier(BENCH_SCHEMA, "flat")))
+                await conn.execute(sql.SQL("CREATE INDEX ON {} (user_uid, notification_id DESC)").format(
+                    sql.Identifier(BENCH_SCHEMA, "partitioned")))
+                await conn.execute(sql.SQL("CREATE INDEX ON {} (user_uid, notification_id DESC) WHERE is_read = FALSE").format(
+                    sql.Identifier(BENCH_SCHEMA, "partitioned")))
+                await conn.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(BENCH_SCHEMA, "flat")))
+                await conn.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(BENCH_SCHEMA, "partitioned")))
+                await conn.commit()
+            else:
+                print(f"♻️ Verwende bestehende Daten in {BENCH_SCHEMA}")
+
+            # User mit genügend Einträgen für die gewünschte Seitentiefe
+            result = await conn.execute(
+                sql.SQL("""
+                    SELECT user_uid FROM {} GROUP BY user_uid
+                    HAVING COUNT(*) > %s ORDER BY random() LIMIT %s
+                """).format(sql.Identifier(BENCH_SCHEMA, "partitioned")),
+                (depth + 50, samples)
+            )
+            sample_users = [row["user_uid"] for row in await result.fetchall()]
+            if not sample_users:
+                print(f"❌ Kein User mit mehr als {depth + 50} Einträgen - --depth verkleinern oder --users reduzieren")
+                return
+            random.shuffle(sample_users)
+
+            flat = sql.Identifier(BENCH_SCHEMA, "flat")
+            partitioned = sql.Identifier(BENCH_SCHEMA, "partitioned")
+
+            # Cursor für die Keyset-Abfrage vorab bestimmen (nicht gemessen)
+            cursors = []
+            for uid in sample_users:
+                result = await conn.execute(
+                    sql.SQL("""
+                        SELECT notification_id FROM {} WHERE user_uid = %s
+                        ORDER BY notification_id DESC OFFSET %s LIMIT 1
+                    """).format(partitioned),
+                    (uid, depth - 1)
+                )
+                cursors.append((uid, (await result.fetchone())["notification_id"]))
+
+            offset_latencies = await _time_query(
+                conn,
+                sql.SQL("""
+                    SELECT * FROM {} WHERE user_uid = %s
+                    ORDER BY created_at DESC LIMIT 50 OFFSET %s
+                """).format(flat),
+                [(uid, depth) for uid in sample_users]
+            )
+            keyset_latencies = await _time_query(
+                conn,
+                sql.SQL("""
+                    SELECT * FROM {} WHERE user_uid = %s AND notification_id < %s
+                    ORDER BY notification_id DESC LIMIT 50
+                """).format(partitioned),
+                cursors
+            )
+            count_flat = await _time_query(
+                conn,
+                sql.SQL("SELECT COUNT(*) FROM {} WHERE user_uid = %s AND is_read = FALSE").format(flat),
+                [(uid,) for uid in sample_users]
+            )
+            count_partial = await _time_query(
+                conn,
+                sql.SQL("SELECT COUNT(*) FROM {} WHERE user_uid = %s AND is_read = FALSE").format(partitioned),
+                [(uid,) for uid in sample_users]
+            )
+
+            total = sum(offset_latencies) / 1000
+            _print_result(f"Seite bei Tiefe {depth}: LIMIT/OFFSET (flach)", offset_latencies, total)
+            total = sum(keyset_latencies) / 1000
+            _print_result(f"Seite bei Tiefe {depth}: Keyset (partitioniert)", keyset_latencies, total)
+            total = sum(count_flat) / 1000
+            _print_result("Unread COUNT (flach)", count_flat, total)
+            total = sum(count_partial) / 1000
+            _print_result("Unread COUNT (Partial Index)", count_partial, total)
+
+            if not keep:
+                await conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(BENCH_SCHEMA)))
+                await conn.commit()
+                print(f"🧹 Schema {BENCH_SCHEMA} entfernt")
+
+    finally:
+        await PostgresDB.close_pool()
+
+
+def _render_uncompiled(notification_type: str, language: str, values: dict) -> tuple[str, str, str]:
+    """Bisheriger Weg: JSON-Datei pro E-Mail lesen und Platzhalter einzeln ersetzen"""
+    import re
+    from app.db.email_templates import _load_templates
+    from app.services.email_service import EmailService
+
+    template = _load_templates()[notification_type][language]
+    subject = template["subject"]
+    body = template["body"]
+    for name, value in values.items():
+        subject = subject.replace("{{" + name + "}}", value)
+        body = body.replace("{{" + name + "}}", value)
+    text = re.sub(r'<[^>]+>', '', body)
+    text = text.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
+    return subject, EmailService._wrap_email_html("🔔", body, language), text
+
+
+def bench_templates(renders: int):
+    """Rendert `renders` Benachrichtigungs-E-Mails aus Admin-Templates (ohne Versand)"""
+    import tempfile
+    from pathlib import Path
+    from app.db import email_templates
+    from app.services.email_service import EmailService
+    from app.services.email_template_registry import EmailTemplateRegistry
+
+    # Standard-Templates als "gespeicherte" Admin-Templates in eine temporäre Datei
+    with tempfile.TemporaryDirectory() as tmp:
+        email_templates.TEMPLATES_FILE = Path(tmp) / "email_templates.json"
+        email_templates._save_templates(email_templates.DEFAULT_TEMPLATES)
+
+        types = email_templates.NOTIFICATION_TYPES
+        post_content = "Ein Beispiel-Post mit etwas Text. " * 5
+
+        latencies = []
+        start = time.perf_counter()
+        for i in range(renders):
+            t0 = time.perf_counter()
+            _render_uncompiled(types[i % len(types)], "de" if i % 2 else "en", {
+                "username": f"user{i}",
+                "actor": "alice",
+                "post_content": post_content,
+                "comment_content": "",
+                "action_button": f"<a href='http://localhost:4200/my-posts?highlight={i}' class='button'>Post ansehen</a>",
+                "birthday_age": "30",
+            })
+            latencies.append((time.perf_counter() - t0) * 1000)
+        _print_result("Uncompiled (Datei + str.replace pro E-Mail)", latencies, time.perf_counter() - start)
+
+        latencies = []
+        start = time.perf_counter()
+        for i in range(renders):
+            t0 = time.perf_counter()
+            EmailService._build_notification_email(
+                f"user{i}", "alice", types[i % len(types)], i, None,
+                post_content=post_content, birthday_age=30,
+                user_language="de" if i % 2 else "en"
+            )
+            latencies.append((time.perf_counter() - t0) * 1000)
+        _print_result("Registry (kompiliert, gecached)", latencies, time.perf_counter() - start)
+        print(f"   Kompilierte Templates: {len(EmailTemplateRegistry._compiled)}")
+
+
+async def bench_worker(messages: int, partitions: int, keys: int, latency_ms: float, in_flight: list[int]):
+    """
+    Durchsatz des ConcurrentDispatcher mit einem gemockten Moderator
+    (asyncio.sleep mit ±50% Streuung statt LLM-Aufruf). Prüft zusätzlich,
+    dass Nachrichten mit gleichem Key in Offset-Reihenfolge verarbeitet und
+    alle Offsets freigegeben werden.
+    """
+    import random
+    from app.safespace.dispatcher import ConcurrentDispatcher
+
+    rng = random.Random(42)
+    records = [(i % partitions, i // partitions, rng.randrange(keys)) for i in range(messages)]
+
+    for n in in_flight:
+        last_offset: dict[tuple, int] = {}
+        violations = 0
+        latencies = []
+
+        async def moderate(payload, message_id):
+            nonlocal violations
+            partition, offset, key = payload
+            t0 = time.perf_counter()
+            await asyncio.sleep(latency_ms / 1000 * rng.uniform(0.5, 1.5))
+            if last_offset.get((partition, key), -1) > offset:
+                violations += 1
+            last_offset[(partition, key)] = offset
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        dispatcher = ConcurrentDispatcher(moderate, max_in_flight=n)
+        start = time.perf_counter()
+        for partition, offset, key in records:
+            await dispatcher.submit(partition, offset, key, (partition, offset, key))
+        await dispatcher.drain()
+        elapsed = time.perf_counter() - start
+
+        committed = dispatcher.commit_offsets()
+        complete = all(committed.get(p) == len([r for r in records if r[0] == p]) for p in range(partitions))
+        _print_result(f"max_in_flight={n}", latencies, elapsed)
+        print(f"   Reihenfolge-Verletzungen: {violations}, Offsets vollständig: {'ja' if complete else 'NEIN'}")
+
+
+
+def _legacy_simple_scan(content: str) -> tuple[list[str], list[str]]:
+    """Regelabgleich wie vor app.safespace.rules: re.search pro Regel, zweiter Durchlauf für Alternativen"""
+    import re
+    from app.safespace.simple_moderator import HATE_KEYWORDS, ALTERNATIVES
+
+    content_lower = content.lower()
+    categories = []
+    for category, patterns in HATE_KEYWORDS.items():
+        for pattern in patterns:
+            if re.search(pattern, content_lower, re.IGNORECASE):
+                categories.append(category)
+                break
+    phrases = [pattern for pattern in ALTERNATIVES if pattern.lower() in content_lower]
+    return categories, phrases
+
+
+def bench_simple_moderator(posts: int):
+    """
+    Regelabgleich des SimpleModerators auf synthetischen Posts: ~90% unauffällig,
+    der Rest mit Keywords, teils verschleiert (Leetspeak, Großschrift, Zero-Width).
+    """
+    import random
+    from datetime import datetime
+    from app.safespace.models import PostMessage
+    from app.safespace.simple_moderator import SimpleModerator
+
+    rng = random.Random(42)
+    words = ("heute morgen wetter stadt politik meinung verkehr schule arbeit zug "
+             "familie urlaub essen fußball regierung nachbarn diskussion thema").split()
+    toxic = ["Ausländer raus", "schlampe", "n1gg3r", "SCHWUCHTELN", "verrecke",
+             "wir werden sie alle töten", "Migranten Pack", "sch\u200blampe", "5chlampe"]
+
+    contents = []
+    for _ in range(posts):
+        text = " ".join(rng.choices(words, k=rng.randint(8, 60)))
+        if rng.random() < 0.1:
+            text = f"{text} {rng.choice(toxic)} {' '.join(rng.choices(words, k=5))}"
+        contents.append(text)
+
+    start = time.perf_counter()
+    legacy = [_legacy_simple_scan(c) for c in contents]
+    legacy_elapsed = time.perf_counter() - start
+
+    rules = SimpleModerator.rules()
+    start = time.perf_counter()
+    scans = [rules.scan(c) for c in contents]
+    compiled_elapsed = time.perf_counter() - start
+
+    flagged_legacy = sum(1 for categories, _ in legacy if categories)
+    flagged_compiled = sum(1 for scan in scans if scan.categories)
+    missed = sum(1 for (categories, _), scan in zip(legacy, scans) if set(categories) - set(scan.categories))
+
+    print(f"📊 Regelabgleich, {posts} Posts")
+    print(f"   re.search pro Regel:  {legacy_elapsed:.2f}s ({posts / legacy_elapsed:,.0f} Posts/s), "
+          f"{flagged_legacy} markiert")
+    print(f"   Kompilierte Regeln:   {compiled_elapsed:.2f}s ({posts / compiled_elapsed:,.0f} Posts/s), "
+          f"{flagged_compiled} markiert")
+    print(f"   Speedup: {legacy_elapsed / compiled_elapsed:.1f}x, "
+          f"Kategorien nur vorher erkannt: {missed}")
+
+    batch = [
+        PostMessage(post_id=i, author_uid=1, author_username="bench", content=c,
+                    visibility="public", created_at=datetime.utcnow())
+        for i, c in enumerate(contents)
+    ]
+    start = time.perf_counter()
+    asyncio.run(SimpleModerator.moderate_many(batch))
+    elapsed = time.perf_counter() - start
+    print(f"   moderate_many (inkl. ModerationResult): {elapsed:.2f}s ({posts / elapsed:,.0f} Posts/s)")
+
+    # Moderations-Kaskade: welcher Anteil noch zu DeepSeek ginge
+    from collections import Counter
+    from app.safespace.cascade import ModerationCascade
+    start = time.perf_counter()
+    tiers = Counter(ModerationCascade._classify(post).tier for post in batch)
+    elapsed = time.perf_counter() - start
+    print(f"   Kaskade: {tiers['clean']} freigegeben, {tiers['abusive']} geflaggt, "
+          f"{tiers['llm']} zu DeepSeek ({tiers['llm'] / posts:.1%}), {elapsed:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="SafeSpace Benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    auth_parser = subparsers.add_parser("auth", help="Authentifizierte Requests/Sekunde")
+    auth_parser.add_argument("--url", default="http://localhost:8000")
+    auth_parser.add_argument("--username", required=True)
+    auth_parser.add_argument("--password", default=None)
+    auth_parser.add_argument("--requests", type=int, default=2000)
+    auth_parser.add_argument("--concurrency", type=int, default=50)
+    auth_parser.add_argument("--in-process", action="store_true",
+                             help="get_current_user direkt aufrufen (vorher/nachher)")
+
+    storm_parser = subparsers.add_parser("login-storm", help="Latenz unbeteiligter Requests während Logins")
+    storm_parser.add_argument("--url", default="http://localhost:8000")
+    storm_parser.add_argument("--username", required=True)
+    storm_parser.add_argument("--password", default=None)
+    storm_parser.add_argument("--logins", type=int, default=200)
+    storm_parser.add_argument("--concurrency", type=int, default=20)
+    storm_parser.add_argument("--probe", default="/health", help="Unbeteiligter Endpoint")
+    storm_parser.add_argument("--baseline-seconds", type=float, default=5.0)
+
+    notif_parser = subparsers.add_parser("notifications", help="Notifications: OFFSET vs. Keyset")
+    notif_parser.add_argument("--rows", type=int, default=1_000_000)
+    notif_parser.add_argument("--users", type=int, default=10_000)
+    notif_parser.add_argument("--months", type=int, default=12)
+    notif_parser.add_argument("--depth", type=int, default=500, help="Seitentiefe (Anzahl übersprungener Einträge)")
+    notif_parser.add_argument("--samples", type=int, default=200)
+    notif_parser.add_argument("--chunk", type=int, default=1_000_000, help="Zeilen pro INSERT beim Befüllen")
+    notif_parser.add_argument("--keep", action="store_true", help="Benchmark-Schema für weitere Läufe behalten")
+
+    templates_parser = subparsers.add_parser("templates", help="E-Mail-Templates: uncompiled vs. Registry")
+    templates_parser.add_argument("--renders", type=int, default=10_000)
+
+    worker_parser = subparsers.add_parser("worker", help="Moderation-Worker: Durchsatz nach max_in_flight")
+    worker_parser.add_argument("--messages", type=int, default=2000)
+    worker_parser.add_argument("--partitions", type=int, default=6)
+    worker_parser.add_argument("--keys", type=int, default=500, help="Verschiedene Nachrichten-Keys (post_id)")
+    worker_parser.add_argument("--latency-ms", type=float, default=800, help="Mittlere Moderator-Latenz")
+    worker_parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 16, 64])
+
+    simple_parser = subparsers.add_parser("simple-moderator", help="SimpleModerator: Regeln pro Post vs. kompiliert")
+    simple_parser.add_argument("--posts", type=int, default=100_000)
+
+    args = parser.parse_args()
+
+    if getattr(args, "password", "") is None and not getattr(args, "in_process", False):
+        from getpass import getpass
+        args.password = getpass("Passwort: ")
+
+    if args.command == "auth":
+        if args.in_process:
+            asyncio.run(bench_auth_in_process(args.username, args.requests, args.concurrency))
+        else:
+            asyncio.run(bench_auth_http(args.url, args.username, args.password, args.requests, args.concurrency))
+
+    elif args.command == "notifications":
+        asyncio.run(bench_notifications(
+            args.rows, args.users, args.months, args.depth,
+            args.samples, args.chunk, args.keep
+        ))
+
+    elif args.command == "templates":
+        bench_templates(args.renders)
+
+    elif args.command == "worker":
+        asyncio.run(bench_worker(args.messages, args.partitions, args.keys, args.latency_ms, args.in_flight))
+
+    elif args.command == "simple-moderator":
+        bench_simple_moderator(args.posts)
+
+    elif args.command == "login-storm":
+        asyncio.run(bench_login_storm(
+            args.url, args.username, args.password, args.logins,
+            args.concurrency, args.probe, args.baseline_seconds
+        ))
+
+
+if __name__ == "__main__":
+    main()
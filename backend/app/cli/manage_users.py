@@ -23,8 +23,9 @@ from getpass import getpass
 # Für direkten Import
 sys.path.insert(0, '/app')
 
-from app.db.postgres import PostgresDB, create_user, get_user_by_username
-from app.services.auth_service import get_password_hash
+from app.db.postgres import PostgresDB, create_user, get_user_by_username, update_user_role
+from app.cache.redis_cache import RedisCache
+from app.services.auth_service import get_password_hash_async
 
 
 async def create_staff_user(username: str, email: str, password: str, role: str):
@@ -39,7 +40,7 @@ async def create_staff_user(username: str, email: str, password: str, role: str)
             return False
         
         # User erstellen
-        password_hash = get_password_hash(password)
+        password_hash = await get_password_hash_async(password)
         user = await create_user(username, email, password_hash)
         
         # Rolle setzen
@@ -60,6 +61,7 @@ async def create_staff_user(username: str, email: str, password: str, role: str)
 async def promote_user(username: str, role: str):
     """Befördert existierenden User zu Moderator/Admin"""
     await PostgresDB.init_pool()
+    await RedisCache.init()
     
     try:
         user = await get_user_by_username(username)
@@ -67,23 +69,21 @@ async def promote_user(username: str, role: str):
             print(f"❌ User '{username}' nicht gefunden!")
             return False
         
-        async with PostgresDB.connection() as conn:
-            await conn.execute(
-                "UPDATE users SET role = %s WHERE uid = %s",
-                (role, user["uid"])
-            )
-            await conn.commit()
+        # Invalidiert auch den gecachten Principal des Users
+        await update_user_role(user["uid"], role)
         
         print(f"✅ User '{username}' ist jetzt {role}")
         return True
         
     finally:
         await PostgresDB.close_pool()
+        await RedisCache.close()
 
 
 async def demote_user(username: str):
     """Degradiert User zurück zu normalem User"""
     await PostgresDB.init_pool()
+    await RedisCache.init()
     
     try:
         user = await get_user_by_username(username)
@@ -91,18 +91,15 @@ async def demote_user(username: str):
             print(f"❌ User '{username}' nicht gefunden!")
             return False
         
-        async with PostgresDB.connection() as conn:
-            await conn.execute(
-                "UPDATE users SET role = 'user' WHERE uid = %s",
-                (user["uid"],)
-            )
-            await conn.commit()
+        # Invalidiert auch den gecachten Principal des Users
+        await update_user_role(user["uid"], "user")
         
         print(f"✅ User '{username}' ist jetzt normaler User")
         return True
         
     finally:
         await PostgresDB.close_pool()
+        await RedisCache.close()
 
 
 async def list_staff():
@@ -9,6 +9,13 @@ class Settings(BaseSettings):
     postgres_db: str = "socialnet"
     postgres_user: str = "socialnet"
     postgres_password: str = "changeme"
+    postgres_pool_min_size: int = 5
+    postgres_pool_max_size: int = 20
+    postgres_pool_timeout: float = 30.0  # Sekunden Wartezeit auf freie Verbindung
+
+    # Query-Statistiken / Slow-Query-Log
+    query_stats_enabled: bool = True
+    slow_query_threshold_ms: int = 250
     
     # Redis
     redis_host: str = "localhost"
@@ -28,10 +35,31 @@ class Settings(BaseSettings):
     # Auth
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
-    access_token_expire_minutes: int = 60 * 24  # 24 Stunden
+    access_token_expire_minutes: int = 15  # kurzlebig, Erneuerung über Refresh-Token
+    refresh_token_expire_days: int = 30
+
+    # Passwort-Hashing (bcrypt Cost-Faktor, Änderung führt zu Rehash beim Login)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4  # Threads pro Worker-Prozess
     
     # Feed
     feed_cache_ttl: int = 30  # Sekunden
+
+    # Notifications: Monats-Partitionen und Retention
+    notification_partitions_ahead: int = 2  # Monate im Voraus anlegen
+    notification_retention_months: int = 6  # gelesene Partitionen danach löschen
+    notification_unread_retention_months: int = 12  # danach auch mit ungelesenen Einträgen
+    unread_counter_reconcile_interval: int = 600  # Sekunden zwischen Abgleichen Redis <-> PostgreSQL
+    notification_coalesce_window_minutes: int = 60  # Likes/Kommentare auf dasselbe Ziel zusammenfassen
+    notification_digest_hour: int = 8  # Uhrzeit der täglichen Digest-E-Mail
+    notification_digest_max_items: int = 20
+    birthday_default_timezone: str = "Europe/Berlin"  # für User ohne gemeldete Zeitzone
+
+    # Principal-Cache für get_current_user
+    user_cache_enabled: bool = True
+    user_cache_ttl: int = 300  # Sekunden in Redis
+    user_cache_local_ttl: int = 5  # Sekunden im Worker-Prozess (begrenzt Staleness zwischen Workern)
+    user_cache_local_max_size: int = 10000
     feed_default_limit: int = 50
 
     # Email/SMTP
@@ -44,6 +72,17 @@ class Settings(BaseSettings):
     smtp_use_tls: bool = True
     email_enabled: bool = False  # Default disabled, enable via env
 
+    # Mailer-Worker (E-Mail-Outbox)
+    mailer_smtp_connections: int = 4  # Persistente SMTP-Verbindungen pro Mailer
+    mailer_batch_size: int = 50
+    mailer_poll_interval: float = 2.0  # Sekunden, wenn die Outbox leer ist
+    mailer_max_attempts: int = 8
+    mailer_retry_base_delay: int = 30  # Sekunden, verdoppelt sich pro Versuch
+    mailer_retry_max_delay: int = 3600
+    mailer_domain_rate: float = 5.0  # E-Mails pro Sekunde und Empfänger-Domain
+    mailer_domain_burst: int = 20
+    mailer_sent_retention_days: int = 7
+
     @property
     def postgres_dsn(self) -> str:
         return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
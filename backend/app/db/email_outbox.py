@@ -0,0 +1,193 @@
+"""
+E-Mail-Outbox
+
+E-Mails werden nicht direkt versendet, sondern in die Tabelle email_outbox
+geschrieben (bei Benachrichtigungen in derselben Transaktion). Der Mailer-Worker
+(app.services.mailer) holt fällige Zeilen mit FOR UPDATE SKIP LOCKED ab, sodass
+mehrere Mailer parallel laufen können, ohne E-Mails doppelt zu versenden.
+
+Status: pending -> sending -> sent | failed
+Während 'sending' dient next_attempt_at als Lease: bricht ein Mailer ab,
+wird die Zeile nach Ablauf der Lease erneut abgeholt.
+"""
+
+from typing import List, Optional
+
+from app.db.postgres import PostgresDB
+
+
+async def create_email_outbox_table():
+    """Erstellt die Outbox-Tabelle und den Index für fällige E-Mails"""
+    async with PostgresDB.connection() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS email_outbox (
+                email_id BIGSERIAL PRIMARY KEY,
+                to_email VARCHAR(255) NOT NULL,
+                domain VARCHAR(255) NOT NULL,
+                subject TEXT NOT NULL,
+                html_content TEXT NOT NULL,
+                text_content TEXT,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                sent_at TIMESTAMP
+            )
+        """)
+
+        # Nur offene Zeilen indexieren, versendete E-Mails blähen den Index nicht auf
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+            ON email_outbox (next_attempt_at)
+            WHERE status IN ('pending', 'sending')
+        """)
+
+        await conn.commit()
+
+
+def _domain(to_email: str) -> str:
+    return to_email.rsplit("@", 1)[-1].strip().lower()
+
+
+async def enqueue_emails(conn, emails: List[dict]) -> int:
+    """
+    Schreibt E-Mails in die Outbox, ohne zu committen.
+    Damit landen sie in derselben Transaktion wie die auslösende Änderung.
+
+    Jede E-Mail ist ein Dict mit to_email, subject, html_content, text_content.
+    """
+    if not emails:
+        return 0
+
+    await conn.execute("""
+        INSERT INTO email_outbox (to_email, domain, subject, html_content, text_content)
+        SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::text[], %s::text[], %s::text[])
+    """, (
+        [e["to_email"] for e in emails],
+        [_domain(e["to_email"]) for e in emails],
+        [e["subject"] for e in emails],
+        [e["html_content"] for e in emails],
+        [e.get("text_content") for e in emails]
+    ))
+    return len(emails)
+
+
+async def enqueue_email(
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None
+) -> None:
+    """Schreibt eine einzelne E-Mail in die Outbox (eigene Transaktion)"""
+    async with PostgresDB.connection() as conn:
+        await enqueue_emails(conn, [{
+            "to_email": to_email,
+            "subject": subject,
+            "html_content": html_content,
+            "text_content": text_content
+        }])
+        await conn.commit()
+
+
+async def claim_emails(limit: int, lease_seconds: int) -> List[dict]:
+    """
+    Holt fällige E-Mails für diesen Mailer ab.
+    Gesperrte Zeilen anderer Mailer werden übersprungen (SKIP LOCKED).
+    """
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute("""
+            UPDATE email_outbox o
+            SET status = 'sending',
+                attempts = o.attempts + 1,
+                next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+            FROM (
+                SELECT email_id
+                FROM email_outbox
+                WHERE status IN ('pending', 'sending')
+                  AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ) due
+            WHERE o.email_id = due.email_id
+            RETURNING o.email_id, o.to_email, o.domain, o.subject,
+                      o.html_content, o.text_content, o.attempts
+        """, (lease_seconds, limit))
+        rows = await result.fetchall()
+        await conn.commit()
+    return [dict(row) for row in rows]
+
+
+async def mark_emails_sent(email_ids: List[int]) -> None:
+    """Markiert E-Mails als versendet"""
+    if not email_ids:
+        return
+    async with PostgresDB.connection() as conn:
+        await conn.execute("""
+            UPDATE email_outbox
+            SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL
+            WHERE email_id = ANY(%s)
+        """, (email_ids,))
+        await conn.commit()
+
+
+async def mark_email_failed(email_id: int, error: str, retry_in: Optional[float]) -> None:
+    """
+    Vermerkt einen Fehlversuch.
+    retry_in=None markiert die E-Mail endgültig als fehlgeschlagen.
+    """
+    async with PostgresDB.connection() as conn:
+        if retry_in is None:
+            await conn.execute("""
+                UPDATE email_outbox
+                SET status = 'failed', last_error = %s
+                WHERE email_id = %s
+            """, (error[:1000], email_id))
+        else:
+            await conn.execute("""
+                UPDATE email_outbox
+                SET status = 'pending', last_error = %s,
+                    next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                WHERE email_id = %s
+            """, (error[:1000], retry_in, email_id))
+        await conn.commit()
+
+
+async def release_emails(email_ids: List[int], delay: float) -> None:
+    """
+    Gibt abgeholte E-Mails ohne Zustellversuch zurück (z.B. Domain-Drosselung).
+    Der Versuch wird nicht gezählt.
+    """
+    if not email_ids:
+        return
+    async with PostgresDB.connection() as conn:
+        await conn.execute("""
+            UPDATE email_outbox
+            SET status = 'pending',
+                attempts = GREATEST(attempts - 1, 0),
+                next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+            WHERE email_id = ANY(%s)
+        """, (delay, email_ids))
+        await conn.commit()
+
+
+async def purge_sent_emails(retention_days: int) -> int:
+    """Löscht versendete E-Mails, die älter als retention_days sind"""
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute("""
+            DELETE FROM email_outbox
+            WHERE status = 'sent'
+              AND sent_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+        """, (retention_days,))
+        await conn.commit()
+        return result.rowcount
+
+
+async def get_outbox_stats() -> dict:
+    """Anzahl der E-Mails pro Status"""
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute(
+            "SELECT status, COUNT(*) AS count FROM email_outbox GROUP BY status"
+        )
+        return {row["status"]: row["count"] for row in await result.fetchall()}
@@ -64,13 +64,37 @@ DEFAULT_TEMPLATES = {
 
 
 def _load_templates() -> dict:
-    """Lädt die Templates aus der JSON-Datei"""
-    if TEMPLATES_FILE.exists():
-        try:
-            return json.loads(TEMPLATES_FILE.read_text())
-        except (json.JSONDecodeError, OSError):
-            return dict(DEFAULT_TEMPLATES)
-    return dict(DEFAULT_TEMPLATES)
+    """Standard-Templates, überlagert von den von Admins gespeicherten"""
+    templates = {t: dict(languages) for t, languages in DEFAULT_TEMPLATES.items()}
+    for notification_type, languages in load_custom_templates().items():
+        templates.setdefault(notification_type, {}).update(languages)
+    return templates
+
+
+def load_custom_templates() -> dict:
+    """
+    Lädt nur die von Admins gespeicherten Templates (ohne Standard-Templates).
+    Wird von der EmailTemplateRegistry einmal pro Version gelesen.
+    """
+    if not TEMPLATES_FILE.exists():
+        return {}
+    try:
+        stored = json.loads(TEMPLATES_FILE.read_text())
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+    # Frühere Versionen haben beim Speichern alle Standard-Templates mitgeschrieben;
+    # unveränderte Standard-Templates sind keine Admin-Anpassung
+    custom = {}
+    for notification_type, languages in stored.items():
+        defaults = DEFAULT_TEMPLATES.get(notification_type, {})
+        edited = {
+            language: template for language, template in languages.items()
+            if template != defaults.get(language)
+        }
+        if edited:
+            custom[notification_type] = edited
+    return custom
 
 
 def _save_templates(templates: dict) -> None:
@@ -92,8 +116,8 @@ async def get_template(notification_type: str, language: str = "de") -> Optional
 
 
 async def save_template(notification_type: str, language: str, subject: str, body: str) -> dict:
-    """Speichert ein E-Mail-Template"""
-    templates = _load_templates()
+    """Speichert ein E-Mail-Template (in der Datei stehen nur Admin-Anpassungen)"""
+    templates = load_custom_templates()
     if notification_type not in templates:
         templates[notification_type] = {}
     templates[notification_type][language] = {
@@ -101,6 +125,11 @@ async def save_template(notification_type: str, language: str, subject: str, bod
         "body": body
     }
     _save_templates(templates)
+
+    # Kompilierte Templates in allen Workern verwerfen
+    from app.services.email_template_registry import EmailTemplateRegistry
+    await EmailTemplateRegistry.invalidate()
+
     return templates[notification_type][language]
 
 
@@ -6,6 +6,7 @@ Angepasst an das existierende Schema in postgres.py
 from datetime import datetime, timedelta
 from typing import Optional
 from app.db.postgres import PostgresDB
+from app.cache.redis_cache import UserCache, SessionCache
 
 
 # === User Role Management ===
@@ -23,6 +24,8 @@ async def set_user_role(uid: int, role: str) -> bool:
             "UPDATE users SET role = %s WHERE uid = %s RETURNING uid", (role, uid)
         )
         await conn.commit()
+        await UserCache.invalidate(uid)
+        await SessionCache.revoke_all(uid)  # Rolle steckt im Token
         return await result.fetchone() is not None
 
 
@@ -53,6 +56,8 @@ async def suspend_user(uid: int, reason: str, duration_days: int = None, moderat
             (banned_until, reason, uid)
         )
         await conn.commit()
+        await UserCache.invalidate(uid)
+        await SessionCache.revoke_all(uid)
         if moderator_uid:
             await log_moderator_action(moderator_uid, "suspend_user", target_user_uid=uid, reason=reason)
         return True
@@ -64,6 +69,7 @@ async def unsuspend_user(uid: int) -> bool:
             "UPDATE users SET is_banned = FALSE, banned_until = NULL, ban_reason = NULL WHERE uid = %s", (uid,)
         )
         await conn.commit()
+        await UserCache.invalidate(uid)
         return True
 
 
@@ -179,6 +185,40 @@ async def resolve_report(report_id: int, moderator_uid: int, resolution_note: st
         return await result.fetchone() is not None
 
 
+# === Moderation Disputes ===
+
+async def get_pending_disputes(limit: int = 50) -> list:
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute(
+            """SELECT d.*, u.username FROM moderation_disputes d
+               LEFT JOIN users u ON u.uid = d.user_uid
+               WHERE d.status = 'pending' ORDER BY d.created_at ASC LIMIT %s""",
+            (limit,)
+        )
+        return await result.fetchall()
+
+
+async def resolve_dispute(dispute_id: int, moderator_uid: int, resolution: str, overturn: bool) -> Optional[dict]:
+    """
+    Entscheidet einen Widerspruch. Bei overturn wird das Moderationsergebnis des Posts
+    aufgehoben und die User-Statistik in derselben Transaktion korrigiert.
+    """
+    from app.db.moderation_reports import overturn_moderation_report
+
+    status = "overturned" if overturn else "rejected"
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute(
+            """UPDATE moderation_disputes SET status = %s, reviewed_by = %s, reviewed_at = CURRENT_TIMESTAMP,
+               resolution = %s WHERE dispute_id = %s AND status = 'pending' RETURNING *""",
+            (status, moderator_uid, resolution, dispute_id)
+        )
+        dispute = await result.fetchone()
+        if dispute and overturn and dispute["post_id"] is not None:
+            await overturn_moderation_report(conn, dispute["user_uid"], dispute["post_id"])
+        await conn.commit()
+        return dispute
+
+
 async def get_user_report_count(uid: int) -> dict:
     async with PostgresDB.connection() as conn:
         result = await conn.execute(
@@ -0,0 +1,439 @@
+"""
+Katalog der SafeSpace Moderation Reports
+
+Die vollständigen Reports liegen als JSON in MinIO (reports/YYYY/MM/DD/<id>.json).
+Zeitstempel sind wie in den Reports naive UTC-Zeiten.
+Die Tabelle moderation_reports indexiert die Felder, nach denen gesucht und
+aggregiert wird, und verweist per object_key auf das Objekt. MinIO wird nur
+noch für den vollständigen Report-Body benötigt.
+
+Geschrieben wird der Eintrag vom Moderation-Worker direkt nach dem MinIO-Upload;
+bestehende Objekte übernimmt `python -m app.cli.backfill_moderation_reports`.
+
+user_moderation_stats hält die Statistiken pro User als eine Zeile. Sie wird in
+derselben Transaktion fortgeschrieben, in der ein Report eingetragen oder ein
+Ergebnis per Widerspruch aufgehoben wird; das Stats-Endpoint liest nur diese Zeile.
+"""
+
+import json
+from collections import defaultdict
+from typing import List
+
+from app.db.postgres import PostgresDB, SCHEMA_LOCK_ID
+from app.safespace.models import ModerationReport
+
+
+# Länge der gespeicherten Inhaltsvorschau
+CONTENT_PREVIEW_LENGTH = 100
+
+
+async def create_moderation_reports_table():
+    """Erstellt die Katalog-Tabelle und die Indizes für User- und Zeitabfragen"""
+    async with PostgresDB.connection() as conn:
+        # Alle API-Prozesse rufen das beim Start auf: nacheinander, wie PostgresDB._init_schema
+        await conn.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+
+        # user_uid ohne Fremdschlüssel: Reports gelöschter User bleiben in MinIO erhalten
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS moderation_reports (
+                report_id VARCHAR(64) PRIMARY KEY,
+                user_uid INTEGER NOT NULL,
+                post_id INTEGER NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                is_hate_speech BOOLEAN NOT NULL DEFAULT FALSE,
+                confidence_score REAL NOT NULL DEFAULT 0,
+                categories TEXT[] NOT NULL DEFAULT '{}',
+                content_preview TEXT,
+                created_at TIMESTAMP NOT NULL,
+                object_key TEXT NOT NULL UNIQUE
+            )
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_moderation_reports_user
+            ON moderation_reports(user_uid, created_at DESC)
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_moderation_reports_post
+            ON moderation_reports(user_uid, post_id)
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_moderation_reports_hate_speech
+            ON moderation_reports(created_at DESC)
+            WHERE is_hate_speech
+        """)
+        await conn.execute("""
+            ALTER TABLE moderation_reports
+            ADD COLUMN IF NOT EXISTS disputed BOOLEAN NOT NULL DEFAULT FALSE
+        """)
+        await conn.execute("""
+            ALTER TABLE moderation_reports
+            ADD COLUMN IF NOT EXISTS overturned BOOLEAN NOT NULL DEFAULT FALSE
+        """)
+
+        result = await conn.execute("SELECT to_regclass('user_moderation_stats') IS NOT NULL AS stats_exist")
+        stats_exist = (await result.fetchone())["stats_exist"]
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS user_moderation_stats (
+                user_uid INTEGER PRIMARY KEY,
+                total_posts INTEGER NOT NULL DEFAULT 0,
+                flagged_posts INTEGER NOT NULL DEFAULT 0,
+                blocked_posts INTEGER NOT NULL DEFAULT 0,
+                modified_posts INTEGER NOT NULL DEFAULT 0,
+                hate_speech_posts INTEGER NOT NULL DEFAULT 0,
+                hate_speech_score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                categories JSONB NOT NULL DEFAULT '{}',
+                last_violation TIMESTAMP,
+                disputed_posts INTEGER NOT NULL DEFAULT 0,
+                overturned_posts INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        if not stats_exist:
+            # Beim ersten Anlegen aus dem bestehenden Katalog befüllen, noch unter dem Lock
+            await _rebuild_stats(conn)
+        await conn.commit()
+
+
+def _report_row(report: ModerationReport, object_key: str) -> tuple:
+    result = report.result
+    return (
+        report.report_id,
+        report.post.author_uid,
+        report.post.post_id,
+        result.status.value,
+        result.is_hate_speech,
+        result.confidence_score,
+        [c.value for c in result.categories],
+        report.post.content[:CONTENT_PREVIEW_LENGTH],
+        report.processed_at,
+        object_key
+    )
+
+
+async def index_moderation_reports(entries: List[tuple[ModerationReport, str]]) -> int:
+    """
+    Trägt Reports (Report, MinIO-Objektpfad) in den Katalog ein und schreibt
+    die User-Statistiken in derselben Transaktion fort.
+    Bereits indexierte Reports werden übersprungen (idempotent für Backfill und Retries).
+    Returns: Anzahl neu eingetragener Reports
+    """
+    if not entries:
+        return 0
+
+    rows = [_report_row(report, object_key) for report, object_key in entries]
+    columns = [list(column) for column in zip(*rows)]
+    # Kategorien als kommagetrennter Text: unnest() kann keine Arrays von Arrays entpacken
+    columns[6] = [",".join(categories) for categories in columns[6]]
+
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute("""
+            INSERT INTO moderation_reports (
+                report_id, user_uid, post_id, status, is_hate_speech,
+                confidence_score, categories, content_preview, created_at, object_key
+            )
+            SELECT r.report_id, r.user_uid, r.post_id, r.status, r.is_hate_speech,
+                   r.confidence_score, string_to_array(r.categories, ','),
+                   r.content_preview, r.created_at, r.object_key
+            FROM unnest(
+                %s::varchar[], %s::int[], %s::int[], %s::varchar[], %s::boolean[],
+                %s::real[], %s::text[], %s::text[], %s::timestamp[], %s::text[]
+            ) AS r(report_id, user_uid, post_id, status, is_hate_speech,
+                   confidence_score, categories, content_preview, created_at, object_key)
+            ON CONFLICT DO NOTHING
+            RETURNING user_uid, status, is_hate_speech, confidence_score, categories, created_at
+        """, columns)
+        inserted = await result.fetchall()
+
+        deltas = defaultdict(_empty_stats_delta)
+        for row in inserted:
+            deltas[row["user_uid"]]["total_posts"] += 1
+            _add_to_stats_delta(deltas[row["user_uid"]], row, 1)
+        await _apply_stats_deltas(conn, deltas)
+        await conn.commit()
+    return len(inserted)
+
+
+async def index_moderation_report(report: ModerationReport, object_key: str) -> bool:
+    """Trägt einen einzelnen Report in den Katalog ein"""
+    return await index_moderation_reports([(report, object_key)]) > 0
+
+
+async def get_indexed_object_keys(object_keys: List[str]) -> set[str]:
+    """Welche der Objektpfade bereits im Katalog stehen (für den Backfill)"""
+    if not object_keys:
+        return set()
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute(
+            "SELECT object_key FROM moderation_reports WHERE object_key = ANY(%s)",
+            (object_keys,)
+        )
+        return {row["object_key"] for row in await result.fetchall()}
+
+
+async def get_post_report_object_key(user_uid: int, post_id: int) -> str | None:
+    """
+    MinIO-Objektpfad des neuesten Reports zu einem Post.
+    post_id ist nur pro Autor eindeutig (Posts liegen in User-SQLite-DBs).
+    """
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute("""
+            SELECT object_key FROM moderation_reports
+            WHERE user_uid = %s AND post_id = %s
+            ORDER BY created_at DESC
+            LIMIT 1
+        """, (user_uid, post_id))
+        row = await result.fetchone()
+        return row["object_key"] if row else None
+
+
+async def list_user_moderation_reports(user_uid: int, limit: int = 20) -> list[dict]:
+    """Neueste Reports eines Users"""
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute("""
+            SELECT report_id, post_id, status, is_hate_speech, confidence_score,
+                   categories, created_at, object_key
+            FROM moderation_reports
+            WHERE user_uid = %s
+            ORDER BY created_at DESC
+            LIMIT %s
+        """, (user_uid, limit))
+        return await result.fetchall()
+
+
+# === User-Statistiken (user_moderation_stats) ===
+
+def _empty_stats_delta() -> dict:
+    return {
+        "total_posts": 0,
+        "flagged_posts": 0,
+        "blocked_posts": 0,
+        "modified_posts": 0,
+        "hate_speech_posts": 0,
+        "hate_speech_score_sum": 0.0,
+        "categories": defaultdict(int),
+        "last_violation": None,
+        "overturned_posts": 0,
+    }
+
+
+def _add_to_stats_delta(delta: dict, row: dict, sign: int):
+    """
+    Zählt das Ergebnis einer Katalogzeile zur Änderung hinzu (sign=-1 nimmt es zurück).
+    total_posts zählt der Aufrufer: ein aufgehobener Report bleibt ein Post.
+    """
+    status_column = f"{row['status']}_posts"
+    if status_column in ("flagged_posts", "blocked_posts", "modified_posts"):
+        delta[status_column] += sign
+    if row["is_hate_speech"]:
+        delta["hate_speech_posts"] += sign
+        delta["hate_speech_score_sum"] += sign * row["confidence_score"]
+        for category in row["categories"]:
+            delta["categories"][category] += sign
+        if sign > 0 and (delta["last_violation"] is None or row["created_at"] > delta["last_violation"]):
+            delta["last_violation"] = row["created_at"]
+
+
+async def _apply_stats_deltas(conn, deltas: dict):
+    """
+    Addiert Änderungen auf die Stats-Zeilen (Upsert).
+    Sortiert nach user_uid, damit parallele Worker Zeilen in gleicher Reihenfolge sperren.
+    """
+    if not deltas:
+        return
+    rows = [
+        (
+            user_uid,
+            delta["total_posts"],
+            delta["flagged_posts"],
+            delta["blocked_posts"],
+            delta["modified_posts"],
+            delta["hate_speech_posts"],
+            delta["hate_speech_score_sum"],
+            json.dumps({k: v for k, v in delta["categories"].items() if v}),
+            delta["last_violation"],
+            delta["overturned_posts"],
+        )
+        for user_uid, delta in sorted(deltas.items())
+    ]
+    async with conn.cursor() as cur:
+        await cur.executemany("""
+            INSERT INTO user_moderation_stats AS s (
+                user_uid, total_posts, flagged_posts, blocked_posts, modified_posts,
+                hate_speech_posts, hate_speech_score_sum, categories, last_violation, overturned_posts
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s)
+            ON CONFLICT (user_uid) DO UPDATE SET
+                total_posts = s.total_posts + EXCLUDED.total_posts,
+                flagged_posts = s.flagged_posts + EXCLUDED.flagged_posts,
+                blocked_posts = s.blocked_posts + EXCLUDED.blocked_posts,
+                modified_posts = s.modified_posts + EXCLUDED.modified_posts,
+                hate_speech_posts = s.hate_speech_posts + EXCLUDED.hate_speech_posts,
+                hate_speech_score_sum = s.hate_speech_score_sum + EXCLUDED.hate_speech_score_sum,
+                categories = jsonb_strip_nulls(s.categories || COALESCE((
+                    SELECT jsonb_object_agg(
+                        d.key, NULLIF(COALESCE((s.categories->>d.key)::int, 0) + d.value::int, 0)
+                    )
+                    FROM jsonb_each_text(EXCLUDED.categories) AS d
+                ), '{}'::jsonb)),
+                last_violation = GREATEST(s.last_violation, EXCLUDED.last_violation),
+                overturned_posts = s.overturned_posts + EXCLUDED.overturned_posts,
+                updated_at = CURRENT_TIMESTAMP
+        """, rows)
+
+
+async def rebuild_user_moderation_stats() -> int:
+    """
+    Berechnet alle Stats-Zeilen aus dem Katalog neu (Erstbefüllung, Reparatur).
+    Widerspruchs-Zähler werden aus den Report-Flags übernommen.
+    Returns: Anzahl User
+    """
+    async with PostgresDB.connection() as conn:
+        count = await _rebuild_stats(conn)
+        await conn.commit()
+    return count
+
+
+async def _rebuild_stats(conn) -> int:
+    result = await conn.execute("""
+        WITH base AS (
+            SELECT
+                user_uid,
+                COUNT(*) AS total_posts,
+                COUNT(*) FILTER (WHERE status = 'flagged') AS flagged_posts,
+                COUNT(*) FILTER (WHERE status = 'blocked') AS blocked_posts,
+                COUNT(*) FILTER (WHERE status = 'modified') AS modified_posts,
+                COUNT(*) FILTER (WHERE is_hate_speech) AS hate_speech_posts,
+                COALESCE(SUM(confidence_score) FILTER (WHERE is_hate_speech), 0) AS hate_speech_score_sum,
+                MAX(created_at) FILTER (WHERE is_hate_speech) AS last_violation,
+                COUNT(*) FILTER (WHERE disputed) AS disputed_posts,
+                COUNT(*) FILTER (WHERE overturned) AS overturned_posts
+            FROM moderation_reports
+            GROUP BY user_uid
+        ),
+        cats AS (
+            SELECT user_uid, jsonb_object_agg(category, n) AS categories
+            FROM (
+                SELECT user_uid, category, COUNT(*) AS n
+                FROM moderation_reports, unnest(categories) AS category
+                WHERE is_hate_speech
+                GROUP BY user_uid, category
+            ) c
+            GROUP BY user_uid
+        )
+        INSERT INTO user_moderation_stats (
+            user_uid, total_posts, flagged_posts, blocked_posts, modified_posts,
+            hate_speech_posts, hate_speech_score_sum, categories, last_violation,
+            disputed_posts, overturned_posts
+        )
+        SELECT b.user_uid, b.total_posts, b.flagged_posts, b.blocked_posts, b.modified_posts,
+               b.hate_speech_posts, b.hate_speech_score_sum, COALESCE(c.categories, '{}'::jsonb),
+               b.last_violation, b.disputed_posts, b.overturned_posts
+        FROM base b
+        LEFT JOIN cats c ON c.user_uid = b.user_uid
+        ON CONFLICT (user_uid) DO UPDATE SET
+            total_posts = EXCLUDED.total_posts,
+            flagged_posts = EXCLUDED.flagged_posts,
+            blocked_posts = EXCLUDED.blocked_posts,
+            modified_posts = EXCLUDED.modified_posts,
+            hate_speech_posts = EXCLUDED.hate_speech_posts,
+            hate_speech_score_sum = EXCLUDED.hate_speech_score_sum,
+            categories = EXCLUDED.categories,
+            last_violation = EXCLUDED.last_violation,
+            disputed_posts = EXCLUDED.disputed_posts,
+            overturned_posts = EXCLUDED.overturned_posts,
+            updated_at = CURRENT_TIMESTAMP
+    """)
+    return result.rowcount
+
+
+async def get_user_moderation_stats(user_uid: int) -> dict | None:
+    """Stats-Zeile eines Users (None, wenn noch kein Report existiert)"""
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute(
+            "SELECT * FROM user_moderation_stats WHERE user_uid = %s",
+            (user_uid,)
+        )
+        return await result.fetchone()
+
+
+async def mark_report_disputed(conn, user_uid: int, post_id: int) -> bool:
+    """
+    Markiert den neuesten Report eines Posts als angefochten und zählt ihn einmalig
+    in disputed_posts. Läuft in der Transaktion des Aufrufers (conn).
+    """
+    result = await conn.execute("""
+        UPDATE moderation_reports SET disputed = TRUE
+        WHERE report_id = (
+            SELECT report_id FROM moderation_reports
+            WHERE user_uid = %s AND post_id = %s
+            ORDER BY created_at DESC
+            LIMIT 1
+        ) AND NOT disputed
+        RETURNING report_id
+    """, (user_uid, post_id))
+    if await result.fetchone() is None:
+        return False
+
+    await conn.execute("""
+        UPDATE user_moderation_stats
+        SET disputed_posts = disputed_posts + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE user_uid = %s
+    """, (user_uid,))
+    return True
+
+
+async def overturn_moderation_report(conn, user_uid: int, post_id: int) -> bool:
+    """
+    Hebt das Moderationsergebnis eines Posts nach einem stattgegebenen Widerspruch auf:
+    der Report gilt danach als approved, die Stats-Zeile wird um das alte Ergebnis
+    korrigiert. Läuft in der Transaktion des Aufrufers (conn).
+    """
+    result = await conn.execute("""
+        UPDATE moderation_reports r
+        SET status = 'approved', is_hate_speech = FALSE, overturned = TRUE
+        FROM (
+            SELECT report_id, status, is_hate_speech, confidence_score, categories, created_at
+            FROM moderation_reports
+            WHERE user_uid = %s AND post_id = %s AND NOT overturned
+            ORDER BY created_at DESC
+            LIMIT 1
+            FOR UPDATE
+        ) old
+        WHERE r.report_id = old.report_id
+        RETURNING old.status, old.is_hate_speech, old.confidence_score, old.categories, old.created_at
+    """, (user_uid, post_id))
+    old = await result.fetchone()
+    if old is None:
+        return False
+
+    delta = _empty_stats_delta()
+    _add_to_stats_delta(delta, old, -1)
+    delta["overturned_posts"] = 1
+    await _apply_stats_deltas(conn, {user_uid: delta})
+
+    if old["is_hate_speech"]:
+        # Letzter Verstoß kann nicht per Differenz korrigiert werden
+        await conn.execute("""
+            UPDATE user_moderation_stats SET last_violation = (
+                SELECT MAX(created_at) FROM moderation_reports
+                WHERE user_uid = %s AND is_hate_speech
+            )
+            WHERE user_uid = %s
+        """, (user_uid, user_uid))
+    return True
+
+
+async def list_recent_hate_speech_reports(days: int = 7, limit: int = 100) -> list[dict]:
+    """Als Hassrede erkannte Reports der letzten Tage, neueste zuerst"""
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute("""
+            SELECT r.report_id, r.post_id, r.user_uid AS author_uid, u.username AS author_username,
+                   r.content_preview, r.status, r.confidence_score, r.categories, r.created_at
+            FROM moderation_reports r
+            LEFT JOIN users u ON u.uid = r.user_uid
+            WHERE r.is_hate_speech
+              AND r.created_at >= (NOW() AT TIME ZONE 'UTC') - make_interval(days => %s)
+            ORDER BY r.created_at DESC
+            LIMIT %s
+        """, (days, limit))
+        return await result.fetchall()
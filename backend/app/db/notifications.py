@@ -1,36 +1,214 @@
 """Notifications System für User-Benachrichtigungen"""
 
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
+
+from psycopg import sql
+
+from app.config import settings
 from app.db.postgres import PostgresDB
+from app.cache.redis_cache import UnreadCounter
+
+
+# Advisory-Lock für Schema-Migration und Partitions-Wartung (mehrere Worker)
+NOTIFICATIONS_LOCK_ID = 740301
+
+NOTIFICATION_COLUMNS = "user_uid, actor_uid, type, post_id, post_author_uid, comment_id, group_id, is_read, created_at"
+
+# Typen, die pro Ziel zusammengefasst werden ("Anna und 14 weitere haben deinen Post geliked")
+COALESCE_TYPES = ("post_liked", "post_commented", "comment_liked")
+
+# Benachrichtigungen über eigene Aktionen (actor_uid == user_uid)
+SELF_NOTIFICATION_TYPES = ("welcome", "comment_approved", "comment_hidden")
+
+# Nur in der App, ohne E-Mail und Digest
+IN_APP_ONLY_TYPES = ("comment_approved", "comment_hidden")
+
+
+def _month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def _add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"notifications_p{month:%Y%m}"
 
 
 async def create_notifications_table():
-    """Erstellt die Notifications-Tabelle"""
+    """
+    Erstellt die Notifications-Tabelle, monatlich nach created_at partitioniert.
+    Eine bestehende, nicht partitionierte Tabelle wird einmalig migriert.
+    """
     async with PostgresDB.connection() as conn:
+        await conn.execute("SELECT pg_advisory_xact_lock(%s)", (NOTIFICATIONS_LOCK_ID,))
+
+        result = await conn.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass('notifications')"
+        )
+        row = await result.fetchone()
+        migrate_legacy = row is not None and row["relkind"] == "r"
+
+        if migrate_legacy:
+            print("🔄 Migrating notifications table to monthly partitions...")
+            await conn.execute("ALTER TABLE notifications RENAME TO notifications_legacy")
+            await conn.execute("ALTER TABLE notifications_legacy RENAME CONSTRAINT notifications_pkey TO notifications_legacy_pkey")
+            await conn.execute("ALTER INDEX IF EXISTS idx_notifications_user RENAME TO idx_notifications_legacy_user")
+            await conn.execute("ALTER SEQUENCE IF EXISTS notifications_notification_id_seq RENAME TO notifications_legacy_notification_id_seq")
+            await conn.execute("ALTER TABLE notifications_legacy ADD COLUMN IF NOT EXISTS group_id INTEGER")
+
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS notifications (
-                notification_id SERIAL PRIMARY KEY,
+                notification_id BIGSERIAL,
                 user_uid INTEGER REFERENCES users(uid) ON DELETE CASCADE,
                 actor_uid INTEGER REFERENCES users(uid) ON DELETE CASCADE,
                 type VARCHAR(50) NOT NULL,
                 post_id INTEGER,
                 post_author_uid INTEGER,
                 comment_id INTEGER,
-                group_id INTEGER,
+                group_id INTEGER REFERENCES groups(group_id) ON DELETE CASCADE,
                 is_read BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                actor_count INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (notification_id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """)
+        await conn.execute(
+            "ALTER TABLE notifications ADD COLUMN IF NOT EXISTS actor_count INTEGER NOT NULL DEFAULT 1"
+        )
+
+        # Keyset-Pagination pro User und Zähler/Listen ungelesener Einträge
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_notifications_user_id
+            ON notifications(user_uid, notification_id DESC)
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_notifications_unread
+            ON notifications(user_uid, notification_id DESC)
+            WHERE is_read = FALSE
         """)
 
+        # Fängt Zeilen außerhalb der angelegten Monate ab (sollte leer bleiben)
         await conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_notifications_user
-            ON notifications(user_uid, is_read, created_at DESC)
+            CREATE TABLE IF NOT EXISTS notifications_default
+            PARTITION OF notifications DEFAULT
         """)
 
+        first_month = _add_months(_month_start(date.today()), -1)
+        if migrate_legacy:
+            result = await conn.execute("SELECT MIN(created_at) AS oldest FROM notifications_legacy")
+            oldest = (await result.fetchone())["oldest"]
+            if oldest:
+                first_month = min(first_month, _month_start(oldest.date()))
+
+        await _create_partitions(conn, first_month, settings.notification_partitions_ahead)
+
+        if migrate_legacy:
+            await conn.execute(f"""
+                INSERT INTO notifications (notification_id, {NOTIFICATION_COLUMNS})
+                SELECT notification_id, user_uid, actor_uid, type, post_id, post_author_uid, comment_id,
+                       group_id, is_read, COALESCE(created_at, CURRENT_TIMESTAMP)
+                FROM notifications_legacy
+            """)
+            await conn.execute("""
+                SELECT setval(
+                    pg_get_serial_sequence('notifications', 'notification_id'),
+                    GREATEST((SELECT MAX(notification_id) FROM notifications_legacy), 1)
+                )
+            """)
+            await conn.execute("DROP TABLE notifications_legacy CASCADE")
+            print("✅ Notifications table migrated to monthly partitions")
+
         await conn.commit()
 
 
+async def _create_partitions(conn, first_month: date, months_ahead: int) -> list[str]:
+    """Legt Monats-Partitionen von first_month bis months_ahead Monate in die Zukunft an"""
+    created = []
+    last_month = _add_months(_month_start(date.today()), months_ahead)
+    month = first_month
+    while month <= last_month:
+        name = _partition_name(month)
+        result = await conn.execute("SELECT to_regclass(%s) AS existing", (name,))
+        if (await result.fetchone())["existing"] is None:
+            await conn.execute(
+                sql.SQL("CREATE TABLE {} PARTITION OF notifications FOR VALUES FROM ({}) TO ({})").format(
+                    sql.Identifier(name), sql.Literal(month), sql.Literal(_add_months(month, 1))
+                )
+            )
+            created.append(name)
+        month = _add_months(month, 1)
+    return created
+
+
+async def ensure_notification_partitions() -> list[str]:
+    """Legt fehlende Partitionen für die kommenden Monate an"""
+    async with PostgresDB.connection() as conn:
+        await conn.execute("SELECT pg_advisory_xact_lock(%s)", (NOTIFICATIONS_LOCK_ID,))
+        created = await _create_partitions(
+            conn, _month_start(date.today()), settings.notification_partitions_ahead
+        )
+        await conn.commit()
+    return created
+
+
+async def purge_old_notifications() -> list[str]:
+    """
+    Retention: Entfernt ganze Monats-Partitionen.
+    - älter als notification_retention_months und ohne ungelesene Einträge
+    - älter als notification_unread_retention_months in jedem Fall
+
+    Returns: Namen der entfernten Partitionen
+    """
+    current_month = _month_start(date.today())
+    read_cutoff = _add_months(current_month, -settings.notification_retention_months)
+    unread_cutoff = _add_months(current_month, -settings.notification_unread_retention_months)
+
+    dropped = []
+    async with PostgresDB.connection() as conn:
+        await conn.execute("SELECT pg_advisory_xact_lock(%s)", (NOTIFICATIONS_LOCK_ID,))
+
+        result = await conn.execute("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'notifications'::regclass
+              AND c.relname ~ '^notifications_p[0-9]{6}$'
+            ORDER BY c.relname
+        """)
+        partitions = [row["relname"] for row in await result.fetchall()]
+
+        for name in partitions:
+            month = datetime.strptime(name[len("notifications_p"):], "%Y%m").date()
+            month_end = _add_months(month, 1)
+            if month_end > read_cutoff:
+                continue
+
+            if month_end > unread_cutoff:
+                result = await conn.execute(
+                    sql.SQL("SELECT EXISTS(SELECT 1 FROM {} WHERE is_read = FALSE) AS has_unread").format(
+                        sql.Identifier(name)
+                    )
+                )
+                if (await result.fetchone())["has_unread"]:
+                    continue
+
+            await conn.execute(
+                sql.SQL("ALTER TABLE notifications DETACH PARTITION {}").format(sql.Identifier(name))
+            )
+            await conn.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+            dropped.append(name)
+
+        await conn.commit()
+
+    if dropped:
+        print(f"🧹 Dropped notification partitions: {', '.join(dropped)}")
+    return dropped
+
+
 async def create_notification(
     user_uid: int,
     actor_uid: int,
@@ -57,100 +235,275 @@ async def create_notification(
     - 'friend_request': Jemand hat dir eine Freundschaftsanfrage gesendet
     - 'friend_request_accepted': Jemand hat deine Freundschaftsanfrage angenommen
     - 'post_shared': Jemand hat einen Post mit dir geteilt
+    - 'comment_approved': Dein Kommentar wurde nach der Moderation freigegeben
+    - 'comment_hidden': Dein Kommentar wurde nach der Moderation ausgeblendet
     """
-    # Erstelle keine Benachrichtigung wenn User sich selbst liked/kommentiert
-    # (Ausnahme: welcome-Benachrichtigung)
-    if user_uid == actor_uid and notification_type != "welcome":
-        return None
+    notifications = await create_notifications_bulk([{
+        "user_uid": user_uid,
+        "actor_uid": actor_uid,
+        "type": notification_type,
+        "post_id": post_id,
+        "post_author_uid": post_author_uid,
+        "comment_id": comment_id,
+        "comment_content": comment_content,
+        "birthday_age": birthday_age,
+        "group_id": group_id,
+        "group_name": group_name
+    }])
+    return notifications[0] if notifications else None
+
+
+# Maximale Anzahl Zeilen pro INSERT-Statement
+BULK_INSERT_CHUNK_SIZE = 1000
+
+
+async def create_notifications_bulk(rows: List[dict]) -> List[dict]:
+    """
+    Erstellt viele Benachrichtigungen in einer Transaktion (Fan-out).
 
-    async with PostgresDB.connection() as conn:
-        result = await conn.execute("""
-            INSERT INTO notifications (user_uid, actor_uid, type, post_id, post_author_uid, comment_id, group_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING notification_id, user_uid, actor_uid, type, post_id, post_author_uid, comment_id, group_id, is_read, created_at
-        """, (user_uid, actor_uid, notification_type, post_id, post_author_uid, comment_id, group_id))
-        row = await result.fetchone()
-        await conn.commit()
+    Jede Zeile ist ein Dict mit den Parametern von create_notification:
+    user_uid, actor_uid, type sowie optional post_id, post_author_uid,
+    comment_id, group_id und die nur für E-Mails genutzten Felder
+    comment_content, birthday_age, group_name.
 
-        if row:
-            notification = {
-                "notification_id": row["notification_id"],
-                "user_uid": row["user_uid"],
-                "actor_uid": row["actor_uid"],
-                "type": row["type"],
-                "post_id": row["post_id"],
-                "post_author_uid": row["post_author_uid"],
-                "comment_id": row["comment_id"],
-                "group_id": row["group_id"],
-                "is_read": row["is_read"],
-                "created_at": row["created_at"].isoformat() if row["created_at"] else None
-            }
+    Likes und Kommentare (COALESCE_TYPES) auf dasselbe Ziel werden mit einer
+    ungelesenen Benachrichtigung aus dem Coalescing-Fenster zusammengefasst:
+    die alte Zeile wird ersetzt (neue ID, damit sie oben erscheint) und
+    actor_count erhöht. Für zusammengefasste Ereignisse wird keine E-Mail versendet.
 
-            # E-Mail-Benachrichtigung versenden (async, fire and forget)
+    Returns: Liste der erstellten Benachrichtigungen (inkl. notification_id)
+    """
+    # Erstelle keine Benachrichtigung wenn User sich selbst liked/kommentiert
+    # (Ausnahme: SELF_NOTIFICATION_TYPES)
+    rows = [r for r in rows if r["user_uid"] != r["actor_uid"] or r["type"] in SELF_NOTIFICATION_TYPES]
+    if not rows:
+        return []
+
+    # Post-Inhalte und Site-URL für E-Mails vor der Transaktion laden
+    email_context = None
+    if settings.email_enabled:
+        try:
+            email_context = await _load_email_context(rows)
+        except Exception as e:
+            print(f"⚠️ Failed to prepare notification emails: {e}")
+
+    notifications = []
+    async with PostgresDB.connection() as conn:
+        # Zusammenfassen vor dem Insert; betrifft nur Einzel-Ereignisse, keine Fan-outs
+        actor_counts = []
+        new_rows = []
+        for r in rows:
+            actor_count, replaced = 1, False
+            if r["type"] in COALESCE_TYPES:
+                actor_count, replaced = await _coalesce_existing(conn, r)
+            actor_counts.append(actor_count)
+            if not replaced:
+                new_rows.append(r)
+
+        for i in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+            chunk = rows[i:i + BULK_INSERT_CHUNK_SIZE]
+            result = await conn.execute("""
+                INSERT INTO notifications (user_uid, actor_uid, type, post_id, post_author_uid, comment_id, group_id, actor_count)
+                SELECT * FROM unnest(
+                    %s::int[], %s::int[], %s::varchar[], %s::int[], %s::int[], %s::int[], %s::int[], %s::int[]
+                )
+                RETURNING notification_id, user_uid, actor_uid, type, post_id, post_author_uid, comment_id, group_id,
+                          actor_count, is_read, created_at
+            """, (
+                [r["user_uid"] for r in chunk],
+                [r["actor_uid"] for r in chunk],
+                [r["type"] for r in chunk],
+                [r.get("post_id") for r in chunk],
+                [r.get("post_author_uid") for r in chunk],
+                [r.get("comment_id") for r in chunk],
+                [r.get("group_id") for r in chunk],
+                actor_counts[i:i + BULK_INSERT_CHUNK_SIZE]
+            ))
+            for row in await result.fetchall():
+                notifications.append({
+                    "notification_id": row["notification_id"],
+                    "user_uid": row["user_uid"],
+                    "actor_uid": row["actor_uid"],
+                    "type": row["type"],
+                    "post_id": row["post_id"],
+                    "post_author_uid": row["post_author_uid"],
+                    "comment_id": row["comment_id"],
+                    "group_id": row["group_id"],
+                    "actor_count": row["actor_count"],
+                    "is_read": row["is_read"],
+                    "created_at": row["created_at"].isoformat() if row["created_at"] else None
+                })
+
+        # E-Mails in derselben Transaktion in die Outbox schreiben.
+        # Savepoint: Fehler beim E-Mail-Aufbau sollen Notifications nicht verhindern.
+        email_rows = [r for r in new_rows if r["type"] not in IN_APP_ONLY_TYPES]
+        if email_context is not None and email_rows:
             try:
-                from app.services.email_service import EmailService
-                import asyncio
-
-                # User-Daten für E-Mail abrufen (inkl. Preferences und Sprache)
-                user_result = await conn.execute("""
-                    SELECT u1.username as to_username, u1.email as to_email,
-                           u1.notification_preferences as prefs,
-                           u1.preferred_language as language,
-                           u2.username as actor_username
-                    FROM users u1
-                    JOIN users u2 ON u2.uid = %s
-                    WHERE u1.uid = %s
-                """, (actor_uid, user_uid))
-                user_row = await user_result.fetchone()
-
-                if user_row and user_row["to_email"]:
-                    # Prüfe ob User diese Benachrichtigung per E-Mail erhalten möchte
-                    prefs = user_row.get("prefs") or {}
-                    email_enabled = prefs.get(notification_type, True)  # Default: aktiviert
-
-                    if email_enabled:
-                        # Post-Inhalt laden falls vorhanden
-                        post_content = None
-                        if post_id and post_author_uid:
-                            try:
-                                from app.db.sqlite_posts import UserPostsDB
-                                posts_db = UserPostsDB(post_author_uid)
-                                post = await posts_db.get_post(post_id)
-                                if post:
-                                    post_content = post.get("content")
-                            except Exception as e:
-                                print(f"⚠️ Failed to load post content for email: {e}")
-
-                        user_language = user_row.get("language") or "de"
-
-                        # Hintergrund-Task für E-Mail-Versand
-                        asyncio.create_task(
-                            EmailService.send_notification_email(
-                                to_email=user_row["to_email"],
-                                to_username=user_row["to_username"],
-                                actor_username=user_row["actor_username"],
-                                notification_type=notification_type,
-                                post_id=post_id,
-                                post_author_uid=post_author_uid,
-                                comment_id=comment_id,
-                                post_content=post_content,
-                                comment_content=comment_content,
-                                birthday_age=birthday_age,
-                                user_language=user_language,
-                                group_id=group_id,
-                                group_name=group_name
-                            )
-                        )
+                async with conn.transaction():
+                    await _queue_notification_emails(conn, email_rows, email_context)
             except Exception as e:
-                # E-Mail-Fehler sollen Notification nicht blockieren
-                print(f"⚠️ Failed to send notification email: {e}")
+                print(f"⚠️ Failed to queue notification emails: {e}")
+
+        await conn.commit()
 
-            return notification
-        return None
+    # Unread-Zähler der Empfänger erhöhen (ersetzte Zeilen waren bereits ungelesen)
+    deltas: dict[int, int] = {}
+    for r in new_rows:
+        deltas[r["user_uid"]] = deltas.get(r["user_uid"], 0) + 1
+    try:
+        await UnreadCounter.adjust_many(deltas)
+    except Exception as e:
+        print(f"⚠️ Failed to update unread counters: {e}")
 
+    return notifications
+
+
+async def _coalesce_existing(conn, row: dict) -> tuple[int, bool]:
+    """
+    Entfernt eine passende ungelesene Benachrichtigung aus dem Coalescing-Fenster.
+    Returns: (actor_count für die neue Zeile, ob eine Zeile ersetzt wurde)
+    """
+    # Kommentare werden pro Post zusammengefasst, Likes pro Post bzw. Kommentar
+    match_comment = row["type"] != "post_commented"
+    target = [row["user_uid"], row["type"], row.get("post_author_uid"), row.get("post_id"), row.get("group_id")]
+    if match_comment:
+        target.append(row.get("comment_id"))
+
+    # Serialisiert gleichzeitige Events auf dasselbe Ziel (z.B. viele Likes auf einen Post)
+    await conn.execute(
+        "SELECT pg_advisory_xact_lock(%s, hashtext(%s))",
+        (NOTIFICATIONS_LOCK_ID, ":".join(str(v) for v in target))
+    )
+
+    query = """
+        DELETE FROM notifications
+        WHERE user_uid = %s AND type = %s AND is_read = FALSE
+          AND post_author_uid IS NOT DISTINCT FROM %s
+          AND post_id IS NOT DISTINCT FROM %s
+          AND group_id IS NOT DISTINCT FROM %s
+          AND created_at >= CURRENT_TIMESTAMP - make_interval(mins => %s)
+    """
+    params = [row["user_uid"], row["type"], row.get("post_author_uid"), row.get("post_id"),
+              row.get("group_id"), settings.notification_coalesce_window_minutes]
+    if match_comment:
+        query += " AND comment_id IS NOT DISTINCT FROM %s"
+        params.append(row.get("comment_id"))
+    query += " RETURNING actor_uid, actor_count"
+
+    result = await conn.execute(query, tuple(params))
+    previous = await result.fetchall()
+    if not previous:
+        return 1, False
+
+    # Erneutes Event desselben Actors (z.B. Unlike + Like) zählt nicht doppelt
+    count = sum(p["actor_count"] for p in previous)
+    if any(p["actor_uid"] == row["actor_uid"] for p in previous):
+        return count, True
+    return count + 1, True
+
+
+async def _load_email_context(rows: List[dict]) -> dict:
+    """Lädt Site-URL und Post-Inhalte (einmal pro Post) für die E-Mails"""
+    from app.db.site_settings import get_site_url
+    from app.services.email_template_registry import EmailTemplateRegistry
+
+    # Geänderte Admin-Templates übernehmen (prüft Redis höchstens alle paar Sekunden)
+    await EmailTemplateRegistry.refresh()
+
+    try:
+        site_url = await get_site_url()
+    except Exception:
+        site_url = "http://localhost:4200"
+
+    post_contents: dict[tuple[int, int], Optional[str]] = {}
+    for r in rows:
+        post_id = r.get("post_id")
+        post_author_uid = r.get("post_author_uid")
+        if not post_id or not post_author_uid:
+            continue
+        key = (post_author_uid, post_id)
+        if key in post_contents:
+            continue
+        post_contents[key] = None
+        try:
+            from app.db.sqlite_posts import UserPostsDB
+            post = await UserPostsDB(post_author_uid).get_post(post_id)
+            if post:
+                post_contents[key] = post.get("content")
+        except Exception as e:
+            print(f"⚠️ Failed to load post content for email: {e}")
+
+    return {"site_url": site_url, "post_contents": post_contents}
+
+
+async def _queue_notification_emails(conn, rows: List[dict], email_context: dict) -> None:
+    """
+    Schreibt E-Mails zu neuen Benachrichtigungen in die Outbox (ohne Commit).
+    Preferences, Sprache und Actor-Namen werden in einer Abfrage geladen.
+    """
+    from app.services.email_service import EmailService
+    from app.db.email_outbox import enqueue_emails
+
+    uids = list({r["user_uid"] for r in rows} | {r["actor_uid"] for r in rows})
+    result = await conn.execute("""
+        SELECT uid, username, email, notification_preferences as prefs,
+               preferred_language as language
+        FROM users
+        WHERE uid = ANY(%s)
+    """, (uids,))
+    users = {row["uid"]: row for row in await result.fetchall()}
+
+    emails = []
+    for r in rows:
+        recipient = users.get(r["user_uid"])
+        actor = users.get(r["actor_uid"])
+        if not recipient or not actor or not recipient["email"]:
+            continue
+
+        # Prüfe ob User diese Benachrichtigung per E-Mail erhalten möchte
+        prefs = recipient.get("prefs") or {}
+        if not prefs.get(r["type"], True):  # Default: aktiviert
+            continue
+
+        # Digest-Abonnenten erhalten die Benachrichtigung gesammelt (notification_digest)
+        if prefs.get("email_digest", "off") != "off":
+            continue
+
+        post_id = r.get("post_id")
+        post_author_uid = r.get("post_author_uid")
+        subject, html_content, text_content = EmailService._build_notification_email(
+            recipient["username"], actor["username"], r["type"], post_id, r.get("comment_id"),
+            email_context["site_url"],
+            post_content=email_context["post_contents"].get((post_author_uid, post_id)),
+            comment_content=r.get("comment_content"),
+            birthday_age=r.get("birthday_age"),
+            group_id=r.get("group_id"),
+            group_name=r.get("group_name"),
+            user_language=recipient.get("language") or "de"
+        )
+        emails.append({
+            "to_email": recipient["email"],
+            "subject": subject,
+            "html_content": html_content,
+            "text_content": text_content
+        })
+
+    await enqueue_emails(conn, emails)
+
+
+async def get_notifications(
+    user_uid: int,
+    limit: int = 50,
+    offset: int = 0,
+    unread_only: bool = False,
+    before_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Holt Benachrichtigungen eines Users mit Actor-Info, neueste zuerst.
 
-async def get_notifications(user_uid: int, limit: int = 50, offset: int = 0, unread_only: bool = False) -> List[dict]:
-    """Holt alle Benachrichtigungen eines Users mit Actor-Info"""
+    Keyset-Pagination: before_id = notification_id des letzten Eintrags der
+    vorherigen Seite. OFFSET wird nur noch ohne before_id unterstützt.
+    """
     async with PostgresDB.connection() as conn:
         query = """
             SELECT
@@ -162,6 +515,7 @@ async def get_notifications(user_uid: int, limit: int = 50, offset: int = 0, unr
                 n.post_author_uid,
                 n.comment_id,
                 n.group_id,
+                n.actor_count,
                 n.is_read,
                 n.created_at,
                 u.username as actor_username,
@@ -178,8 +532,16 @@ async def get_notifications(user_uid: int, limit: int = 50, offset: int = 0, unr
         if unread_only:
             query += " AND n.is_read = FALSE"
 
-        query += " ORDER BY n.created_at DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
+        if before_id is not None:
+            query += " AND n.notification_id < %s"
+            params.append(before_id)
+
+        query += " ORDER BY n.notification_id DESC LIMIT %s"
+        params.append(limit)
+
+        if offset and before_id is None:
+            query += " OFFSET %s"
+            params.append(offset)
 
         result = await conn.execute(query, tuple(params))
 
@@ -197,6 +559,7 @@ async def get_notifications(user_uid: int, limit: int = 50, offset: int = 0, unr
                 "comment_id": row["comment_id"],
                 "group_id": row["group_id"],
                 "group_name": row["group_name"],
+                "actor_count": row["actor_count"],
                 "is_read": row["is_read"],
                 "created_at": row["created_at"].isoformat() if row["created_at"] else None
             })
@@ -204,28 +567,80 @@ async def get_notifications(user_uid: int, limit: int = 50, offset: int = 0, unr
         return notifications
 
 
-async def get_unread_count(user_uid: int) -> int:
-    """Gibt die Anzahl ungelesener Benachrichtigungen zurück"""
+async def _count_unread(user_uids: List[int]) -> dict[int, int]:
+    """Zählt ungelesene Benachrichtigungen in PostgreSQL (Partial Index)"""
     async with PostgresDB.connection() as conn:
         result = await conn.execute("""
-            SELECT COUNT(*) as count
+            SELECT user_uid, COUNT(*) as count
             FROM notifications
-            WHERE user_uid = %s AND is_read = FALSE
-        """, (user_uid,))
-        row = await result.fetchone()
-        return row["count"] if row else 0
+            WHERE user_uid = ANY(%s) AND is_read = FALSE
+            GROUP BY user_uid
+        """, (user_uids,))
+        counts = {row["user_uid"]: row["count"] for row in await result.fetchall()}
+    return {uid: counts.get(uid, 0) for uid in user_uids}
+
+
+async def get_unread_count(user_uid: int) -> int:
+    """
+    Gibt die Anzahl ungelesener Benachrichtigungen zurück.
+    Liest den Redis-Zähler; fehlt er, wird er aus PostgreSQL neu aufgebaut.
+    """
+    try:
+        count = await UnreadCounter.get(user_uid)
+        if count is not None:
+            return count
+    except Exception as e:
+        print(f"⚠️ Unread counter unavailable: {e}")
+        return (await _count_unread([user_uid]))[user_uid]
+
+    count = (await _count_unread([user_uid]))[user_uid]
+    try:
+        await UnreadCounter.set(user_uid, count)
+    except Exception as e:
+        print(f"⚠️ Failed to store unread counter: {e}")
+    return count
+
+
+async def reconcile_unread_counters() -> int:
+    """
+    Gleicht alle gecachten Unread-Zähler mit PostgreSQL ab.
+    Returns: Anzahl korrigierter Zähler
+    """
+    corrected = 0
+    async for user_uids in UnreadCounter.tracked_uids():
+        counts = await _count_unread(user_uids)
+        cached = await UnreadCounter.get_many(user_uids)
+        corrections = {
+            uid: count for uid, count in counts.items()
+            if cached[uid] is not None and cached[uid] != count
+        }
+        await UnreadCounter.set_many(corrections)
+        corrected += len(corrections)
+    return corrected
+
+
+async def _adjust_unread(user_uid: int, delta: int) -> None:
+    try:
+        await UnreadCounter.adjust(user_uid, delta)
+    except Exception as e:
+        print(f"⚠️ Failed to update unread counter: {e}")
 
 
 async def mark_notification_as_read(notification_id: int, user_uid: int) -> bool:
     """Markiert eine Benachrichtigung als gelesen"""
     async with PostgresDB.connection() as conn:
-        await conn.execute("""
+        result = await conn.execute("""
             UPDATE notifications
             SET is_read = TRUE
-            WHERE notification_id = %s AND user_uid = %s
+            WHERE notification_id = %s AND user_uid = %s AND is_read = FALSE
+            RETURNING notification_id
         """, (notification_id, user_uid))
+        updated = await result.fetchone()
         await conn.commit()
-        return True
+
+    if updated:
+        await _adjust_unread(user_uid, -1)
+    return True
 
 
 async def mark_all_as_read(user_uid: int) -> bool:
@@ -237,15 +652,25 @@ async def mark_all_as_read(user_uid: int) -> bool:
             WHERE user_uid = %s AND is_read = FALSE
         """, (user_uid,))
         await conn.commit()
-        return True
+
+    try:
+        await UnreadCounter.set(user_uid, 0)
+    except Exception as e:
+        print(f"⚠️ Failed to reset unread counter: {e}")
+    return True
 
 
 async def delete_notification(notification_id: int, user_uid: int) -> bool:
     """Löscht eine Benachrichtigung"""
     async with PostgresDB.connection() as conn:
-        await conn.execute("""
+        result = await conn.execute("""
             DELETE FROM notifications
             WHERE notification_id = %s AND user_uid = %s
+            RETURNING is_read
         """, (notification_id, user_uid))
+        deleted = await result.fetchone()
         await conn.commit()
-        return True
+
+    if deleted and not deleted["is_read"]:
+        await _adjust_unread(user_uid, -1)
+    return True
@@ -3,9 +3,17 @@ from psycopg.rows import dict_row
 from psycopg_pool import AsyncConnectionPool
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import time
 
 from app.config import settings
+from app.db.query_stats import QueryStats, TimedAsyncCursor
+from app.services.metrics import Metrics
+from app.cache.redis_cache import UserCache, SessionCache
+
+
+# Serialisiert die Schema-Erstellung, wenn mehrere Prozesse gleichzeitig starten
+SCHEMA_LOCK_ID = 740300
 
 
 class PostgresDB:
@@ -16,11 +24,13 @@ class PostgresDB:
         """Initialisiert den Connection Pool beim App-Start"""
         cls._pool = AsyncConnectionPool(
             conninfo=settings.postgres_dsn,
-            min_size=5,
-            max_size=20,
-            kwargs={"row_factory": dict_row}
+            min_size=settings.postgres_pool_min_size,
+            max_size=settings.postgres_pool_max_size,
+            timeout=settings.postgres_pool_timeout,
+            kwargs={"row_factory": dict_row, "cursor_factory": TimedAsyncCursor}
         )
         await cls._pool.open()
+        Metrics.register_collector(cls._collect_pool_metrics)
         await cls._init_schema()
     
     @classmethod
@@ -33,13 +43,62 @@ class PostgresDB:
     @asynccontextmanager
     async def connection(cls) -> AsyncGenerator[psycopg.AsyncConnection, None]:
         """Context Manager für Datenbankverbindungen"""
+        requested_at = time.perf_counter()
         async with cls._pool.connection() as conn:
+            QueryStats.record_checkout((time.perf_counter() - requested_at) * 1000)
             yield conn
-    
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """
+        Aktuelle Pool-Statistiken dieses Workers.
+        in_use = geöffnete Verbindungen, die gerade ausgeliehen sind.
+        """
+        if not cls._pool:
+            return {}
+        stats = cls._pool.get_stats()
+        pool_size = stats.get("pool_size", 0)
+        pool_available = stats.get("pool_available", 0)
+        return {
+            "min_size": stats.get("pool_min", settings.postgres_pool_min_size),
+            "max_size": stats.get("pool_max", settings.postgres_pool_max_size),
+            "size": pool_size,
+            "available": pool_available,
+            "in_use": pool_size - pool_available,
+            "requests_waiting": stats.get("requests_waiting", 0),
+            "requests_total": stats.get("requests_num", 0),
+            "requests_queued_total": stats.get("requests_queued", 0),
+            "requests_wait_ms_total": stats.get("requests_wait_ms", 0),
+            "requests_errors_total": stats.get("requests_errors", 0),
+            "connections_errors_total": stats.get("connections_errors", 0),
+            "checkout": QueryStats.checkout_stats()
+        }
+
+    @classmethod
+    def _collect_pool_metrics(cls):
+        stats = cls.pool_stats()
+        if not stats:
+            return []
+        return [
+            ("db_pool_size", {}, stats["size"]),
+            ("db_pool_max_size", {}, stats["max_size"]),
+            ("db_pool_in_use", {}, stats["in_use"]),
+            ("db_pool_available", {}, stats["available"]),
+            ("db_pool_requests_waiting", {}, stats["requests_waiting"]),
+            ("db_pool_requests_total", {}, stats["requests_total"]),
+            ("db_pool_requests_errors_total", {}, stats["requests_errors_total"]),
+        ]
+
     @classmethod
     async def _init_schema(cls):
-        """Erstellt die Tabellen falls nicht vorhanden"""
+        """
+        Erstellt die Tabellen falls nicht vorhanden.
+        Backend, Worker und Mailer starten gleichzeitig (skaliert auch mehrfach):
+        das DDL läuft unter einem Advisory-Lock nacheinander statt parallel.
+        """
         async with cls.connection() as conn:
+            await conn.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
+
             # Users mit Rollen
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -95,6 +154,25 @@ class PostgresDB:
                 ADD COLUMN IF NOT EXISTS birthday DATE
             """)
 
+            # Monat/Tag des Geburtstags (MMDD) für die indizierte tägliche Suche
+            await conn.execute("""
+                ALTER TABLE users
+                ADD COLUMN IF NOT EXISTS birthday_mmdd SMALLINT GENERATED ALWAYS AS (
+                    (EXTRACT(MONTH FROM birthday) * 100 + EXTRACT(DAY FROM birthday))::smallint
+                ) STORED
+            """)
+
+            await conn.execute("""
+                ALTER TABLE users
+                ADD COLUMN IF NOT EXISTS birthday_notified_on DATE
+            """)
+
+            # IANA-Zeitzone (vom Browser gemeldet), NULL = birthday_default_timezone
+            await conn.execute("""
+                ALTER TABLE users
+                ADD COLUMN IF NOT EXISTS timezone VARCHAR(64)
+            """)
+
             await conn.execute("""
                 ALTER TABLE users
                 ADD COLUMN IF NOT EXISTS notification_preferences JSONB DEFAULT '{}'::jsonb
@@ -208,6 +286,11 @@ class PostgresDB:
                     resolution TEXT
                 )
             """)
+            # Optionaler Bezug auf einen veröffentlichten Post (für die Moderations-Statistik)
+            await conn.execute("""
+                ALTER TABLE moderation_disputes
+                ADD COLUMN IF NOT EXISTS post_id INTEGER
+            """)
             
             # Indexes
             await conn.execute("""
@@ -234,6 +317,11 @@ class PostgresDB:
                 CREATE INDEX IF NOT EXISTS idx_users_last_login
                 ON users(last_login)
             """)
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_users_birthday_mmdd
+                ON users(birthday_mmdd)
+                WHERE birthday_mmdd IS NOT NULL
+            """)
 
             # Groups
             await conn.execute("""
@@ -307,31 +395,7 @@ class PostgresDB:
                 ON group_posts(group_id, created_at DESC)
             """)
 
-            # Notifications table
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS notifications (
-                    notification_id SERIAL PRIMARY KEY,
-                    user_uid INTEGER REFERENCES users(uid) ON DELETE CASCADE,
-                    actor_uid INTEGER REFERENCES users(uid) ON DELETE CASCADE,
-                    type VARCHAR(50) NOT NULL,
-                    post_id INTEGER,
-                    post_author_uid INTEGER,
-                    comment_id INTEGER,
-                    group_id INTEGER REFERENCES groups(group_id) ON DELETE CASCADE,
-                    is_read BOOLEAN DEFAULT FALSE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            await conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_notifications_user
-                ON notifications(user_uid, is_read, created_at DESC)
-            """)
-
-            # Migration: add group_id column for existing databases without it
-            await conn.execute("""
-                ALTER TABLE notifications
-                ADD COLUMN IF NOT EXISTS group_id INTEGER REFERENCES groups(group_id) ON DELETE CASCADE
-            """)
+            # Notifications table: partitioniert, siehe app.db.notifications.create_notifications_table
 
             # Welcome Messages
             await conn.execute("""
@@ -368,13 +432,17 @@ class PostgresDB:
 
             await conn.commit()
 
+        # Notifications (monatlich partitioniert, migriert bestehende Tabellen)
+        from app.db.notifications import create_notifications_table
+        await create_notifications_table()
+
 
 # === User Queries ===
 async def get_user_by_uid(uid: int) -> dict | None:
     async with PostgresDB.connection() as conn:
         result = await conn.execute(
             """SELECT uid, username, email, password_hash, role, bio, is_banned, banned_until, created_at,
-                      profile_picture, first_name, last_name, preferred_language, birthday
+                      profile_picture, first_name, last_name, preferred_language, birthday, timezone
                FROM users WHERE uid = %s""",
             (uid,)
         )
@@ -424,6 +492,16 @@ async def create_user(username: str, email: str, password_hash: str, first_name:
         return await result.fetchone()
 
 
+async def update_password_hash(uid: int, password_hash: str) -> None:
+    """Ersetzt den Passwort-Hash (Rehash bei geändertem Cost-Faktor)"""
+    async with PostgresDB.connection() as conn:
+        await conn.execute(
+            "UPDATE users SET password_hash = %s WHERE uid = %s",
+            (password_hash, uid)
+        )
+        await conn.commit()
+
+
 async def update_user_role(uid: int, role: str) -> bool:
     async with PostgresDB.connection() as conn:
         result = await conn.execute(
@@ -431,6 +509,8 @@ async def update_user_role(uid: int, role: str) -> bool:
             (role, uid)
         )
         await conn.commit()
+        await UserCache.invalidate(uid)
+        await SessionCache.revoke_all(uid)  # Rolle steckt im Token
         return await result.fetchone() is not None
 
 
@@ -449,6 +529,8 @@ async def ban_user(uid: int, days: int | None, reason: str) -> bool:
                 (reason, uid)
             )
         await conn.commit()
+        await UserCache.invalidate(uid)
+        await SessionCache.revoke_all(uid)
         return True
 
 
@@ -459,6 +541,7 @@ async def unban_user(uid: int) -> bool:
             (uid,)
         )
         await conn.commit()
+        await UserCache.invalidate(uid)
         return True
 
 
@@ -830,17 +913,46 @@ async def decrement_user_posts_count(user_uid: int) -> None:
         await conn.commit()
 
 
-async def get_users_with_birthday_today() -> list[dict]:
-    """Gibt alle User zurück, die heute Geburtstag haben"""
+async def get_users_with_birthday_on(mmdd_values: list[int]) -> list[dict]:
+    """Gibt alle User zurück, deren Geburtstag (MMDD) in mmdd_values liegt"""
     async with PostgresDB.connection() as conn:
         result = await conn.execute(
             """
-            SELECT uid, username, birthday
+            SELECT uid, username, birthday, birthday_mmdd, timezone, birthday_notified_on
             FROM users
-            WHERE birthday IS NOT NULL
-              AND EXTRACT(MONTH FROM birthday) = EXTRACT(MONTH FROM CURRENT_DATE)
-              AND EXTRACT(DAY FROM birthday) = EXTRACT(DAY FROM CURRENT_DATE)
+            WHERE birthday_mmdd = ANY(%s)
               AND is_banned = FALSE
+            """,
+            (mmdd_values,)
+        )
+        return await result.fetchall()
+
+
+async def get_friend_pairs(uids: list[int]) -> list[dict]:
+    """Gibt die akzeptierten Freunde mehrerer User in einer Abfrage zurück (uid, friend_uid)"""
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute(
             """
+            SELECT user_id AS uid, friend_id AS friend_uid FROM friendships
+            WHERE user_id = ANY(%s) AND status = 'accepted'
+            UNION
+            SELECT friend_id AS uid, user_id AS friend_uid FROM friendships
+            WHERE friend_id = ANY(%s) AND status = 'accepted'
+            """,
+            (uids, uids)
         )
         return await result.fetchall()
+
+
+async def mark_birthdays_notified(uids: list[int], dates: list[date]):
+    """Merkt sich pro User den (lokalen) Tag der letzten Geburtstags-Benachrichtigung"""
+    async with PostgresDB.connection() as conn:
+        await conn.execute(
+            """
+            UPDATE users u SET birthday_notified_on = d.day
+            FROM unnest(%s::int[], %s::date[]) AS d(uid, day)
+            WHERE u.uid = d.uid
+            """,
+            (uids, dates)
+        )
+        await conn.commit()
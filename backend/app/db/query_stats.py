@@ -0,0 +1,170 @@
+"""
+Statement-Timing und Slow-Query-Log für PostgreSQL.
+
+Alle Statements laufen über `TimedAsyncCursor` (als cursor_factory im Pool
+gesetzt). Pro normalisiertem SQL werden Aufrufe, Gesamt- und Maximaldauer
+seit dem Start des Workers gesammelt.
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+from psycopg import AsyncCursor
+
+from app.config import settings
+from app.services.metrics import Metrics
+
+
+_APP_ROOT = str(Path(__file__).resolve().parent.parent)
+_THIS_FILE = str(Path(__file__).resolve())
+
+_RE_WHITESPACE = re.compile(r"\s+")
+_RE_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+
+# Obergrenze für unterschiedliche Statements im Speicher
+MAX_TRACKED_STATEMENTS = 500
+
+Metrics.describe("db_query_duration_ms", "summary", "Dauer der SQL-Statements in Millisekunden")
+Metrics.describe("db_slow_queries_total", "counter", "Statements über dem Slow-Query-Schwellwert")
+Metrics.describe("db_pool_checkout_ms", "summary", "Wartezeit auf eine Pool-Verbindung in Millisekunden")
+Metrics.describe("db_pool_in_use", "gauge", "Aktuell ausgeliehene Verbindungen")
+Metrics.describe("db_pool_requests_waiting", "gauge", "Requests, die auf eine Verbindung warten")
+
+
+def normalize_sql(query) -> str:
+    """
+    Normalisiert SQL für die Aggregation:
+    Whitespace zusammenfassen, Literale durch ? ersetzen, IN-Listen kürzen.
+    """
+    if not isinstance(query, str):
+        # psycopg.sql.Composed o.ä.
+        query = str(query)
+    sql = _RE_WHITESPACE.sub(" ", query).strip()
+    sql = _RE_PLACEHOLDER_LIST.sub("(%s, ...)", sql)
+    sql = _RE_STRING.sub("?", sql)
+    sql = _RE_NUMBER.sub("?", sql)
+    return sql
+
+
+def _find_call_site() -> str:
+    """Erster Stack-Frame im App-Code außerhalb dieses Moduls"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_APP_ROOT) and filename != _THIS_FILE:
+            relative = filename[len(_APP_ROOT) - len("app"):]
+            return f"{relative}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryStats:
+    """Sammelt Statement- und Checkout-Statistiken pro Worker-Prozess"""
+
+    _statements: dict[str, dict] = {}
+    _checkout_count: int = 0
+    _checkout_total_ms: float = 0.0
+    _checkout_max_ms: float = 0.0
+    _started_at: float = time.time()
+
+    @classmethod
+    def record_query(cls, query, duration_ms: float) -> None:
+        if not settings.query_stats_enabled:
+            return
+
+        sql = normalize_sql(query)
+        entry = cls._statements.get(sql)
+        if entry is None:
+            if len(cls._statements) >= MAX_TRACKED_STATEMENTS:
+                # Selten genutzte Statements verdrängen
+                least_used = min(cls._statements, key=lambda k: cls._statements[k]["calls"])
+                del cls._statements[least_used]
+            entry = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "slow_calls": 0, "last_call_site": None}
+            cls._statements[sql] = entry
+
+        entry["calls"] += 1
+        entry["total_ms"] += duration_ms
+        if duration_ms > entry["max_ms"]:
+            entry["max_ms"] = duration_ms
+
+        Metrics.observe("db_query_duration_ms", duration_ms)
+
+        if duration_ms >= settings.slow_query_threshold_ms:
+            call_site = _find_call_site()
+            entry["slow_calls"] += 1
+            entry["last_call_site"] = call_site
+            Metrics.inc("db_slow_queries_total")
+            print(f"🐢 Slow query ({duration_ms:.1f}ms) at {call_site}: {sql[:500]}")
+
+    @classmethod
+    def record_checkout(cls, wait_ms: float) -> None:
+        cls._checkout_count += 1
+        cls._checkout_total_ms += wait_ms
+        if wait_ms > cls._checkout_max_ms:
+            cls._checkout_max_ms = wait_ms
+        Metrics.observe("db_pool_checkout_ms", wait_ms)
+
+    @classmethod
+    def checkout_stats(cls) -> dict:
+        return {
+            "count": cls._checkout_count,
+            "avg_ms": round(cls._checkout_total_ms / cls._checkout_count, 3) if cls._checkout_count else 0.0,
+            "max_ms": round(cls._checkout_max_ms, 3)
+        }
+
+    @classmethod
+    def top_queries(cls, limit: int = 20, order_by: str = "total_ms") -> list[dict]:
+        """
+        Gibt die Top-N Statements zurück.
+        order_by: total_ms, max_ms, avg_ms oder calls
+        """
+        rows = []
+        for sql, entry in list(cls._statements.items()):
+            rows.append({
+                "query": sql,
+                "calls": entry["calls"],
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else 0.0,
+                "max_ms": round(entry["max_ms"], 3),
+                "slow_calls": entry["slow_calls"],
+                "last_slow_call_site": entry["last_call_site"]
+            })
+
+        if order_by not in ("total_ms", "max_ms", "avg_ms", "calls"):
+            order_by = "total_ms"
+        rows.sort(key=lambda r: r[order_by], reverse=True)
+        return rows[:limit]
+
+    @classmethod
+    def uptime_seconds(cls) -> int:
+        return int(time.time() - cls._started_at)
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._statements = {}
+        cls._checkout_count = 0
+        cls._checkout_total_ms = 0.0
+        cls._checkout_max_ms = 0.0
+        cls._started_at = time.time()
+
+
+class TimedAsyncCursor(AsyncCursor):
+    """AsyncCursor, der jede Ausführung misst und an QueryStats meldet"""
+
+    async def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            QueryStats.record_query(query, (time.perf_counter() - start) * 1000)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            QueryStats.record_query(query, (time.perf_counter() - start) * 1000)
@@ -72,10 +72,31 @@ class UserPostsDB:
                     post_id INTEGER,
                     user_uid INTEGER,
                     content TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    moderation_status TEXT DEFAULT 'approved',  -- pending, approved, hidden
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP,
+                    notify_pending INTEGER DEFAULT 0  -- Ergebnis übernommen, Benachrichtigungen ausstehend
                 )
             """)
 
+            # Migration: Moderations-Status für Kommentare (bestehende gelten als freigegeben)
+            try:
+                await db.execute("ALTER TABLE comments ADD COLUMN moderation_status TEXT DEFAULT 'approved'")
+            except:
+                pass  # Column already exists
+
+            # Migration: update_comment setzt updated_at
+            try:
+                await db.execute("ALTER TABLE comments ADD COLUMN updated_at TIMESTAMP")
+            except:
+                pass  # Column already exists
+
+            # Migration: Benachrichtigungen zur asynchronen Moderation idempotent versenden
+            try:
+                await db.execute("ALTER TABLE comments ADD COLUMN notify_pending INTEGER DEFAULT 0")
+            except:
+                pass  # Column already exists
+
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS comment_likes (
                     comment_id INTEGER,
@@ -335,53 +356,116 @@ class UserPostsDB:
             row = await cursor.fetchone()
             return row is not None
     
-    async def add_comment(self, post_id: int, user_uid: int, content: str) -> dict:
-        """Fügt einen Kommentar hinzu"""
+    async def add_comment(self, post_id: int, user_uid: int, content: str, moderation_status: str = "approved") -> dict:
+        """Fügt einen Kommentar hinzu ('pending' = sichtbar nur für den Kommentierenden)"""
+        await self._ensure_db()
+
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
                 """
-                INSERT INTO comments (post_id, user_uid, content)
-                VALUES (?, ?, ?)
+                INSERT INTO comments (post_id, user_uid, content, moderation_status)
+                VALUES (?, ?, ?, ?)
                 RETURNING *
                 """,
-                (post_id, user_uid, content)
+                (post_id, user_uid, content, moderation_status)
             )
             row = await cursor.fetchone()
             await db.commit()
             return dict(row)
     
-    async def get_comments(self, post_id: int, limit: int = 50) -> list[dict]:
-        """Lädt Kommentare für einen Post mit Likes-Count"""
+    async def get_comments(self, post_id: int, limit: int = 50, viewer_uid: Optional[int] = None) -> list[dict]:
+        """
+        Lädt Kommentare für einen Post mit Likes-Count.
+        Nicht freigegebene Kommentare (pending, hidden) sieht nur ihr Verfasser (viewer_uid).
+        """
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
             await self._ensure_comment_likes_table(db)
 
-            cursor = await db.execute(
+            cursor = await self._execute_comments_query(
+                db,
                 """
                 SELECT c.*, COUNT(cl.user_uid) as likes_count
                 FROM comments c
                 LEFT JOIN comment_likes cl ON c.comment_id = cl.comment_id
-                WHERE c.post_id = ?
+                WHERE c.post_id = ? AND (c.moderation_status = 'approved' OR c.user_uid = ?)
                 GROUP BY c.comment_id
                 ORDER BY c.created_at ASC
                 LIMIT ?
                 """,
-                (post_id, limit)
+                (post_id, viewer_uid, limit)
             )
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
     
     async def get_comments_count(self, post_id: int) -> int:
-        """Zählt Kommentare für einen Post"""
+        """Zählt freigegebene Kommentare für einen Post"""
         async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                "SELECT COUNT(*) FROM comments WHERE post_id = ?",
+            cursor = await self._execute_comments_query(
+                db,
+                "SELECT COUNT(*) FROM comments WHERE post_id = ? AND moderation_status = 'approved'",
                 (post_id,)
             )
             row = await cursor.fetchone()
             return row[0] if row else 0
 
+    async def set_comment_moderation_status(self, comment_id: int, status: str, content: str) -> Optional[dict]:
+        """
+        Setzt das Ergebnis der asynchronen Moderation (approved, hidden).
+        Greift nur, solange der Kommentar noch 'pending' ist und den moderierten
+        Inhalt hat. Bis mark_comment_notified liefert ein erneut zugestelltes
+        Ergebnis den Kommentar nochmals (Benachrichtigungen nachholen), danach
+        ändern doppelt zugestellte Ergebnisse nichts.
+        Returns: Der aktualisierte Kommentar oder None
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await self._execute_comments_query(
+                db,
+                """
+                UPDATE comments
+                SET moderation_status = ?, notify_pending = 1
+                WHERE comment_id = ? AND content = ?
+                  AND (moderation_status = 'pending' OR (moderation_status = ? AND notify_pending = 1))
+                RETURNING *
+                """,
+                (status, comment_id, content, status)
+            )
+            row = await cursor.fetchone()
+            await db.commit()
+            return dict(row) if row else None
+
+    async def get_pending_comment(self, comment_id: int) -> Optional[dict]:
+        """Ein Kommentar, solange er auf die asynchrone Moderation oder deren Benachrichtigungen wartet, sonst None"""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await self._execute_comments_query(
+                db,
+                "SELECT * FROM comments WHERE comment_id = ? AND (moderation_status = 'pending' OR notify_pending = 1)",
+                (comment_id,)
+            )
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+
+    async def mark_comment_notified(self, comment_id: int) -> None:
+        """Benachrichtigungen zum Moderations-Ergebnis sind versendet"""
+        async with aiosqlite.connect(self.db_path) as db:
+            await self._execute_comments_query(
+                db,
+                "UPDATE comments SET notify_pending = 0 WHERE comment_id = ?",
+                (comment_id,)
+            )
+            await db.commit()
+
+    async def _execute_comments_query(self, db, sql: str, params: tuple):
+        """Abfrage auf comments; alte DBs ohne moderation_status werden beim ersten Fehler migriert"""
+        try:
+            return await db.execute(sql, params)
+        except aiosqlite.OperationalError:
+            await self._ensure_db()
+            return await db.execute(sql, params)
+
     async def _ensure_comment_likes_table(self, db) -> None:
         """Stellt sicher, dass die comment_likes Tabelle existiert (für alte Datenbanken)"""
         await db.execute("""
@@ -463,7 +547,7 @@ class UserPostsDB:
             # Lade den aktualisierten Kommentar
             cursor = await db.execute(
                 """
-                SELECT comment_id, post_id, user_uid, content, created_at, updated_at
+                SELECT comment_id, post_id, user_uid, content, moderation_status, created_at, updated_at
                 FROM comments
                 WHERE comment_id = ?
                 """,
@@ -1,5 +1,6 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.db.postgres import PostgresDB
@@ -51,7 +52,31 @@ async def lifespan(app: FastAPI):
         print("✅ Notifications table initialized")
     except Exception as e:
         print(f"⚠️ Failed to initialize notifications table: {e}")
+
+    # Digest-Zeitpunkte pro User
+    try:
+        from app.services.notification_digest import create_notification_digest_table
+        await create_notification_digest_table()
+        print("✅ Notification digest table initialized")
+    except Exception as e:
+        print(f"⚠️ Failed to initialize notification digest table: {e}")
     
+    # E-Mail-Outbox Tabelle erstellen
+    try:
+        from app.db.email_outbox import create_email_outbox_table
+        await create_email_outbox_table()
+        print("✅ Email outbox table initialized")
+    except Exception as e:
+        print(f"⚠️ Failed to initialize email outbox table: {e}")
+
+    # Katalog der SafeSpace Moderation Reports (MinIO-Index)
+    try:
+        from app.db.moderation_reports import create_moderation_reports_table
+        await create_moderation_reports_table()
+        print("✅ Moderation reports table initialized")
+    except Exception as e:
+        print(f"⚠️ Failed to initialize moderation reports table: {e}")
+
     # Site Settings Tabelle erstellen
     try:
         from app.db.site_settings import init_site_settings_table
@@ -76,21 +101,57 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Kafka not available: {e}")
 
-    # Birthday Notification Scheduler starten
+    # Ergebnisse der asynchronen Kommentar-Moderation übernehmen
+    try:
+        from app.safespace.comment_moderation import CommentModeration
+        CommentModeration.start()
+        print("✅ Comment moderation consumer started")
+    except Exception as e:
+        print(f"⚠️ Failed to start comment moderation consumer: {e}")
+
+    # Periodische Jobs (Geburtstage, Notification-Wartung, Digests) über den Scheduler;
+    # nur der per Redis-Lock gewählte Leader-Worker führt sie aus
     try:
-        from app.services.birthday_service import start_birthday_scheduler
-        start_birthday_scheduler()
+        from app.services.scheduler import Scheduler
+        from app.services.jobs import register_jobs
+        await Scheduler.create_table()
+        register_jobs()
+        Scheduler.start()
     except Exception as e:
-        print(f"⚠️ Failed to start birthday scheduler: {e}")
+        print(f"⚠️ Failed to start scheduler: {e}")
 
     yield
     
     # Shutdown
+    try:
+        from app.services.scheduler import Scheduler
+        await Scheduler.stop()
+    except Exception:
+        pass
+
+    try:
+        from app.safespace.comment_moderation import CommentModeration
+        await CommentModeration.stop()
+    except Exception:
+        pass
+
     try:
         from app.safespace.kafka_service import KafkaService
         await KafkaService.close_producer()
     except:
         pass
+
+    try:
+        from app.safespace.minio_service import MinIOService
+        await MinIOService.close()
+    except Exception:
+        pass
+
+    try:
+        from app.safespace.llm_client import LLMClient
+        await LLMClient.close()
+    except Exception:
+        pass
     
     await PostgresDB.close_pool()
     await RedisCache.close()
@@ -151,6 +212,13 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus-Metriken dieses Worker-Prozesses"""
+    from app.services.metrics import Metrics
+    return Metrics.render()
+
+
 @app.get("/api/site-settings/title")
 async def get_public_site_title():
     """Öffentlicher Endpunkt für den Site-Titel"""
@@ -48,6 +48,12 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: str | None = None
+    expires_in: int | None = None  # Sekunden
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -74,6 +80,7 @@ class UserProfile(UserPublic):
     last_name: str | None = None
     preferred_language: str | None = None
     birthday: date | None = None
+    timezone: str | None = None
 
 
 class UserWithStats(UserPublic):
@@ -4,10 +4,20 @@ from typing import Optional
 from pydantic import BaseModel
 
 from app.services.auth_service import get_current_user
-from app.safespace.models import ModerationResult, ModerationStatus, UserModerationStats
+from app.safespace.models import ModerationResult, UserModerationStats
 from app.safespace.deepseek_moderator import DeepSeekModerator
 from app.safespace.minio_service import MinIOService
 from app.safespace.config import safespace_settings
+from app.safespace.cascade import ModerationCascade
+from app.safespace.llm_client import LLMClient
+from app.safespace.result_cache import ModerationCache
+from app.db.moderation_reports import (
+    get_post_report_object_key,
+    list_user_moderation_reports,
+    get_user_moderation_stats as get_user_moderation_stats_row,
+    list_recent_hate_speech_reports,
+    mark_report_disputed,
+)
 
 
 router = APIRouter(prefix="/safespace", tags=["SafeSpace Moderation"])
@@ -16,6 +26,7 @@ router = APIRouter(prefix="/safespace", tags=["SafeSpace Moderation"])
 class DisputeRequest(BaseModel):
     content: str
     reason: str
+    post_id: Optional[int] = None  # Bei veröffentlichten Posts
 
 
 @router.get("/status")
@@ -26,7 +37,10 @@ async def get_moderation_status():
         "auto_flag_threshold": safespace_settings.auto_flag_threshold,
         "auto_block_threshold": safespace_settings.auto_block_threshold,
         "kafka_topic": safespace_settings.kafka_topic_new_posts,
-        "deepseek_model": safespace_settings.deepseek_model
+        "deepseek_model": safespace_settings.deepseek_model,
+        "circuit_breaker": LLMClient.breaker().status(),
+        "cache": await ModerationCache.stats() if safespace_settings.moderation_cache_enabled else None,
+        "cascade": await ModerationCascade.stats() if safespace_settings.moderation_cascade_enabled else None
     }
 
 
@@ -56,8 +70,10 @@ async def check_content(
         created_at=datetime.utcnow()
     )
 
-    # Moderieren mit Sprache
-    result = await DeepSeekModerator.moderate_post(temp_post, language)
+    # Eindeutige Fälle über Regeln, sonst DeepSeek mit Sprache
+    result = (await ModerationCascade.triage(temp_post, source="check", language=language)).result
+    if result is None:
+        result = await DeepSeekModerator.moderate_post(temp_post, language)
     
     return {
         "is_hate_speech": result.is_hate_speech,
@@ -103,15 +119,17 @@ async def dispute_moderation(
     """
     from app.db.postgres import PostgresDB
 
-    # Speichere den Widerspruch in der Datenbank
+    # Speichere den Widerspruch in der Datenbank, zusammen mit der User-Statistik
     async with PostgresDB.connection() as conn:
         await conn.execute(
             """
-            INSERT INTO moderation_disputes (user_uid, content, reason, created_at, status)
-            VALUES (%s, %s, %s, %s, 'pending')
+            INSERT INTO moderation_disputes (user_uid, post_id, content, reason, created_at, status)
+            VALUES (%s, %s, %s, %s, %s, 'pending')
             """,
-            (current_user["uid"], request.content, request.reason, datetime.utcnow())
+            (current_user["uid"], request.post_id, request.content, request.reason, datetime.utcnow())
         )
+        if request.post_id is not None:
+            await mark_report_disputed(conn, current_user["uid"], request.post_id)
         await conn.commit()
 
     return {
@@ -123,17 +141,36 @@ async def dispute_moderation(
 @router.get("/reports/post/{post_id}")
 async def get_post_moderation_report(
     post_id: int,
+    author_uid: Optional[int] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """
     Gibt den Moderation Report für einen spezifischen Post zurück.
-    User kann nur eigene Reports sehen (außer Admins).
+    User kann nur eigene Reports sehen; Admins geben mit author_uid den
+    Autor an (post_id ist nur pro Autor eindeutig).
     """
-    # TODO: Implementierung mit DB-Index für post_id -> MinIO path
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Requires database index for efficient lookup"
-    )
+    owner_uid = current_user["uid"]
+    if author_uid is not None and author_uid != owner_uid:
+        if current_user.get("role") != "admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Can only view own reports"
+            )
+        owner_uid = author_uid
+
+    # Katalog liefert den Objektpfad, nur der Report-Body kommt aus MinIO
+    object_key = await get_post_report_object_key(owner_uid, post_id)
+    report = None
+    if object_key:
+        report = await MinIOService.get_moderation_report(object_key)
+
+    if not report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report not found"
+        )
+
+    return report
 
 
 @router.get("/reports/user/{user_uid}")
@@ -154,22 +191,21 @@ async def get_user_moderation_reports(
             detail="Can only view own reports"
         )
     
-    report_paths = MinIOService.list_reports_by_user(user_uid, limit=limit)
-    
-    reports = []
-    for path in report_paths:
-        report = MinIOService.get_moderation_report(path)
-        if report:
-            reports.append({
-                "report_id": report.report_id,
-                "post_id": report.post.post_id,
-                "status": report.result.status.value,
-                "is_hate_speech": report.result.is_hate_speech,
-                "confidence_score": report.result.confidence_score,
-                "categories": [c.value for c in report.result.categories],
-                "processed_at": report.processed_at.isoformat()
-            })
-    
+    rows = await list_user_moderation_reports(user_uid, limit=limit)
+
+    reports = [
+        {
+            "report_id": row["report_id"],
+            "post_id": row["post_id"],
+            "status": row["status"],
+            "is_hate_speech": row["is_hate_speech"],
+            "confidence_score": row["confidence_score"],
+            "categories": row["categories"],
+            "processed_at": row["created_at"].isoformat()
+        }
+        for row in rows
+    ]
+
     return {"reports": reports}
 
 
@@ -187,41 +223,24 @@ async def get_user_moderation_stats(
             detail="Can only view own stats"
         )
     
-    # Reports laden und Statistiken berechnen
-    report_paths = MinIOService.list_reports_by_user(user_uid, limit=1000)
-    
-    stats = UserModerationStats(user_uid=user_uid)
-    category_counts: dict[str, int] = {}
-    total_score = 0.0
-    
-    for path in report_paths:
-        report = MinIOService.get_moderation_report(path)
-        if not report:
-            continue
-        
-        stats.total_posts += 1
-        result = report.result
-        
-        if result.status == ModerationStatus.FLAGGED:
-            stats.flagged_posts += 1
-        elif result.status == ModerationStatus.BLOCKED:
-            stats.blocked_posts += 1
-        elif result.status == ModerationStatus.MODIFIED:
-            stats.modified_posts += 1
-        
-        if result.is_hate_speech:
-            total_score += result.confidence_score
-            
-            for cat in result.categories:
-                category_counts[cat.value] = category_counts.get(cat.value, 0) + 1
-            
-            if stats.last_violation is None or report.processed_at > stats.last_violation:
-                stats.last_violation = report.processed_at
-    
+    # Eine Zeile, fortgeschrieben vom Worker und bei Widersprüchen
+    row = await get_user_moderation_stats_row(user_uid)
+    if row is None:
+        return UserModerationStats(user_uid=user_uid)
+
+    stats = UserModerationStats(
+        user_uid=user_uid,
+        total_posts=row["total_posts"],
+        flagged_posts=row["flagged_posts"],
+        blocked_posts=row["blocked_posts"],
+        modified_posts=row["modified_posts"],
+        categories_triggered=row["categories"],
+        last_violation=row["last_violation"],
+        disputed_posts=row["disputed_posts"],
+        overturned_posts=row["overturned_posts"]
+    )
     if stats.total_posts > 0:
-        stats.hate_speech_score = total_score / stats.total_posts
-    
-    stats.categories_triggered = category_counts
+        stats.hate_speech_score = row["hate_speech_score_sum"] / stats.total_posts
     
     return stats
 
@@ -236,32 +255,21 @@ async def get_recent_reports(
     """
     # TODO: Admin-Check
     
-    from datetime import timedelta
-    
-    today = datetime.utcnow()
-    reports = []
-    
-    for i in range(days):
-        date = today - timedelta(days=i)
-        paths = MinIOService.list_reports_by_date(
-            year=date.year,
-            month=date.month,
-            day=date.day
-        )
-        
-        for path in paths[:50]:  # Max 50 pro Tag
-            report = MinIOService.get_moderation_report(path)
-            if report and report.result.is_hate_speech:
-                reports.append({
-                    "report_id": report.report_id,
-                    "post_id": report.post.post_id,
-                    "author_uid": report.post.author_uid,
-                    "author_username": report.post.author_username,
-                    "content_preview": report.post.content[:100],
-                    "status": report.result.status.value,
-                    "confidence_score": report.result.confidence_score,
-                    "categories": [c.value for c in report.result.categories],
-                    "processed_at": report.processed_at.isoformat()
-                })
-    
-    return {"reports": reports[:100]}  # Max 100 insgesamt
+    rows = await list_recent_hate_speech_reports(days=days, limit=100)
+
+    reports = [
+        {
+            "report_id": row["report_id"],
+            "post_id": row["post_id"],
+            "author_uid": row["author_uid"],
+            "author_username": row["author_username"],
+            "content_preview": row["content_preview"],
+            "status": row["status"],
+            "confidence_score": row["confidence_score"],
+            "categories": row["categories"],
+            "processed_at": row["created_at"].isoformat()
+        }
+        for row in rows
+    ]
+
+    return {"reports": reports}
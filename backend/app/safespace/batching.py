@@ -0,0 +1,334 @@
+"""
+Micro-Batching der DeepSeek-Moderation
+
+Pro Einzelaufruf wird der mehrere Kilobyte lange System-Prompt mitgeschickt
+und bezahlt. Der Batcher sammelt bis zu deepseek_batch_size Posts (oder
+deepseek_batch_wait_ms Millisekunden) je Sprache und moderiert sie in einem
+Aufruf: die Posts gehen als JSON-Array mit IDs hinein, die Antwort ist ein
+JSON-Array mit einem Ergebnis pro ID. Fehlt ein Ergebnis oder ist es
+ungültig, wird dieser Post einzeln moderiert.
+
+Die Prompt-Tokens eines Batches werden auf die Posts verteilt (System-Prompt
+zu gleichen Teilen, Inhalte nach Länge); die Ersparnis pro Post ist der
+Anteil des System-Prompts, den ein Einzelaufruf zusätzlich gekostet hätte.
+"""
+
+import asyncio
+import json
+import re
+from typing import Optional
+
+from app.safespace.config import safespace_settings
+from app.safespace.deepseek_moderator import DeepSeekModerator, get_moderation_system_prompt
+from app.safespace.llm_client import LLMClient
+from app.safespace.models import HateSpeechCategory, ModerationResult, PostMessage, TokenUsage
+from app.safespace.result_cache import ModerationCache, content_digest
+from app.services.metrics import Metrics
+
+
+Metrics.describe("safespace_llm_batches_total", "counter", "DeepSeek-Aufrufe mit mehreren Posts")
+Metrics.describe("safespace_llm_batch_size", "summary", "Posts pro DeepSeek-Batch")
+Metrics.describe("safespace_llm_batch_fallbacks_total", "counter", "Posts, die nach einem Batch einzeln moderiert wurden")
+Metrics.describe("safespace_llm_prompt_tokens_saved_total", "counter", "Geschätzte eingesparte Prompt-Tokens durch Batching")
+
+
+BATCH_INSTRUCTIONS = {
+    "de": """
+
+## Mehrere Beiträge
+Du erhältst ein JSON-Array von Beiträgen mit den Feldern "id" und "text".
+Analysiere jeden Beitrag unabhängig von den anderen. Antworte NUR mit einem
+JSON-Array, das für jeden Beitrag ein Objekt im obigen Ausgabeformat enthält,
+ergänzt um das Feld "id" des Beitrags.""",
+
+    "en": """
+
+## Multiple posts
+You receive a JSON array of posts with the fields "id" and "text".
+Analyze each post independently of the others. Reply ONLY with a JSON array
+containing one object in the output format above per post, with the
+additional field "id" of the post.""",
+
+    "es": """
+
+## Varias publicaciones
+Recibes un array JSON de publicaciones con los campos "id" y "text".
+Analiza cada publicación de forma independiente. Responde SOLO con un array
+JSON que contenga un objeto en el formato de salida anterior por publicación,
+con el campo adicional "id" de la publicación.""",
+
+    "fr": """
+
+## Plusieurs publications
+Tu reçois un tableau JSON de publications avec les champs "id" et "text".
+Analyse chaque publication indépendamment des autres. Réponds UNIQUEMENT avec
+un tableau JSON contenant un objet au format de sortie ci-dessus par
+publication, avec le champ supplémentaire "id" de la publication.""",
+
+    "it": """
+
+## Più post
+Ricevi un array JSON di post con i campi "id" e "text".
+Analizza ogni post indipendentemente dagli altri. Rispondi SOLO con un array
+JSON che contenga un oggetto nel formato di output sopra per ogni post, con il
+campo aggiuntivo "id" del post.""",
+
+    "ar": """
+
+## منشورات متعددة
+ستتلقى مصفوفة JSON من المنشورات تحتوي على الحقلين "id" و "text".
+حلل كل منشور بشكل مستقل عن الآخرين. أجب فقط بمصفوفة JSON تحتوي على كائن
+واحد بتنسيق الإخراج أعلاه لكل منشور، مع الحقل الإضافي "id" للمنشور.""",
+}
+
+# Antwort-Tokens pro Post (wie beim Einzelaufruf), begrenzt durch das Modell-Maximum
+MAX_TOKENS_PER_POST = 1000
+MAX_TOKENS_PER_BATCH = 8192
+
+REQUIRED_FIELDS = ("is_hate_speech", "confidence_score", "categories", "explanation")
+
+
+class _Pending:
+    """Ein wartender Post im Batch"""
+
+    def __init__(self, item_id: str, content: str):
+        self.item_id = item_id
+        self.content = content
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class ModerationBatcher:
+    """
+    Sammelt Moderationen zu Batches und verteilt die Ergebnisse.
+    Eine Instanz pro Prozess (ModerationBatcher.instance()).
+    """
+
+    _instance: Optional["ModerationBatcher"] = None
+
+    def __init__(self, batch_size: int = None, wait_ms: int = None):
+        self.batch_size = batch_size or safespace_settings.deepseek_batch_size
+        self.wait_seconds = (wait_ms if wait_ms is not None else safespace_settings.deepseek_batch_wait_ms) / 1000
+        self._pending: dict[str, list[_Pending]] = {}
+        self._timers: dict[str, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._in_flight: dict[tuple[str, str], asyncio.Future] = {}
+        self._next_id = 0
+        self.batches = 0
+        self.fallbacks = 0
+        self.tokens_saved = 0
+
+    @classmethod
+    def instance(cls) -> "ModerationBatcher":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    async def moderate_post(self, post: PostMessage, language: str = "de") -> tuple[ModerationResult, TokenUsage]:
+        """Moderiert einen Post im nächsten Batch seiner Sprache"""
+        analysis, usage = await self.analyze(post.content, language)
+        return DeepSeekModerator._build_result(post, analysis), usage
+
+    async def analyze(self, content: str, language: str = "de") -> tuple[dict, TokenUsage]:
+        """Analyse eines Inhalts; aus dem Cache oder im nächsten Batch"""
+        if safespace_settings.moderation_cache_enabled:
+            cached, result = await ModerationCache.get(content, language)
+            await ModerationCache.record(result, "worker")
+            if cached is not None:
+                return cached, TokenUsage(batch_size=0)
+
+        # Gleiche Inhalte, die gerade moderiert werden (Spam-Wellen), nur einmal senden
+        key = (language, content_digest(content))
+        running = self._in_flight.get(key)
+        if running is not None:
+            analysis, _ = await asyncio.shield(running)
+            return analysis, TokenUsage(batch_size=0)
+
+        running = asyncio.ensure_future(self._analyze_uncached(content, language))
+        self._in_flight[key] = running
+        try:
+            analysis, usage = await asyncio.shield(running)
+        finally:
+            if running.done():
+                self._in_flight.pop(key, None)
+            else:
+                running.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        await ModerationCache.set(content, language, analysis)
+        return analysis, usage
+
+    async def _analyze_uncached(self, content: str, language: str) -> tuple[dict, TokenUsage]:
+        """Wartet höchstens wait_ms auf weitere Posts"""
+        if self.batch_size <= 1:
+            return await DeepSeekModerator._call_deepseek(content, language), TokenUsage()
+
+        self._next_id += 1
+        item = _Pending(f"p{self._next_id}", content)
+        queue = self._pending.setdefault(language, [])
+        queue.append(item)
+
+        if len(queue) >= self.batch_size:
+            self._flush(language)
+        elif language not in self._timers:
+            self._timers[language] = asyncio.create_task(self._flush_later(language))
+
+        return await item.future
+
+    async def _flush_later(self, language: str):
+        await asyncio.sleep(self.wait_seconds)
+        self._timers.pop(language, None)
+        self._flush(language)
+
+    def _flush(self, language: str):
+        timer = self._timers.pop(language, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        items = self._pending.pop(language, [])
+        if not items:
+            return
+        task = asyncio.create_task(self._run_batch(items, language))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, items: list[_Pending], language: str):
+        if len(items) == 1:
+            # Kein Batch nötig: normaler Einzelaufruf
+            await self._run_single(items[0], language)
+            return
+
+        try:
+            results, usage = await self._call_batch(items, language)
+        except Exception as e:
+            print(f"⚠️ DeepSeek-Batch ({len(items)} Posts) fehlgeschlagen, moderiere einzeln: {e}")
+            results, usage = {}, None
+
+        self.batches += 1
+        Metrics.inc("safespace_llm_batches_total")
+        Metrics.observe("safespace_llm_batch_size", len(items))
+
+        shares = self._split_usage(items, language, usage) if usage else {}
+        missing = []
+        for item in items:
+            analysis = results.get(item.item_id)
+            if analysis is None:
+                missing.append(item)
+                continue
+            share = shares.get(item.item_id, TokenUsage(batch_size=len(items)))
+            self.tokens_saved += share.prompt_tokens_saved
+            Metrics.inc("safespace_llm_prompt_tokens_saved_total", share.prompt_tokens_saved)
+            if not item.future.done():
+                item.future.set_result((analysis, share))
+
+        if missing:
+            self.fallbacks += len(missing)
+            Metrics.inc("safespace_llm_batch_fallbacks_total", len(missing))
+            await asyncio.gather(*(self._run_single(item, language) for item in missing))
+
+    async def _run_single(self, item: _Pending, language: str):
+        try:
+            analysis = await DeepSeekModerator._call_deepseek(item.content, language)
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+            return
+        if not item.future.done():
+            item.future.set_result((analysis, TokenUsage()))
+
+    async def _call_batch(self, items: list[_Pending], language: str) -> tuple[dict[str, dict], dict]:
+        """
+        Ein DeepSeek-Aufruf für alle Posts.
+        Returns: (id -> Analyse für alle gültigen Ergebnisse, usage der API)
+        """
+        system_prompt = self._system_prompt(language)
+        user_prompt = json.dumps(
+            [{"id": item.item_id, "text": item.content} for item in items],
+            ensure_ascii=False
+        )
+
+        data = await LLMClient.chat(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.1,
+            max_tokens=min(MAX_TOKENS_PER_POST * len(items), MAX_TOKENS_PER_BATCH),
+            timeout=60.0
+        )
+
+        expected = {item.item_id for item in items}
+        results = {}
+        for entry in self._parse_batch_response(data["choices"][0]["message"]["content"]):
+            item_id = entry.get("id") if isinstance(entry, dict) else None
+            if item_id in expected and item_id not in results and self._is_valid(entry):
+                results[item_id] = entry
+        return results, data.get("usage") or {}
+
+    @classmethod
+    def _system_prompt(cls, language: str) -> str:
+        return get_moderation_system_prompt(language) + BATCH_INSTRUCTIONS.get(language, BATCH_INSTRUCTIONS["de"])
+
+    @classmethod
+    def _parse_batch_response(cls, response: str) -> list:
+        """Extrahiert das JSON-Array der Antwort (auch aus Markdown-Codeblöcken)"""
+        candidates = [response]
+        code_block = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', response)
+        if code_block:
+            candidates.append(code_block.group(1))
+        array = re.search(r'\[[\s\S]*\]', response)
+        if array:
+            candidates.append(array.group(0))
+
+        for candidate in candidates:
+            try:
+                parsed = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(parsed, dict):
+                # Manche Antworten verpacken das Array in ein Objekt
+                parsed = next((v for v in parsed.values() if isinstance(v, list)), None)
+            if isinstance(parsed, list):
+                return parsed
+
+        print(f"⚠️ Konnte DeepSeek-Batch-Antwort nicht parsen: {response[:200]}")
+        return []
+
+    @classmethod
+    def _is_valid(cls, analysis: dict) -> bool:
+        """Ein Ergebnis wird nur übernommen, wenn _build_result es verarbeiten kann"""
+        if any(field not in analysis for field in REQUIRED_FIELDS):
+            return False
+        if not isinstance(analysis["is_hate_speech"], bool):
+            return False
+        if not isinstance(analysis["confidence_score"], (int, float)):
+            return False
+        if not isinstance(analysis["categories"], list):
+            return False
+        valid_categories = {c.value for c in HateSpeechCategory}
+        return all(c in valid_categories for c in analysis["categories"])
+
+    def _split_usage(self, items: list[_Pending], language: str, usage: dict) -> dict[str, TokenUsage]:
+        """
+        Verteilt die Tokens eines Batches auf die Posts.
+        Tokens pro Zeichen werden aus dem Batch selbst geschätzt.
+        """
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        system_chars = len(self._system_prompt(language))
+        content_chars = [len(item.content) for item in items]
+        total_chars = system_chars + sum(content_chars)
+        if not prompt_tokens or not total_chars:
+            return {}
+
+        tokens_per_char = prompt_tokens / total_chars
+        system_tokens = system_chars * tokens_per_char
+        count = len(items)
+
+        shares = {}
+        for item, chars in zip(items, content_chars):
+            weight = chars / sum(content_chars) if sum(content_chars) else 1 / count
+            shares[item.item_id] = TokenUsage(
+                prompt_tokens=round(system_tokens / count + chars * tokens_per_char),
+                completion_tokens=round(completion_tokens * weight),
+                prompt_tokens_saved=round(system_tokens * (count - 1) / count),
+                batch_size=count
+            )
+        return shares
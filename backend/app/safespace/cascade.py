@@ -0,0 +1,145 @@
+"""
+Moderations-Kaskade
+
+Vor DeepSeek bewertet die kompilierte Regel-Engine (app.safespace.rules)
+jeden Post mit einem Score:
+
+- Keywords aus HATE_KEYWORDS: 0.5 + 0.2 pro Kategorie (wie der SimpleModerator)
+- sonst schwache Signale (RISK_SIGNALS, Großschreibung): 0.15 pro Signal, max. 0.45
+
+Danach entscheidet die Stufe (tier):
+
+    clean    Score < moderation_cascade_clean_below   → automatisch freigegeben
+    abusive  Score >= moderation_cascade_flag_at      → automatisch geflaggt,
+                                                        ein Mensch prüft nach
+    llm      dazwischen                               → DeepSeek
+
+Score 0 heißt nur, dass keine Regel getroffen hat, nicht, dass der Text
+unbedenklich ist: Hassrede ohne Keyword ("Die sollte man alle an die Wand
+stellen") und Texte in anderen Sprachen erkennen die Regeln nicht. Die
+Stufe clean ist deshalb optional (clean_below > 0) und gilt auch dann nur
+für die Sprachen in moderation_cascade_clean_languages. Mit den Defaults
+geht alles, was nicht geflaggt wird, zu DeepSeek.
+
+Die Zähler pro Stufe und Quelle liegen als Metrik und (prozessübergreifend)
+im Redis-Hash safespace:mod:tiers.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from app.cache.redis_cache import RedisCache
+from app.safespace.config import safespace_settings
+from app.safespace.models import ModerationResult, ModerationStatus, PostMessage
+from app.safespace.rules import ScanResult
+from app.safespace.simple_moderator import SimpleModerator
+from app.services.metrics import Metrics
+
+
+Metrics.describe("safespace_moderation_tier_total", "counter", "Moderationen nach Stufe der Kaskade")
+
+TIER_CLEAN = "clean"
+TIER_ABUSIVE = "abusive"
+TIER_LLM = "llm"
+TIERS = (TIER_CLEAN, TIER_ABUSIVE, TIER_LLM)
+
+SIGNAL_WEIGHT = 0.15
+MAX_SIGNAL_SCORE = 0.45
+
+# Großschreibung zählt erst ab dieser Anzahl Buchstaben als Signal
+SHOUTING_MIN_LETTERS = 20
+SHOUTING_RATIO = 0.7
+
+STATS_KEY = "safespace:mod:tiers"
+
+
+@dataclass
+class Triage:
+    """Stufe eines Posts; result ist None, wenn DeepSeek entscheiden muss"""
+    tier: str
+    score: float
+    result: Optional[ModerationResult] = None
+
+
+def rule_score(content: str, scan: ScanResult) -> float:
+    """Score der Regel-Engine (siehe Modul-Docstring)"""
+    if scan.categories:
+        return min(0.5 + len(scan.categories) * 0.2, 1.0)
+
+    signals = len(scan.signals)
+    letters = [c for c in content if c.isalpha()]
+    if len(letters) >= SHOUTING_MIN_LETTERS and sum(c.isupper() for c in letters) / len(letters) >= SHOUTING_RATIO:
+        signals += 1
+    return min(signals * SIGNAL_WEIGHT, MAX_SIGNAL_SCORE)
+
+
+class ModerationCascade:
+    """Vorstufe vor DeepSeek (siehe Modul-Docstring)"""
+
+    @classmethod
+    async def triage(cls, post: PostMessage, source: str = "worker", language: str = "de") -> Triage:
+        """
+        Ordnet einen Post einer Stufe zu.
+        Für clean und abusive liegt das Ergebnis bei, für llm moderiert der Aufrufer.
+
+        Args:
+            language: Sprache, in der der Aufrufer mit DeepSeek moderieren würde
+        """
+        if not safespace_settings.moderation_cascade_enabled:
+            triage = Triage(TIER_LLM, 0.0)
+        else:
+            triage = cls._classify(post, language)
+        await cls.record(triage.tier, source)
+        return triage
+
+    @classmethod
+    def _classify(cls, post: PostMessage, language: str = "de") -> Triage:
+        scan = SimpleModerator.rules().scan(post.content)
+        score = rule_score(post.content, scan)
+
+        if (score < safespace_settings.moderation_cascade_clean_below
+                and language in safespace_settings.moderation_cascade_clean_languages):
+            result = SimpleModerator._moderate(post, scan).model_copy(update={
+                # Nichts zu überarbeiten
+                "suggested_revision": None,
+                "alternative_suggestions": None,
+                "revision_explanation": None,
+            })
+            return Triage(TIER_CLEAN, score, result)
+
+        if score >= safespace_settings.moderation_cascade_flag_at:
+            # Regeln können danebenliegen: markieren statt blockieren, ein Mensch entscheidet
+            result = SimpleModerator._moderate(post, scan).model_copy(update={
+                "status": ModerationStatus.FLAGGED,
+                "requires_human_review": True,
+                "auto_action_taken": SimpleModerator._get_auto_action(ModerationStatus.FLAGGED),
+            })
+            return Triage(TIER_ABUSIVE, score, result)
+
+        return Triage(TIER_LLM, score)
+
+    @classmethod
+    async def record(cls, tier: str, source: str) -> None:
+        """Zählt eine Moderation pro Stufe und Quelle (worker, check, comment)"""
+        Metrics.inc("safespace_moderation_tier_total", tier=tier, source=source)
+        try:
+            await RedisCache.client().hincrby(STATS_KEY, f"{source}:{tier}", 1)
+        except Exception:
+            pass
+
+    @classmethod
+    async def stats(cls) -> dict:
+        """Moderationen pro Stufe und Anteil, der zu DeepSeek ging, pro Quelle"""
+        try:
+            raw = await RedisCache.client().hgetall(STATS_KEY)
+        except Exception:
+            return {}
+
+        stats: dict[str, dict] = {}
+        for field, value in raw.items():
+            source, tier = field.split(":", 1)
+            stats.setdefault(source, dict.fromkeys(TIERS, 0))[tier] = int(value)
+        for counts in stats.values():
+            total = sum(counts[tier] for tier in TIERS)
+            counts["llm_share"] = counts[TIER_LLM] / total if total else 0.0
+        return stats
@@ -0,0 +1,273 @@
+"""
+Asynchrone Moderation von Kommentaren
+
+Kommentare werden sofort gespeichert, ohne auf DeepSeek zu warten. Eindeutige
+Fälle entscheidet die Kaskade (app.safespace.cascade) noch im Request:
+
+    clean    → approved, sofort für alle sichtbar (nur mit clean_below > 0)
+    abusive  → abgelehnt (400), wie bisher
+    llm      → pending, nur für den Kommentierenden sichtbar
+
+Pending-Kommentare gehen wie Posts über safespace.posts.new an den Worker
+(PostMessage mit comment_id und post_author_uid). CommentModeration.start()
+liest im API-Prozess safespace.posts.moderated und setzt den Kommentar auf
+approved oder hidden (Hassrede ab comment_hide_threshold). Den Endstand
+erfahren die Beteiligten über Benachrichtigungen:
+
+    approved  → 'post_commented' an den Post-Autor, 'comment_approved' an den Kommentierenden
+    hidden    → 'comment_hidden' an den Kommentierenden
+
+Ist Kafka nicht erreichbar, wird der Kommentar wie früher direkt mit DeepSeek
+moderiert. Kommentare gehen dafür nicht in den Kafka-Spool (app.safespace.kafka_spool).
+
+Der Result-Consumer committet erst nach apply_result; schlägt es fehl, startet
+er neu und bekommt das Ergebnis erneut. apply_result ist dafür idempotent: bis
+die Benachrichtigungen versendet sind, greift ein erneut zugestelltes Ergebnis
+noch einmal. pending-Kommentare stehen im Redis-ZSET safespace:comments:pending
+(Score = Zeitpunkt des Einreihens); länger als comment_pending_requeue_seconds
+wartende (Nachricht verloren, Worker lange ausgefallen) reiht der Job
+comment_moderation_requeue erneut ein.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.safespace.config import safespace_settings
+from app.safespace.models import ModerationResult, PostMessage
+from app.services.metrics import Metrics
+
+
+Metrics.describe("safespace_comment_moderation_total", "counter", "Asynchron moderierte Kommentare nach Ergebnis")
+Metrics.describe("safespace_comment_requeued_total", "counter", "Erneut eingereihte hängende pending-Kommentare")
+
+STATUS_PENDING = "pending"
+STATUS_APPROVED = "approved"
+STATUS_HIDDEN = "hidden"
+
+# Wartezeit, bevor der Result-Consumer nach einem Fehler neu startet
+RESTART_DELAY_SECONDS = 10.0
+
+# Redis-ZSET: "post_author_uid:comment_id" → Zeitpunkt des (erneuten) Einreihens
+PENDING_KEY = "safespace:comments:pending"
+
+# Höchstens so viele Kommentare pro Lauf von comment_moderation_requeue
+REQUEUE_BATCH_SIZE = 500
+
+
+class CommentModeration:
+    """Kommentar-Moderation über die Kafka-Pipeline (siehe Modul-Docstring)"""
+
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def is_rejected(cls, result: ModerationResult) -> bool:
+        """Hassrede mit ausreichend hohem Score: ablehnen bzw. ausblenden"""
+        return result.is_hate_speech and result.confidence_score >= safespace_settings.comment_hide_threshold
+
+    @classmethod
+    async def screen(cls, post_id: int, commenter: dict, content: str) -> tuple[str, Optional[ModerationResult]]:
+        """
+        Vorprüfung im Request über die Kaskade.
+        Returns: (Status für den neuen Kommentar, Ergebnis der Regeln oder None)
+        """
+        from app.safespace.cascade import ModerationCascade
+
+        message = PostMessage(
+            post_id=post_id,
+            author_uid=commenter["uid"],
+            author_username=commenter["username"],
+            content=content,
+            visibility="public",
+            created_at=datetime.utcnow()
+        )
+        result = (await ModerationCascade.triage(message, source="comment")).result
+        if result is None and safespace_settings.moderation_enabled:
+            return STATUS_PENDING, None
+        if result is None:
+            # Ohne Pipeline wie bisher direkt mit DeepSeek
+            from app.safespace.deepseek_moderator import DeepSeekModerator
+            result = await DeepSeekModerator.moderate_post(message, cache_source="comment")
+        return STATUS_APPROVED, result
+
+    @classmethod
+    async def submit(cls, post_author_uid: int, comment: dict, commenter_username: str) -> str:
+        """
+        Schickt einen pending-Kommentar in die Moderation-Queue.
+        Returns: Status des Kommentars danach (pending, bei Kafka-Fehlern der Endstand)
+        """
+        from app.safespace.kafka_service import PostModerationQueue
+
+        # Vor dem Senden vormerken: scheitert beides, holt comment_moderation_requeue ihn nach
+        await cls._track(post_author_uid, comment["comment_id"])
+        try:
+            queued = await PostModerationQueue.enqueue_comment(
+                post_author_uid=post_author_uid,
+                post_id=comment["post_id"],
+                comment_id=comment["comment_id"],
+                author_uid=comment["user_uid"],
+                author_username=commenter_username,
+                content=comment["content"]
+            )
+        except Exception as e:
+            print(f"⚠️ SafeSpace Queue Error: {e}")
+            queued = False
+        if queued:
+            return STATUS_PENDING
+
+        # Kafka nicht erreichbar: im Request moderieren, Ergebnis wie aus dem Worker anwenden
+        from app.safespace.deepseek_moderator import DeepSeekModerator
+        message = PostMessage(
+            post_id=comment["post_id"],
+            author_uid=comment["user_uid"],
+            author_username=commenter_username,
+            content=comment["content"],
+            visibility="public",
+            created_at=datetime.utcnow(),
+            comment_id=comment["comment_id"],
+            post_author_uid=post_author_uid
+        )
+        result = await DeepSeekModerator.moderate_post(message, cache_source="comment")
+        updated = await cls.apply_result(result.model_copy(update={
+            "comment_id": comment["comment_id"],
+            "post_author_uid": post_author_uid,
+        }))
+        return updated["moderation_status"] if updated else STATUS_PENDING
+
+    @classmethod
+    async def apply_result(cls, result: ModerationResult) -> Optional[dict]:
+        """
+        Übernimmt ein Moderations-Ergebnis für einen Kommentar und benachrichtigt die Beteiligten.
+        Ergebnisse zu Posts, doppelt zugestellte oder veraltete (Kommentar inzwischen
+        bearbeitet oder gelöscht) werden ignoriert. Scheitern die Benachrichtigungen,
+        holt sie ein erneut zugestelltes Ergebnis nach.
+        Returns: Der aktualisierte Kommentar oder None
+        """
+        if result.comment_id is None or result.post_author_uid is None:
+            return None
+
+        from app.db.sqlite_posts import UserPostsDB
+        from app.db.notifications import create_notifications_bulk
+
+        status = STATUS_HIDDEN if cls.is_rejected(result) else STATUS_APPROVED
+        posts_db = UserPostsDB(result.post_author_uid)
+        comment = await posts_db.set_comment_moderation_status(
+            result.comment_id, status, result.original_content
+        )
+        if comment is None:
+            return None
+
+        notifications = [{
+            "user_uid": result.author_uid,
+            "actor_uid": result.author_uid,
+            "type": "comment_approved" if status == STATUS_APPROVED else "comment_hidden",
+            "post_id": result.post_id,
+            "post_author_uid": result.post_author_uid,
+            "comment_id": result.comment_id,
+        }]
+        if status == STATUS_APPROVED:
+            notifications.insert(0, {
+                "user_uid": result.post_author_uid,
+                "actor_uid": result.author_uid,
+                "type": "post_commented",
+                "post_id": result.post_id,
+                "post_author_uid": result.post_author_uid,
+                "comment_id": result.comment_id,
+                "comment_content": result.original_content,
+            })
+        # Beide in einer Transaktion: bei einem Fehler wird keine doppelt versendet
+        await create_notifications_bulk(notifications)
+        await posts_db.mark_comment_notified(result.comment_id)
+        await cls._untrack(result.post_author_uid, result.comment_id)
+
+        Metrics.inc("safespace_comment_moderation_total", status=status)
+        print(f"💬 Kommentar {result.comment_id} zu Post {result.post_id}: {status}")
+        return comment
+
+    # === Hängende pending-Kommentare ===
+
+    @classmethod
+    async def _track(cls, post_author_uid: int, comment_id: int):
+        from app.cache.redis_cache import RedisCache
+        try:
+            await RedisCache.client().zadd(PENDING_KEY, {f"{post_author_uid}:{comment_id}": time.time()})
+        except Exception as e:
+            print(f"⚠️ Kommentar {comment_id} nicht für comment_moderation_requeue vorgemerkt: {e}")
+
+    @classmethod
+    async def _untrack(cls, post_author_uid: int, comment_id: int):
+        from app.cache.redis_cache import RedisCache
+        try:
+            await RedisCache.client().zrem(PENDING_KEY, f"{post_author_uid}:{comment_id}")
+        except Exception as e:
+            print(f"⚠️ Kommentar {comment_id} nicht aus {PENDING_KEY} entfernt: {e}")
+
+    @classmethod
+    async def requeue_stale(cls) -> int:
+        """
+        Reiht pending-Kommentare erneut ein, deren Ergebnis seit
+        comment_pending_requeue_seconds aussteht (siehe Modul-Docstring).
+        Returns: Anzahl erneut eingereihter Kommentare
+        """
+        from app.cache.redis_cache import RedisCache
+        from app.db.postgres import get_user_by_uid
+        from app.db.sqlite_posts import UserPostsDB
+
+        client = RedisCache.client()
+        cutoff = time.time() - safespace_settings.comment_pending_requeue_seconds
+        members = await client.zrangebyscore(PENDING_KEY, "-inf", cutoff, start=0, num=REQUEUE_BATCH_SIZE)
+
+        requeued = 0
+        for member in members:
+            post_author_uid, comment_id = (int(part) for part in member.split(":"))
+            try:
+                comment = await UserPostsDB(post_author_uid).get_pending_comment(comment_id)
+                commenter = await get_user_by_uid(comment["user_uid"]) if comment else None
+                if commenter is None:
+                    # Inzwischen moderiert oder gelöscht
+                    await client.zrem(PENDING_KEY, member)
+                    continue
+                await cls.submit(post_author_uid, comment, commenter["username"])
+                requeued += 1
+            except Exception as e:
+                print(f"⚠️ Kommentar {comment_id} nicht erneut eingereiht: {e}")
+
+        if requeued:
+            Metrics.inc("safespace_comment_requeued_total", requeued)
+            print(f"🔁 {requeued} hängende Kommentare erneut zur Moderation eingereiht")
+        return requeued
+
+    # === Result-Consumer ===
+
+    @classmethod
+    def start(cls):
+        """Startet den Consumer für Moderations-Ergebnisse als Hintergrund-Task"""
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        """Beendet den Consumer"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    async def _run(cls):
+        from app.safespace.kafka_service import KafkaService
+
+        while True:
+            try:
+                await KafkaService.consume_moderated_posts(cls.apply_result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Kafka (noch) nicht erreichbar oder apply_result fehlgeschlagen (z.B. SQLite
+                # gesperrt): später erneut versuchen, das Ergebnis wird erneut zugestellt
+                print(f"⚠️ Kommentar-Moderation: Consumer gestoppt ({e}), Neustart in {RESTART_DELAY_SECONDS:.0f}s")
+            await asyncio.sleep(RESTART_DELAY_SECONDS)
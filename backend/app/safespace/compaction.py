@@ -0,0 +1,445 @@
+"""
+Tägliche Kompaktierung der Moderation Reports
+
+Millionen einzelner JSON-Objekte sind teuer zu listen und auszuwerten. Die
+Kompaktierung fasst die Reports eines Tages zusammen:
+
+    archive/YYYY/MM/DD/reports.jsonl.zst   ein Report pro Zeile, zstd-komprimiert
+    archive/YYYY/MM/DD/manifest.json       Anzahl, Größe, SHA-256, Aggregate, Frame-Index
+
+Das Manifest wird zuletzt geschrieben und markiert den Tag als kompaktiert.
+Dashboard-Aggregate (Kategorien, Flag-Raten) werden aus den Manifesten
+berechnet, ohne einzelne Reports zu laden. Nach report_raw_retention_days
+werden die Einzelobjekte kompaktierter Tage gelöscht; get_moderation_report
+liest sie danach aus dem Archiv.
+
+Das Archiv ist nach report_id sortiert und besteht aus unabhängigen
+zstd-Frames zu je FRAME_REPORTS Reports. Der Frame-Index im Manifest
+(erste report_id, Offset, Länge) erlaubt Einzelabrufe mit einem Range-Request
+auf einen Frame. Eine erneute Kompaktierung führt die vorhandenen
+Einzelobjekte mit dem bestehenden Archiv zusammen; ein Archiv wird nie durch
+eines mit weniger Reports ersetzt.
+
+Parsen, Zusammenführen und Komprimieren laufen in einem Thread
+(asyncio.to_thread), damit der Job den Event Loop des API-Prozesses, in dem
+der Scheduler läuft, nicht blockiert.
+
+Läuft täglich als Scheduler-Job (app.services.jobs). Manuell:
+    python -m app.safespace.compaction --day 2025-06-01
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from app.safespace.config import safespace_settings
+from app.safespace.models import ModerationReport, ModerationStatus
+
+
+ARCHIVE_PREFIX = "archive/"
+# Version 2: sortiert, ein zstd-Frame pro FRAME_REPORTS Reports, Frame-Index im Manifest
+MANIFEST_VERSION = 2
+
+# Reports pro Frame: kleinere Frames = kleinere Range-Requests, aber schlechtere Kompression
+FRAME_REPORTS = 500
+
+# zstd-Level: guter Kompromiss aus Kompressionsrate und CPU
+ZSTD_LEVEL = 10
+
+
+def _day_path(day: date) -> str:
+    return f"{day.year}/{day.month:02d}/{day.day:02d}/"
+
+
+def raw_prefix(day: date) -> str:
+    return f"reports/{_day_path(day)}"
+
+
+def archive_key(day: date) -> str:
+    return f"{ARCHIVE_PREFIX}{_day_path(day)}reports.jsonl.zst"
+
+
+def manifest_key(day: date) -> str:
+    return f"{ARCHIVE_PREFIX}{_day_path(day)}manifest.json"
+
+
+def _empty_aggregates() -> dict:
+    return {
+        "total": 0,
+        "hate_speech": 0,
+        "statuses": {s.value: 0 for s in ModerationStatus},
+        "categories": {},
+        "confidence_sum": 0.0,
+    }
+
+
+def _add_to_aggregates(aggregates: dict, report: ModerationReport):
+    result = report.result
+    aggregates["total"] += 1
+    aggregates["statuses"][result.status.value] += 1
+    if result.is_hate_speech:
+        aggregates["hate_speech"] += 1
+        aggregates["confidence_sum"] += result.confidence_score
+        for category in result.categories:
+            aggregates["categories"][category.value] = aggregates["categories"].get(category.value, 0) + 1
+
+
+def _storage():
+    from app.safespace.minio_service import MinIOService
+    return MinIOService.storage()
+
+
+async def load_manifest(day: date) -> Optional[dict]:
+    """Manifest eines Tages oder None, wenn der Tag nicht kompaktiert ist"""
+    storage = _storage()
+    data = await storage.get(safespace_settings.minio_bucket_moderation, manifest_key(day))
+    return json.loads(data) if data else None
+
+
+def _report_id(key: str) -> str:
+    """report_id aus dem Objekt-Schlüssel (reports/YYYY/MM/DD/<report_id>.json)"""
+    return key.rsplit("/", 1)[-1][:-len(".json")]
+
+
+def _read_lines(f: BinaryIO) -> Iterator[bytes]:
+    """Zeilen eines (mehrteiligen) zstd-Archivs als Stream"""
+    import zstandard
+
+    with zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True) as reader:
+        buffer = b""
+        while chunk := reader.read(1 << 20):
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            yield from (line for line in lines if line)
+        if buffer:
+            yield buffer
+
+
+def _archived_reports(path: Path, manifest: dict) -> Iterator[ModerationReport]:
+    """Reports eines bestehenden Archivs, nach report_id sortiert"""
+    with open(path, "rb") as f:
+        reports = (ModerationReport.model_validate_json(line) for line in _read_lines(f))
+        if manifest.get("frames") is not None:
+            yield from reports
+        else:
+            # Archive vor Version 2 sind unsortiert
+            yield from sorted(reports, key=lambda report: report.report_id)
+
+
+class _FrameWriter:
+    """Schreibt Reports als unabhängige zstd-Frames und merkt sich deren Lage"""
+
+    def __init__(self, f: BinaryIO):
+        import zstandard
+
+        self._file = f
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        self._lines: list[bytes] = []
+        self._first: Optional[str] = None
+        self._offset = 0
+        self.frames: list[dict] = []
+        self.count = 0
+
+    def write(self, report: ModerationReport):
+        if not self._lines:
+            self._first = report.report_id
+        self._lines.append(report.model_dump_json().encode("utf-8") + b"\n")
+        self.count += 1
+        if len(self._lines) >= FRAME_REPORTS:
+            self.flush()
+
+    def flush(self):
+        if not self._lines:
+            return
+        frame = self._compressor.compress(b"".join(self._lines))
+        self._file.write(frame)
+        self.frames.append({"first": self._first, "offset": self._offset, "length": len(frame)})
+        self._offset += len(frame)
+        self._lines = []
+
+
+class _ArchiveMerge:
+    """
+    Führt sortierte Einzelobjekte mit dem (sortierten) bestehenden Archiv zusammen;
+    bei gleicher report_id gilt das Einzelobjekt. Synchron, läuft über asyncio.to_thread.
+    """
+
+    def __init__(self, f: BinaryIO, archived: Iterator[ModerationReport]):
+        self._archived = archived
+        self._pending: Optional[ModerationReport] = None
+        self._started = False
+        self.writer = _FrameWriter(f)
+        self.aggregates = _empty_aggregates()
+
+    def _emit(self, report: ModerationReport):
+        _add_to_aggregates(self.aggregates, report)
+        self.writer.write(report)
+
+    def _advance(self):
+        self._pending = next(self._archived, None)
+
+    def add(self, chunk: list[Optional[bytes]]):
+        """Nächster Block Einzelobjekte (nach report_id sortiert, None = inzwischen gelöscht)"""
+        if not self._started:
+            self._advance()
+            self._started = True
+        for data in chunk:
+            if data is None:
+                continue
+            report = ModerationReport.model_validate_json(data)
+            while self._pending is not None and self._pending.report_id < report.report_id:
+                self._emit(self._pending)
+                self._advance()
+            if self._pending is not None and self._pending.report_id == report.report_id:
+                self._advance()
+            self._emit(report)
+
+    def finish(self):
+        """Übernimmt den Rest des Archivs und schreibt den letzten Frame"""
+        self.add([])
+        while self._pending is not None:
+            self._emit(self._pending)
+            self._advance()
+        self.writer.flush()
+
+
+async def compact_day(day: date, force: bool = False) -> Optional[dict]:
+    """
+    Kompaktiert die Reports eines Tages in ein JSONL.zst-Archiv.
+    Ist der Tag bereits kompaktiert (nur mit force), werden die vorhandenen
+    Einzelobjekte mit dem bestehenden Archiv zusammengeführt.
+    Returns: Manifest oder None, wenn es nichts zu kompaktieren gab
+    """
+    storage = _storage()
+    bucket = safespace_settings.minio_bucket_moderation
+
+    previous = await load_manifest(day)
+    if previous and not force:
+        return None
+
+    keys = [key async for key in storage.list_keys(bucket, raw_prefix(day)) if key.endswith(".json")]
+    if not keys:
+        return None
+    keys.sort(key=_report_id)
+
+    semaphore = asyncio.Semaphore(safespace_settings.report_compaction_concurrency)
+
+    async def load(key: str) -> Optional[bytes]:
+        async with semaphore:
+            return await storage.get(bucket, key)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        archived: Iterator[ModerationReport] = iter(())
+        if previous:
+            previous_path = Path(tmp_dir) / "previous.jsonl.zst"
+            if not await storage.get_file(bucket, archive_key(day), previous_path):
+                raise RuntimeError(f"Archiv für {day} fehlt, Manifest vorhanden - Kompaktierung abgebrochen")
+            archived = _archived_reports(previous_path, previous)
+
+        path = Path(tmp_dir) / "reports.jsonl.zst"
+        with open(path, "wb") as archive_file:
+            merge = _ArchiveMerge(archive_file, archived)
+            # In Blöcken laden, damit nie ein ganzer Tag im Speicher liegt
+            for i in range(0, len(keys), 1000):
+                chunk = await asyncio.gather(*(load(key) for key in keys[i:i + 1000]))
+                await asyncio.to_thread(merge.add, chunk)
+            await asyncio.to_thread(merge.finish)
+
+        written = merge.writer.count
+        if previous and written < previous["object_count"]:
+            raise RuntimeError(
+                f"Neues Archiv für {day} hätte {written} statt {previous['object_count']} Reports - "
+                f"Kompaktierung abgebrochen"
+            )
+
+        sha256 = await asyncio.to_thread(lambda: hashlib.sha256(path.read_bytes()).hexdigest())
+        await storage.put_file(bucket, archive_key(day), path, content_type="application/zstd")
+        archive_size = path.stat().st_size
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "day": day.isoformat(),
+        "format": "jsonl.zst",
+        "archive_key": archive_key(day),
+        "object_count": written,
+        "archive_size": archive_size,
+        "sha256": sha256,
+        "compacted_at": datetime.utcnow().isoformat(),
+        "aggregates": merge.aggregates,
+        "frames": merge.writer.frames,
+    }
+    await storage.put(bucket, manifest_key(day), json.dumps(manifest).encode("utf-8"), "application/json")
+
+    print(f"🗜️ Compacted {written} moderation reports for {day} ({archive_size / 1024:.0f} KiB)")
+    return manifest
+
+
+async def expire_raw_reports(day: date) -> int:
+    """
+    Löscht die Einzelobjekte eines kompaktierten Tages.
+    Vorher werden sie mit dem Archiv zusammengeführt, damit auch Reports, die
+    nach der Kompaktierung hinzugekommen sind, erhalten bleiben.
+    Returns: Anzahl gelöschter Objekte
+    """
+    storage = _storage()
+    bucket = safespace_settings.minio_bucket_moderation
+
+    if not await load_manifest(day):
+        return 0
+
+    keys = [key async for key in storage.list_keys(bucket, raw_prefix(day))]
+    if not keys:
+        return 0
+    # Alle gelisteten Einzelobjekte landen im Archiv (wirft bei Fehlern, dann wird nichts gelöscht)
+    await compact_day(day, force=True)
+
+    deleted = 0
+    for i in range(0, len(keys), 1000):
+        deleted += await storage.delete_many(bucket, keys[i:i + 1000])
+    print(f"🗑️ Expired {deleted} raw moderation reports for {day}")
+    return deleted
+
+
+async def load_archived_report(object_key: str) -> Optional[ModerationReport]:
+    """
+    Sucht einen Report (reports/YYYY/MM/DD/<id>.json) im Tagesarchiv.
+    Für Einzelabrufe nach Ablauf der Retention: lädt über den Frame-Index nur
+    den einen Frame, der den Report enthält.
+    """
+    import zstandard
+
+    parts = object_key.split("/")
+    if len(parts) != 5 or parts[0] != "reports" or not parts[4].endswith(".json"):
+        return None
+    day = date(int(parts[1]), int(parts[2]), int(parts[3]))
+    report_id = _report_id(object_key)
+    needle = f'"report_id":"{report_id}"'.encode("utf-8")
+
+    manifest = await load_manifest(day)
+    if not manifest:
+        return None
+
+    storage = _storage()
+    bucket = safespace_settings.minio_bucket_moderation
+    frames = manifest.get("frames")
+    if frames is not None:
+        index = bisect.bisect_right([frame["first"] for frame in frames], report_id) - 1
+        if index < 0:
+            return None
+        frame = frames[index]
+        data = await storage.get_range(bucket, archive_key(day), frame["offset"], frame["length"])
+        if data is None:
+            return None
+        content = await asyncio.to_thread(zstandard.ZstdDecompressor().decompress, data)
+        for line in content.split(b"\n"):
+            if needle in line:
+                return ModerationReport.model_validate_json(line)
+        return None
+
+    # Archive vor Version 2: ohne Index, als Stream durchsuchen
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "reports.jsonl.zst"
+        if not await storage.get_file(bucket, archive_key(day), path):
+            return None
+
+        def scan() -> Optional[ModerationReport]:
+            with open(path, "rb") as f:
+                for line in _read_lines(f):
+                    if needle in line:
+                        return ModerationReport.model_validate_json(line)
+            return None
+
+        return await asyncio.to_thread(scan)
+
+
+async def run_report_compaction():
+    """
+    Scheduler-Job: kompaktiert die letzten Tage (bis gestern) und
+    löscht Einzelobjekte, die älter als die Retention sind.
+    """
+    today = datetime.utcnow().date()
+
+    for offset in range(safespace_settings.report_compaction_lookback_days, 0, -1):
+        await compact_day(today - timedelta(days=offset))
+
+    # Abgelaufene Tage: ab dem Retention-Stichtag einige Tage zurück prüfen
+    retention_day = today - timedelta(days=safespace_settings.report_raw_retention_days)
+    for offset in range(safespace_settings.report_compaction_lookback_days):
+        day = retention_day - timedelta(days=offset)
+        await compact_day(day)
+        await expire_raw_reports(day)
+
+
+async def get_archive_aggregates(days: int = 30) -> dict:
+    """
+    Dashboard-Aggregate der letzten Tage aus den Manifesten (kompaktierte Tage bis gestern).
+    Returns: Tagesreihe mit Flag-Raten, Summen und Kategorien
+    """
+    today = datetime.utcnow().date()
+    day_list = [today - timedelta(days=offset) for offset in range(days, 0, -1)]
+    manifests = await asyncio.gather(*(load_manifest(day) for day in day_list))
+
+    totals = _empty_aggregates()
+    series = []
+    for day, manifest in zip(day_list, manifests):
+        if not manifest:
+            continue
+        aggregates = manifest["aggregates"]
+        flagged = aggregates["statuses"].get("flagged", 0) + aggregates["statuses"].get("blocked", 0)
+        series.append({
+            "day": day.isoformat(),
+            "total": aggregates["total"],
+            "hate_speech": aggregates["hate_speech"],
+            "flag_rate": flagged / aggregates["total"] if aggregates["total"] else 0.0,
+        })
+
+        totals["total"] += aggregates["total"]
+        totals["hate_speech"] += aggregates["hate_speech"]
+        totals["confidence_sum"] += aggregates["confidence_sum"]
+        for status, count in aggregates["statuses"].items():
+            totals["statuses"][status] = totals["statuses"].get(status, 0) + count
+        for category, count in aggregates["categories"].items():
+            totals["categories"][category] = totals["categories"].get(category, 0) + count
+
+    flagged_total = totals["statuses"].get("flagged", 0) + totals["statuses"].get("blocked", 0)
+    return {
+        "days": series,
+        "total": totals["total"],
+        "hate_speech": totals["hate_speech"],
+        "statuses": totals["statuses"],
+        "categories": totals["categories"],
+        "flag_rate": flagged_total / totals["total"] if totals["total"] else 0.0,
+        "avg_hate_speech_confidence": (
+            totals["confidence_sum"] / totals["hate_speech"] if totals["hate_speech"] else 0.0
+        ),
+    }
+
+
+async def main():
+    from app.safespace.minio_service import MinIOService
+
+    parser = argparse.ArgumentParser(description="Moderation Reports eines Tages kompaktieren")
+    parser.add_argument("--day", type=date.fromisoformat, help="Tag (YYYY-MM-DD), sonst der reguläre Job")
+    parser.add_argument("--force", action="store_true", help="Bereits kompaktierte Tage neu schreiben")
+    parser.add_argument("--expire", action="store_true", help="Einzelobjekte des Tages danach löschen")
+    args = parser.parse_args()
+
+    try:
+        if args.day:
+            await compact_day(args.day, force=args.force)
+            if args.expire:
+                await expire_raw_reports(args.day)
+        else:
+            await run_report_compaction()
+    finally:
+        await MinIOService.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
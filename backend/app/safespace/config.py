@@ -7,6 +7,27 @@ class SafeSpaceSettings(BaseSettings):
     kafka_topic_new_posts: str = "safespace.posts.new"
     kafka_topic_moderated: str = "safespace.posts.moderated"
     kafka_consumer_group: str = "safespace-moderator"
+
+    # Retry-Topics und Dead-Letter-Queue (app.safespace.dead_letters)
+    kafka_topic_retry_prefix: str = "safespace.posts.retry"  # + ".{delay}s"
+    kafka_topic_dead_letter: str = "safespace.posts.dlq"
+    kafka_retry_delays_seconds: list[int] = [30, 300, 1800]  # eine Stufe pro Wert, als JSON-Liste
+
+    # Kafka-Producer (app.safespace.kafka_service)
+    kafka_linger_ms: int = 20  # Wartezeit, um Nachrichten zu Batches zu sammeln
+    kafka_max_batch_size: int = 256 * 1024  # Bytes pro Partition und Batch
+    kafka_compression_type: str = "zstd"  # zstd | lz4 | snappy | gzip | none
+    kafka_enable_idempotence: bool = True  # keine Duplikate durch Producer-Retries
+    kafka_request_timeout_ms: int = 30000  # danach gilt eine Zustellung als fehlgeschlagen
+    kafka_reconnect_backoff_seconds: float = 30.0  # Broker nicht erreichbar: so lange direkt spoolen
+    kafka_spool_dir: str = "/data/kafka-spool"  # nicht zustellbare Nachrichten (app.safespace.kafka_spool)
+    kafka_spool_max_mb: int = 512
+
+    # Moderation-Worker (app.safespace.worker)
+    worker_max_in_flight: int = 16  # gleichzeitig moderierte Posts pro Prozess
+    worker_max_attempts: int = 3  # Versuche pro Nachricht
+    worker_commit_interval_seconds: float = 5.0
+    worker_drain_timeout_seconds: float = 30.0  # bei SIGTERM/Rebalance
     
     # MinIO
     minio_endpoint: str = "minio:9000"
@@ -15,16 +36,55 @@ class SafeSpaceSettings(BaseSettings):
     minio_bucket_media: str = "socialnet-media"
     minio_bucket_moderation: str = "safespace-reports"
     minio_use_ssl: bool = False
+
+    # Object Storage (app.safespace.storage)
+    storage_backend: str = "minio"  # minio | local
+    storage_local_root: str = "/data/object-storage"  # nur für storage_backend=local
+    storage_max_workers: int = 8  # Threads (und HTTP-Verbindungen) für MinIO-Aufrufe
+    storage_part_size: int = 16 * 1024 * 1024  # Multipart-Teilgröße, mind. 5 MiB
+
+    # Tägliche Kompaktierung der Reports (app.safespace.compaction)
+    report_compaction_lookback_days: int = 7  # verpasste Tage nachholen
+    report_compaction_concurrency: int = 16  # parallele Downloads
+    report_raw_retention_days: int = 30  # Einzelobjekte danach löschen
     
     # DeepSeek API
     deepseek_api_key: str = ""
     deepseek_base_url: str = "https://api.deepseek.com/v1"
     deepseek_model: str = "deepseek-chat"
+    deepseek_batch_size: int = 8  # Posts pro Aufruf im Worker, 1 = kein Batching
+    deepseek_batch_wait_ms: int = 200  # max. Wartezeit auf weitere Posts
+
+    # HTTP-Client und Circuit Breaker für DeepSeek (app.safespace.llm_client)
+    llm_http2: bool = True
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_attempt_timeout_seconds: float = 30.0  # pro Versuch
+    llm_max_attempts: int = 3
+    llm_retry_base_delay_seconds: float = 0.5
+    llm_retry_max_delay_seconds: float = 10.0
+    llm_breaker_failure_threshold: int = 5  # aufeinander folgende Fehlschläge
+    llm_breaker_reset_seconds: float = 30.0  # danach ein Probe-Aufruf
+
+    # Cache für Moderations-Ergebnisse (app.safespace.result_cache)
+    moderation_cache_enabled: bool = True
+    moderation_cache_ttl_seconds: int = 7 * 24 * 3600
+    moderation_cache_simhash_enabled: bool = False  # auch nahezu identische Inhalte
+    moderation_cache_simhash_distance: int = 3  # max. abweichende Bits (von 64)
+    moderation_cache_simhash_min_words: int = 8  # kürzere Texte nur exakt
+
+    # Moderations-Kaskade: Regeln vor DeepSeek (app.safespace.cascade)
+    moderation_cascade_enabled: bool = True
+    moderation_cascade_clean_below: float = 0.0  # Regel-Score darunter: freigegeben (0 = aus)
+    moderation_cascade_clean_languages: list[str] = ["de"]  # nur hier gilt clean_below, als JSON-Liste
+    moderation_cascade_flag_at: float = 0.9  # Regel-Score ab hier: geflaggt ohne DeepSeek
     
     # Moderation Settings
     moderation_enabled: bool = True
     auto_flag_threshold: float = 0.7  # Ab diesem Score wird geflaggt
     auto_block_threshold: float = 0.9  # Ab diesem Score wird blockiert
+    comment_hide_threshold: float = 0.8  # Kommentare mit Hassrede ab diesem Score ablehnen/ausblenden
+    comment_pending_requeue_seconds: int = 900  # pending-Kommentare danach erneut einreihen
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,253 @@
+"""
+Retry-Topics und Dead-Letter-Queue für die Moderation
+
+Scheitert die Moderation einer Nachricht auch nach worker_max_attempts
+Versuchen (DeepSeek-Timeout oder HTTP-Fehler trotz der Retries des LLMClient,
+MinIO nicht erreichbar, Ergebnis nicht publiziert), wird sie nicht mehr
+übersprungen, sondern stufenweise später erneut versucht:
+
+    safespace.posts.new → safespace.posts.retry.30s → .300s → .1800s → safespace.posts.dlq
+
+Pro Wert in kafka_retry_delays_seconds gibt es ein Retry-Topic. Der Worker
+liest sie zusammen mit safespace.posts.new; eine Nachricht trägt im Header
+safespace-not-before, ab wann sie wieder dran ist. Ist es noch nicht so weit,
+pausiert der Consumer die Partition bis dahin (alle Nachrichten eines
+Retry-Topics haben dieselbe Wartezeit, die folgenden sind also auch noch nicht
+fällig). Ungültige Nachrichten gehen direkt in die DLQ.
+
+Ein offener Circuit Breaker (app.safespace.llm_client) löst keinen Retry aus:
+DeepSeekModerator moderiert dann mit dem SimpleModerator, die Nachricht gilt
+als erledigt.
+
+Admins sehen die DLQ unter GET /admin/moderation/dead-letters und können
+einzelne Einträge zurück nach safespace.posts.new schicken. Die DLQ selbst
+bleibt unverändert (Kafka löscht nicht einzeln); erneut gesendete Einträge
+werden in Redis vermerkt.
+"""
+
+import json
+import time
+from datetime import datetime
+from typing import Optional
+
+from aiokafka import AIOKafkaConsumer, TopicPartition
+
+from app.safespace.config import safespace_settings
+from app.services.metrics import Metrics
+
+
+Metrics.describe("safespace_moderation_retries_total", "counter", "In ein Retry-Topic verschobene Nachrichten nach Stufe")
+Metrics.describe("safespace_moderation_dead_letters_total", "counter", "In die Dead-Letter-Queue verschobene Nachrichten nach Grund")
+Metrics.describe("safespace_moderation_dlq_replays_total", "counter", "Von Admins erneut gesendete DLQ-Einträge")
+
+HEADER_ATTEMPT = "safespace-retry-attempt"
+HEADER_NOT_BEFORE = "safespace-not-before"
+HEADER_ERROR = "safespace-error"
+HEADER_ORIGINAL_TOPIC = "safespace-original-topic"
+HEADER_FAILED_AT = "safespace-failed-at"
+
+# Redis-Hash: DLQ-Eintrag (partition:offset) → Zeitpunkt des erneuten Sendens
+REPLAYED_KEY = "safespace:dlq:replayed"
+
+# Fehlermeldungen in Headern kürzen
+MAX_ERROR_LENGTH = 500
+
+
+def retry_topics() -> list[str]:
+    """Die Retry-Topics in Reihenfolge der Stufen"""
+    prefix = safespace_settings.kafka_topic_retry_prefix
+    return [f"{prefix}.{delay}s" for delay in safespace_settings.kafka_retry_delays_seconds]
+
+
+def headers_dict(record) -> dict[str, str]:
+    """Header eines ConsumerRecords als dict"""
+    return {key: value.decode("utf-8", "replace") for key, value in (record.headers or ())}
+
+
+def not_before(record) -> float:
+    """Unix-Zeit, ab der die Nachricht verarbeitet werden darf (0 = sofort)"""
+    try:
+        return float(headers_dict(record).get(HEADER_NOT_BEFORE, 0))
+    except ValueError:
+        return 0.0
+
+
+def _key(record) -> Optional[str]:
+    return record.key.decode("utf-8") if isinstance(record.key, bytes) else record.key
+
+
+class DeadLetterRouter:
+    """Verschiebt endgültig fehlgeschlagene Nachrichten in die nächste Stufe (siehe Modul-Docstring)"""
+
+    @classmethod
+    async def route(cls, record, message_id: str, error: Exception, retry: bool = True):
+        """
+        Publiziert die Nachricht ins nächste Retry-Topic bzw. in die DLQ.
+        Wirft bei Kafka-Fehlern, damit der Offset offen bleibt.
+
+        Args:
+            record: ConsumerRecord der fehlgeschlagenen Nachricht
+            retry: False für Nachrichten, die eine Wiederholung nicht rettet (ungültig)
+        """
+        from app.safespace.kafka_service import KafkaService
+
+        headers = headers_dict(record)
+        try:
+            attempt = int(headers.get(HEADER_ATTEMPT, 0))
+        except ValueError:
+            attempt = 0
+        delays = safespace_settings.kafka_retry_delays_seconds
+
+        new_headers = {
+            HEADER_ATTEMPT: str(attempt + 1),
+            HEADER_ERROR: f"{type(error).__name__}: {error}"[:MAX_ERROR_LENGTH],
+            HEADER_ORIGINAL_TOPIC: headers.get(HEADER_ORIGINAL_TOPIC, record.topic),
+            HEADER_FAILED_AT: datetime.utcnow().isoformat(),
+        }
+        if retry and attempt < len(delays):
+            delay = delays[attempt]
+            topic = retry_topics()[attempt]
+            new_headers[HEADER_NOT_BEFORE] = str(time.time() + delay)
+            await KafkaService.republish(topic, _key(record), record.value, new_headers)
+            Metrics.inc("safespace_moderation_retries_total", tier=f"{delay}s")
+            print(f"🔁 Nachricht {message_id} in {delay}s erneut (Stufe {attempt + 1}/{len(delays)})")
+        else:
+            await KafkaService.republish(safespace_settings.kafka_topic_dead_letter, _key(record), record.value, new_headers)
+            Metrics.inc("safespace_moderation_dead_letters_total", reason="exhausted" if retry else "invalid")
+            print(f"☠️ Nachricht {message_id} in die Dead-Letter-Queue verschoben: {error}")
+
+
+# === Admin: DLQ ansehen und erneut senden ===
+
+def _entry(record, replayed: dict) -> dict:
+    headers = headers_dict(record)
+    value = record.value if isinstance(record.value, dict) else {}
+    entry_id = f"{record.partition}:{record.offset}"
+    return {
+        "id": entry_id,
+        "key": _key(record),
+        "post_id": value.get("post_id"),
+        "author_uid": value.get("author_uid"),
+        "author_username": value.get("author_username"),
+        "comment_id": value.get("comment_id"),
+        "post_author_uid": value.get("post_author_uid"),
+        "content_preview": (value.get("content") or "")[:200],
+        "error": headers.get(HEADER_ERROR),
+        "original_topic": headers.get(HEADER_ORIGINAL_TOPIC),
+        "attempts": headers.get(HEADER_ATTEMPT),
+        "failed_at": headers.get(HEADER_FAILED_AT),
+        "replayed_at": replayed.get(entry_id),
+    }
+
+
+def _consumer() -> AIOKafkaConsumer:
+    # Ohne Consumer Group: liest nur, committet nichts
+    return AIOKafkaConsumer(
+        bootstrap_servers=safespace_settings.kafka_bootstrap_servers,
+        group_id=None,
+        enable_auto_commit=False,
+        value_deserializer=lambda v: json.loads(v.decode("utf-8"))
+    )
+
+
+async def _partitions(consumer: AIOKafkaConsumer) -> list[TopicPartition]:
+    topic = safespace_settings.kafka_topic_dead_letter
+    if topic not in await consumer.topics():
+        return []
+    return [TopicPartition(topic, p) for p in sorted(consumer.partitions_for_topic(topic) or ())]
+
+
+async def _replayed() -> dict:
+    from app.cache.redis_cache import RedisCache
+    try:
+        return await RedisCache.client().hgetall(REPLAYED_KEY)
+    except Exception:
+        return {}
+
+
+async def list_dead_letters(limit: int = 100) -> dict:
+    """Die neuesten `limit` Einträge der DLQ und die Gesamtzahl"""
+    consumer = _consumer()
+    await consumer.start()
+    try:
+        partitions = await _partitions(consumer)
+        if not partitions:
+            return {"total": 0, "entries": []}
+        consumer.assign(partitions)
+        beginning = await consumer.beginning_offsets(partitions)
+        end = await consumer.end_offsets(partitions)
+
+        total = 0
+        remaining = {}
+        for tp in partitions:
+            total += end[tp] - beginning[tp]
+            start = max(beginning[tp], end[tp] - limit)
+            if start < end[tp]:
+                consumer.seek(tp, start)
+                remaining[tp] = end[tp]
+            else:
+                consumer.pause(tp)
+
+        records = []
+        while remaining:
+            batches = await consumer.getmany(*remaining, timeout_ms=1000)
+            if not batches:
+                break
+            for tp, messages in batches.items():
+                records.extend(m for m in messages if m.offset < remaining[tp])
+                if messages and messages[-1].offset + 1 >= remaining[tp]:
+                    consumer.pause(tp)
+                    del remaining[tp]
+    finally:
+        await consumer.stop()
+
+    replayed = await _replayed()
+    records.sort(key=lambda r: r.timestamp, reverse=True)
+    return {"total": total, "entries": [_entry(r, replayed) for r in records[:limit]]}
+
+
+async def replay_dead_letter(entry_id: str) -> Optional[dict]:
+    """
+    Sendet einen DLQ-Eintrag ("partition:offset") erneut nach safespace.posts.new,
+    mit zurückgesetztem Versuchszähler.
+    Returns: Der Eintrag oder None, wenn es ihn nicht gibt
+    """
+    from app.safespace.kafka_service import KafkaService
+    from app.cache.redis_cache import RedisCache
+
+    try:
+        partition, offset = (int(part) for part in entry_id.split(":"))
+    except ValueError:
+        return None
+
+    consumer = _consumer()
+    await consumer.start()
+    try:
+        tp = TopicPartition(safespace_settings.kafka_topic_dead_letter, partition)
+        if tp not in await _partitions(consumer):
+            return None
+        consumer.assign([tp])
+        beginning = (await consumer.beginning_offsets([tp]))[tp]
+        end = (await consumer.end_offsets([tp]))[tp]
+        if not beginning <= offset < end:
+            return None
+        consumer.seek(tp, offset)
+        record = None
+        while record is None:
+            batches = await consumer.getmany(tp, timeout_ms=5000, max_records=1)
+            if not batches:
+                return None
+            record = next((m for m in batches.get(tp, []) if m.offset == offset), None)
+    finally:
+        await consumer.stop()
+
+    # Ohne Header: die Nachricht durchläuft die Stufen wieder von vorn
+    await KafkaService.republish(safespace_settings.kafka_topic_new_posts, _key(record), record.value, {})
+    replayed_at = datetime.utcnow().isoformat()
+    try:
+        await RedisCache.client().hset(REPLAYED_KEY, entry_id, replayed_at)
+    except Exception as e:
+        print(f"⚠️ DLQ: erneutes Senden von {entry_id} nicht vermerkt: {e}")
+    Metrics.inc("safespace_moderation_dlq_replays_total")
+    print(f"📤 DLQ-Eintrag {entry_id} erneut zur Moderation gesendet")
+    return {**_entry(record, {}), "replayed_at": replayed_at}
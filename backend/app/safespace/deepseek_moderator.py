@@ -6,6 +6,7 @@ from typing import Optional
 import httpx
 
 from app.safespace.config import safespace_settings
+from app.safespace.llm_client import LLMClient, CircuitOpenError
 from app.safespace.models import (
     PostMessage,
     ModerationResult,
@@ -275,18 +276,28 @@ class DeepSeekModerator:
     """
     
     @classmethod
-    async def moderate_post(cls, post: PostMessage, language: str = "de") -> ModerationResult:
+    async def moderate_post(cls, post: PostMessage, language: str = "de", cache_source: str = "check") -> ModerationResult:
         """
         Analysiert einen Post mit DeepSeek und gibt Moderations-Ergebnis zurück.
 
         Args:
             post: Der zu moderierende Post
             language: Sprache für die Moderation (de, en, es, fr, it, ar)
+            cache_source: Quelle für die Cache-Statistik (check, comment)
         """
+        from app.safespace.result_cache import ModerationCache
 
-        # DeepSeek API aufrufen
-        analysis = await cls._call_deepseek(post.content, language)
-        
+        # DeepSeek API aufrufen, gleiche Inhalte aus dem Cache
+        analysis = await ModerationCache.get_or_analyze(
+            post.content, language,
+            lambda: cls._call_deepseek(post.content, language),
+            source=cache_source
+        )
+        return cls._build_result(post, analysis)
+
+    @classmethod
+    def _build_result(cls, post: PostMessage, analysis: dict) -> ModerationResult:
+        """Erstellt das Moderations-Ergebnis aus der Analyse des Modells"""
         # Status bestimmen
         status = cls._determine_status(
             analysis["is_hate_speech"],
@@ -331,57 +342,52 @@ class DeepSeekModerator:
             }
             user_prompt = user_prompts.get(language, user_prompts["de"])
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{safespace_settings.deepseek_base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {safespace_settings.deepseek_api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": safespace_settings.deepseek_model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "temperature": 0.1,  # Niedrig für konsistente Ergebnisse
-                        "max_tokens": 1000
-                    }
-                )
-
-                response.raise_for_status()
-                data = response.json()
-
-                # Antwort parsen
-                assistant_message = data["choices"][0]["message"]["content"]
-
-                # JSON aus der Antwort extrahieren
-                return cls._parse_response(assistant_message)
+            data = await LLMClient.chat(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.1,  # Niedrig für konsistente Ergebnisse
+                max_tokens=1000
+            )
+
+            # Antwort parsen
+            assistant_message = data["choices"][0]["message"]["content"]
+
+            # JSON aus der Antwort extrahieren
+            return cls._parse_response(assistant_message)
+        except CircuitOpenError:
+            # DeepSeek ist gerade nicht erreichbar: SimpleModerator statt Fehler
+            return await cls._fallback_analysis(content, language)
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 402:
                 print("⚠️  DeepSeek API: 402 Payment Required - Fallback auf SimpleModerator")
-                # Fallback auf SimpleModerator
-                from app.safespace.simple_moderator import SimpleModerator
-                from app.safespace.models import PostMessage
-                temp_post = PostMessage(
-                    post_id=0,
-                    author_uid=0,
-                    author_username="",
-                    content=content,
-                    visibility="public",
-                    created_at=datetime.utcnow()
-                )
-                result = await SimpleModerator.moderate_post(temp_post, language)
-                return {
-                    "is_hate_speech": result.is_hate_speech,
-                    "confidence_score": result.confidence_score,
-                    "categories": [c.value for c in result.categories],
-                    "explanation": result.explanation,
-                    "suggested_revision": result.suggested_revision,
-                    "alternative_suggestions": result.alternative_suggestions,
-                    "revision_explanation": result.revision_explanation
-                }
+                return await cls._fallback_analysis(content, language)
             raise
+
+    @classmethod
+    async def _fallback_analysis(cls, content: str, language: str) -> dict:
+        """Analyse des SimpleModerators (wird nicht gecacht)"""
+        from app.safespace.simple_moderator import SimpleModerator
+        temp_post = PostMessage(
+            post_id=0,
+            author_uid=0,
+            author_username="",
+            content=content,
+            visibility="public",
+            created_at=datetime.utcnow()
+        )
+        result = await SimpleModerator.moderate_post(temp_post, language)
+        return {
+            "is_hate_speech": result.is_hate_speech,
+            "confidence_score": result.confidence_score,
+            "categories": [c.value for c in result.categories],
+            "explanation": result.explanation,
+            "suggested_revision": result.suggested_revision,
+            "alternative_suggestions": result.alternative_suggestions,
+            "revision_explanation": result.revision_explanation,
+            "fallback": True
+        }
     
     @classmethod
     def _parse_response(cls, response: str) -> dict:
@@ -417,7 +423,8 @@ class DeepSeekModerator:
             "categories": ["none"],
             "explanation": "Analyse konnte nicht durchgeführt werden",
             "suggested_revision": None,
-            "revision_explanation": None
+            "revision_explanation": None,
+            "fallback": True
         }
     
     @classmethod
@@ -523,23 +530,13 @@ Rispondi SOLO con il testo migliorato, senza spiegazioni.""",
         }
         prompt = prompts.get(language, prompts["de"])
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{safespace_settings.deepseek_base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {safespace_settings.deepseek_api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": safespace_settings.deepseek_model,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 500
-                }
+        try:
+            data = await LLMClient.chat(
+                [{"role": "user", "content": prompt}],
+                temperature=0.7,
+                max_tokens=500
             )
-            
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
+        except CircuitOpenError:
+            from app.safespace.simple_moderator import SimpleModerator
+            return SimpleModerator._generate_alternatives(content)[0]
+        return data["choices"][0]["message"]["content"].strip()
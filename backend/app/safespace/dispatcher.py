@@ -0,0 +1,186 @@
+"""
+Nebenläufige Verarbeitung von Kafka-Nachrichten
+
+Der Moderation-Worker wartet pro Nachricht Sekunden auf das LLM. Der
+Dispatcher verarbeitet bis zu max_in_flight Nachrichten gleichzeitig:
+
+- Nachrichten mit gleichem Key (Partition + Key) laufen nacheinander in
+  Eingangsreihenfolge, unterschiedliche Keys parallel.
+- Offsets werden pro Partition nur bis zur ersten noch offenen Nachricht
+  freigegeben. Ein Absturz verliert dadurch nichts: alles ab dem
+  committeten Offset wird nach dem Neustart erneut zugestellt.
+- Fehlgeschlagene Handler werden mit Backoff wiederholt. Nach dem letzten
+  Versuch übernimmt on_failure die Nachricht (Retry-Topic oder DLQ, siehe
+  app.safespace.dead_letters); erst danach wird ihr Offset freigegeben.
+
+Der Dispatcher kennt Kafka nicht; KafkaService.consume_new_posts liefert
+die Nachrichten und committet die Offsets aus commit_offsets().
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+
+# Wartezeit vor dem n-ten Wiederholungsversuch: RETRY_BACKOFF_SECONDS * 2^(n-1)
+RETRY_BACKOFF_SECONDS = 1.0
+
+# Obergrenze für die Wartezeit, wenn on_failure selbst fehlschlägt
+MAX_FAILURE_BACKOFF_SECONDS = 30.0
+
+
+class PartitionOffsets:
+    """Offsets einer Partition: freigegeben wird nur bis zur ersten offenen Nachricht"""
+
+    def __init__(self):
+        self._pending: deque[int] = deque()
+        self._done: set[int] = set()
+        self.committable: Optional[int] = None  # nächster Offset, der gelesen werden muss
+        self.committed: Optional[int] = None
+        self.tasks: set[asyncio.Task] = set()
+
+    def add(self, offset: int):
+        self._pending.append(offset)
+
+    def complete(self, offset: int):
+        self._done.add(offset)
+        while self._pending and self._pending[0] in self._done:
+            done = self._pending.popleft()
+            self._done.discard(done)
+            self.committable = done + 1
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+
+class ConcurrentDispatcher:
+    """
+    Verarbeitet Nachrichten mit begrenzter Nebenläufigkeit.
+
+    handler(payload, message_id) wird pro Nachricht aufgerufen; message_id
+    ("topic:partition:offset") ist über erneute Zustellungen hinweg stabil.
+    on_failure(payload, message_id, error) erhält Nachrichten, deren letzter
+    Versuch fehlgeschlagen ist; ohne on_failure werden sie übersprungen.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any, str], Awaitable[None]],
+        max_in_flight: int = 16,
+        max_attempts: int = 3,
+        on_failure: Optional[Callable[[Any, str, Exception], Awaitable[None]]] = None
+    ):
+        self._handler = handler
+        self._max_attempts = max_attempts
+        self._on_failure = on_failure
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._partitions: dict[Hashable, PartitionOffsets] = {}
+        self._key_tails: dict[tuple, asyncio.Task] = {}
+        self.processed_count = 0
+        self.failed_count = 0
+
+    async def submit(self, partition: Hashable, offset: int, key: Any, payload: Any):
+        """Startet die Verarbeitung; wartet, solange max_in_flight Nachrichten laufen"""
+        await self._slots.acquire()
+        offsets = self._partitions.setdefault(partition, PartitionOffsets())
+        offsets.add(offset)
+
+        chain = (partition, key)
+        previous = self._key_tails.get(chain)
+        message_id = ":".join(map(str, partition if isinstance(partition, tuple) else (partition,)))
+        task = asyncio.create_task(self._run(offsets, previous, f"{message_id}:{offset}", offset, payload))
+        self._key_tails[chain] = task
+        offsets.tasks.add(task)
+        # Als Done-Callback, damit auch vor dem Start abgebrochene Tasks den Slot freigeben
+        task.add_done_callback(lambda t: self._finished(offsets, chain, t))
+
+    def _finished(self, offsets: PartitionOffsets, chain: tuple, task: asyncio.Task):
+        # Abgebrochene Nachrichten bleiben offen und werden erneut zugestellt
+        offsets.tasks.discard(task)
+        if self._key_tails.get(chain) is task:
+            del self._key_tails[chain]
+        self._slots.release()
+
+    async def _run(self, offsets: PartitionOffsets, previous: Optional[asyncio.Task],
+                   message_id: str, offset: int, payload: Any):
+        if previous is not None:
+            # Reihenfolge pro Key; Fehler der Vorgängerin betreffen diese Nachricht nicht
+            await asyncio.wait([previous])
+
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                await self._handler(payload, message_id)
+                self.processed_count += 1
+                break
+            except Exception as e:
+                if attempt == self._max_attempts:
+                    await self._fail(payload, message_id, attempt, e)
+                else:
+                    delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                    print(f"⚠️ Nachricht {message_id} fehlgeschlagen, neuer Versuch in {delay:.0f}s: {e}")
+                    await asyncio.sleep(delay)
+
+        offsets.complete(offset)
+
+    async def _fail(self, payload: Any, message_id: str, attempts: int, error: Exception):
+        """Gibt eine endgültig fehlgeschlagene Nachricht an on_failure ab (bis das gelingt)"""
+        self.failed_count += 1
+        if self._on_failure is None:
+            print(f"❌ Nachricht {message_id} nach {attempts} Versuchen übersprungen: {error}")
+            return
+
+        delay = RETRY_BACKOFF_SECONDS
+        while True:
+            try:
+                await self._on_failure(payload, message_id, error)
+                return
+            except Exception as e:
+                # Bei Abbruch (drain) bleibt der Offset offen und die Nachricht wird erneut zugestellt
+                print(f"⚠️ Nachricht {message_id} nicht weitergeleitet, neuer Versuch in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_FAILURE_BACKOFF_SECONDS)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(offsets.in_flight for offsets in self._partitions.values())
+
+    def commit_offsets(self, partitions: Iterable[Hashable] = None) -> dict[Hashable, int]:
+        """
+        Offsets, die seit dem letzten Aufruf committet werden können
+        (pro Partition der nächste zu lesende Offset).
+        """
+        selected = self._partitions if partitions is None else {
+            p: self._partitions[p] for p in partitions if p in self._partitions
+        }
+        offsets = {}
+        for partition, tracker in selected.items():
+            if tracker.committable is not None and tracker.committable != tracker.committed:
+                offsets[partition] = tracker.committable
+                tracker.committed = tracker.committable
+        return offsets
+
+    async def drain(self, partitions: Iterable[Hashable] = None, timeout: float = None) -> bool:
+        """
+        Wartet auf laufende Nachrichten (aller oder der angegebenen Partitionen).
+        Nach timeout werden sie abgebrochen; ihre Offsets bleiben uncommittet.
+        Returns: True, wenn alle Nachrichten abgeschlossen wurden
+        """
+        selected = self._partitions.values() if partitions is None else [
+            self._partitions[p] for p in partitions if p in self._partitions
+        ]
+        tasks = {task for tracker in selected for task in tracker.tasks}
+        if not tasks:
+            return True
+
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+        return not pending
+
+    def forget(self, partitions: Iterable[Hashable]):
+        """Vergisst abgegebene Partitionen (nach einem Rebalance)"""
+        for partition in partitions:
+            self._partitions.pop(partition, None)
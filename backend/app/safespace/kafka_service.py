@@ -1,13 +1,25 @@
 import json
 import asyncio
+import functools
+import os
+import socket
+import time
 from datetime import datetime
-from typing import Callable, Awaitable
+from typing import Callable, Awaitable, Optional
 
-from aiokafka import AIOKafkaProducer, AIOKafkaConsumer
+from aiokafka import AIOKafkaProducer, AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition, codec
 from aiokafka.errors import KafkaError
 
 from app.safespace.config import safespace_settings
+from app.safespace.kafka_spool import KafkaSpool
 from app.safespace.models import PostMessage, ModerationResult
+from app.services.metrics import Metrics
+
+
+Metrics.describe("safespace_kafka_messages_total", "counter", "Kafka-Nachrichten des Producers nach Ergebnis")
+
+# Übernommene Spool-Dateien beim Nachsenden alle N Nachrichten als aktiv markieren
+REPLAY_TOUCH_EVERY = 1000
 
 
 class KafkaService:
@@ -15,59 +27,197 @@ class KafkaService:
     Kafka Service für Post-Moderation Pipeline.
     
     Topics:
-    - safespace.posts.new: Neue Posts zur Moderation
+    - safespace.posts.new: Neue Posts (und Kommentare) zur Moderation
+    - safespace.posts.retry.{delay}s: Erneute Versuche nach Fehlern (app.safespace.dead_letters)
+    - safespace.posts.dlq: Endgültig fehlgeschlagene Nachrichten
     - safespace.posts.moderated: Moderierte Posts mit Ergebnis
     """
     
     _producer: AIOKafkaProducer = None
     _consumer: AIOKafkaConsumer = None
+
+    # Broker nicht erreichbar: bis dahin direkt spoolen statt neu zu verbinden
+    _producer_retry_at: float = 0.0
+    _spool_pending: bool = True  # beim Start vorhandene Spool-Dateien nachsenden
+    _replay_task: Optional[asyncio.Task] = None
     
     # === Producer ===
+
+    @classmethod
+    def _compression_type(cls) -> Optional[str]:
+        """Konfigurierte Kompression, falls das Codec-Paket installiert ist"""
+        wanted = safespace_settings.kafka_compression_type
+        if wanted in ("", "none"):
+            return None
+        checks = {"gzip": codec.has_gzip, "snappy": codec.has_snappy, "lz4": codec.has_lz4, "zstd": codec.has_zstd}
+        if wanted in checks and not checks[wanted]():
+            print(f"⚠️ Kafka-Kompression {wanted} nicht verfügbar (Paket fehlt), sende unkomprimiert")
+            return None
+        return wanted
     
     @classmethod
     async def init_producer(cls):
-        """Initialisiert Kafka Producer"""
+        """
+        Initialisiert Kafka Producer.
+        Nachrichten werden bis kafka_linger_ms gesammelt und komprimiert als Batch
+        gesendet; acks=all mit Idempotenz, damit Retries keine Duplikate erzeugen.
+        """
         if cls._producer is None:
-            cls._producer = AIOKafkaProducer(
+            producer = AIOKafkaProducer(
                 bootstrap_servers=safespace_settings.kafka_bootstrap_servers,
                 value_serializer=lambda v: json.dumps(v, default=str).encode('utf-8'),
-                key_serializer=lambda k: str(k).encode('utf-8') if k else None
+                key_serializer=lambda k: str(k).encode('utf-8') if k else None,
+                acks="all",
+                enable_idempotence=safespace_settings.kafka_enable_idempotence,
+                linger_ms=safespace_settings.kafka_linger_ms,
+                max_batch_size=safespace_settings.kafka_max_batch_size,
+                compression_type=cls._compression_type(),
+                request_timeout_ms=safespace_settings.kafka_request_timeout_ms
             )
-            await cls._producer.start()
+            try:
+                await producer.start()
+            except BaseException:
+                await producer.stop()
+                raise
+            cls._producer = producer
             print("✅ Kafka Producer gestartet")
+            if cls._spool_pending:
+                cls._schedule_replay()
     
     @classmethod
     async def close_producer(cls):
-        """Schließt Kafka Producer"""
+        """Schließt Kafka Producer; gesammelte Nachrichten werden vorher gesendet"""
+        if cls._replay_task is not None:
+            cls._replay_task.cancel()
+            cls._replay_task = None
         if cls._producer:
             await cls._producer.stop()
             cls._producer = None
+
+    @classmethod
+    async def _available_producer(cls) -> Optional[AIOKafkaProducer]:
+        """Der Producer, oder None, solange der Broker nicht erreichbar ist"""
+        if cls._producer is None:
+            if time.monotonic() < cls._producer_retry_at:
+                return None
+            try:
+                await cls.init_producer()
+            except Exception as e:
+                cls._producer_retry_at = time.monotonic() + safespace_settings.kafka_reconnect_backoff_seconds
+                print(f"❌ Kafka nicht erreichbar, Nachrichten werden gespoolt: {e}")
+                return None
+        return cls._producer
+
+    @classmethod
+    async def _send(cls, topic: str, key, value: dict, spool: bool = True) -> bool:
+        """
+        Sendet ohne auf den Broker zu warten; das Ergebnis meldet _on_delivery.
+        Ist der Broker nicht erreichbar, landet die Nachricht im Spool. Mit
+        spool=False wird sie stattdessen verworfen; der Aufrufer hat dafür einen
+        eigenen Weg (Kommentare: Moderation im Request, sonst comment_moderation_requeue).
+        Returns: False, wenn sie weder gesendet noch gespoolt wurde
+        """
+        producer = await cls._available_producer()
+        if producer is not None:
+            try:
+                delivery = await producer.send(topic, key=key, value=value)
+            except KafkaError as e:
+                print(f"❌ Kafka Error: {e}")
+            else:
+                delivery.add_done_callback(functools.partial(cls._on_delivery, topic, key, value, spool))
+                return True
+        return cls._spool(topic, key, value) if spool else False
+
+    @classmethod
+    def _on_delivery(cls, topic: str, key, value: dict, spool: bool, delivery: asyncio.Future):
+        if not delivery.cancelled() and delivery.exception() is None:
+            Metrics.inc("safespace_kafka_messages_total", topic=topic, outcome="delivered")
+            # Broker wieder erreichbar: Gespooltes nachsenden
+            if cls._spool_pending:
+                cls._schedule_replay()
+            return
+        error = "abgebrochen" if delivery.cancelled() else delivery.exception()
+        Metrics.inc("safespace_kafka_messages_total", topic=topic, outcome="failed")
+        if not spool:
+            print(f"⚠️ Kafka-Zustellung an {topic} (Key {key}) fehlgeschlagen: {error}")
+            return
+        print(f"⚠️ Kafka-Zustellung an {topic} fehlgeschlagen ({error}), Nachricht wird gespoolt")
+        cls._spool(topic, key, value)
+
+    @classmethod
+    def _spool(cls, topic: str, key, value: dict) -> bool:
+        if not KafkaSpool.append(topic, key, value):
+            Metrics.inc("safespace_kafka_messages_total", topic=topic, outcome="dropped")
+            print(f"❌ Nachricht an {topic} (Key {key}) verworfen: Spool voll oder nicht beschreibbar")
+            return False
+        cls._spool_pending = True
+        Metrics.inc("safespace_kafka_messages_total", topic=topic, outcome="spooled")
+        return True
+
+    @classmethod
+    def _schedule_replay(cls):
+        if cls._replay_task is None or cls._replay_task.done():
+            cls._replay_task = asyncio.create_task(cls._replay_spool())
+
+    @classmethod
+    async def _replay_spool(cls):
+        """Sendet gespoolte Nachrichten nach (schlägt das fehl, landen sie erneut im Spool)"""
+        cls._spool_pending = False
+        replayed = 0
+        try:
+            for path in KafkaSpool.claim():
+                for i, record in enumerate(KafkaSpool.read(path), 1):
+                    await cls._send(record["topic"], record["key"], record["value"])
+                    Metrics.inc("safespace_kafka_messages_total", topic=record["topic"], outcome="replayed")
+                    replayed += 1
+                    if i % REPLAY_TOUCH_EVERY == 0:
+                        KafkaSpool.touch(path)
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            # Nicht übernommene Reste holt der nächste Durchlauf (als verwaiste Datei)
+            cls._spool_pending = True
+            print(f"⚠️ Kafka-Spool konnte nicht nachgesendet werden: {e}")
+        if replayed:
+            print(f"📤 {replayed} gespoolte Nachrichten nachgesendet")
     
     @classmethod
-    async def publish_new_post(cls, post: PostMessage) -> bool:
+    async def publish_new_post(cls, post: PostMessage, spool: bool = True) -> bool:
         """
-        Publiziert neuen Post zur Moderation.
+        Publiziert neuen Post (oder Kommentar) zur Moderation, ohne auf die
+        Bestätigung des Brokers zu warten.
         Key = post_id für Partitionierung
         """
-        try:
-            await cls.init_producer()
-            
-            await cls._producer.send_and_wait(
-                topic=safespace_settings.kafka_topic_new_posts,
-                key=post.post_id,
-                value=post.model_dump()
-            )
-            
-            print(f"📤 Post {post.post_id} zur Moderation gesendet")
-            return True
-            
-        except KafkaError as e:
-            print(f"❌ Kafka Error: {e}")
-            return False
+        queued = await cls._send(
+            safespace_settings.kafka_topic_new_posts,
+            post.post_id,
+            post.model_dump(mode="json"),
+            spool=spool
+        )
+        if queued:
+            print(f"📤 Post {post.post_id} zur Moderation eingereiht")
+        return queued
     
+    @classmethod
+    async def republish(cls, topic: str, key, value: dict, headers: dict[str, str]):
+        """
+        Sendet eine Nachricht mit Headern und wartet auf den Broker
+        (Retry-Topics und DLQ, app.safespace.dead_letters). Wirft bei Fehlern.
+        """
+        await cls.init_producer()
+        await cls._producer.send_and_wait(
+            topic,
+            key=key,
+            value=value,
+            headers=[(name, text.encode("utf-8")) for name, text in headers.items()]
+        )
+        Metrics.inc("safespace_kafka_messages_total", topic=topic, outcome="delivered")
+
     @classmethod
     async def publish_moderation_result(cls, result: ModerationResult) -> bool:
-        """Publiziert Moderations-Ergebnis"""
+        """
+        Publiziert Moderations-Ergebnis.
+        Wartet auf den Broker: der Worker committet den Offset erst danach.
+        """
         try:
             await cls.init_producer()
             
@@ -89,46 +239,135 @@ class KafkaService:
     @classmethod
     async def consume_new_posts(
         cls,
-        handler: Callable[[PostMessage], Awaitable[None]],
+        handler: Callable[[PostMessage, str], Awaitable[None]],
+        stop_event: asyncio.Event = None,
         max_messages: int = None
     ):
         """
-        Konsumiert neue Posts und ruft Handler auf.
-        
+        Konsumiert neue Posts und verarbeitet sie nebenläufig (ConcurrentDispatcher).
+
+        Offsets werden manuell committet, und zwar erst, wenn der Handler (Report
+        gespeichert, Ergebnis publiziert) zurückgekehrt ist. Mehrere Worker-Prozesse
+        in derselben Consumer Group teilen sich die Partitionen; bei einem Rebalance
+        werden abgegebene Partitionen erst abgearbeitet und committet.
+
+        Scheitert eine Nachricht auch nach worker_max_attempts Versuchen, wandert
+        sie ins nächste Retry-Topic bzw. in die DLQ (DeadLetterRouter). Die
+        Retry-Topics werden mitgelesen; Partitionen mit noch nicht fälligen
+        Nachrichten bleiben bis zu deren safespace-not-before pausiert.
+
         Args:
-            handler: Async Funktion die PostMessage verarbeitet
+            handler: Async Funktion (PostMessage, message_id); message_id ist über
+                     erneute Zustellungen stabil
+            stop_event: Beendet das Lesen; laufende Nachrichten werden abgeschlossen
             max_messages: Optional - stoppt nach N Messages (für Tests)
         """
+        from app.safespace.dispatcher import ConcurrentDispatcher
+        from app.safespace.dead_letters import DeadLetterRouter, not_before, retry_topics
+
+        stop_event = stop_event or asyncio.Event()
+        max_in_flight = safespace_settings.worker_max_in_flight
+        topics = [safespace_settings.kafka_topic_new_posts, *retry_topics()]
+
+        async def process(record, message_id: str):
+            try:
+                post = PostMessage.model_validate(record.value)
+            except Exception as e:
+                # Ungültige Nachrichten nicht wiederholen, sondern direkt in die DLQ
+                print(f"❌ Ungültige Nachricht {message_id}: {e}")
+                await DeadLetterRouter.route(record, message_id, e, retry=False)
+                return
+            print(f"📥 Post {post.post_id} empfangen von User {post.author_username}")
+            await handler(post, message_id)
+
+        dispatcher = ConcurrentDispatcher(
+            process,
+            max_in_flight=max_in_flight,
+            max_attempts=safespace_settings.worker_max_attempts,
+            on_failure=DeadLetterRouter.route
+        )
+        # Pausierte Partitionen (Retry-Topics) → Zeitpunkt, ab dem sie wieder fällig sind
+        paused: dict = {}
+
         consumer = AIOKafkaConsumer(
-            safespace_settings.kafka_topic_new_posts,
             bootstrap_servers=safespace_settings.kafka_bootstrap_servers,
             group_id=safespace_settings.kafka_consumer_group,
+            client_id=f"{safespace_settings.kafka_consumer_group}-{socket.gethostname()}-{os.getpid()}",
             value_deserializer=lambda v: json.loads(v.decode('utf-8')),
             auto_offset_reset='earliest',
-            enable_auto_commit=True
+            enable_auto_commit=False,
+            max_poll_records=max_in_flight
         )
-        
+
+        async def commit(partitions=None):
+            offsets = dispatcher.commit_offsets(partitions)
+            if not offsets:
+                return
+            try:
+                await consumer.commit(offsets)
+            except KafkaError as e:
+                # Nicht committete Nachrichten werden erneut zugestellt
+                print(f"⚠️ Offset-Commit fehlgeschlagen: {e}")
+
+        class DrainOnRevoke(ConsumerRebalanceListener):
+            async def on_partitions_revoked(self, revoked):
+                for tp in revoked:
+                    paused.pop(tp, None)
+                if revoked:
+                    await dispatcher.drain(revoked, timeout=safespace_settings.worker_drain_timeout_seconds)
+                    await commit(revoked)
+                    dispatcher.forget(revoked)
+
+            async def on_partitions_assigned(self, assigned):
+                if assigned:
+                    print(f"📋 Partitionen zugewiesen: {sorted(tp.partition for tp in assigned)}")
+
+        consumer.subscribe(topics, listener=DrainOnRevoke())
         await consumer.start()
-        print(f"✅ Consumer gestartet für Topic: {safespace_settings.kafka_topic_new_posts}")
-        
+        print(f"✅ Consumer gestartet für Topics: {', '.join(topics)} "
+              f"(max. {max_in_flight} parallel)")
+
         try:
             message_count = 0
-            async for message in consumer:
-                try:
-                    post = PostMessage.model_validate(message.value)
-                    print(f"📥 Post {post.post_id} empfangen von User {post.author_username}")
-                    
-                    await handler(post)
-                    
-                    message_count += 1
-                    if max_messages and message_count >= max_messages:
+            last_commit = time.monotonic()
+            while not stop_event.is_set():
+                due = [tp for tp, resume_at in paused.items() if resume_at <= time.time()]
+                for tp in due:
+                    del paused[tp]
+                if due:
+                    consumer.resume(*due)
+
+                batches = await consumer.getmany(timeout_ms=500, max_records=max_in_flight)
+                for tp, messages in batches.items():
+                    for message in messages:
+                        resume_at = not_before(message)
+                        if resume_at > time.time():
+                            # Noch nicht fällig: ab hier erneut lesen, sobald die Wartezeit um ist
+                            consumer.pause(tp)
+                            consumer.seek(tp, message.offset)
+                            paused[tp] = resume_at
+                            break
+                        await dispatcher.submit(tp, message.offset, message.key, message)
+                        message_count += 1
+                        if max_messages and message_count >= max_messages:
+                            stop_event.set()
+                        if stop_event.is_set():
+                            break
+                    if stop_event.is_set():
                         break
-                        
-                except Exception as e:
-                    print(f"❌ Error processing message: {e}")
-                    
+
+                if time.monotonic() - last_commit >= safespace_settings.worker_commit_interval_seconds:
+                    await commit()
+                    last_commit = time.monotonic()
+
         finally:
+            # Laufende Nachrichten abschließen, danach den letzten Stand committen
+            print(f"⏳ Warte auf {dispatcher.in_flight} laufende Nachrichten...")
+            await dispatcher.drain(timeout=safespace_settings.worker_drain_timeout_seconds)
+            await commit()
             await consumer.stop()
+            print(f"📊 Consumer: {dispatcher.processed_count} verarbeitet, "
+                  f"{dispatcher.failed_count} in Retry-Topics/DLQ verschoben")
     
     @classmethod
     async def consume_moderated_posts(
@@ -138,13 +377,18 @@ class KafkaService:
         """
         Konsumiert moderierte Posts.
         Kann z.B. für Notifications oder DB-Updates genutzt werden.
+
+        Der Offset wird erst committet, wenn der Handler durchgelaufen ist.
+        Wirft der Handler, endet der Consumer mit dem Fehler; nach einem Neustart
+        wird das Ergebnis erneut zugestellt. Ungültige Nachrichten werden übersprungen.
         """
         consumer = AIOKafkaConsumer(
             safespace_settings.kafka_topic_moderated,
             bootstrap_servers=safespace_settings.kafka_bootstrap_servers,
             group_id=f"{safespace_settings.kafka_consumer_group}-results",
             value_deserializer=lambda v: json.loads(v.decode('utf-8')),
-            auto_offset_reset='earliest'
+            auto_offset_reset='earliest',
+            enable_auto_commit=False
         )
         
         await consumer.start()
@@ -154,9 +398,13 @@ class KafkaService:
             async for message in consumer:
                 try:
                     result = ModerationResult.model_validate(message.value)
-                    await handler(result)
                 except Exception as e:
-                    print(f"❌ Error processing result: {e}")
+                    print(f"❌ Ungültiges Ergebnis übersprungen ({message.partition}:{message.offset}): {e}")
+                else:
+                    await handler(result)
+                await consumer.commit({
+                    TopicPartition(message.topic, message.partition): message.offset + 1
+                })
         finally:
             await consumer.stop()
 
@@ -192,6 +440,34 @@ class PostModerationQueue:
         )
         
         return await KafkaService.publish_new_post(post)
+
+    @classmethod
+    async def enqueue_comment(
+        cls,
+        post_author_uid: int,
+        post_id: int,
+        comment_id: int,
+        author_uid: int,
+        author_username: str,
+        content: str
+    ) -> bool:
+        """
+        Fügt einen Kommentar (Status 'pending') zur Moderation-Queue hinzu.
+        Das Ergebnis verarbeitet app.safespace.comment_moderation.
+        Ohne Spool: ist Kafka nicht erreichbar (False), moderiert der Aufrufer im Request.
+        """
+        comment = PostMessage(
+            post_id=post_id,
+            author_uid=author_uid,
+            author_username=author_username,
+            content=content,
+            visibility="public",
+            created_at=datetime.utcnow(),
+            comment_id=comment_id,
+            post_author_uid=post_author_uid
+        )
+
+        return await KafkaService.publish_new_post(comment, spool=False)
     
     @classmethod
     async def publish_result(cls, result: ModerationResult) -> bool:
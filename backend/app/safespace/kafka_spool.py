@@ -0,0 +1,115 @@
+"""
+Lokaler Spool für Kafka-Nachrichten
+
+Ist der Broker nicht erreichbar oder schlägt eine Zustellung fehl, schreibt
+KafkaService die Nachricht als JSON-Zeile in eine Datei pro Prozess:
+
+    {kafka_spool_dir}/{host}-{pid}.jsonl
+
+Nach dem (Re-)Connect übernimmt ein Prozess die vorhandenen Dateien durch
+atomares Umbenennen (→ .replay) und sendet sie nach. Dateien anderer Prozesse
+(auch abgestürzter) werden erst übernommen, wenn sie STALE_SECONDS nicht mehr
+geschrieben wurden, damit kein laufender Prozess in eine übernommene Datei
+schreibt; dasselbe gilt für .replay-Dateien, deren Nachsenden abgebrochen ist
+(beim Nachsenden wird die Datei regelmäßig angefasst).
+
+Die Zustellung ist at-least-once: meldet der Callback einen Fehler, obwohl der
+Broker die Nachricht hat, wird sie doppelt gesendet. Die Reihenfolge pro Key
+ist gegenüber neuen Nachrichten nicht garantiert.
+"""
+
+import json
+import os
+import socket
+import time
+from pathlib import Path
+from typing import Iterator
+
+from app.safespace.config import safespace_settings
+
+
+# Fremde Dateien erst übernehmen, wenn so lange nicht mehr geschrieben
+STALE_SECONDS = 60.0
+
+
+class KafkaSpool:
+    """Spool-Dateien für nicht zugestellte Kafka-Nachrichten (siehe Modul-Docstring)"""
+
+    @classmethod
+    def directory(cls) -> Path:
+        return Path(safespace_settings.kafka_spool_dir)
+
+    @classmethod
+    def _own_file(cls) -> Path:
+        return cls.directory() / f"{socket.gethostname()}-{os.getpid()}.jsonl"
+
+    @classmethod
+    def append(cls, topic: str, key, value: dict) -> bool:
+        """
+        Hängt eine Nachricht an die Spool-Datei des Prozesses an.
+        Die Datei wird pro Nachricht geöffnet, damit sie jederzeit übernommen werden kann.
+        Returns: False, wenn der Spool voll oder nicht beschreibbar ist
+        """
+        path = cls._own_file()
+        line = json.dumps({"topic": topic, "key": key, "value": value}, default=str) + "\n"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if cls.size_bytes() + len(line) > safespace_settings.kafka_spool_max_mb * 1024 * 1024:
+                return False
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+            return True
+        except OSError as e:
+            print(f"❌ Kafka-Spool nicht beschreibbar: {e}")
+            return False
+
+    @classmethod
+    def size_bytes(cls) -> int:
+        """Größe aller Spool-Dateien"""
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(cls.directory()) if entry.is_file())
+        except OSError:
+            return 0
+
+    @classmethod
+    def claim(cls) -> list[Path]:
+        """Übernimmt die nachzusendenden Dateien (eigene sofort, fremde erst wenn verwaist)"""
+        directory = cls.directory()
+        if not directory.is_dir():
+            return []
+
+        own = cls._own_file()
+        now = time.time()
+        claimed = []
+        for path in sorted(directory.iterdir()):
+            if path.suffix not in (".jsonl", ".replay"):
+                continue
+            try:
+                if path != own and now - path.stat().st_mtime < STALE_SECONDS:
+                    continue
+                target = path.with_name(f"{path.name}.{os.getpid()}.replay")
+                # Atomar: nur ein Prozess gewinnt das Umbenennen
+                path.rename(target)
+                cls.touch(target)
+            except OSError:
+                continue
+            claimed.append(target)
+        return claimed
+
+    @classmethod
+    def touch(cls, path: Path) -> None:
+        """Markiert eine übernommene Datei als aktiv (sonst gilt sie nach STALE_SECONDS als verwaist)"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @classmethod
+    def read(cls, path: Path) -> Iterator[dict]:
+        """Liest die Nachrichten einer übernommenen Datei; kaputte Zeilen werden übersprungen"""
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Kafka-Spool: ungültige Zeile in {path.name} übersprungen")
@@ -0,0 +1,224 @@
+"""
+Gemeinsamer HTTP-Client für die DeepSeek API
+
+Ein HTTP/2-Client pro Prozess mit Keep-Alive-Pool statt eines neuen Clients
+(und TLS-Handshakes) pro Aufruf. Jeder Versuch hat ein eigenes Timeout;
+429, 5xx und Verbindungsfehler werden mit exponentiellem Backoff und Jitter
+wiederholt (Retry-After wird beachtet).
+
+Der Circuit Breaker öffnet nach llm_breaker_failure_threshold aufeinander
+folgenden Fehlschlägen. Solange er offen ist, schlägt chat() sofort mit
+CircuitOpenError fehl und die Aufrufer weichen auf den SimpleModerator aus.
+Nach llm_breaker_reset_seconds lässt er einen Probe-Aufruf durch (half-open);
+gelingt er, schließt der Breaker wieder.
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+import httpx
+
+from app.safespace.config import safespace_settings
+from app.services.metrics import Metrics
+
+
+Metrics.describe("safespace_llm_requests_total", "counter", "DeepSeek-Aufrufe nach Ergebnis")
+Metrics.describe("safespace_llm_retries_total", "counter", "Wiederholte DeepSeek-Versuche")
+Metrics.describe("safespace_llm_request_duration_seconds", "summary", "Dauer der DeepSeek-Aufrufe inkl. Wiederholungen")
+Metrics.describe("safespace_llm_breaker_state", "gauge", "Circuit Breaker: 0 = closed, 1 = half-open, 2 = open")
+Metrics.describe("safespace_llm_breaker_transitions_total", "counter", "Zustandswechsel des Circuit Breakers")
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Antworten, die auf ein Problem des Dienstes (nicht des Requests) hindeuten
+BREAKER_STATUS_CODES = RETRY_STATUS_CODES | {401, 402, 403}
+
+
+class CircuitOpenError(Exception):
+    """Der Circuit Breaker ist offen; kein Aufruf an DeepSeek"""
+
+
+class CircuitBreaker:
+    """Circuit Breaker mit den Zuständen closed, open und half-open"""
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_running = False
+        Metrics.set_gauge("safespace_llm_breaker_state", 0, breaker=name)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        print(f"🔌 Circuit Breaker {self.name}: {self.state} → {state}")
+        self.state = state
+        Metrics.set_gauge("safespace_llm_breaker_state", self._STATE_VALUES[state], breaker=self.name)
+        Metrics.inc("safespace_llm_breaker_transitions_total", breaker=self.name, to=state)
+
+    def before_call(self):
+        """Prüft, ob ein Aufruf erlaubt ist; sonst CircuitOpenError"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                raise CircuitOpenError(f"Circuit breaker {self.name} is open")
+            self._transition(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            # Nur ein Probe-Aufruf gleichzeitig
+            if self._probe_running:
+                raise CircuitOpenError(f"Circuit breaker {self.name} is half-open")
+            self._probe_running = True
+
+    def record_success(self):
+        self._probe_running = False
+        self.failures = 0
+        self._transition(self.CLOSED)
+
+    def record_failure(self):
+        self._probe_running = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._transition(self.OPEN)
+
+    def record_neutral(self):
+        """Aufruf ohne Aussage über den Dienst (z.B. 400 Bad Request)"""
+        self._probe_running = False
+
+    def status(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class LLMClient:
+    """Prozessweiter DeepSeek-Client mit Retries und Circuit Breaker"""
+
+    _client: Optional[httpx.AsyncClient] = None
+    _breaker: Optional[CircuitBreaker] = None
+
+    @classmethod
+    def client(cls) -> httpx.AsyncClient:
+        if cls._client is None:
+            cls._client = httpx.AsyncClient(
+                base_url=safespace_settings.deepseek_base_url,
+                http2=safespace_settings.llm_http2,
+                headers={
+                    "Authorization": f"Bearer {safespace_settings.deepseek_api_key}",
+                    "Content-Type": "application/json"
+                },
+                limits=httpx.Limits(
+                    max_connections=safespace_settings.llm_max_connections,
+                    max_keepalive_connections=safespace_settings.llm_max_keepalive_connections,
+                    keepalive_expiry=30.0
+                ),
+                timeout=httpx.Timeout(safespace_settings.llm_attempt_timeout_seconds, connect=5.0, pool=10.0)
+            )
+        return cls._client
+
+    @classmethod
+    def breaker(cls) -> CircuitBreaker:
+        if cls._breaker is None:
+            cls._breaker = CircuitBreaker(
+                "deepseek",
+                failure_threshold=safespace_settings.llm_breaker_failure_threshold,
+                reset_seconds=safespace_settings.llm_breaker_reset_seconds
+            )
+        return cls._breaker
+
+    @classmethod
+    async def close(cls):
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    @classmethod
+    def _retry_delay(cls, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Exponentielles Backoff mit vollem Jitter; Retry-After hat Vorrang"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), safespace_settings.llm_retry_max_delay_seconds)
+        cap = min(safespace_settings.llm_retry_base_delay_seconds * 2 ** (attempt - 1),
+                  safespace_settings.llm_retry_max_delay_seconds)
+        return random.uniform(0, cap)
+
+    @classmethod
+    async def chat(
+        cls,
+        messages: list[dict],
+        temperature: float,
+        max_tokens: int,
+        timeout: float = None
+    ) -> dict:
+        """
+        POST /chat/completions mit Retries.
+        Returns: JSON-Antwort der API
+        Raises: CircuitOpenError, httpx.HTTPStatusError, httpx.TransportError
+        """
+        breaker = cls.breaker()
+        breaker.before_call()
+
+        payload = {
+            "model": safespace_settings.deepseek_model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        attempt_timeout = timeout or safespace_settings.llm_attempt_timeout_seconds
+        max_attempts = safespace_settings.llm_max_attempts
+        start = time.perf_counter()
+
+        try:
+            for attempt in range(1, max_attempts + 1):
+                response = None
+                try:
+                    response = await cls.client().post(
+                        "/chat/completions",
+                        json=payload,
+                        timeout=httpx.Timeout(attempt_timeout, connect=5.0, pool=10.0)
+                    )
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        response.raise_for_status()
+                        breaker.record_success()
+                        Metrics.inc("safespace_llm_requests_total", outcome="success")
+                        return response.json()
+                    error = httpx.HTTPStatusError(
+                        f"DeepSeek API {response.status_code}", request=response.request, response=response
+                    )
+                except httpx.HTTPStatusError as e:
+                    # Nicht wiederholbar (4xx außer 429)
+                    if e.response.status_code in BREAKER_STATUS_CODES:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_neutral()
+                    Metrics.inc("safespace_llm_requests_total", outcome=f"http_{e.response.status_code}")
+                    raise
+                except httpx.TransportError as e:
+                    error = e
+
+                if attempt == max_attempts:
+                    breaker.record_failure()
+                    Metrics.inc("safespace_llm_requests_total", outcome="exhausted")
+                    raise error
+
+                delay = cls._retry_delay(attempt, response)
+                Metrics.inc("safespace_llm_retries_total")
+                print(f"⚠️ DeepSeek-Versuch {attempt}/{max_attempts} fehlgeschlagen ({error}), "
+                      f"neuer Versuch in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        except BaseException:
+            # Probe-Slot auch bei Abbruch oder unerwarteten Fehlern freigeben
+            breaker.record_neutral()
+            raise
+        finally:
+            Metrics.observe("safespace_llm_request_duration_seconds", time.perf_counter() - start)
@@ -34,6 +34,10 @@ class PostMessage(BaseModel):
     media_paths: list[str] = []
     visibility: str
     created_at: datetime
+
+    # Nur bei Kommentaren: post_id ist dann der kommentierte Post
+    comment_id: Optional[int] = None
+    post_author_uid: Optional[int] = None
     
     class Config:
         json_encoders = {
@@ -66,6 +70,18 @@ class ModerationResult(BaseModel):
     requires_human_review: bool = False
     auto_action_taken: Optional[str] = None
 
+    # Aus der PostMessage übernommen, wenn ein Kommentar moderiert wurde
+    comment_id: Optional[int] = None
+    post_author_uid: Optional[int] = None
+
+
+class TokenUsage(BaseModel):
+    """Token-Verbrauch einer Moderation (bei Batches der Anteil des Posts)"""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    prompt_tokens_saved: int = 0  # gegenüber einem Einzelaufruf
+    batch_size: int = 1  # 0 = ohne DeepSeek-Aufruf (Cache, Regeln der Kaskade)
+
 
 class ModerationReport(BaseModel):
     """Vollständiger Moderationsbericht (für MinIO)"""
@@ -77,6 +93,9 @@ class ModerationReport(BaseModel):
     model_used: str
     prompt_tokens: int = 0
     completion_tokens: int = 0
+    prompt_tokens_saved: int = 0
+    batch_size: int = 1
+    moderation_tier: str = "llm"  # clean | abusive | llm (app.safespace.cascade)
     
     # Timestamps
     received_at: datetime
@@ -94,3 +113,5 @@ class UserModerationStats(BaseModel):
     hate_speech_score: float = 0.0  # Durchschnitt
     categories_triggered: dict[str, int] = {}
     last_violation: Optional[datetime] = None
+    disputed_posts: int = 0
+    overturned_posts: int = 0
@@ -0,0 +1,221 @@
+"""
+Cache für Moderations-Ergebnisse
+
+Reposts, geteilte Inhalte, Copy-Paste-Spam und Entwürfe, die /safespace/check
+bei jeder Änderung erneut prüft, müssen nicht jedes Mal zu DeepSeek.
+
+Gespeichert wird die Analyse des Modells (is_hate_speech, Score, Kategorien,
+Erklärung, Vorschläge), nicht das ModerationResult: Post-ID, Autor und der aus
+den Schwellwerten abgeleitete Status werden pro Post neu gebildet.
+
+Key-Schema:
+    safespace:mod:{version}:{lang}:{sha256}          Analyse (JSON, TTL)
+    safespace:mod:{version}:{lang}:simz:{band}:{bits} SimHash-Bänder (ZSET, Score = Einfügezeit)
+    safespace:mod:stats                               Hit/Miss-Zähler (HASH)
+
+version ergibt sich aus Modell und System-Prompt der Sprache: ändert sich
+eins davon, werden alte Einträge nicht mehr gefunden und laufen über die TTL aus.
+
+Optional (SAFESPACE_MODERATION_CACHE_SIMHASH_ENABLED) werden nahezu identische
+Inhalte über SimHash gefunden: 64 Bit aus Wort-Trigrammen, in 4 Bänder à 16 Bit
+aufgeteilt. Bei höchstens 3 abweichenden Bits stimmt mindestens ein Band
+überein, ein Kandidat wird also immer über die Band-Sets gefunden.
+
+Ein Band-Key läuft bei stetigem Verkehr nie ab. Die Mitglieder tragen deshalb
+ihre Einfügezeit als Score: set entfernt ältere als die TTL, get liest nur
+jüngere.
+"""
+
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from typing import Awaitable, Callable, Optional
+
+from app.cache.redis_cache import RedisCache
+from app.safespace.config import safespace_settings
+from app.services.metrics import Metrics
+
+
+Metrics.describe("safespace_moderation_cache_requests_total", "counter", "Moderations-Cache-Abfragen nach Ergebnis")
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+SIMHASH_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+STATS_KEY = "safespace:mod:stats"
+
+_ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u2060\ufeff\u00ad"))
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+
+def normalize_content(content: str) -> str:
+    """Vereinheitlicht Unicode-Formen, Groß-/Kleinschreibung und Leerraum"""
+    text = unicodedata.normalize("NFKC", content).translate(_ZERO_WIDTH).casefold()
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def content_digest(content: str) -> str:
+    """SHA-256 des normalisierten Inhalts"""
+    return hashlib.sha256(normalize_content(content).encode("utf-8")).hexdigest()
+
+
+def simhash(normalized: str) -> Optional[int]:
+    """64-Bit-SimHash über Wort-Trigramme; None für zu kurze Texte"""
+    words = _WORD.findall(normalized)
+    if len(words) < safespace_settings.moderation_cache_simhash_min_words:
+        return None
+
+    weights = [0] * SIMHASH_BITS
+    for i in range(len(words) - 2):
+        shingle = " ".join(words[i:i + 3]).encode("utf-8")
+        value = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def _bands(value: int) -> list[int]:
+    mask = (1 << SIMHASH_BAND_BITS) - 1
+    return [value >> (band * SIMHASH_BAND_BITS) & mask for band in range(SIMHASH_BANDS)]
+
+
+class ModerationCache:
+    """Redis-Cache für Moderations-Analysen (siehe Modul-Docstring)"""
+
+    _versions: dict[str, str] = {}
+
+    @classmethod
+    def _version(cls, language: str) -> str:
+        if language not in cls._versions:
+            from app.safespace.deepseek_moderator import get_moderation_system_prompt
+            source = f"{safespace_settings.deepseek_model}\n{get_moderation_system_prompt(language)}"
+            cls._versions[language] = hashlib.sha256(source.encode("utf-8")).hexdigest()[:12]
+        return cls._versions[language]
+
+    @classmethod
+    def _prefix(cls, language: str) -> str:
+        return f"safespace:mod:{cls._version(language)}:{language}"
+
+    @classmethod
+    async def get_or_analyze(
+        cls,
+        content: str,
+        language: str,
+        analyze: Callable[[], Awaitable[dict]],
+        source: str = "worker"
+    ) -> dict:
+        """
+        Liefert die gecachte Analyse oder ruft analyze() auf und speichert das Ergebnis.
+        Redis-Fehler führen nie zum Abbruch, nur zu einem Cache-Miss.
+        """
+        if not safespace_settings.moderation_cache_enabled:
+            return await analyze()
+
+        cached, result = await cls.get(content, language)
+        await cls.record(result, source)
+        if cached is not None:
+            return cached
+
+        analysis = await analyze()
+        await cls.set(content, language, analysis)
+        return analysis
+
+    @classmethod
+    async def get(cls, content: str, language: str) -> tuple[Optional[dict], str]:
+        """Returns: (Analyse oder None, "hit" | "near_hit" | "miss")"""
+        normalized = normalize_content(content)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        prefix = cls._prefix(language)
+
+        try:
+            client = RedisCache.client()
+            data = await client.get(f"{prefix}:{digest}")
+            if data:
+                return json.loads(data), "hit"
+
+            if not safespace_settings.moderation_cache_simhash_enabled:
+                return None, "miss"
+            fingerprint = simhash(normalized)
+            if fingerprint is None:
+                return None, "miss"
+
+            oldest = time.time() - safespace_settings.moderation_cache_ttl_seconds
+            async with client.pipeline(transaction=False) as pipe:
+                for band, bits in enumerate(_bands(fingerprint)):
+                    pipe.zrangebyscore(f"{prefix}:simz:{band}:{bits}", oldest, "+inf")
+                members = set().union(*await pipe.execute())
+
+            # Nächster Kandidat innerhalb der erlaubten Hamming-Distanz
+            best = None
+            for member in members:
+                other, other_digest = member.split(":", 1)
+                distance = (int(other, 16) ^ fingerprint).bit_count()
+                if distance <= safespace_settings.moderation_cache_simhash_distance and (
+                    best is None or distance < best[0]
+                ):
+                    best = (distance, other_digest)
+            if best:
+                data = await client.get(f"{prefix}:{best[1]}")
+                if data:
+                    return json.loads(data), "near_hit"
+        except Exception as e:
+            print(f"⚠️ Moderations-Cache nicht verfügbar: {e}")
+        return None, "miss"
+
+    @classmethod
+    async def set(cls, content: str, language: str, analysis: dict) -> None:
+        """Speichert eine Analyse; Fallback-Ergebnisse (SimpleModerator, Parse-Fehler) nicht"""
+        if not safespace_settings.moderation_cache_enabled or analysis.get("fallback"):
+            return
+
+        normalized = normalize_content(content)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        prefix = cls._prefix(language)
+        ttl = safespace_settings.moderation_cache_ttl_seconds
+
+        try:
+            async with RedisCache.client().pipeline(transaction=False) as pipe:
+                pipe.set(f"{prefix}:{digest}", json.dumps(analysis), ex=ttl)
+                fingerprint = simhash(normalized) if safespace_settings.moderation_cache_simhash_enabled else None
+                if fingerprint is not None:
+                    member = f"{fingerprint:016x}:{digest}"
+                    now = time.time()
+                    for band, bits in enumerate(_bands(fingerprint)):
+                        key = f"{prefix}:simz:{band}:{bits}"
+                        pipe.zadd(key, {member: now})
+                        # Mitglieder, deren Analyse abgelaufen ist
+                        pipe.zremrangebyscore(key, "-inf", now - ttl)
+                        pipe.expire(key, ttl)
+                await pipe.execute()
+        except Exception as e:
+            print(f"⚠️ Moderations-Cache nicht verfügbar: {e}")
+
+    @classmethod
+    async def record(cls, result: str, source: str) -> None:
+        """Zählt eine Cache-Abfrage (hit, near_hit, miss) pro Quelle"""
+        Metrics.inc("safespace_moderation_cache_requests_total", result=result, source=source)
+        # Prozessübergreifende Zähler (API und Worker) für die Trefferquote
+        try:
+            await RedisCache.client().hincrby(STATS_KEY, f"{source}:{result}", 1)
+        except Exception:
+            pass
+
+    @classmethod
+    async def stats(cls) -> dict:
+        """Treffer, Fehlschläge und Trefferquote pro Quelle (worker, check, comment)"""
+        try:
+            raw = await RedisCache.client().hgetall(STATS_KEY)
+        except Exception:
+            return {}
+
+        stats: dict[str, dict] = {}
+        for field, value in raw.items():
+            source, result = field.split(":", 1)
+            stats.setdefault(source, {"hit": 0, "near_hit": 0, "miss": 0})[result] = int(value)
+        for counts in stats.values():
+            total = counts["hit"] + counts["near_hit"] + counts["miss"]
+            counts["hit_rate"] = (counts["hit"] + counts["near_hit"]) / total if total else 0.0
+        return stats
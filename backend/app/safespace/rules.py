@@ -0,0 +1,232 @@
+"""
+Kompilierte Regeln für den SimpleModerator
+
+Die Regeln (HATE_KEYWORDS, ALTERNATIVES, RISK_SIGNALS) werden einmal beim ersten Aufruf
+kompiliert und dann in einem Durchlauf pro Post ausgewertet:
+
+- Literale (Keywords ohne Regex-Syntax, Alternativ-Phrasen) über einen
+  Aho-Corasick-Automaten (pyahocorasick; ohne das Paket über eine einzige
+  Alternation aus Literalen).
+- Alle übrigen Regeln als eine kombinierte Alternation ohne Capture-Gruppen,
+  die nur Kandidaten-Stellen findet (re kann sie so mit Präfix-Optimierung
+  durchsuchen; benannte Gruppen pro Regel machen sie mehrfach langsamer).
+  An jeder Kandidaten-Stelle werden die einzelnen Regeln mit match()
+  geprüft; die Suche geht ein Zeichen weiter, damit sich Treffer überlappen
+  dürfen (eine lange Drohung verdeckt kein Schimpfwort darin).
+
+Vorher wird der Text normalisiert: NFKC, Kleinschreibung, unsichtbare
+Zeichen entfernt, kyrillische Doppelgänger und Leetspeak (n1gg3r, 5chlampe)
+auf lateinische Buchstaben abgebildet, Leerraum zusammengefasst.
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+
+_ZERO_WIDTH = "\u200b\u200c\u200d\u2060\ufeff\u00ad"
+
+# Unsichtbare Zeichen entfernen, kyrillische Doppelgänger lateinischer Buchstaben ersetzen
+_TRANSLATION = str.maketrans("аеорсхуіјѕԁ", "aeopcxyijsd", _ZERO_WIDTH)
+_NEEDS_TRANSLATION = re.compile(f"[{_ZERO_WIDTH}\u0400-\u052f]")
+
+_LEET = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"}
+_LEET_CHARS = re.compile(r"[013457@$]")
+# Nur Leetspeak-Zeichen direkt neben Buchstaben ("h4ss", aber nicht "2024")
+_LEET_RUN = re.compile(r"(?<=[^\W\d_])[013457@$]+|[013457@$]+(?=[^\W\d_])")
+
+
+def normalize_for_rules(content: str) -> str:
+    """Normalisiert einen Text für den Regelabgleich (nicht zur Anzeige)"""
+    # lower() statt casefold(): casefold macht aus ß "ss" und die Regeln enthalten [sß]
+    text = unicodedata.normalize("NFKC", content).lower()
+    # Die teuren Schritte nur, wenn der Text betroffene Zeichen enthält
+    if _NEEDS_TRANSLATION.search(text):
+        text = text.translate(_TRANSLATION)
+    if _LEET_CHARS.search(text):
+        text = _LEET_RUN.sub(lambda m: "".join(_LEET[c] for c in m.group(0)), text)
+    return " ".join(text.split())
+
+
+@dataclass
+class ScanResult:
+    """Treffer eines Durchlaufs, jeweils in Definitionsreihenfolge"""
+    categories: list[str] = field(default_factory=list)
+    phrases: list[str] = field(default_factory=list)
+    signals: list[str] = field(default_factory=list)
+
+
+# Öffnende Capture-Gruppe (nicht escaped, kein (?...)
+_CAPTURE_GROUP = re.compile(r"(?<!\\)\((?!\?)")
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _trie_pattern(literals: Iterable[str]) -> str:
+    """
+    Regex für eine Menge von Literalen als Präfixbaum ("asyl|araber" → "a(?:syl|raber)").
+    Eine flache Alternation probiert re an jeder Stelle Literal für Literal durch.
+    """
+    trie: dict = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if "" in node else "")
+
+    return build(trie)
+
+
+def _top_level_alternation(rule: str) -> bool:
+    """Enthält die Regel ein | außerhalb von Gruppen und Zeichenklassen?"""
+    depth, in_class, escaped = 0, False, False
+    for char in rule:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def _grouped_alternation(rules: list[str]) -> str:
+    """
+    Alternation von Regeln, nach dem ersten Zeichen gruppiert, wenn es ein
+    einfacher Buchstabe ist ("asyl|ausl" → "a(?:syl|usl)"), aus demselben Grund.
+    """
+    groups: dict[str, list[str]] = {}
+    others = []
+    for rule in rules:
+        if rule[:1].isalnum() and rule[1:2] not in ("?", "*", "+", "{") and not _top_level_alternation(rule):
+            groups.setdefault(rule[0], []).append(rule[1:])
+        else:
+            others.append(rule)
+
+    branches = [f"{char}(?:{'|'.join(rests)})" for char, rests in sorted(groups.items())]
+    return "(?:" + "|".join(branches + [f"(?:{rule})" for rule in others]) + ")"
+
+
+class _LiteralMatcher:
+    """Findet alle Literale in einem Durchlauf: (Startposition, Wert)"""
+
+    def __init__(self, literals: dict[str, list]):
+        self._automaton = None
+        self._regex = None
+        self._values = literals
+        if not literals:
+            return
+        try:
+            import ahocorasick
+        except ImportError:
+            self._regex = re.compile(_trie_pattern(literals))
+            return
+
+        automaton = ahocorasick.Automaton()
+        for literal, values in literals.items():
+            automaton.add_word(literal, (len(literal), values))
+        automaton.make_automaton()
+        self._automaton = automaton
+
+    def iter(self, text: str) -> Iterator[tuple[int, list]]:
+        if self._automaton is not None:
+            for end, (length, values) in self._automaton.iter(text):
+                yield end - length + 1, values
+        elif self._regex is not None:
+            pos = 0
+            while candidate := self._regex.search(text, pos):
+                # Alle Literale, die hier beginnen (auch kürzere als der Treffer)
+                start = candidate.start()
+                for literal, values in self._values.items():
+                    if text.startswith(literal, start):
+                        yield start, values
+                pos = start + 1
+
+
+class RuleSet:
+    """
+    Kompilierte Form von Keyword-Regeln pro Kategorie, Alternativ-Phrasen und
+    schwachen Signalen (für sich kein Hinweis auf Hassrede, siehe app.safespace.cascade)
+    """
+
+    def __init__(
+        self,
+        keywords: dict[str, list[str]],
+        phrases: Iterable[str],
+        signals: dict[str, list[str]] = None
+    ):
+        self._category_order = list(keywords)
+        self._phrase_order = list(phrases)
+        self._signal_order = list(signals or {})
+
+        literals: dict[str, list] = {}
+        patterns = []
+        rule_groups = [("category", keywords), ("signal", signals or {})]
+        for kind, groups in rule_groups:
+            for name, rules in groups.items():
+                for rule in rules:
+                    body = rule[2:] if rule.startswith(r"\b") else None
+                    if body and re.escape(body) == body:
+                        # Wortanfang muss stimmen, das Ende ist offen (wie \bneger)
+                        literals.setdefault(body, []).append((kind, name, True))
+                    else:
+                        patterns.append(((kind, name), rule))
+        for phrase in self._phrase_order:
+            literals.setdefault(normalize_for_rules(phrase), []).append(("phrase", phrase, False))
+
+        self._literals = _LiteralMatcher(literals)
+        self._patterns = [(match, re.compile(rule)) for match, rule in patterns]
+        self._prefilter = None
+        if patterns:
+            # Ohne Capture-Gruppen nutzt re die Präfix-Optimierungen der Alternation
+            bodies = [_CAPTURE_GROUP.sub("(?:", rule) for _, rule in patterns]
+            if all(b.startswith(r"\b") and not _top_level_alternation(b) for b in bodies):
+                # Alle Regeln beginnen an einer Wortgrenze: \b einmal vor der Alternation
+                self._prefilter = re.compile(r"\b" + _grouped_alternation([b[2:] for b in bodies]))
+            else:
+                self._prefilter = re.compile(_grouped_alternation(bodies))
+
+    def scan(self, content: str) -> ScanResult:
+        """Ein Durchlauf über den normalisierten Text"""
+        text = normalize_for_rules(content)
+        found: set[tuple[str, str]] = set()
+
+        pos = 0
+        while self._prefilter is not None and (candidate := self._prefilter.search(text, pos)):
+            # Welche Regeln hier greifen, entscheidet der Abgleich an dieser Stelle
+            start = candidate.start()
+            for match, pattern in self._patterns:
+                if match not in found and pattern.match(text, start):
+                    found.add(match)
+            pos = start + 1
+
+        for start, values in self._literals.iter(text):
+            for kind, name, word_start in values:
+                if word_start and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                found.add((kind, name))
+
+        return ScanResult(
+            categories=[c for c in self._category_order if ("category", c) in found],
+            phrases=[p for p in self._phrase_order if ("phrase", p) in found],
+            signals=[s for s in self._signal_order if ("signal", s) in found]
+        )
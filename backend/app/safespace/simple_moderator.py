@@ -1,10 +1,9 @@
 """
 Einfacher regelbasierter Moderator als Fallback wenn DeepSeek API nicht verfügbar ist.
-Verwendet Keyword-basierte Erkennung.
+Verwendet Keyword-basierte Erkennung (kompiliert in app.safespace.rules).
 """
-import re
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from app.safespace.models import (
     PostMessage,
@@ -12,13 +11,14 @@ from app.safespace.models import (
     ModerationStatus,
     HateSpeechCategory
 )
+from app.safespace.rules import RuleSet, ScanResult
 
 
 # Hatespeech Keywords nach Kategorie
 HATE_KEYWORDS = {
     "racism": [
         r"\bn[i1]gg[ae3]r",
-        r"\bkanakenFrequently abbreviated as \"kanak\"",
+        r"\bkanaken?",
         r"\bzigeuner",
         r"\bbimbos?",
         r"\bneger",
@@ -57,6 +57,74 @@ HATE_KEYWORDS = {
 }
 
 
+# Schwache Signale: für sich keine Hassrede, aber ein Grund für eine genauere
+# Prüfung (Moderations-Kaskade, app.safespace.cascade)
+RISK_SIGNALS = {
+    "group_reference": [
+        r"\bausl[äa]nder",
+        r"\bmigrant",
+        r"\bfl[üu]chtling",
+        r"\basyl",
+        r"\bmuslim",
+        r"\bmoslem",
+        r"\bislam",
+        r"\bjuden?\b",
+        r"\bschwule?\b",
+        r"\blesben?\b",
+        r"\btrans(frau|mann|menschen|personen)?\b",
+        r"\bt[üu]rken?\b",
+        r"\baraber",
+        r"\bafrikaner",
+        r"\bschwarze[n]?\b",
+        r"\bimmigrant",
+        r"\brefugee",
+        r"\bjews?\b",
+        r"\bgays?\b",
+    ],
+    "dehumanization": [
+        r"\bpack\b",
+        r"\bgesindel",
+        r"\babschaum",
+        r"\bparasit",
+        r"\bungeziefer",
+        r"\bratten\b",
+        r"\buntermensch",
+        r"\bvermin",
+        r"\bscum",
+        r"\bsubhuman",
+    ],
+    "exclusion": [
+        r"\braus\b",
+        r"\babschieben",
+        r"\bausweisen",
+        r"\bgo\s+back\b",
+    ],
+    "violence": [
+        r"\bt[öo]ten",
+        r"\bumbringen",
+        r"\berschie[sß]en",
+        r"\bvernichten",
+        r"\bausrotten",
+        r"\bverpr[üu]geln",
+        r"\bkill",
+        r"\bshoot",
+        r"\bexterminat",
+    ],
+    "insult": [
+        r"\bidiot",
+        r"\bvollidiot",
+        r"\bdrecks",
+        r"\bmissgeburt",
+        r"\bhurensohn",
+        r"\barschloch",
+        r"\bwichser",
+        r"\bmoron",
+        r"\bbitch",
+        r"\bfuck",
+    ],
+}
+
+
 # Alternative Formulierungen für häufige Hassrede-Muster
 ALTERNATIVES = {
     "Ihr verdammten Ausländer": [
@@ -74,11 +142,27 @@ ALTERNATIVES = {
 }
 
 
+# Fallback-Alternativen wenn keine spezifischen gefunden wurden
+DEFAULT_ALTERNATIVES = [
+    "Ich möchte meine Bedenken zu diesem Thema sachlich äußern",
+    "Meine Kritik an der aktuellen Situation ist..."
+]
+
+
 class SimpleModerator:
     """
     Einfacher regelbasierter Moderator ohne externe API-Abhängigkeit.
     """
 
+    _rules: Optional[RuleSet] = None
+
+    @classmethod
+    def rules(cls) -> RuleSet:
+        """Einmal kompilierte Regeln (HATE_KEYWORDS, ALTERNATIVES, RISK_SIGNALS)"""
+        if cls._rules is None:
+            cls._rules = RuleSet(HATE_KEYWORDS, ALTERNATIVES, RISK_SIGNALS)
+        return cls._rules
+
     @classmethod
     async def moderate_post(cls, post: PostMessage, language: str = "de") -> ModerationResult:
         """
@@ -88,18 +172,19 @@ class SimpleModerator:
             post: Der zu moderierende Post
             language: Sprache (wird vom SimpleModerator aktuell nicht verwendet)
         """
-        content_lower = post.content.lower()
+        return cls._moderate(post)
 
-        # Kategorien und Keywords überprüfen
-        detected_categories = []
-        matched_patterns = []
+    @classmethod
+    async def moderate_many(cls, posts: List[PostMessage], language: str = "de") -> List[ModerationResult]:
+        """Moderiert mehrere Posts (z.B. einen ganzen Batch bei offenem Circuit Breaker)"""
+        return [cls._moderate(post) for post in posts]
 
-        for category, patterns in HATE_KEYWORDS.items():
-            for pattern in patterns:
-                if re.search(pattern, content_lower, re.IGNORECASE):
-                    detected_categories.append(category)
-                    matched_patterns.append(pattern)
-                    break  # Nur eine Übereinstimmung pro Kategorie zählen
+    @classmethod
+    def _moderate(cls, post: PostMessage, scan: Optional[ScanResult] = None) -> ModerationResult:
+        # Kategorien und Alternativ-Phrasen in einem Durchlauf
+        if scan is None:
+            scan = cls.rules().scan(post.content)
+        detected_categories = scan.categories
 
         # Confidence Score basierend auf Anzahl gefundener Kategorien
         is_hate_speech = len(detected_categories) > 0
@@ -112,7 +197,7 @@ class SimpleModerator:
             explanation = "Es wurden keine problematischen Inhalte erkannt."
 
         # Alternative Formulierungen generieren
-        suggested_revisions = cls._generate_alternatives(post.content)
+        suggested_revisions = cls._alternatives_for(scan.phrases)
         suggested_revision = suggested_revisions[0] if suggested_revisions else None
 
         revision_explanation = "Diese Formulierung drückt die Kritik sachlich aus, ohne diskriminierende Sprache zu verwenden." if suggested_revision else None
@@ -149,23 +234,13 @@ class SimpleModerator:
     @classmethod
     def _generate_alternatives(cls, content: str) -> List[str]:
         """Generiert alternative Formulierungen basierend auf Templates"""
-        alternatives = []
+        return cls._alternatives_for(cls.rules().scan(content).phrases)
 
-        content_lower = content.lower()
-
-        # Suche nach bekannten Mustern und biete Alternativen an
-        for pattern, alts in ALTERNATIVES.items():
-            if pattern.lower() in content_lower:
-                alternatives.extend(alts)
-
-        # Fallback-Alternativen wenn keine spezifischen gefunden wurden
-        if not alternatives:
-            alternatives = [
-                "Ich möchte meine Bedenken zu diesem Thema sachlich äußern",
-                "Meine Kritik an der aktuellen Situation ist..."
-            ]
-
-        return alternatives
+    @classmethod
+    def _alternatives_for(cls, phrases: List[str]) -> List[str]:
+        # Bekannte Muster gefunden: deren Alternativen anbieten
+        alternatives = [alt for phrase in phrases for alt in ALTERNATIVES[phrase]]
+        return alternatives or list(DEFAULT_ALTERNATIVES)
 
     @classmethod
     def _get_auto_action(cls, status: ModerationStatus) -> str:
@@ -0,0 +1,344 @@
+"""
+Async Object Storage
+
+Der minio-Client ist synchron. MinIOStorage führt seine Aufrufe in einem
+begrenzten Thread-Pool aus, damit put/get/list den Event Loop nicht blockieren,
+und nutzt einen einzigen Client (HTTP-Connection-Pool) pro Prozess.
+Große Objekte werden als Multipart-Upload in Teilen von storage_part_size übertragen.
+
+LocalStorage implementiert dieselbe Schnittstelle auf dem Dateisystem
+(SAFESPACE_STORAGE_BACKEND=local), z.B. für Tests und lokale Entwicklung ohne MinIO.
+Die Instanz des Prozesses liefert MinIOService.storage().
+"""
+
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+
+from app.safespace.config import safespace_settings
+
+
+# Objekt-Schlüssel pro Thread-Aufruf beim Listen
+LIST_PAGE_SIZE = 1000
+
+
+class ObjectStorage(ABC):
+    """Gemeinsame async Schnittstelle der Storage-Backends"""
+
+    @abstractmethod
+    async def put(self, bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        """Speichert ein Objekt aus dem Speicher"""
+
+    @abstractmethod
+    async def put_stream(
+        self,
+        bucket: str,
+        key: str,
+        stream: BinaryIO,
+        length: int = -1,
+        content_type: str = "application/octet-stream"
+    ):
+        """Speichert ein Objekt aus einem Datei-Objekt (Multipart ab storage_part_size, length=-1 = unbekannt)"""
+
+    @abstractmethod
+    async def put_file(self, bucket: str, key: str, path: Path, content_type: str = "application/octet-stream"):
+        """Lädt eine lokale Datei hoch (Multipart für große Dateien)"""
+
+    @abstractmethod
+    async def get(self, bucket: str, key: str) -> Optional[bytes]:
+        """Lädt ein Objekt; None, wenn es nicht existiert"""
+
+    @abstractmethod
+    async def get_range(self, bucket: str, key: str, offset: int, length: int) -> Optional[bytes]:
+        """Lädt length Bytes ab offset; None, wenn das Objekt nicht existiert"""
+
+    @abstractmethod
+    async def get_file(self, bucket: str, key: str, path: Path) -> bool:
+        """Lädt ein Objekt in eine lokale Datei; False, wenn es nicht existiert"""
+
+    @abstractmethod
+    def list_keys(self, bucket: str, prefix: str = "") -> AsyncIterator[str]:
+        """Iteriert über alle Objekt-Schlüssel unter prefix (rekursiv, sortiert)"""
+
+    @abstractmethod
+    async def delete(self, bucket: str, key: str) -> bool:
+        """Löscht ein Objekt"""
+
+    @abstractmethod
+    async def delete_many(self, bucket: str, keys: list[str]) -> int:
+        """Löscht viele Objekte. Returns: Anzahl gelöschter Objekte"""
+
+    @abstractmethod
+    async def presigned_url(self, bucket: str, key: str, expires: timedelta) -> str:
+        """URL für direkten Lesezugriff"""
+
+    async def close(self):
+        """Gibt Ressourcen (Threads, Verbindungen) frei"""
+
+
+class MinIOStorage(ObjectStorage):
+    """MinIO/S3 über den synchronen minio-Client in einem begrenzten Thread-Pool"""
+
+    def __init__(self):
+        import urllib3
+        from minio import Minio
+
+        workers = safespace_settings.storage_max_workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage")
+        # Ein Connection-Pool pro Prozess, so groß wie der Thread-Pool
+        self._http = urllib3.PoolManager(
+            maxsize=workers,
+            timeout=urllib3.Timeout(connect=5, read=60),
+            retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+        )
+        self._client = Minio(
+            endpoint=safespace_settings.minio_endpoint,
+            access_key=safespace_settings.minio_access_key,
+            secret_key=safespace_settings.minio_secret_key,
+            secure=safespace_settings.minio_use_ssl,
+            http_client=self._http
+        )
+        self._buckets: set[str] = set()
+        self._bucket_lock = asyncio.Lock()
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def _ensure_bucket(self, bucket: str):
+        """Erstellt den Bucket beim ersten Zugriff (einmal pro Prozess)"""
+        if bucket in self._buckets:
+            return
+        async with self._bucket_lock:
+            if bucket in self._buckets:
+                return
+            if not await self._run(self._client.bucket_exists, bucket):
+                await self._run(self._client.make_bucket, bucket)
+                print(f"✅ Bucket erstellt: {bucket}")
+            self._buckets.add(bucket)
+
+    async def put(self, bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        await self.put_stream(bucket, key, io.BytesIO(data), len(data), content_type)
+
+    async def put_stream(
+        self,
+        bucket: str,
+        key: str,
+        stream: BinaryIO,
+        length: int = -1,
+        content_type: str = "application/octet-stream"
+    ):
+        await self._ensure_bucket(bucket)
+        # minio teilt Objekte größer als part_size (bzw. unbekannter Länge) in einen Multipart-Upload auf
+        await self._run(
+            self._client.put_object,
+            bucket, key, stream, length,
+            content_type=content_type,
+            part_size=safespace_settings.storage_part_size
+        )
+
+    async def put_file(self, bucket: str, key: str, path: Path, content_type: str = "application/octet-stream"):
+        await self._ensure_bucket(bucket)
+        await self._run(
+            self._client.fput_object,
+            bucket, key, str(path),
+            content_type=content_type,
+            part_size=safespace_settings.storage_part_size
+        )
+
+    async def get(self, bucket: str, key: str) -> Optional[bytes]:
+        from minio.error import S3Error
+
+        def read():
+            response = self._client.get_object(bucket, key)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+
+        try:
+            return await self._run(read)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchBucket"):
+                return None
+            raise
+
+    async def get_range(self, bucket: str, key: str, offset: int, length: int) -> Optional[bytes]:
+        from minio.error import S3Error
+
+        def read():
+            response = self._client.get_object(bucket, key, offset=offset, length=length)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+
+        try:
+            return await self._run(read)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchBucket"):
+                return None
+            raise
+
+    async def get_file(self, bucket: str, key: str, path: Path) -> bool:
+        from minio.error import S3Error
+
+        try:
+            await self._run(self._client.fget_object, bucket, key, str(path))
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchBucket"):
+                return False
+            raise
+
+    async def list_keys(self, bucket: str, prefix: str = "") -> AsyncIterator[str]:
+        await self._ensure_bucket(bucket)
+        # Der Iterator lädt Seiten per HTTP nach: seitenweise im Thread-Pool abrufen
+        objects = await self._run(self._client.list_objects, bucket, prefix=prefix, recursive=True)
+        while True:
+            page = await self._run(lambda: [obj.object_name for obj in islice(objects, LIST_PAGE_SIZE)])
+            for key in page:
+                yield key
+            if len(page) < LIST_PAGE_SIZE:
+                return
+
+    async def delete(self, bucket: str, key: str) -> bool:
+        from minio.error import S3Error
+
+        try:
+            await self._run(self._client.remove_object, bucket, key)
+            return True
+        except S3Error:
+            return False
+
+    async def delete_many(self, bucket: str, keys: list[str]) -> int:
+        from minio.deleteobjects import DeleteObject
+
+        def remove():
+            errors = list(self._client.remove_objects(bucket, [DeleteObject(key) for key in keys]))
+            for error in errors:
+                print(f"⚠️ Löschen fehlgeschlagen: {error.name}: {error.message}")
+            return len(keys) - len(errors)
+
+        if not keys:
+            return 0
+        return await self._run(remove)
+
+    async def presigned_url(self, bucket: str, key: str, expires: timedelta) -> str:
+        return await self._run(self._client.presigned_get_object, bucket, key, expires=expires)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        self._http.clear()
+
+
+class LocalStorage(ObjectStorage):
+    """Dateisystem-Backend: <root>/<bucket>/<key>"""
+
+    def __init__(self, root: Path):
+        self._root = Path(root)
+
+    def _path(self, bucket: str, key: str) -> Path:
+        path = (self._root / bucket / key).resolve()
+        if not path.is_relative_to((self._root / bucket).resolve()):
+            raise ValueError(f"Invalid object key: {key!r}")
+        return path
+
+    def _write(self, path: Path, stream: BinaryIO):
+        # Erst in eine temporäre Datei schreiben, damit Leser nie halbe Objekte sehen
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(stream, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    async def put(self, bucket: str, key: str, data: bytes, content_type: str = "application/octet-stream"):
+        await self.put_stream(bucket, key, io.BytesIO(data), len(data), content_type)
+
+    async def put_stream(
+        self,
+        bucket: str,
+        key: str,
+        stream: BinaryIO,
+        length: int = -1,
+        content_type: str = "application/octet-stream"
+    ):
+        await asyncio.to_thread(self._write, self._path(bucket, key), stream)
+
+    async def put_file(self, bucket: str, key: str, path: Path, content_type: str = "application/octet-stream"):
+        def copy():
+            with open(path, "rb") as f:
+                self._write(self._path(bucket, key), f)
+
+        await asyncio.to_thread(copy)
+
+    async def get(self, bucket: str, key: str) -> Optional[bytes]:
+        try:
+            return await asyncio.to_thread(self._path(bucket, key).read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def get_range(self, bucket: str, key: str, offset: int, length: int) -> Optional[bytes]:
+        def read():
+            with open(self._path(bucket, key), "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+
+        try:
+            return await asyncio.to_thread(read)
+        except FileNotFoundError:
+            return None
+
+    async def get_file(self, bucket: str, key: str, path: Path) -> bool:
+        try:
+            await asyncio.to_thread(shutil.copyfile, self._path(bucket, key), path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def list_keys(self, bucket: str, prefix: str = "") -> AsyncIterator[str]:
+        base = self._root / bucket
+
+        def scan() -> list[str]:
+            if not base.is_dir():
+                return []
+            keys = (
+                path.relative_to(base).as_posix()
+                for path in base.rglob("*")
+                if path.is_file() and not path.name.startswith(".upload-")
+            )
+            return sorted(key for key in keys if key.startswith(prefix))
+
+        for key in await asyncio.to_thread(scan):
+            yield key
+
+    async def delete(self, bucket: str, key: str) -> bool:
+        try:
+            await asyncio.to_thread(self._path(bucket, key).unlink)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def delete_many(self, bucket: str, keys: list[str]) -> int:
+        deleted = 0
+        for key in keys:
+            deleted += await self.delete(bucket, key)
+        return deleted
+
+    async def presigned_url(self, bucket: str, key: str, expires: timedelta) -> str:
+        return self._path(bucket, key).as_uri()
+
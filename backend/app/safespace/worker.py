@@ -2,24 +2,38 @@
 SafeSpace Moderation Worker
 
 Dieser Worker:
-1. Konsumiert neue Posts aus Kafka
-2. Moderiert sie mit DeepSeek
-3. Speichert Reports in MinIO
+1. Konsumiert neue Posts und Kommentare aus Kafka (bis zu SAFESPACE_WORKER_MAX_IN_FLIGHT parallel)
+2. Moderiert sie: eindeutige Fälle über Regeln (app.safespace.cascade), der Rest
+   mit DeepSeek (mehrere Posts pro Aufruf, app.safespace.batching)
+3. Speichert Reports in MinIO und indexiert sie in PostgreSQL (moderation_reports)
 4. Publiziert Ergebnisse zurück nach Kafka
+5. Committet den Offset erst danach
+6. Verschiebt Posts, deren Moderation wiederholt scheitert, in Retry-Topics
+   mit wachsender Wartezeit und zuletzt in die DLQ (app.safespace.dead_letters)
+
+Mehrere Prozesse in derselben Consumer Group teilen sich die Partitionen
+(docker compose up --scale safespace-worker=3). SIGTERM beendet das Lesen,
+laufende Posts werden noch abgeschlossen.
 
 Starten mit:
     python -m app.safespace.worker
 """
 
 import asyncio
+import signal
 import uuid
 from datetime import datetime
 
 from app.safespace.config import safespace_settings
-from app.safespace.models import PostMessage, ModerationReport
+from app.safespace.models import PostMessage, ModerationReport, TokenUsage
 from app.safespace.kafka_service import KafkaService, PostModerationQueue
-from app.safespace.deepseek_moderator import DeepSeekModerator
+from app.safespace.batching import ModerationBatcher
+from app.safespace.cascade import ModerationCascade, TIERS, TIER_CLEAN, TIER_ABUSIVE, TIER_LLM
+from app.safespace.llm_client import LLMClient
 from app.safespace.minio_service import MinIOService
+from app.db.postgres import PostgresDB
+from app.cache.redis_cache import RedisCache
+from app.db.moderation_reports import index_moderation_report
 
 
 class SafeSpaceWorker:
@@ -31,6 +45,14 @@ class SafeSpaceWorker:
         self.processed_count = 0
         self.error_count = 0
         self.start_time = None
+        self.tier_counts = dict.fromkeys(TIERS, 0)
+        self._stop_event = asyncio.Event()
+
+    def stop(self):
+        """Beendet das Lesen neuer Posts (SIGTERM/SIGINT)"""
+        if not self._stop_event.is_set():
+            print("\n👋 Worker wird beendet, laufende Posts werden abgeschlossen...")
+            self._stop_event.set()
     
     async def run(self):
         """Startet den Worker"""
@@ -38,6 +60,7 @@ class SafeSpaceWorker:
         print(f"   Kafka: {safespace_settings.kafka_bootstrap_servers}")
         print(f"   MinIO: {safespace_settings.minio_endpoint}")
         print(f"   DeepSeek Model: {safespace_settings.deepseek_model}")
+        print(f"   Parallel: {safespace_settings.worker_max_in_flight}")
         print()
         
         self.start_time = datetime.utcnow()
@@ -45,56 +68,90 @@ class SafeSpaceWorker:
         try:
             # Kafka Consumer starten
             await KafkaService.consume_new_posts(
-                handler=self.process_post
+                handler=self.process_post,
+                stop_event=self._stop_event
             )
-        except KeyboardInterrupt:
-            print("\n👋 Worker wird beendet...")
         finally:
             await KafkaService.close_producer()
+            await MinIOService.close()
             self._print_stats()
     
-    async def process_post(self, post: PostMessage):
-        """Verarbeitet einen einzelnen Post"""
+    async def process_post(self, post: PostMessage, message_id: str):
+        """
+        Verarbeitet einen einzelnen Post.
+        Fehler werden weitergereicht, damit der Offset nicht committet wird.
+        """
         received_at = datetime.utcnow()
         
         try:
             print(f"\n{'='*60}")
-            print(f"📝 Moderiere Post {post.post_id}")
+            if post.comment_id is not None:
+                print(f"📝 Moderiere Kommentar {post.comment_id} zu Post {post.post_id}")
+            else:
+                print(f"📝 Moderiere Post {post.post_id}")
             print(f"   Von: {post.author_username} (UID: {post.author_uid})")
             print(f"   Content: {post.content[:100]}...")
             
-            # Mit DeepSeek moderieren
-            result = await DeepSeekModerator.moderate_post(post)
+            # Eindeutige Fälle über Regeln, der Rest mit DeepSeek (gebündelt mit parallel laufenden Posts)
+            triage = await ModerationCascade.triage(post, source="worker")
+            if triage.result is None:
+                result, usage = await ModerationBatcher.instance().moderate_post(post)
+            else:
+                result, usage = triage.result, TokenUsage(batch_size=0)
+            self.tier_counts[triage.tier] += 1
+            if post.comment_id is not None:
+                # Zuordnung für app.safespace.comment_moderation
+                result = result.model_copy(update={
+                    "comment_id": post.comment_id,
+                    "post_author_uid": post.post_author_uid,
+                })
             
             processed_at = datetime.utcnow()
             processing_time = int((processed_at - received_at).total_seconds() * 1000)
             
-            # Report erstellen
+            # Report erstellen; die ID folgt aus der Kafka-Nachricht, damit eine erneute
+            # Zustellung (Absturz vor dem Commit) keinen zweiten Katalog-Eintrag erzeugt
             report = ModerationReport(
-                report_id=str(uuid.uuid4()),
+                report_id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"safespace:{message_id}")),
                 post=post,
                 result=result,
-                model_used=safespace_settings.deepseek_model,
+                model_used=safespace_settings.deepseek_model if triage.tier == TIER_LLM else "rules",
+                moderation_tier=triage.tier,
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                prompt_tokens_saved=usage.prompt_tokens_saved,
+                batch_size=usage.batch_size,
                 received_at=received_at,
                 processed_at=processed_at,
                 processing_time_ms=processing_time
             )
             
             # In MinIO speichern
-            report_path = MinIOService.store_moderation_report(report)
+            report_path = await MinIOService.store_moderation_report(report)
+
+            # Katalog-Eintrag; fehlt er, holt ihn der Backfill nach.
+            # Der Katalog führt Posts pro Autor, Kommentare haben nur den Report in MinIO.
+            if post.comment_id is None:
+                try:
+                    await index_moderation_report(report, report_path)
+                except Exception as e:
+                    print(f"⚠️ Report {report.report_id} nicht indexiert: {e}")
             
-            # Ergebnis nach Kafka publizieren
-            await PostModerationQueue.publish_result(result)
+            # Ergebnis nach Kafka publizieren; scheitert das, wird die Nachricht wiederholt
+            # (report_id ist pro Nachricht stabil, Report und Katalog-Eintrag bleiben einmalig)
+            if not await PostModerationQueue.publish_result(result):
+                raise RuntimeError(f"Ergebnis für Post {post.post_id} nicht publiziert")
             
             # Logging
-            self._log_result(result, processing_time, report_path)
+            self._log_result(result, processing_time, report_path, usage)
             self.processed_count += 1
             
         except Exception as e:
             print(f"❌ Fehler bei Post {post.post_id}: {e}")
             self.error_count += 1
+            raise
     
-    def _log_result(self, result, processing_time: int, report_path: str):
+    def _log_result(self, result, processing_time: int, report_path: str, usage: TokenUsage):
         """Loggt das Moderations-Ergebnis"""
         status_emoji = {
             "approved": "✅",
@@ -122,6 +179,9 @@ class SafeSpaceWorker:
             print(f"   👀 Menschliche Überprüfung erforderlich!")
         
         print(f"   ⏱️  Verarbeitung: {processing_time}ms")
+        if usage.batch_size > 1:
+            print(f"   🪙 Tokens: {usage.prompt_tokens}+{usage.completion_tokens} "
+                  f"({usage.prompt_tokens_saved} gespart, Batch von {usage.batch_size})")
         print(f"   📁 Report: {report_path}")
     
     def _print_stats(self):
@@ -136,6 +196,13 @@ class SafeSpaceWorker:
         print(f"   Laufzeit: {runtime}")
         print(f"   Verarbeitet: {self.processed_count}")
         print(f"   Fehler: {self.error_count}")
+        print(f"   Stufen: {self.tier_counts[TIER_CLEAN]} freigegeben, "
+              f"{self.tier_counts[TIER_ABUSIVE]} geflaggt, {self.tier_counts[TIER_LLM]} DeepSeek")
+
+        batcher = ModerationBatcher.instance()
+        if batcher.batches:
+            print(f"   DeepSeek-Batches: {batcher.batches} ({batcher.fallbacks} Einzel-Fallbacks)")
+            print(f"   Eingesparte Prompt-Tokens: {batcher.tokens_saved}")
         
         if self.processed_count > 0:
             success_rate = (self.processed_count - self.error_count) / self.processed_count
@@ -144,8 +211,20 @@ class SafeSpaceWorker:
 
 async def main():
     """Entry Point"""
+    await PostgresDB.init_pool()
+    await RedisCache.init()
     worker = SafeSpaceWorker()
-    await worker.run()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await LLMClient.close()
+        await RedisCache.close()
+        await PostgresDB.close_pool()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,11 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import hashlib
+import time
+import uuid
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -8,13 +13,28 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
 from app.config import settings
-from app.db.postgres import get_user_by_username, get_user_by_email, get_user_by_username_or_email, get_user_by_uid, create_user
+from app.db.postgres import get_user_by_username, get_user_by_email, get_user_by_username_or_email, get_user_by_uid, create_user, update_password_hash
 from app.models.schemas import TokenData
-from app.cache.redis_cache import OnlineStatus
+from app.cache.redis_cache import OnlineStatus, UserCache, SessionCache
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max = rounds: Hashes mit abweichendem Cost werden beim Login neu erstellt
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+# Für Endpunkte, die auch mit abgelaufenem oder fehlendem Access-Token funktionieren (Logout)
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+# bcrypt gibt den GIL frei - ein begrenzter Thread-Pool hält den Event-Loop frei
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -31,6 +51,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(truncated)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verifiziert Passwort gegen Hash.
+    Returns: (gültig, neuer Hash falls der Cost-Faktor geändert wurde)
+    """
+    truncated = _truncate_password(plain_password)
+    return pwd_context.verify_and_update(truncated, hashed_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verifiziert Passwort im Hash-Thread-Pool (blockiert den Event-Loop nicht)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """verify_and_update_password im Hash-Thread-Pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_and_update_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Erstellt Passwort-Hash im Hash-Thread-Pool (blockiert den Event-Loop nicht)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
+
+
 def _truncate_password(password: str) -> str:
     """
     Truncates password to 72 bytes for bcrypt compatibility.
@@ -44,8 +91,8 @@ def _truncate_password(password: str) -> str:
     return password
 
 
-def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
-    """Erstellt JWT Token"""
+def create_access_token(data: dict, expires_delta: timedelta = None, token_type: str = "access") -> str:
+    """Erstellt JWT Token (mit jti für die Revocation-Liste)"""
     to_encode = data.copy()
     
     if expires_delta:
@@ -55,7 +102,12 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
             minutes=settings.access_token_expire_minutes
         )
     
-    to_encode.update({"exp": expire})
+    to_encode.update({
+        "exp": expire,
+        "iat": datetime.utcnow(),
+        "jti": uuid.uuid4().hex,
+        "typ": token_type
+    })
     encoded_jwt = jwt.encode(
         to_encode,
         settings.secret_key,
@@ -64,33 +116,59 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     return encoded_jwt
 
 
-async def authenticate_user(identifier: str, password: str) -> dict | None:
-    """
-    Authentifiziert User mit Username/E-Mail und Passwort.
+def _timestamp(value: datetime | None) -> int | None:
+    return timegm(value.utctimetuple()) if value else None
 
-    Args:
-        identifier: Username oder E-Mail-Adresse
-        password: Passwort
 
-    Returns:
-        User dict oder None bei Fehler
+def is_ban_active(is_banned: bool, banned_until: datetime | int | None) -> bool:
+    """Prüft ob ein Bann aktiv ist (temporäre Banns laufen ab)"""
+    if isinstance(banned_until, datetime):
+        banned_until = _timestamp(banned_until)
+    return bool(is_banned) and (banned_until is None or banned_until > time.time())
+
+
+async def create_token_pair(user: dict) -> dict:
     """
-    # Versuche Login mit Username oder E-Mail
-    user = await get_user_by_username_or_email(identifier)
+    Erstellt Access- und Refresh-Token für einen User.
+    Der Access-Token trägt Rolle, Bann-Status und Token-Version,
+    damit Requests ohne Datenbankzugriff autorisiert werden können.
+    """
+    version = await SessionCache.current_version(user["uid"])
 
-    if not user:
-        return None
+    access_token = create_access_token(
+        data={
+            "sub": str(user["uid"]),  # JWT standard requires sub to be a string
+            "role": user.get("role") or "user",
+            "ban": bool(user.get("is_banned")),
+            "ban_until": _timestamp(user.get("banned_until")),
+            "ver": version
+        },
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+    )
+    refresh_token = create_access_token(
+        data={"sub": str(user["uid"]), "ver": version},
+        expires_delta=timedelta(days=settings.refresh_token_expire_days),
+        token_type="refresh"
+    )
 
-    if not verify_password(password, user["password_hash"]):
-        return None
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": settings.access_token_expire_minutes * 60
+    }
 
-    return user
 
+def _token_id(payload: dict, token: str) -> str:
+    """jti des Tokens (ältere Tokens ohne jti werden über ihren Hash identifiziert)"""
+    return payload.get("jti") or hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
-    """Holt aktuellen User aus JWT Token"""
-    print(f"[AUTH] get_current_user called with token: {token[:20] if token else 'None'}...")
 
+async def decode_token(token: str, expected_type: str = "access") -> dict:
+    """
+    Dekodiert und validiert einen JWT inkl. Token-Version und Revocation-Liste.
+    Raises: HTTPException 401 bei ungültigem, abgelaufenem oder widerrufenem Token
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -106,7 +184,6 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
             options={"verify_sub": False}
         )
         sub = payload.get("sub")
-        print(f"[AUTH] Decoded token, sub: {sub} (type: {type(sub).__name__})")
 
         if sub is None:
             print("[AUTH] ERROR: sub is None in token payload")
@@ -126,11 +203,94 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     except (JWTError, ValueError) as e:
         print(f"[AUTH] ERROR: JWT decode/parsing failed: {str(e)}")
         raise credentials_exception
-    
-    user = await get_user_by_uid(token_data.uid)
-    
-    if user is None:
+
+    # Ältere Tokens ohne typ sind Access-Tokens
+    if payload.get("typ", "access") != expected_type:
         raise credentials_exception
+
+    # Token-Version und Revocation-Liste in einem Redis-Roundtrip prüfen
+    version, revoked = await SessionCache.check_token(token_data.uid, _token_id(payload, token))
+    if revoked or payload.get("ver", 0) != version:
+        raise credentials_exception
+
+    payload["uid"] = token_data.uid
+    return payload
+
+
+async def revoke_token(token: str, expected_type: str = "access") -> None:
+    """Setzt einen gültigen Token bis zu seinem Ablauf auf die Revocation-Liste"""
+    payload = await decode_token(token, expected_type)
+    await SessionCache.revoke_token(_token_id(payload, token), payload["exp"])
+
+
+async def consume_refresh_token(token: str) -> dict:
+    """
+    Löst einen Refresh-Token ein: er wird dabei widerrufen (Rotation).
+    Raises: HTTPException 401 bei ungültigem oder bereits eingelöstem Token
+    """
+    payload = await decode_token(token, expected_type="refresh")
+    if not await SessionCache.consume_token(_token_id(payload, token), payload["exp"]):
+        # Parallel oder erneut eingelöst (z.B. gestohlener Token)
+        print(f"[AUTH] WARNING: Refresh-Token von User {payload['uid']} erneut verwendet")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+async def authenticate_user(identifier: str, password: str) -> dict | None:
+    """
+    Authentifiziert User mit Username/E-Mail und Passwort.
+
+    Args:
+        identifier: Username oder E-Mail-Adresse
+        password: Passwort
+
+    Returns:
+        User dict oder None bei Fehler
+    """
+    # Versuche Login mit Username oder E-Mail
+    user = await get_user_by_username_or_email(identifier)
+
+    if not user:
+        return None
+
+    valid, new_hash = await verify_and_update_password_async(password, user["password_hash"])
+    if not valid:
+        return None
+
+    # Transparentes Rehashing wenn sich der Cost-Faktor geändert hat
+    if new_hash:
+        await update_password_hash(user["uid"], new_hash)
+        user["password_hash"] = new_hash
+
+    return user
+
+
+async def _principal(uid: int) -> dict:
+    """Principal aus Cache (LRU/Redis), sonst aus der Datenbank; prüft den Bann und markiert online"""
+    user = await UserCache.get(uid)
+
+    if user is None:
+        user = await get_user_by_uid(uid)
+
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        await UserCache.set(uid, user)
+        user = UserCache.principal(user)
+
+    if is_ban_active(user.get("is_banned"), user.get("banned_until")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account suspended"
+        )
     
     # User als online markieren
     await OnlineStatus.set_online(user["uid"])
@@ -138,6 +298,36 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     return user
 
 
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+    """Holt aktuellen User aus JWT Token"""
+    payload = await decode_token(token)
+    return await _principal(payload["uid"])
+
+
+async def get_current_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    Principal nur aus dem Token (uid, role), ohne Cache- oder Datenbankzugriff.
+    Für Endpunkte, die kein User-Profil brauchen. Rollenwechsel, Bann und Löschung
+    erhöhen die Token-Version; ältere Tokens scheitern schon in decode_token.
+    """
+    payload = await decode_token(token)
+    uid = payload["uid"]
+
+    if "role" not in payload:
+        # Token aus der Zeit vor den Claims
+        user = await _principal(uid)
+        return {"uid": uid, "role": user.get("role") or "user"}
+
+    if is_ban_active(payload.get("ban"), payload.get("ban_until")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account suspended"
+        )
+
+    await OnlineStatus.set_online(uid)
+    return {"uid": uid, "role": payload["role"]}
+
+
 async def register_user(username: str, email: str, password: str, first_name: str = None, last_name: str = None, birthday: str = None) -> dict:
     """Registriert neuen User"""
     # Prüfen ob Username bereits existiert
@@ -149,7 +339,7 @@ async def register_user(username: str, email: str, password: str, first_name: st
         )
 
     # Password hashen
-    password_hash = get_password_hash(password)
+    password_hash = await get_password_hash_async(password)
 
     # User erstellen
     user = await create_user(username, email, password_hash, first_name, last_name, birthday)
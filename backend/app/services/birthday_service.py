@@ -1,73 +1,107 @@
-"""Birthday Notification Service - Prüft täglich um Mitternacht auf Geburtstage"""
+"""
+Birthday Notification Service - läuft stündlich als Scheduler-Job (app.services.jobs)
 
-import asyncio
-from datetime import datetime, date, time, timedelta
+Jeder User wird nach Mitternacht in seiner eigenen Zeitzone benachrichtigt.
+Die Suche nutzt den Index auf users.birthday_mmdd; birthday_notified_on
+verhindert doppelte Benachrichtigungen und holt verpasste Läufe nach.
+"""
 
+import calendar
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-def calculate_age(birthday: date) -> int:
+from app.config import settings
+
+
+# Geburtstagskinder pro Transaktion (Fan-out an alle Freunde)
+BIRTHDAY_BATCH_SIZE = 200
+
+# Lokale Uhrzeiten liegen zwischen UTC-12 und UTC+14
+_UTC_OFFSETS = (timedelta(hours=-12), timedelta(0), timedelta(hours=14))
+
+
+def calculate_age(birthday: date, today: date | None = None) -> int:
     """Berechnet das aktuelle Alter basierend auf dem Geburtsdatum"""
-    today = date.today()
+    today = today or date.today()
     age = today.year - birthday.year
-    # Prüfe ob der Geburtstag dieses Jahr schon war
-    if (today.month, today.day) < (birthday.month, birthday.day):
+    # Prüfe ob der Geburtstag dieses Jahr schon war (29.2. wird in Nicht-Schaltjahren am 28.2. gefeiert)
+    is_birthday = birthday.month * 100 + birthday.day in birthday_mmdd_for(today)
+    if (today.month, today.day) < (birthday.month, birthday.day) and not is_birthday:
         age -= 1
     return age
 
 
+def birthday_mmdd_for(day: date) -> list[int]:
+    """MMDD-Werte, die an `day` Geburtstag feiern; am 28.2. in Nicht-Schaltjahren auch der 29.2."""
+    values = [day.month * 100 + day.day]
+    if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+        values.append(229)
+    return values
+
+
+def resolve_timezone(name: str | None) -> ZoneInfo:
+    """Zeitzone eines Users; unbekannte oder fehlende Angaben nutzen birthday_default_timezone"""
+    try:
+        return ZoneInfo(name or settings.birthday_default_timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.birthday_default_timezone)
+
+
 async def send_birthday_notifications():
-    """Sendet Geburtstags-Benachrichtigungen an alle Freunde des Geburtstagskinds"""
-    from app.db.postgres import get_users_with_birthday_today, get_friends
-    from app.db.notifications import create_notification
-
-    birthday_users = await get_users_with_birthday_today()
-
-    for birthday_user in birthday_users:
-        birthday_uid = birthday_user["uid"]
-        birthday_date = birthday_user["birthday"]
-
-        # Alter berechnen
-        age = calculate_age(birthday_date) if birthday_date else None
-
-        # Alle Freunde des Geburtstagskinds benachrichtigen
-        friend_uids = await get_friends(birthday_uid)
-
-        for friend_uid in friend_uids:
-            try:
-                # Alter wird im comment_id-Feld gespeichert (bei Birthday ungenutzt)
-                await create_notification(
-                    user_uid=friend_uid,
-                    actor_uid=birthday_uid,
-                    notification_type="birthday",
-                    comment_id=age,
-                    birthday_age=age
-                )
-            except Exception as e:
-                print(f"Fehler beim Senden der Geburtstags-Benachrichtigung an {friend_uid}: {e}")
-
-    if birthday_users:
-        usernames = [u["username"] for u in birthday_users]
-        print(f"🎂 Geburtstags-Benachrichtigungen gesendet für: {', '.join(usernames)}")
-
-
-async def _run_birthday_scheduler():
-    """Interner Scheduler, der täglich um Mitternacht läuft"""
-    while True:
-        now = datetime.now()
-        # Nächste Mitternacht berechnen
-        tomorrow = now.date() + timedelta(days=1)
-        next_midnight = datetime.combine(tomorrow, time(0, 0, 0))
-        seconds_until_midnight = (next_midnight - now).total_seconds()
-
-        print(f"🎂 Birthday scheduler: nächste Prüfung in {seconds_until_midnight:.0f} Sekunden (um Mitternacht)")
-        await asyncio.sleep(seconds_until_midnight)
-
-        try:
-            await send_birthday_notifications()
-        except Exception as e:
-            print(f"❌ Fehler im Birthday Scheduler: {e}")
-
-
-def start_birthday_scheduler():
-    """Startet den Birthday Scheduler als Background Task"""
-    asyncio.create_task(_run_birthday_scheduler())
-    print("✅ Birthday notification scheduler started")
+    """Sendet Geburtstags-Benachrichtigungen an alle Freunde der Geburtstagskinder"""
+    from app.db.postgres import get_users_with_birthday_on
+
+    now = datetime.now(timezone.utc)
+    candidate_mmdd = sorted({
+        mmdd for offset in _UTC_OFFSETS for mmdd in birthday_mmdd_for((now + offset).date())
+    })
+    candidates = await get_users_with_birthday_on(candidate_mmdd)
+
+    # Nach Zeitzone gruppieren: fällig ist, wer lokal heute Geburtstag hat
+    by_zone: dict[str | None, list[dict]] = {}
+    for user in candidates:
+        by_zone.setdefault(user["timezone"], []).append(user)
+
+    due = []
+    for zone_name, users in by_zone.items():
+        local_today = now.astimezone(resolve_timezone(zone_name)).date()
+        today_mmdd = birthday_mmdd_for(local_today)
+        due.extend(
+            (user, local_today) for user in users
+            if user["birthday_mmdd"] in today_mmdd and user["birthday_notified_on"] != local_today
+        )
+
+    for i in range(0, len(due), BIRTHDAY_BATCH_SIZE):
+        await _notify_batch(due[i:i + BIRTHDAY_BATCH_SIZE])
+
+
+async def _notify_batch(due: list[tuple[dict, date]]):
+    """Fan-out einer Gruppe von Geburtstagskindern an ihre Freunde (eine Abfrage für alle Freundschaften)"""
+    from app.db.postgres import get_friend_pairs, mark_birthdays_notified
+    from app.db.notifications import create_notifications_bulk
+
+    uids = [user["uid"] for user, _ in due]
+    friends: dict[int, list[int]] = {}
+    for pair in await get_friend_pairs(uids):
+        friends.setdefault(pair["uid"], []).append(pair["friend_uid"])
+
+    rows = []
+    for user, local_today in due:
+        age = calculate_age(user["birthday"], local_today)
+        # Alter wird im comment_id-Feld gespeichert (bei Birthday ungenutzt)
+        rows.extend(
+            {
+                "user_uid": friend_uid,
+                "actor_uid": user["uid"],
+                "type": "birthday",
+                "comment_id": age,
+                "birthday_age": age
+            }
+            for friend_uid in friends.get(user["uid"], [])
+        )
+
+    await create_notifications_bulk(rows)
+    await mark_birthdays_notified(uids, [local_today for _, local_today in due])
+
+    usernames = [user["username"] for user, _ in due]
+    print(f"🎂 Geburtstags-Benachrichtigungen gesendet für: {', '.join(usernames)}")
@@ -1,16 +1,17 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import formatdate
 from typing import Optional
-from datetime import datetime
 
 from app.config import settings
 from app.db.site_settings import get_site_url
+from app.services.email_template_registry import CompiledTemplate, EmailTemplateRegistry
 
 
 class EmailService:
     """
     Service für das Versenden von E-Mails über SMTP.
+    E-Mails werden in die Outbox geschrieben und vom Mailer-Worker zugestellt.
     Konfiguriert über Umgebungsvariablen in docker-compose.yml.
     """
 
@@ -85,6 +86,15 @@ class EmailService:
             "default_subject": "Neue Benachrichtigung von {actor}",
             "default_body": "Du hast eine neue Benachrichtigung erhalten.",
             "default_header": "Neue Benachrichtigung",
+            # Zusammengefasste Benachrichtigungen / Digest
+            "post_liked_many": "{actor} und {count} weitere haben deinen Post geliked",
+            "post_commented_many": "{actor} und {count} weitere haben deinen Post kommentiert",
+            "comment_liked_many": "{actor} und {count} weitere haben deinen Kommentar geliked",
+            "digest_subject": "Du hast {count} neue Benachrichtigungen",
+            "digest_header": "Deine Zusammenfassung",
+            "digest_intro": "Das ist seit deiner letzten Zusammenfassung passiert:",
+            "digest_more": "… und {count} weitere",
+            "view_notifications": "Benachrichtigungen ansehen",
         },
         "en": {
             "greeting": "Hello {username},",
@@ -145,6 +155,15 @@ class EmailService:
             "default_subject": "New notification from {actor}",
             "default_body": "You have received a new notification.",
             "default_header": "New notification",
+            # Zusammengefasste Benachrichtigungen / Digest
+            "post_liked_many": "{actor} and {count} others liked your post",
+            "post_commented_many": "{actor} and {count} others commented on your post",
+            "comment_liked_many": "{actor} and {count} others liked your comment",
+            "digest_subject": "You have {count} new notifications",
+            "digest_header": "Your summary",
+            "digest_intro": "Here is what happened since your last summary:",
+            "digest_more": "… and {count} more",
+            "view_notifications": "View notifications",
         },
         "fr": {
             "greeting": "Bonjour {username},",
@@ -205,6 +224,15 @@ class EmailService:
             "default_subject": "Nouvelle notification de {actor}",
             "default_body": "Vous avez reçu une nouvelle notification.",
             "default_header": "Nouvelle notification",
+            # Zusammengefasste Benachrichtigungen / Digest
+            "post_liked_many": "{actor} et {count} autres ont aimé votre publication",
+            "post_commented_many": "{actor} et {count} autres ont commenté votre publication",
+            "comment_liked_many": "{actor} et {count} autres ont aimé votre commentaire",
+            "digest_subject": "Vous avez {count} nouvelles notifications",
+            "digest_header": "Votre résumé",
+            "digest_intro": "Voici ce qui s'est passé depuis votre dernier résumé :",
+            "digest_more": "… et {count} de plus",
+            "view_notifications": "Voir les notifications",
         },
         "es": {
             "greeting": "Hola {username},",
@@ -265,6 +293,15 @@ class EmailService:
             "default_subject": "Nueva notificación de {actor}",
             "default_body": "Has recibido una nueva notificación.",
             "default_header": "Nueva notificación",
+            # Zusammengefasste Benachrichtigungen / Digest
+            "post_liked_many": "A {actor} y {count} personas más les gustó tu publicación",
+            "post_commented_many": "{actor} y {count} personas más comentaron tu publicación",
+            "comment_liked_many": "A {actor} y {count} personas más les gustó tu comentario",
+            "digest_subject": "Tienes {count} notificaciones nuevas",
+            "digest_header": "Tu resumen",
+            "digest_intro": "Esto es lo que ha pasado desde tu último resumen:",
+            "digest_more": "… y {count} más",
+            "view_notifications": "Ver notificaciones",
         },
         "it": {
             "greeting": "Ciao {username},",
@@ -325,6 +362,15 @@ class EmailService:
             "default_subject": "Nuova notifica da {actor}",
             "default_body": "Hai ricevuto una nuova notifica.",
             "default_header": "Nuova notifica",
+            # Zusammengefasste Benachrichtigungen / Digest
+            "post_liked_many": "A {actor} e ad altre {count} persone piace il tuo post",
+            "post_commented_many": "{actor} e altre {count} persone hanno commentato il tuo post",
+            "comment_liked_many": "A {actor} e ad altre {count} persone piace il tuo commento",
+            "digest_subject": "Hai {count} nuove notifiche",
+            "digest_header": "Il tuo riepilogo",
+            "digest_intro": "Ecco cosa è successo dal tuo ultimo riepilogo:",
+            "digest_more": "… e altre {count}",
+            "view_notifications": "Visualizza notifiche",
         },
         "pt": {
             "greeting": "Olá {username},",
@@ -385,6 +431,15 @@ class EmailService:
             "default_subject": "Nova notificação de {actor}",
             "default_body": "Você recebeu uma nova notificação.",
             "default_header": "Nova notificação",
+            # Zusammengefasste Benachrichtigungen / Digest
+            "post_liked_many": "{actor} e mais {count} pessoas curtiram sua publicação",
+            "post_commented_many": "{actor} e mais {count} pessoas comentaram sua publicação",
+            "comment_liked_many": "{actor} e mais {count} pessoas curtiram seu comentário",
+            "digest_subject": "Você tem {count} novas notificações",
+            "digest_header": "Seu resumo",
+            "digest_intro": "Veja o que aconteceu desde o seu último resumo:",
+            "digest_more": "… e mais {count}",
+            "view_notifications": "Ver notificações",
         },
         "nl": {
             "greeting": "Hallo {username},",
@@ -445,6 +500,15 @@ class EmailService:
             "default_subject": "Nieuwe melding van {actor}",
             "default_body": "Je hebt een nieuwe melding ontvangen.",
             "default_header": "Nieuwe melding",
+            # Zusammengefasste Benachrichtigungen / Digest
+            "post_liked_many": "{actor} en {count} anderen vinden je bericht leuk",
+            "post_commented_many": "{actor} en {count} anderen hebben op je bericht gereageerd",
+            "comment_liked_many": "{actor} en {count} anderen vinden je reactie leuk",
+            "digest_subject": "Je hebt {count} nieuwe meldingen",
+            "digest_header": "Je overzicht",
+            "digest_intro": "Dit is er gebeurd sinds je laatste overzicht:",
+            "digest_more": "… en nog {count}",
+            "view_notifications": "Meldingen bekijken",
         },
         "pl": {
             "greeting": "Cześć {username},",
@@ -505,6 +569,15 @@ class EmailService:
             "default_subject": "Nowe powiadomienie od {actor}",
             "default_body": "Otrzymałeś nowe powiadomienie.",
             "default_header": "Nowe powiadomienie",
+            # Zusammengefasste Benachrichtigungen / Digest
+            "post_liked_many": "{actor} i {count} innych osób polubiło Twój post",
+            "post_commented_many": "{actor} i {count} innych osób skomentowało Twój post",
+            "comment_liked_many": "{actor} i {count} innych osób polubiło Twój komentarz",
+            "digest_subject": "Masz nowe powiadomienia: {count}",
+            "digest_header": "Twoje podsumowanie",
+            "digest_intro": "Oto co wydarzyło się od Twojego ostatniego podsumowania:",
+            "digest_more": "… i {count} więcej",
+            "view_notifications": "Zobacz powiadomienia",
         },
     }
 
@@ -518,7 +591,8 @@ class EmailService:
         force: bool = False
     ) -> bool:
         """
-        Sendet eine E-Mail.
+        Stellt eine E-Mail in die Outbox.
+        Der Versand erfolgt durch den Mailer-Worker (app.services.mailer).
 
         Args:
             to_email: Empfänger E-Mail
@@ -528,7 +602,7 @@ class EmailService:
             force: Wenn True, wird auch bei deaktiviertem E-Mail-Versand gesendet
 
         Returns:
-            bool: True wenn erfolgreich, False bei Fehler
+            bool: True wenn eingereiht, False bei Fehler
         """
         # Wenn Email disabled ist, skip (außer bei force)
         if not settings.email_enabled and not force:
@@ -536,44 +610,65 @@ class EmailService:
             return False
 
         try:
-            # E-Mail erstellen
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{settings.smtp_from_name} <{settings.smtp_from_email}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            msg['Date'] = datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S +0000')
-
-            # Text-Version hinzufügen (Fallback)
-            if text_content:
-                part1 = MIMEText(text_content, 'plain', 'utf-8')
-                msg.attach(part1)
-
-            # HTML-Version hinzufügen
-            part2 = MIMEText(html_content, 'html', 'utf-8')
-            msg.attach(part2)
-
-            # SMTP-Verbindung aufbauen und senden
-            if settings.smtp_use_tls:
-                server = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=10)
-                server.starttls()
-            else:
-                server = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=10)
-
-            # Login falls Credentials vorhanden
-            if settings.smtp_user and settings.smtp_password:
-                server.login(settings.smtp_user, settings.smtp_password)
-
-            # E-Mail senden
-            server.send_message(msg)
-            server.quit()
+            from app.db.email_outbox import enqueue_email
+            await enqueue_email(to_email, subject, html_content, text_content)
+            return True
+        except Exception as e:
+            print(f"❌ Failed to queue email to {to_email}: {e}")
+            return False
+
+    @classmethod
+    async def send_email_now(
+        cls,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> bool:
+        """
+        Sendet eine E-Mail sofort über eine eigene SMTP-Verbindung (ohne Outbox).
+        Nur für Fälle, in denen das Ergebnis direkt benötigt wird (Test-E-Mail).
+        """
+        import aiosmtplib
 
+        try:
+            await aiosmtplib.send(
+                cls.build_message(to_email, subject, html_content, text_content),
+                hostname=settings.smtp_host,
+                port=settings.smtp_port,
+                username=settings.smtp_user or None,
+                password=settings.smtp_password or None,
+                start_tls=settings.smtp_use_tls,
+                timeout=10
+            )
             print(f"✅ Email sent to {to_email}: {subject}")
             return True
-
         except Exception as e:
             print(f"❌ Failed to send email to {to_email}: {e}")
             return False
 
+    @staticmethod
+    def build_message(
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ) -> MIMEMultipart:
+        """Erstellt die MIME-Nachricht (Text-Fallback + HTML)"""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{settings.smtp_from_name} <{settings.smtp_from_email}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg['Date'] = formatdate(usegmt=True)
+
+        # Text-Version hinzufügen (Fallback)
+        if text_content:
+            msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+
+        # HTML-Version hinzufügen
+        msg.attach(MIMEText(html_content, 'html', 'utf-8'))
+        return msg
+
     @classmethod
     async def send_notification_email(
         cls,
@@ -600,6 +695,7 @@ class EmailService:
             site_url = await get_site_url()
         except Exception:
             site_url = "http://localhost:4200"
+        await EmailTemplateRegistry.refresh()
 
         # Betreff und Nachricht basierend auf Typ
         subject, html_content, text_content = cls._build_notification_email(
@@ -618,65 +714,73 @@ class EmailService:
     @classmethod
     def _build_from_template(
         cls,
-        template: dict,
+        template: CompiledTemplate,
         to_username: str,
         actor_username: str,
         post_id: Optional[int],
         post_content: Optional[str] = None,
         comment_content: Optional[str] = None,
         birthday_age: Optional[int] = None,
-        site_url: str = "http://localhost:4200"
+        site_url: str = "http://localhost:4200",
+        lang: str = "de"
     ) -> tuple[str, str, str]:
-        """Erstellt E-Mail aus gespeichertem Template mit Platzhalter-Ersetzung."""
+        """Erstellt E-Mail aus gespeichertem (kompiliertem) Template."""
         import html as html_module
-        import re
 
+        s = cls._EMAIL_STRINGS[lang]
         post_link = f"{site_url}/my-posts?highlight={post_id}" if post_id else ""
 
         # Post-Inhalt Block
         post_content_html = ""
+        post_content_text = ""
         if post_content:
             truncated = post_content[:300] + ("..." if len(post_content) > 300 else "")
             safe_content = html_module.escape(truncated)
             post_content_html = f'<div style="background: #f0f2f5; border-left: 4px solid #1877f2; padding: 12px 16px; border-radius: 0 8px 8px 0; margin: 16px 0; font-size: 14px; color: #333;">{safe_content}</div>'
+            post_content_text = f"\n\"{truncated}\"\n"
 
         # Kommentar Block
         comment_content_html = ""
+        comment_content_text = ""
         if comment_content:
             truncated_comment = comment_content[:300] + ("..." if len(comment_content) > 300 else "")
             safe_comment = html_module.escape(truncated_comment)
             comment_content_html = f'<div style="background: #fff3e0; border-left: 4px solid #ff9800; padding: 12px 16px; border-radius: 0 8px 8px 0; margin: 16px 0; font-size: 14px; color: #333;">{safe_comment}</div>'
+            comment_content_text = f"\n\"{truncated_comment}\"\n"
 
         # Action Button
         action_button_html = ""
+        action_button_text = ""
         if post_link:
-            action_button_html = f"<a href='{post_link}' class='button'>Post ansehen</a>"
+            action_button_html = f"<a href='{post_link}' class='button'>{s['view_post']}</a>"
+            action_button_text = f"\n{s['view_post']}: {post_link}"
 
         # Birthday Age Block
         birthday_age_html = ""
         if birthday_age:
             birthday_age_html = f'<p style="font-size: 24px; text-align: center; margin: 16px 0;">🎉 <strong>{birthday_age}</strong> 🎉</p>'
 
-        # Platzhalter ersetzen
-        subject = template["subject"]
-        subject = subject.replace("{{username}}", to_username)
-        subject = subject.replace("{{actor}}", actor_username)
-
-        body = template["body"]
-        body = body.replace("{{username}}", to_username)
-        body = body.replace("{{actor}}", actor_username)
-        body = body.replace("{{post_content}}", post_content_html)
-        body = body.replace("{{comment_content}}", comment_content_html)
-        body = body.replace("{{action_button}}", action_button_html)
-        body = body.replace("{{birthday_age}}", birthday_age_html)
-
-        html = cls._wrap_email_html("🔔", body)
+        subject, body, text = template.render(
+            {"username": to_username, "actor": actor_username},
+            {
+                "username": html_module.escape(to_username),
+                "actor": html_module.escape(actor_username),
+                "post_content": post_content_html,
+                "comment_content": comment_content_html,
+                "action_button": action_button_html,
+                "birthday_age": birthday_age_html,
+            },
+            {
+                "username": to_username,
+                "actor": actor_username,
+                "post_content": post_content_text,
+                "comment_content": comment_content_text,
+                "action_button": action_button_text,
+                "birthday_age": str(birthday_age) if birthday_age else "",
+            }
+        )
 
-        # Einfache Text-Version
-        text = re.sub(r'<[^>]+>', '', body)
-        text = text.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">")
-
-        return subject, html, text
+        return subject, cls._wrap_email_html("🔔", body, lang), text
 
     @classmethod
     def _build_notification_email(
@@ -703,6 +807,15 @@ class EmailService:
         """
         lang = user_language if user_language in cls._EMAIL_STRINGS else "en"
 
+        # Von Admins gespeicherte Templates haben Vorrang vor den Standard-E-Mails
+        template = EmailTemplateRegistry.get(notification_type, lang)
+        if template is not None:
+            return cls._build_from_template(
+                template, to_username, actor_username, post_id,
+                post_content=post_content, comment_content=comment_content,
+                birthday_age=birthday_age, site_url=site_url, lang=lang
+            )
+
         s = cls._EMAIL_STRINGS[lang]
 
         # Post-Link (wenn verfügbar) - verwendet konfigurierte Site-URL
@@ -934,6 +1047,84 @@ class EmailService:
 
         return subject, html, text
 
+    # Text-Schlüssel pro Benachrichtigungstyp für Digest-Zeilen
+    _DIGEST_BODY_KEYS = {
+        "post_liked": "post_liked_body",
+        "post_commented": "post_commented_body",
+        "comment_liked": "comment_liked_body",
+        "birthday": "birthday_body",
+        "group_join_request": "group_join_body",
+        "friend_request": "friend_request_body",
+        "friend_request_accepted": "friend_accepted_body",
+        "post_shared": "post_shared_body",
+        "welcome": "welcome_body",
+    }
+
+    @classmethod
+    def _build_digest_email(
+        cls,
+        to_username: str,
+        items: list[dict],
+        total: int,
+        site_url: str = "http://localhost:4200",
+        user_language: str = "de"
+    ) -> tuple[str, str, str]:
+        """
+        Erstellt die Digest-E-Mail aus ungelesenen Benachrichtigungen.
+        items: Dicts mit type, actor_username, actor_count, group_name (neueste zuerst)
+
+        Returns:
+            (subject, html_content, text_content)
+        """
+        import html as html_module
+
+        lang = user_language if user_language in cls._EMAIL_STRINGS else "en"
+        s = cls._EMAIL_STRINGS[lang]
+
+        lines = []
+        for item in items:
+            actor = item["actor_username"]
+            count = (item.get("actor_count") or 1) - 1
+            if count > 0 and f"{item['type']}_many" in s:
+                lines.append(s[f"{item['type']}_many"].format(actor=actor, count=count))
+                continue
+            key = cls._DIGEST_BODY_KEYS.get(item["type"], "default_body")
+            lines.append(s[key].format(actor=actor, group=item.get("group_name") or s["a_group"]))
+
+        more = ""
+        if total > len(items):
+            more = s["digest_more"].format(count=total - len(items))
+
+        subject = f"🔔 {s['digest_subject'].format(count=total)}"
+        text = "\n".join([
+            s["greeting"].format(username=to_username),
+            "",
+            s["digest_intro"],
+            "",
+            *[f"- {line}" for line in lines],
+            *([more] if more else []),
+            "",
+            f"{s['view_notifications']}: {site_url}",
+            "",
+            s["closing"],
+            s["team"],
+        ])
+
+        items_html = "".join(
+            f'<li style="margin: 6px 0;">{html_module.escape(line)}</li>' for line in lines
+        )
+        html = cls._wrap_email_html(
+            f"🔔 {s['digest_header']}",
+            f"""<p>{s['greeting_html'].format(username=to_username)}</p>
+                <p>{s['digest_intro']}</p>
+                <ul style="padding-left: 20px;">{items_html}</ul>
+                {f"<p>{more}</p>" if more else ""}
+                <a href='{site_url}' class='button'>{s['view_notifications']}</a>""",
+            lang
+        )
+
+        return subject, html, text
+
     @classmethod
     def _wrap_email_html(cls, header_title: str, body_content: str, lang: str = "de") -> str:
         """Wraps email body content in the standard HTML template."""
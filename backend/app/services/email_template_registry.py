@@ -0,0 +1,132 @@
+"""
+E-Mail-Template-Registry
+
+Admin-Templates (email_templates.json) werden einmal pro (Typ, Sprache) geparst
+und in Format-Strings kompiliert, statt bei jeder E-Mail die Datei zu lesen und
+Platzhalter per str.replace zu ersetzen.
+
+Invalidierung: save_template erhöht den Versionszähler in Redis
+(email_templates:version). Jeder Worker prüft den Zähler höchstens alle
+CHECK_INTERVAL Sekunden und verwirft bei Änderung seine kompilierten Templates.
+"""
+
+import html as html_module
+import re
+import time
+from typing import Optional
+
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([A-Za-z_]\w*)\s*\}\}")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+LINE_BREAK_PATTERN = re.compile(r"</p>|<br\s*/?>", re.IGNORECASE)
+
+
+class _KeepMissing(dict):
+    """Unbekannte Platzhalter bleiben wie bisher unverändert stehen"""
+
+    def __missing__(self, key):
+        return "{{" + key + "}}"
+
+
+def _compile(template: str, strip_tags: bool = False) -> str:
+    """
+    Übersetzt {{name}}-Platzhalter in einen Format-String für str.format_map.
+    Mit strip_tags wird die Text-Variante erzeugt (HTML nur einmal entfernt).
+    """
+    parts = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(template):
+        parts.append(_literal(template[position:match.start()], strip_tags))
+        parts.append("{" + match.group(1) + "}")
+        position = match.end()
+    parts.append(_literal(template[position:], strip_tags))
+    return "".join(parts)
+
+
+def _literal(text: str, strip_tags: bool) -> str:
+    if strip_tags:
+        text = LINE_BREAK_PATTERN.sub("\n", text)
+        text = html_module.unescape(TAG_PATTERN.sub("", text))
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+class CompiledTemplate:
+    """Betreff, HTML- und Text-Body eines Templates als vorkompilierte Format-Strings"""
+
+    __slots__ = ("subject", "html", "text")
+
+    def __init__(self, subject: str, body: str):
+        self.subject = _compile(subject)
+        self.html = _compile(body)
+        self.text = _compile(body, strip_tags=True)
+
+    def render(self, subject_values: dict, html_values: dict, text_values: dict) -> tuple[str, str, str]:
+        return (
+            self.subject.format_map(_KeepMissing(subject_values)),
+            self.html.format_map(_KeepMissing(html_values)),
+            self.text.format_map(_KeepMissing(text_values)),
+        )
+
+
+class EmailTemplateRegistry:
+    """Prozesslokaler Cache kompilierter Admin-Templates"""
+
+    VERSION_KEY = "email_templates:version"
+    CHECK_INTERVAL = 5
+
+    _compiled: dict[tuple[str, str], Optional[CompiledTemplate]] = {}
+    _templates: Optional[dict] = None
+    _version: Optional[int] = None
+    _checked_at: float = 0.0
+
+    @classmethod
+    def _clear(cls):
+        cls._compiled = {}
+        cls._templates = None
+
+    @classmethod
+    async def refresh(cls):
+        """Verwirft den Cache, wenn ein anderer Worker Templates geändert hat"""
+        from app.cache.redis_cache import RedisCache
+
+        now = time.monotonic()
+        if now - cls._checked_at < cls.CHECK_INTERVAL:
+            return
+        cls._checked_at = now
+
+        try:
+            version = int(await RedisCache.client().get(cls.VERSION_KEY) or 0)
+        except Exception:
+            return
+        if version != cls._version:
+            cls._clear()
+            cls._version = version
+
+    @classmethod
+    async def invalidate(cls):
+        """Nach Admin-Änderungen: lokalen Cache leeren und Version erhöhen"""
+        from app.cache.redis_cache import RedisCache
+
+        cls._clear()
+        try:
+            cls._version = await RedisCache.client().incr(cls.VERSION_KEY)
+        except Exception as e:
+            print(f"⚠️ Failed to bump email template version: {e}")
+
+    @classmethod
+    def get(cls, notification_type: str, language: str) -> Optional[CompiledTemplate]:
+        """
+        Kompiliertes Admin-Template für (Typ, Sprache) oder None,
+        wenn kein gespeichertes Template existiert (dann gelten die Standard-E-Mails).
+        """
+        key = (notification_type, language)
+        if key not in cls._compiled:
+            if cls._templates is None:
+                from app.db.email_templates import load_custom_templates
+                cls._templates = load_custom_templates()
+
+            template = cls._templates.get(notification_type, {}).get(language)
+            cls._compiled[key] = (
+                CompiledTemplate(template["subject"], template["body"]) if template else None
+            )
+        return cls._compiled[key]
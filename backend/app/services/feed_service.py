@@ -534,17 +534,18 @@ class PostService:
         author_uid: int,
         post_id: int,
         commenter_uid: int,
-        content: str
+        content: str,
+        moderation_status: str = "approved"
     ) -> dict:
         """Fügt Kommentar hinzu"""
         posts_db = UserPostsDB(author_uid)
-        return await posts_db.add_comment(post_id, commenter_uid, content)
+        return await posts_db.add_comment(post_id, commenter_uid, content, moderation_status)
     
     @classmethod
-    async def get_comments(cls, author_uid: int, post_id: int) -> list[dict]:
-        """Lädt Kommentare eines Posts"""
+    async def get_comments(cls, author_uid: int, post_id: int, viewer_uid: int = None) -> list[dict]:
+        """Lädt Kommentare eines Posts (nicht freigegebene nur für ihren Verfasser)"""
         posts_db = UserPostsDB(author_uid)
-        return await posts_db.get_comments(post_id)
+        return await posts_db.get_comments(post_id, viewer_uid=viewer_uid)
 
     @classmethod
     async def like_comment(cls, author_uid: int, comment_id: int, user_uid: int) -> bool:
@@ -0,0 +1,68 @@
+"""
+Registrierung der periodischen Jobs
+
+Neue periodische Aufgaben (Retention, Kompaktierung, Trending, ...) werden hier
+am Scheduler angemeldet statt eigene asyncio-Schleifen pro Worker zu starten.
+Zeiten sind lokale Serverzeit.
+"""
+
+from app.config import settings
+from app.services.scheduler import Scheduler
+
+
+# Aufbewahrung der Run-History
+SCHEDULER_RUN_RETENTION_DAYS = 30
+
+
+async def _purge_scheduler_runs():
+    deleted = await Scheduler.purge_runs(SCHEDULER_RUN_RETENTION_DAYS)
+    if deleted:
+        print(f"🗑️ Purged {deleted} scheduler runs")
+
+
+async def _run_report_compaction():
+    from app.safespace.compaction import run_report_compaction
+    await run_report_compaction()
+
+
+async def _requeue_pending_comments():
+    from app.safespace.comment_moderation import CommentModeration
+    await CommentModeration.requeue_stale()
+
+
+def register_jobs():
+    """Meldet alle periodischen Jobs am Scheduler an"""
+    from app.services.birthday_service import send_birthday_notifications
+    from app.services.notification_maintenance import (
+        run_notification_maintenance,
+        run_unread_reconciliation,
+    )
+    from app.services.notification_digest import run_notification_digests
+    from app.safespace.config import safespace_settings
+
+    # Stündlich, damit jede Zeitzone kurz nach ihrer lokalen Mitternacht dran ist
+    Scheduler.register("birthday_notifications", send_birthday_notifications, cron="5 * * * *")
+    Scheduler.register("notification_maintenance", run_notification_maintenance, cron="30 3 * * *")
+    Scheduler.register(
+        "unread_reconciliation",
+        run_unread_reconciliation,
+        every=settings.unread_counter_reconcile_interval
+    )
+    Scheduler.register(
+        "notification_digest_hourly",
+        lambda: run_notification_digests("hourly"),
+        cron="0 * * * *",
+        grace=1800
+    )
+    Scheduler.register(
+        "notification_digest_daily",
+        lambda: run_notification_digests("daily"),
+        cron=f"0 {settings.notification_digest_hour} * * *"
+    )
+    Scheduler.register("moderation_report_compaction", _run_report_compaction, cron="0 2 * * *")
+    Scheduler.register(
+        "comment_moderation_requeue",
+        _requeue_pending_comments,
+        every=safespace_settings.comment_pending_requeue_seconds
+    )
+    Scheduler.register("scheduler_run_cleanup", _purge_scheduler_runs, cron="15 4 * * *")
@@ -0,0 +1,283 @@
+"""
+Mailer-Worker
+
+Dieser Worker:
+1. Holt fällige E-Mails aus der Outbox (FOR UPDATE SKIP LOCKED)
+2. Versendet sie über einen Pool persistenter SMTP-Verbindungen
+3. Drosselt den Versand pro Empfänger-Domain (Token Bucket)
+4. Wiederholt fehlgeschlagene Zustellungen mit exponentiellem Backoff
+
+Starten mit:
+    python -m app.services.mailer
+"""
+
+import asyncio
+import random
+import signal
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import aiosmtplib
+
+from app.config import settings
+from app.db.postgres import PostgresDB
+from app.db.email_outbox import (
+    claim_emails,
+    mark_emails_sent,
+    mark_email_failed,
+    release_emails,
+    purge_sent_emails,
+)
+from app.services.email_service import EmailService
+
+
+# Lease für abgeholte E-Mails; danach übernimmt ein anderer Mailer
+CLAIM_LEASE_SECONDS = 300
+
+# Verbindungen nach dieser Leerlaufzeit vor dem Senden per NOOP prüfen
+IDLE_CHECK_SECONDS = 30
+
+PURGE_INTERVAL_SECONDS = 3600
+
+
+class SMTPConnectionPool:
+    """
+    Pool persistenter SMTP-Verbindungen.
+    Verbindungen werden bei Bedarf aufgebaut und nach Fehlern verworfen.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(None)
+        self._last_used: dict[int, float] = {}
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.smtp_host,
+            port=settings.smtp_port,
+            start_tls=settings.smtp_use_tls,
+            timeout=10
+        )
+        try:
+            await smtp.connect()
+            if settings.smtp_user and settings.smtp_password:
+                await smtp.login(settings.smtp_user, settings.smtp_password)
+        except BaseException:
+            # Halb geöffnete Verbindung (z.B. Login abgelehnt) nicht offen lassen
+            smtp.close()
+            raise
+        return smtp
+
+    async def _ensure_alive(self, smtp: Optional[aiosmtplib.SMTP]) -> aiosmtplib.SMTP:
+        if smtp is not None and smtp.is_connected:
+            idle_since = self._last_used.get(id(smtp), 0.0)
+            if time.monotonic() - idle_since < IDLE_CHECK_SECONDS:
+                return smtp
+            try:
+                await smtp.noop()
+                return smtp
+            except aiosmtplib.SMTPException:
+                pass
+            except BaseException:
+                self._last_used.pop(id(smtp), None)
+                smtp.close()
+                raise
+        await self._discard(smtp)
+        return await self._connect()
+
+    async def _discard(self, smtp: Optional[aiosmtplib.SMTP]):
+        if smtp is None:
+            return
+        self._last_used.pop(id(smtp), None)
+        try:
+            if smtp.is_connected:
+                await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Leiht eine Verbindung aus; bei Fehlern wird sie geschlossen und ersetzt.
+        Der Platz im Pool wird immer zurückgegeben, auch wenn der Aufbau scheitert.
+        """
+        pooled = await self._idle.get()
+        smtp = None
+        try:
+            # Verwirft die alte Verbindung selbst, wenn sie nicht mehr nutzbar ist
+            smtp = await self._ensure_alive(pooled)
+            yield smtp
+            self._last_used[id(smtp)] = time.monotonic()
+        except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+            # Vom Server abgelehnt, die Verbindung selbst ist weiter nutzbar
+            if smtp is not None and not smtp.is_connected:
+                await self._discard(smtp)
+                smtp = None
+            raise
+        except BaseException:
+            await self._discard(smtp)
+            smtp = None
+            raise
+        finally:
+            self._idle.put_nowait(smtp)
+
+    async def close(self):
+        for _ in range(self._size):
+            await self._discard(await self._idle.get())
+
+
+class DomainThrottle:
+    """Token Bucket pro Empfänger-Domain (schützt vor Rate-Limits großer Provider)"""
+
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._burst = burst
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def acquire(self, domain: str) -> float:
+        """
+        Verbraucht ein Token für die Domain.
+        Returns: 0 wenn gesendet werden darf, sonst Wartezeit in Sekunden.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(domain, (float(self._burst), now))
+        tokens = min(float(self._burst), tokens + (now - updated) * self._rate)
+        if tokens >= 1:
+            self._buckets[domain] = (tokens - 1, now)
+            return 0.0
+        self._buckets[domain] = (tokens, now)
+        return (1 - tokens) / self._rate
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponentieller Backoff mit Jitter"""
+    delay = min(settings.mailer_retry_base_delay * 2 ** (attempts - 1), settings.mailer_retry_max_delay)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """5xx-Antworten (z.B. unbekannter Empfänger) werden nicht wiederholt"""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(r.code >= 500 for r in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return error.code >= 500
+    return False
+
+
+class MailerWorker:
+    """
+    Worker-Prozess für die E-Mail-Outbox.
+    """
+
+    def __init__(self):
+        self.pool = SMTPConnectionPool(settings.mailer_smtp_connections)
+        self.throttle = DomainThrottle(settings.mailer_domain_rate, settings.mailer_domain_burst)
+        self.sent_count = 0
+        self.failed_count = 0
+        self._stopping = asyncio.Event()
+        self._last_purge = 0.0
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self):
+        """Startet den Worker"""
+        print("📬 Mailer Worker startet...")
+        print(f"   SMTP: {settings.smtp_host}:{settings.smtp_port} ({settings.mailer_smtp_connections} Verbindungen)")
+        print()
+
+        try:
+            while not self._stopping.is_set():
+                processed = 0
+                try:
+                    processed = await self.run_once()
+                    await self._purge_if_due()
+                except Exception as e:
+                    print(f"❌ Fehler im Mailer: {e}")
+
+                # Nur bei leerer Outbox warten, sonst direkt den nächsten Batch holen
+                if processed == 0:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), timeout=settings.mailer_poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.pool.close()
+            print(f"👋 Mailer beendet: {self.sent_count} gesendet, {self.failed_count} fehlgeschlagen")
+
+    async def run_once(self) -> int:
+        """Verarbeitet einen Batch fälliger E-Mails. Returns: Anzahl abgeholter E-Mails"""
+        emails = await claim_emails(settings.mailer_batch_size, CLAIM_LEASE_SECONDS)
+        if not emails:
+            return 0
+
+        # Gedrosselte Domains sofort zurückgeben statt die Verbindungen zu blockieren
+        throttled: dict[int, list[int]] = {}
+        ready = []
+        for email in emails:
+            wait = self.throttle.acquire(email["domain"])
+            if wait > 0:
+                throttled.setdefault(round(wait + 0.5), []).append(email["email_id"])
+            else:
+                ready.append(email)
+        for delay, email_ids in throttled.items():
+            await release_emails(email_ids, delay)
+
+        results = await asyncio.gather(*(self._deliver(email) for email in ready))
+        await mark_emails_sent([email_id for email_id in results if email_id is not None])
+        return len(emails)
+
+    async def _deliver(self, email: dict) -> Optional[int]:
+        """Sendet eine E-Mail. Returns: email_id bei Erfolg, sonst None"""
+        message = EmailService.build_message(
+            email["to_email"], email["subject"], email["html_content"], email["text_content"]
+        )
+        try:
+            async with self.pool.connection() as smtp:
+                await smtp.send_message(message)
+            self.sent_count += 1
+            print(f"✅ Email sent to {email['to_email']}: {email['subject']}")
+            return email["email_id"]
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if is_permanent_failure(e) or email["attempts"] >= settings.mailer_max_attempts:
+                self.failed_count += 1
+                print(f"❌ Failed to send email to {email['to_email']} (giving up): {error}")
+                await mark_email_failed(email["email_id"], error, None)
+            else:
+                delay = retry_delay(email["attempts"])
+                print(f"⚠️ Failed to send email to {email['to_email']}, retry in {delay:.0f}s: {error}")
+                await mark_email_failed(email["email_id"], error, delay)
+            return None
+
+    async def _purge_if_due(self):
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        deleted = await purge_sent_emails(settings.mailer_sent_retention_days)
+        if deleted:
+            print(f"🗑️ Purged {deleted} sent emails from outbox")
+
+
+async def main():
+    """Entry Point"""
+    await PostgresDB.init_pool()
+    worker = MailerWorker()
+
+    # SIGTERM/SIGINT: laufenden Batch abschließen, dann beenden
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await PostgresDB.close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
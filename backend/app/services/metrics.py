@@ -0,0 +1,131 @@
+"""
+Prozess-lokale Metriken im Prometheus-Textformat.
+
+Jeder Gunicorn-Worker führt seine eigenen Zähler; Prometheus scraped
+die Worker einzeln bzw. aggregiert über das `worker`-Label (PID).
+"""
+
+import os
+import threading
+from typing import Callable, Iterable
+
+
+MetricKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def _labels_key(labels: dict) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Metrics:
+    """
+    Minimaler Metrik-Registry (Counter, Gauges, Summaries).
+
+    Collector-Funktionen werden beim Export aufgerufen und liefern
+    Momentaufnahmen (z.B. Pool-Statistiken) als (name, labels, value).
+    """
+
+    _lock = threading.Lock()
+    _counters: dict[MetricKey, float] = {}
+    _gauges: dict[MetricKey, float] = {}
+    _summaries: dict[MetricKey, list[float]] = {}  # [count, sum]
+    _help: dict[str, tuple[str, str]] = {}  # name -> (type, help)
+    _collectors: list[Callable[[], Iterable[tuple[str, dict, float]]]] = []
+
+    @classmethod
+    def describe(cls, name: str, metric_type: str, help_text: str) -> None:
+        cls._help[name] = (metric_type, help_text)
+
+    @classmethod
+    def inc(cls, name: str, value: float = 1.0, **labels) -> None:
+        """Erhöht einen Counter"""
+        key = (name, _labels_key(labels))
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0.0) + value
+
+    @classmethod
+    def set_gauge(cls, name: str, value: float, **labels) -> None:
+        """Setzt einen Gauge-Wert"""
+        with cls._lock:
+            cls._gauges[(name, _labels_key(labels))] = float(value)
+
+    @classmethod
+    def observe(cls, name: str, value: float, **labels) -> None:
+        """Fügt eine Beobachtung zu einer Summary hinzu (count + sum)"""
+        key = (name, _labels_key(labels))
+        with cls._lock:
+            summary = cls._summaries.setdefault(key, [0.0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    @classmethod
+    def get_counter(cls, name: str, **labels) -> float:
+        return cls._counters.get((name, _labels_key(labels)), 0.0)
+
+    @classmethod
+    def get_gauge(cls, name: str, **labels) -> float:
+        return cls._gauges.get((name, _labels_key(labels)), 0.0)
+
+    @classmethod
+    def register_collector(cls, collector: Callable[[], Iterable[tuple[str, dict, float]]]) -> None:
+        """Registriert eine Funktion, die beim Export Gauge-Werte liefert"""
+        if collector not in cls._collectors:
+            cls._collectors.append(collector)
+
+    @classmethod
+    def snapshot(cls) -> dict:
+        """Gibt alle Metriken als verschachteltes Dict zurück (für JSON-Endpunkte)"""
+        data: dict[str, list[dict]] = {}
+        for _, name, labels, value in cls._iter_samples():
+            data.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return data
+
+    @classmethod
+    def render(cls) -> str:
+        """Exportiert alle Metriken im Prometheus-Textformat"""
+        lines: list[str] = []
+        seen: set[str] = set()
+        worker = ("worker", str(os.getpid()))
+
+        for family, name, labels, value in cls._iter_samples():
+            if family not in seen and family in cls._help:
+                metric_type, help_text = cls._help[family]
+                lines.append(f"# HELP {family} {help_text}")
+                lines.append(f"# TYPE {family} {metric_type}")
+                seen.add(family)
+            lines.append(f"{name}{_format_labels(labels + (worker,))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def _iter_samples(cls) -> Iterable[tuple[str, str, tuple[tuple[str, str], ...], float]]:
+        """Liefert (family, sample_name, labels, value) für alle Metriken"""
+        with cls._lock:
+            counters = list(cls._counters.items())
+            gauges = list(cls._gauges.items())
+            summaries = [(key, list(value)) for key, value in cls._summaries.items()]
+
+        for (name, labels), value in sorted(counters):
+            yield name, name, labels, value
+        for (name, labels), value in sorted(gauges):
+            yield name, name, labels, value
+        for (name, labels), (count, total) in sorted(summaries):
+            yield name, f"{name}_count", labels, count
+            yield name, f"{name}_sum", labels, total
+
+        for collector in cls._collectors:
+            try:
+                for name, labels, value in collector():
+                    yield name, name, _labels_key(labels), float(value)
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
@@ -0,0 +1,140 @@
+"""
+Notification Digest Service - Sammel-E-Mails statt Einzel-E-Mails
+
+User mit notification_preferences.email_digest = 'hourly' bzw. 'daily' erhalten
+keine E-Mail pro Benachrichtigung, sondern eine Zusammenfassung ihrer
+ungelesenen Benachrichtigungen seit dem letzten Digest.
+Versendet wird über Scheduler-Jobs (app.services.jobs).
+"""
+
+from datetime import timedelta
+
+from app.config import settings
+
+
+DIGEST_PERIODS = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+}
+
+# Abonnenten pro Transaktion
+DIGEST_BATCH_SIZE = 500
+
+
+async def create_notification_digest_table():
+    """Speichert pro User den Zeitpunkt des letzten Digests"""
+    from app.db.postgres import PostgresDB
+
+    async with PostgresDB.connection() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS notification_digests (
+                user_uid INTEGER PRIMARY KEY REFERENCES users(uid) ON DELETE CASCADE,
+                last_sent_at TIMESTAMP NOT NULL
+            )
+        """)
+        await conn.commit()
+
+
+async def send_notification_digests(frequency: str) -> int:
+    """
+    Stellt Digest-E-Mails für alle Abonnenten der Frequenz in die Outbox.
+    Returns: Anzahl eingereihter E-Mails
+    """
+    from app.db.postgres import PostgresDB
+    from app.db.site_settings import get_site_url
+
+    period = DIGEST_PERIODS[frequency]
+    try:
+        site_url = await get_site_url()
+    except Exception:
+        site_url = "http://localhost:4200"
+
+    async with PostgresDB.connection() as conn:
+        result = await conn.execute("""
+            SELECT u.uid, u.username, u.email, u.preferred_language AS language,
+                   u.notification_preferences AS prefs,
+                   COALESCE(d.last_sent_at, LOCALTIMESTAMP - %s) AS since
+            FROM users u
+            LEFT JOIN notification_digests d ON d.user_uid = u.uid
+            WHERE u.notification_preferences->>'email_digest' = %s
+              AND u.email IS NOT NULL AND u.email <> ''
+              AND u.is_banned = FALSE
+        """, (period, frequency))
+        subscribers = await result.fetchall()
+
+    queued = 0
+    for i in range(0, len(subscribers), DIGEST_BATCH_SIZE):
+        queued += await _send_digest_batch(subscribers[i:i + DIGEST_BATCH_SIZE], site_url)
+    return queued
+
+
+async def _send_digest_batch(subscribers: list, site_url: str) -> int:
+    """Lädt die ungelesenen Benachrichtigungen einer Gruppe von Abonnenten und reiht die E-Mails ein"""
+    from app.db.postgres import PostgresDB
+    from app.db.email_outbox import enqueue_emails
+    from app.db.notifications import IN_APP_ONLY_TYPES
+    from app.services.email_service import EmailService
+
+    uids = [s["uid"] for s in subscribers]
+    since = [s["since"] for s in subscribers]
+
+    async with PostgresDB.connection() as conn:
+        # Untere Grenze auf created_at, damit nur die relevanten Partitionen gelesen werden
+        result = await conn.execute("""
+            SELECT n.user_uid, n.type, n.actor_count,
+                   u.username AS actor_username, g.name AS group_name
+            FROM unnest(%s::int[], %s::timestamp[]) AS s(uid, since)
+            JOIN notifications n ON n.user_uid = s.uid AND n.created_at > s.since
+            JOIN users u ON u.uid = n.actor_uid
+            LEFT JOIN groups g ON g.group_id = n.group_id
+            WHERE n.is_read = FALSE
+              AND n.created_at > %s
+              AND n.type <> ALL(%s)
+            ORDER BY n.user_uid, n.notification_id DESC
+        """, (uids, since, min(since), list(IN_APP_ONLY_TYPES)))
+
+        pending: dict[int, list[dict]] = {}
+        for row in await result.fetchall():
+            pending.setdefault(row["user_uid"], []).append(row)
+
+        emails = []
+        for subscriber in subscribers:
+            prefs = subscriber["prefs"] or {}
+            items = [n for n in pending.get(subscriber["uid"], []) if prefs.get(n["type"], True)]
+            if not items:
+                continue
+
+            subject, html_content, text_content = EmailService._build_digest_email(
+                subscriber["username"],
+                items[:settings.notification_digest_max_items],
+                len(items),
+                site_url,
+                subscriber["language"] or "de"
+            )
+            emails.append({
+                "to_email": subscriber["email"],
+                "subject": subject,
+                "html_content": html_content,
+                "text_content": text_content
+            })
+
+        # Digest-Zeitpunkt und Outbox in derselben Transaktion
+        await enqueue_emails(conn, emails)
+        await conn.execute("""
+            INSERT INTO notification_digests (user_uid, last_sent_at)
+            SELECT uid, LOCALTIMESTAMP FROM unnest(%s::int[]) AS uid
+            ON CONFLICT (user_uid) DO UPDATE SET last_sent_at = EXCLUDED.last_sent_at
+        """, (uids,))
+        await conn.commit()
+
+    return len(emails)
+
+
+async def run_notification_digests(frequency: str):
+    """Scheduler-Job: Digests einer Frequenz versenden (nur bei aktiviertem E-Mail-Versand)"""
+    if not settings.email_enabled:
+        return
+
+    queued = await send_notification_digests(frequency)
+    if queued:
+        print(f"📰 Queued {queued} {frequency} notification digests")
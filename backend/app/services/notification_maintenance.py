@@ -0,0 +1,25 @@
+"""
+Notification Maintenance (als Scheduler-Jobs registriert, siehe app.services.jobs)
+- Legt Monats-Partitionen an und löscht alte Partitionen (täglich)
+- Gleicht die Redis Unread-Zähler mit PostgreSQL ab (periodisch)
+"""
+
+
+async def run_notification_maintenance():
+    """Legt kommende Partitionen an und wendet die Retention an"""
+    from app.db.notifications import ensure_notification_partitions, purge_old_notifications
+
+    created = await ensure_notification_partitions()
+    if created:
+        print(f"🗂️ Created notification partitions: {', '.join(created)}")
+
+    await purge_old_notifications()
+
+
+async def run_unread_reconciliation():
+    """Gleicht die Redis Unread-Zähler mit PostgreSQL ab"""
+    from app.db.notifications import reconcile_unread_counters
+
+    corrected = await reconcile_unread_counters()
+    if corrected:
+        print(f"🔢 Reconciled {corrected} unread notification counters")
@@ -0,0 +1,372 @@
+"""
+Periodischer Job-Scheduler mit Leader Election
+
+Jeder Gunicorn-Worker startet den Scheduler, aber nur der Leader führt Jobs aus:
+- Leader Election über einen Redis-Lock (scheduler:leader) mit TTL, den der
+  Leader regelmäßig verlängert. Fällt er aus, übernimmt ein anderer Worker.
+- Idempotenz-Key pro Ausführung: (job_name, scheduled_for) ist in scheduler_runs
+  eindeutig. Selbst wenn kurzzeitig zwei Leader existieren (oder Redis nicht
+  erreichbar ist und alle Worker konkurrieren), läuft jeder Termin nur einmal.
+- Run-History mit Status, Dauer und Fehlermeldung in scheduler_runs.
+
+Zeitpläne: Cron-Ausdruck ("m h dom mon dow", lokale Serverzeit) oder festes
+Intervall in Sekunden. Verpasste Termine (z.B. Deploy um Mitternacht) werden
+innerhalb von `grace` nachgeholt.
+"""
+
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from app.services.metrics import Metrics
+
+
+Metrics.describe("scheduler_job_runs_total", "counter", "Ausgeführte Scheduler-Jobs nach Status")
+Metrics.describe("scheduler_job_duration_seconds", "summary", "Laufzeit der Scheduler-Jobs in Sekunden")
+
+
+class CronSchedule:
+    """Minimaler Cron-Parser: *, Zahlen, Listen (1,2), Bereiche (1-5) und Schritte (*/15)"""
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)
+        )
+        # Wie bei cron: sind Tag und Wochentag eingeschränkt, reicht einer von beiden
+        self._day_or_weekday = fields[2] != "*" and fields[4] != "*"
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> frozenset[int]:
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_text, end_text = part.split("-", 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = end = int(part)
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid cron field: {field!r}")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def matches(self, moment: datetime) -> bool:
+        if moment.minute not in self.minutes or moment.hour not in self.hours:
+            return False
+        if moment.month not in self.months:
+            return False
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays  # cron: 0 = Sonntag
+        if self._day_or_weekday:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def __str__(self) -> str:
+        return self.expression
+
+
+class Job:
+    """Registrierter periodischer Job"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable],
+        cron: Optional[str] = None,
+        every: Optional[int] = None,
+        grace: int = 3600
+    ):
+        if (cron is None) == (every is None):
+            raise ValueError(f"Job {name}: exactly one of cron or every is required")
+        self.name = name
+        self.func = func
+        self.cron = CronSchedule(cron) if cron else None
+        self.every = every
+        self.grace = grace
+        self.last_checked: Optional[datetime] = None
+        self.running = False
+
+    @property
+    def schedule(self) -> str:
+        return str(self.cron) if self.cron else f"every {self.every}s"
+
+    def due_slot(self, now: datetime) -> Optional[datetime]:
+        """
+        Jüngster fälliger Termin seit der letzten Prüfung (innerhalb von grace)
+        oder None, wenn seitdem kein Termin lag.
+        """
+        if self.every:
+            slot = datetime.fromtimestamp(int(now.timestamp()) // self.every * self.every)
+            if self.last_checked is not None and slot <= self.last_checked:
+                return None
+            self.last_checked = slot
+            return slot
+
+        current = now.replace(second=0, microsecond=0)
+        earliest = current - timedelta(seconds=self.grace)
+        if self.last_checked is not None:
+            earliest = max(earliest, self.last_checked + timedelta(minutes=1))
+        self.last_checked = current
+
+        moment = current
+        while moment >= earliest:
+            if self.cron.matches(moment):
+                return moment
+            moment -= timedelta(minutes=1)
+        return None
+
+
+class Scheduler:
+    """
+    Prozessweiter Scheduler (Singleton wie RedisCache/PostgresDB).
+    Jobs werden beim Start registriert, ausgeführt werden sie nur vom Leader.
+    """
+
+    LEADER_KEY = "scheduler:leader"
+    LEADER_TTL = 30
+    TICK_INTERVAL = 5
+
+    # Verlängert den Lock nur, wenn er noch diesem Worker gehört
+    _LEADER_SCRIPT = """
+        local current = redis.call('GET', KEYS[1])
+        if current == ARGV[1] then
+            redis.call('EXPIRE', KEYS[1], ARGV[2])
+            return 1
+        end
+        if not current then
+            redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+            return 1
+        end
+        return 0
+    """
+    _leader_script = None
+
+    _jobs: dict[str, Job] = {}
+    _task: Optional[asyncio.Task] = None
+    _running_tasks: set[asyncio.Task] = set()
+    _worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    _is_leader = False
+
+    @classmethod
+    def register(
+        cls,
+        name: str,
+        func: Callable[[], Awaitable],
+        cron: Optional[str] = None,
+        every: Optional[int] = None,
+        grace: int = 3600
+    ) -> Job:
+        """Registriert einen Job per Cron-Ausdruck oder Intervall (Sekunden)"""
+        job = Job(name, func, cron=cron, every=every, grace=grace)
+        cls._jobs[name] = job
+        return job
+
+    @classmethod
+    def jobs(cls) -> list[Job]:
+        return list(cls._jobs.values())
+
+    @classmethod
+    def is_leader(cls) -> bool:
+        return cls._is_leader
+
+    @classmethod
+    async def create_table(cls):
+        """Run-History; der Unique-Key ist gleichzeitig der Idempotenz-Key"""
+        from app.db.postgres import PostgresDB
+
+        async with PostgresDB.connection() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS scheduler_runs (
+                    run_id BIGSERIAL PRIMARY KEY,
+                    job_name VARCHAR(100) NOT NULL,
+                    scheduled_for TIMESTAMP NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'running',
+                    worker VARCHAR(255),
+                    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    duration_ms INTEGER,
+                    error TEXT,
+                    UNIQUE (job_name, scheduled_for)
+                )
+            """)
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_scheduler_runs_started
+                ON scheduler_runs(started_at DESC)
+            """)
+            await conn.commit()
+
+    @classmethod
+    def start(cls):
+        """Startet die Scheduler-Schleife als Background Task"""
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._loop())
+            print(f"✅ Scheduler started ({len(cls._jobs)} jobs)")
+
+    @classmethod
+    async def stop(cls):
+        """Beendet die Schleife und gibt die Leader-Rolle ab"""
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+        if cls._is_leader:
+            cls._is_leader = False
+            try:
+                from app.cache.redis_cache import RedisCache
+                client = RedisCache.client()
+                if await client.get(cls.LEADER_KEY) == cls._worker_id:
+                    await client.delete(cls.LEADER_KEY)
+            except Exception:
+                pass
+
+    @classmethod
+    async def _elect(cls) -> bool:
+        """
+        Erwirbt oder verlängert den Leader-Lock.
+        Ohne Redis konkurrieren alle Worker; die Run-History verhindert Doppelläufe.
+        """
+        from app.cache.redis_cache import RedisCache
+
+        try:
+            if cls._leader_script is None:
+                cls._leader_script = RedisCache.client().register_script(cls._LEADER_SCRIPT)
+            acquired = await cls._leader_script(keys=[cls.LEADER_KEY], args=[cls._worker_id, cls.LEADER_TTL])
+            return bool(acquired)
+        except Exception as e:
+            print(f"⚠️ Scheduler leader election failed, falling back to run history: {e}")
+            return True
+
+    @classmethod
+    async def _loop(cls):
+        while True:
+            try:
+                was_leader = cls._is_leader
+                cls._is_leader = await cls._elect()
+                if cls._is_leader and not was_leader:
+                    print(f"👑 Scheduler leader: {cls._worker_id}")
+                    # Neuer Leader prüft verpasste Termine innerhalb von grace
+                    for job in cls._jobs.values():
+                        job.last_checked = None
+
+                if cls._is_leader:
+                    now = datetime.now()
+                    for job in cls._jobs.values():
+                        slot = job.due_slot(now)
+                        if slot is not None and not job.running:
+                            task = asyncio.create_task(cls._execute(job, slot))
+                            cls._running_tasks.add(task)
+                            task.add_done_callback(cls._running_tasks.discard)
+            except Exception as e:
+                print(f"❌ Fehler im Scheduler: {e}")
+
+            await asyncio.sleep(cls.TICK_INTERVAL)
+
+    @classmethod
+    async def _claim(cls, job: Job, slot: datetime) -> Optional[int]:
+        """Legt den Run an; None, wenn dieser Termin bereits lief (Idempotenz-Key)"""
+        from app.db.postgres import PostgresDB
+
+        async with PostgresDB.connection() as conn:
+            result = await conn.execute("""
+                INSERT INTO scheduler_runs (job_name, scheduled_for, worker)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (job_name, scheduled_for) DO NOTHING
+                RETURNING run_id
+            """, (job.name, slot, cls._worker_id))
+            row = await result.fetchone()
+            await conn.commit()
+        return row["run_id"] if row else None
+
+    @classmethod
+    async def _finish(cls, run_id: int, duration_ms: int, error: Optional[str]):
+        from app.db.postgres import PostgresDB
+
+        async with PostgresDB.connection() as conn:
+            await conn.execute("""
+                UPDATE scheduler_runs
+                SET status = %s, finished_at = CURRENT_TIMESTAMP, duration_ms = %s, error = %s
+                WHERE run_id = %s
+            """, ("failed" if error else "success", duration_ms, error, run_id))
+            await conn.commit()
+
+    @classmethod
+    async def _execute(cls, job: Job, slot: datetime):
+        job.running = True
+        try:
+            run_id = await cls._claim(job, slot)
+            if run_id is None:
+                return
+
+            start = time.perf_counter()
+            error = None
+            try:
+                await job.func()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"❌ Job {job.name} failed: {error}")
+
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            Metrics.inc("scheduler_job_runs_total", job=job.name, status="failed" if error else "success")
+            Metrics.observe("scheduler_job_duration_seconds", duration_ms / 1000, job=job.name)
+            await cls._finish(run_id, duration_ms, error)
+        except Exception as e:
+            print(f"❌ Scheduler could not record run of {job.name}: {e}")
+        finally:
+            job.running = False
+
+    @classmethod
+    async def recent_runs(cls, limit: int = 50, job_name: Optional[str] = None) -> list[dict]:
+        """Run-History, neueste zuerst"""
+        from app.db.postgres import PostgresDB
+
+        query = """
+            SELECT run_id, job_name, scheduled_for, status, worker,
+                   started_at, finished_at, duration_ms, error
+            FROM scheduler_runs
+        """
+        params: list = []
+        if job_name:
+            query += " WHERE job_name = %s"
+            params.append(job_name)
+        query += " ORDER BY started_at DESC LIMIT %s"
+        params.append(limit)
+
+        async with PostgresDB.connection() as conn:
+            result = await conn.execute(query, tuple(params))
+            rows = await result.fetchall()
+
+        return [
+            {
+                **row,
+                "scheduled_for": row["scheduled_for"].isoformat(),
+                "started_at": row["started_at"].isoformat(),
+                "finished_at": row["finished_at"].isoformat() if row["finished_at"] else None,
+            }
+            for row in rows
+        ]
+
+    @classmethod
+    async def purge_runs(cls, retention_days: int = 30) -> int:
+        """Löscht alte Einträge der Run-History"""
+        from app.db.postgres import PostgresDB
+
+        async with PostgresDB.connection() as conn:
+            result = await conn.execute("""
+                DELETE FROM scheduler_runs
+                WHERE started_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+            """, (retention_days,))
+            await conn.commit()
+            return result.rowcount
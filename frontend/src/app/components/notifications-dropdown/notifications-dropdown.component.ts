@@ -307,6 +307,9 @@ export class NotificationsDropdownComponent implements OnInit {
       this.router.navigate(['/profile', notification.actor_username]);
     } else if (notification.type === 'group_join_request' && notification.group_id) {
       this.router.navigate(['/groups', notification.group_id]);
+    } else if ((notification.type === 'comment_approved' || notification.type === 'comment_hidden') && notification.post_author_uid) {
+      // Kommentar zu einem fremden Post: zum Profil des Post-Autors
+      this.router.navigate(['/profile', notification.post_author_uid]);
     } else if (notification.post_id && notification.post_author_uid) {
       this.router.navigate(['/my-posts'], {
         queryParams: { highlight: notification.post_id }
@@ -340,13 +343,21 @@ export class NotificationsDropdownComponent implements OnInit {
 
   getNotificationMessage(notification: Notification): string {
     const username = notification.actor_username;
+    // Zusammengefasste Benachrichtigung: "Anna und 14 weitere ..."
+    const others = (notification.actor_count ?? 1) - 1;
     switch (notification.type) {
       case 'post_liked':
-        return this.i18n.t('notifications.postLiked', { username });
+        return others > 0
+          ? this.i18n.t('notifications.postLikedMany', { username, count: others })
+          : this.i18n.t('notifications.postLiked', { username });
       case 'post_commented':
-        return this.i18n.t('notifications.postCommented', { username });
+        return others > 0
+          ? this.i18n.t('notifications.postCommentedMany', { username, count: others })
+          : this.i18n.t('notifications.postCommented', { username });
       case 'comment_liked':
-        return this.i18n.t('notifications.commentLiked', { username });
+        return others > 0
+          ? this.i18n.t('notifications.commentLikedMany', { username, count: others })
+          : this.i18n.t('notifications.commentLiked', { username });
       case 'group_join_request':
         return this.i18n.t('notifications.groupJoinRequest', { username, groupName: notification.group_name || '' });
       case 'birthday':
@@ -359,6 +370,10 @@ export class NotificationsDropdownComponent implements OnInit {
         return this.i18n.t('notifications.postShared', { username });
       case 'welcome':
         return this.i18n.t('notifications.welcome');
+      case 'comment_approved':
+        return this.i18n.t('notifications.commentApproved');
+      case 'comment_hidden':
+        return this.i18n.t('notifications.commentHidden');
       default:
         return this.i18n.t('notifications.newNotification');
     }
@@ -208,6 +208,11 @@ import { debounceTime, distinctUntilChanged } from 'rxjs/operators';
                   } @else {
                     <div class="comment-content">{{ comment.content }}</div>
                   }
+                  @if (comment.moderation_status === 'pending') {
+                    <div class="comment-moderation pending">⏳ {{ 'post.commentPending' | translate }}</div>
+                  } @else if (comment.moderation_status === 'hidden') {
+                    <div class="comment-moderation hidden">🚫 {{ 'post.commentHidden' | translate }}</div>
+                  }
                   <div class="comment-actions">
                     <button class="comment-like-btn" [class.liked]="comment.is_liked_by_user" (click)="toggleCommentLike(comment)">
                       {{ comment.is_liked_by_user ? '❤️' : '🤍' }} {{ comment.likes_count }}
@@ -437,6 +442,9 @@ import { debounceTime, distinctUntilChanged } from 'rxjs/operators';
     .comment-username { font-weight: 600; font-size: 14px; }
     .comment-timestamp { font-size: 11px; color: #65676b; }
     .comment-content { font-size: 14px; line-height: 1.4; white-space: pre-wrap; margin-bottom: 8px; }
+    .comment-moderation { font-size: 12px; margin-bottom: 8px; padding: 4px 8px; border-radius: 4px; display: inline-block; }
+    .comment-moderation.pending { background: #fff8e1; color: #8d6e00; }
+    .comment-moderation.hidden { background: #ffebee; color: #c62828; }
     .comment-actions { display: flex; gap: 8px; align-items: center; flex-wrap: wrap; }
     .comment-like-btn, .comment-action-btn { background: none; border: none; padding: 4px 8px; cursor: pointer; color: #65676b; font-size: 13px; border-radius: 4px; }
     .comment-like-btn:hover, .comment-action-btn:hover { background: #f0f2f5; }
@@ -720,6 +728,7 @@ export class PostCardComponent implements OnChanges, OnInit, OnDestroy {
     this.feedService.updateComment(this.post.author_uid, this.post.post_id, comment.comment_id, content).subscribe({
       next: (updatedComment) => {
         comment.content = updatedComment.content;
+        comment.moderation_status = updatedComment.moderation_status;
         this.editingCommentId = null;
         this.editCommentContent = '';
       },
@@ -733,7 +742,9 @@ export class PostCardComponent implements OnChanges, OnInit, OnDestroy {
     this.feedService.deleteComment(this.post.author_uid, this.post.post_id, comment.comment_id).subscribe({
       next: () => {
         this.comments = this.comments.filter(c => c.comment_id !== comment.comment_id);
-        this.post.comments_count = Math.max(0, this.post.comments_count - 1);
+        if (!comment.moderation_status || comment.moderation_status === 'approved') {
+          this.post.comments_count = Math.max(0, this.post.comments_count - 1);
+        }
       },
       error: () => {
         alert(this.i18n.t('errors.deleteComment'));
@@ -818,7 +829,9 @@ export class PostCardComponent implements OnChanges, OnInit, OnDestroy {
     this.feedService.addComment(this.post.author_uid, this.post.post_id, content).subscribe({
       next: (comment) => {
         this.comments.push(comment);
-        this.post.comments_count++;
+        if (!comment.moderation_status || comment.moderation_status === 'approved') {
+          this.post.comments_count++;
+        }
         this.newComment = '';
         this.commentLinkPreviews = [];
         this.commentPreviewUrls.clear();
@@ -186,6 +186,16 @@ import { TranslatePipe } from '../../pipes/translate.pipe';
             </label>
           </div>
 
+          <div class="form-group">
+            <label for="email_digest">{{ 'settings.emailDigest' | translate }}</label>
+            <select id="email_digest" [(ngModel)]="notifPrefs.email_digest" name="email_digest" class="form-control">
+              <option value="off">{{ 'settings.emailDigestOff' | translate }}</option>
+              <option value="hourly">{{ 'settings.emailDigestHourly' | translate }}</option>
+              <option value="daily">{{ 'settings.emailDigestDaily' | translate }}</option>
+            </select>
+            <small class="form-text">{{ 'settings.emailDigestHelp' | translate }}</small>
+          </div>
+
           <!-- Screen Time / Mental Health -->
           <div class="section-divider">
             <h3>{{ 'settings.screenTimeTitle' | translate }}</h3>
@@ -737,7 +747,8 @@ export class SettingsComponent implements OnInit {
     birthday: true,
     group_post: true,
     friend_request: true,
-    friend_request_accepted: true
+    friend_request_accepted: true,
+    email_digest: 'off'
   };
 
   screenTimeEnabled = true;
@@ -791,7 +802,8 @@ export class SettingsComponent implements OnInit {
           birthday: prefs.birthday ?? true,
           group_post: prefs.group_post ?? true,
           friend_request: prefs.friend_request ?? true,
-          friend_request_accepted: prefs.friend_request_accepted ?? true
+          friend_request_accepted: prefs.friend_request_accepted ?? true,
+          email_digest: prefs.email_digest ?? 'off'
         };
       },
       error: () => {}
@@ -869,8 +881,13 @@ export class SettingsComponent implements OnInit {
     };
     this.screenTimeService.saveSettings(screenTimeSettings);
 
-    this.http.put('/api/users/me', updateData).subscribe({
-      next: () => {
+    this.http.put<any>('/api/users/me', updateData).subscribe({
+      next: (response) => {
+        // Password change revokes all sessions and returns fresh tokens
+        if (response?.access_token) {
+          this.authService.storeTokens(response);
+        }
+
         if (this.selectedLanguage !== this.originalLanguage) {
           this.i18n.setLanguage(this.selectedLanguage).then(() => {
             this.originalLanguage = this.selectedLanguage;
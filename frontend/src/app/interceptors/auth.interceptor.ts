@@ -1,13 +1,31 @@
-import { HttpInterceptorFn, HttpErrorResponse } from '@angular/common/http';
+import { HttpInterceptorFn, HttpErrorResponse, HttpBackend, HttpClient, HttpRequest } from '@angular/common/http';
 import { inject } from '@angular/core';
 import { Router } from '@angular/router';
-import { catchError, throwError } from 'rxjs';
+import { Observable, catchError, finalize, shareReplay, switchMap, throwError } from 'rxjs';
+
+interface RefreshResponse {
+  access_token: string;
+  refresh_token?: string;
+}
+
+// Shared refresh request so parallel 401s trigger only one refresh
+let refreshInFlight: Observable<RefreshResponse> | null = null;
+
+function withToken(req: HttpRequest<unknown>, token: string): HttpRequest<unknown> {
+  return req.clone({
+    setHeaders: {
+      Authorization: `Bearer ${token}`
+    }
+  });
+}
 
 export const authInterceptor: HttpInterceptorFn = (req, next) => {
   const router = inject(Router);
+  // HttpClient on the raw backend bypasses interceptors (no circular dependency)
+  const backendHttp = new HttpClient(inject(HttpBackend));
 
   // Public endpoints that don't need a token
-  const publicEndpoints = ['/api/auth/login', '/api/auth/register'];
+  const publicEndpoints = ['/api/auth/login', '/api/auth/register', '/api/auth/refresh'];
   const isPublicEndpoint = publicEndpoints.some(endpoint => req.url.includes(endpoint));
 
   if (isPublicEndpoint) {
@@ -18,26 +36,55 @@ export const authInterceptor: HttpInterceptorFn = (req, next) => {
   const token = localStorage.getItem('access_token');
 
   if (token) {
-    req = req.clone({
-      setHeaders: {
-        Authorization: `Bearer ${token}`
-      }
-    });
+    req = withToken(req, token);
   }
 
+  const handleUnauthorized = (error: HttpErrorResponse) => {
+    localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+    // Only redirect to login if not already on a public page
+    const currentUrl = router.url;
+    const publicPaths = ['/login', '/register', '/forgot-password', '/reset-password', '/terms', '/privacy-policy'];
+    const isPublicPage = publicPaths.some(p => currentUrl.startsWith(p));
+    if (!isPublicPage) {
+      router.navigate(['/login']);
+    }
+    return throwError(() => error);
+  };
+
   return next(req).pipe(
     catchError((error: HttpErrorResponse) => {
-      if (error.status === 401) {
-        localStorage.removeItem('access_token');
-        // Only redirect to login if not already on a public page
-        const currentUrl = router.url;
-        const publicPaths = ['/login', '/register', '/forgot-password', '/reset-password', '/terms', '/privacy-policy'];
-        const isPublicPage = publicPaths.some(p => currentUrl.startsWith(p));
-        if (!isPublicPage) {
-          router.navigate(['/login']);
-        }
+      if (error.status !== 401) {
+        return throwError(() => error);
       }
-      return throwError(() => error);
+
+      // Access tokens are short-lived: try a refresh once, then retry the request
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (!refreshToken) {
+        return handleUnauthorized(error);
+      }
+
+      if (!refreshInFlight) {
+        refreshInFlight = backendHttp.post<RefreshResponse>('/api/auth/refresh', { refresh_token: refreshToken }).pipe(
+          finalize(() => refreshInFlight = null),
+          shareReplay(1)
+        );
+      }
+
+      return refreshInFlight.pipe(
+        catchError(() => handleUnauthorized(error)),
+        switchMap(response => {
+          localStorage.setItem('access_token', response.access_token);
+          if (response.refresh_token) {
+            localStorage.setItem('refresh_token', response.refresh_token);
+          }
+          return next(withToken(req, response.access_token)).pipe(
+            catchError((retryError: HttpErrorResponse) =>
+              retryError.status === 401 ? handleUnauthorized(retryError) : throwError(() => retryError)
+            )
+          );
+        })
+      );
     })
   );
 };
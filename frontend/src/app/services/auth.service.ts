@@ -18,11 +18,14 @@ export interface User {
   last_name?: string;
   preferred_language?: string;
   birthday?: string;
+  timezone?: string;
 }
 
 export interface AuthResponse {
   access_token: string;
   token_type: string;
+  refresh_token?: string;
+  expires_in?: number;
 }
 
 @Injectable({
@@ -31,6 +34,7 @@ export interface AuthResponse {
 export class AuthService {
   private readonly API_URL = '/api/auth';
   private readonly TOKEN_KEY = 'access_token';
+  private readonly REFRESH_TOKEN_KEY = 'refresh_token';
 
   private currentUserSignal = signal<User | null>(null);
   private isLoadingSignal = signal(false);
@@ -75,7 +79,7 @@ export class AuthService {
 
     return this.http.post<AuthResponse>(`${this.API_URL}/login`, formData).pipe(
       tap(response => {
-        this.setToken(response.access_token);
+        this.storeTokens(response);
         this.loadCurrentUser();
       }),
       catchError(error => {
@@ -102,7 +106,7 @@ export class AuthService {
 
     return this.http.post<AuthResponse>(`${this.API_URL}/register`, body).pipe(
       tap(response => {
-        this.setToken(response.access_token);
+        this.storeTokens(response);
         this.loadCurrentUser();
       }),
       catchError(error => {
@@ -117,7 +121,16 @@ export class AuthService {
     this.screenTime.persistUsageToBackend();
     this.screenTime.destroy();
 
+    // Revoke tokens on the server (fire-and-forget); works with an expired access token too
+    const refreshToken = localStorage.getItem(this.REFRESH_TOKEN_KEY);
+    if (this.getToken() || refreshToken) {
+      this.http.post(`${this.API_URL}/logout`, refreshToken ? { refresh_token: refreshToken } : null, {
+        headers: this.getAuthHeaders()
+      }).subscribe({ error: () => {} });
+    }
+
     localStorage.removeItem(this.TOKEN_KEY);
+    localStorage.removeItem(this.REFRESH_TOKEN_KEY);
     localStorage.removeItem('preferredLanguage');
     this.currentUserSignal.set(null);
 
@@ -144,6 +157,13 @@ export class AuthService {
     localStorage.setItem(this.TOKEN_KEY, token);
   }
 
+  storeTokens(response: AuthResponse): void {
+    this.setToken(response.access_token);
+    if (response.refresh_token) {
+      localStorage.setItem(this.REFRESH_TOKEN_KEY, response.refresh_token);
+    }
+  }
+
   loadCurrentUser(): void {
     this.http.get<User>(`${this.API_URL}/me`, {
       headers: this.getAuthHeaders()
@@ -170,6 +190,17 @@ export class AuthService {
             headers: this.getAuthHeaders()
           }).subscribe();
         }
+
+        // Keep the stored time zone in sync with the browser (birthday notifications
+        // are sent after local midnight)
+        const browserTimezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
+        if (browserTimezone && user.timezone !== browserTimezone) {
+          this.http.patch('/api/users/me/timezone', {
+            timezone: browserTimezone
+          }, {
+            headers: this.getAuthHeaders()
+          }).subscribe();
+        }
       }),
       catchError((error) => {
         console.error('Failed to load user:', error);
@@ -177,6 +208,7 @@ export class AuthService {
         // redirects for protected routes. Navigating here would kick users
         // off public pages like /register when an old token is invalid.
         localStorage.removeItem(this.TOKEN_KEY);
+        localStorage.removeItem(this.REFRESH_TOKEN_KEY);
         this.currentUserSignal.set(null);
         this.isLoadingSignal.set(false);
         return of(null);
@@ -33,6 +33,8 @@ export interface Comment {
   created_at: string;
   likes_count: number;
   is_liked_by_user: boolean;
+  // pending/hidden sieht nur der Verfasser (asynchrone Moderation)
+  moderation_status?: 'pending' | 'approved' | 'hidden';
 }
 
 @Injectable({
@@ -253,8 +255,9 @@ export class FeedService implements OnDestroy {
       null,
       { params: { content } }
     ).pipe(
-      tap(() => {
-        // Comments count erhöhen
+      tap((comment) => {
+        // Comments count erhöhen (noch nicht moderierte Kommentare zählen erst nach der Freigabe)
+        if (comment.moderation_status && comment.moderation_status !== 'approved') return;
         this.postsSignal.update(posts =>
           posts.map(p =>
             p.post_id === postId && p.author_uid === authorUid
@@ -15,6 +15,7 @@ export interface Notification {
   comment_id?: number;
   group_id?: number;
   group_name?: string;
+  actor_count?: number;
   is_read: boolean;
   created_at: string;
 }
@@ -152,6 +153,10 @@ export class NotificationsService {
         return this.i18n.t('notifications.postShared').replace('{{username}}', notification.actor_username);
       case 'welcome':
         return this.i18n.t('notifications.welcome');
+      case 'comment_approved':
+        return this.i18n.t('notifications.commentApproved');
+      case 'comment_hidden':
+        return this.i18n.t('notifications.commentHidden');
       default:
         return this.i18n.t('notifications.newNotification');
     }
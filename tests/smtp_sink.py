@@ -0,0 +1,79 @@
+"""
+Lokaler SMTP-Sink für Tests
+
+Nimmt alle E-Mails an und speichert sie im Speicher, statt sie zuzustellen.
+Der Mailer-Worker wird dafür auf den Sink konfiguriert:
+
+    SMTP_HOST=<test-host> SMTP_PORT=1025 SMTP_USE_TLS=false
+
+Als eigenständiger Sink (gibt empfangene E-Mails aus):
+    python smtp_sink.py --port 1025
+"""
+
+import argparse
+import threading
+import time
+from email import message_from_bytes
+from email.message import Message
+from typing import List, Optional
+
+from aiosmtpd.controller import Controller
+
+
+class _SinkHandler:
+    def __init__(self, sink: "SMTPSink"):
+        self.sink = sink
+
+    async def handle_DATA(self, server, session, envelope):
+        message = message_from_bytes(envelope.original_content or envelope.content)
+        self.sink._store(list(envelope.rcpt_tos), message)
+        return "250 Message accepted for delivery"
+
+
+class SMTPSink:
+    """SMTP-Server (aiosmtpd) in einem Hintergrund-Thread"""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 1025, verbose: bool = False):
+        self.messages: List[dict] = []
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._controller = Controller(_SinkHandler(self), hostname=host, port=port)
+
+    def _store(self, recipients: List[str], message: Message):
+        with self._lock:
+            self.messages.append({"to": recipients, "subject": message["Subject"], "message": message})
+        if self.verbose:
+            print(f"📨 {', '.join(recipients)}: {message['Subject']}")
+
+    def start(self):
+        self._controller.start()
+
+    def stop(self):
+        self._controller.stop()
+
+    def wait_for(self, recipient: str, timeout: float = 30) -> Optional[dict]:
+        """Wartet, bis eine E-Mail an recipient eingegangen ist"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                for entry in self.messages:
+                    if recipient in entry["to"]:
+                        return entry
+            time.sleep(0.5)
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler SMTP-Sink für Tests")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, verbose=True)
+    sink.start()
+    print(f"📬 SMTP sink listening on {args.host}:{args.port} (Ctrl+C zum Beenden)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sink.stop()
@@ -7,6 +7,7 @@ Testet: Auth, Posts, Comments, Likes, Notifications, Guardian Modal, etc.
 Author: SafeSpace Team
 """
 
+import os
 import pytest
 import requests
 import json
@@ -317,6 +318,100 @@ class TestAuthentication:
 
         logger.info("✅ Current user data retrieved")
 
+    def test_update_timezone(self, api_client: APIClient, user1_auth):
+        """Test Zeitzone speichern (Geburtstags-Benachrichtigungen)"""
+        logger.info("\n" + "-" * 80)
+        logger.info("TEST: Update Timezone")
+        logger.info("-" * 80)
+
+        response = api_client.request("PATCH", "/users/me/timezone", json={"timezone": "America/New_York"})
+        assert response.status_code == 200
+
+        response = api_client.get("/auth/me")
+        assert response.status_code == 200
+        assert response.json()["timezone"] == "America/New_York"
+
+        response = api_client.request("PATCH", "/users/me/timezone", json={"timezone": "Mars/Olympus_Mons"})
+        assert response.status_code == 400
+
+        logger.info("✅ Timezone stored and validated")
+
+    def test_refresh_and_logout_revokes_token(self, api_client: APIClient, user1_auth):
+        """Test Refresh-Token Flow und Logout-Revocation"""
+        logger.info("\n" + "-" * 80)
+        logger.info("TEST: Refresh Token and Logout")
+        logger.info("-" * 80)
+
+        # Eigene Sitzung, damit der Session-Token von User 1 gültig bleibt
+        login_data = {
+            "username": TestConfig.USER1["username"],
+            "password": TestConfig.USER1["password"]
+        }
+        response = api_client.post("/auth/login", data=login_data)
+        assert response.status_code == 200
+
+        tokens = response.json()
+        assert "refresh_token" in tokens
+
+        session_token = api_client.token
+        try:
+            response = api_client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+            assert response.status_code == 200
+            refreshed = response.json()
+            assert "access_token" in refreshed
+
+            # Refresh-Tokens rotieren: der eingelöste Token ist verbraucht
+            response = api_client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+            assert response.status_code == 401
+
+            api_client.token = refreshed["access_token"]
+            response = api_client.get("/auth/me")
+            assert response.status_code == 200
+
+            response = api_client.post("/auth/logout", json={"refresh_token": refreshed["refresh_token"]})
+            assert response.status_code == 200
+
+            # Widerrufene Tokens dürfen nicht mehr funktionieren
+            response = api_client.get("/auth/me")
+            assert response.status_code == 401
+
+            response = api_client.post("/auth/refresh", json={"refresh_token": refreshed["refresh_token"]})
+            assert response.status_code == 401
+        finally:
+            api_client.token = session_token
+
+        logger.info("✅ Refresh and logout revocation work")
+
+    def test_logout_without_access_token(self, api_client: APIClient, user1_auth):
+        """Test Logout nur mit Refresh-Token (Access-Token abgelaufen oder fehlend)"""
+        logger.info("\n" + "-" * 80)
+        logger.info("TEST: Logout without Access Token")
+        logger.info("-" * 80)
+
+        login_data = {
+            "username": TestConfig.USER1["username"],
+            "password": TestConfig.USER1["password"]
+        }
+        response = api_client.post("/auth/login", data=login_data)
+        assert response.status_code == 200
+        tokens = response.json()
+
+        session_token = api_client.token
+        try:
+            api_client.token = None
+            response = api_client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]})
+            assert response.status_code == 200
+
+            response = api_client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+            assert response.status_code == 401
+
+            response = api_client.post("/auth/logout")
+            assert response.status_code == 401
+        finally:
+            api_client.token = session_token
+
+        logger.info("✅ Refresh token revoked without access token")
+
 
 class TestPosts:
     """Tests für Posts"""
@@ -588,6 +683,38 @@ class TestNotifications:
         logger.info(f"✅ Notifications retrieved: {len(data['notifications'])} notifications")
         return data["notifications"]
 
+    def test_repeated_likes_are_coalesced(self, api_client: APIClient, user1_auth, user2_auth):
+        """Test mehrfache Likes auf denselben Post ergeben nur eine ungelesene Benachrichtigung"""
+        logger.info("\n" + "-" * 80)
+        logger.info("TEST: Coalesced Like Notifications")
+        logger.info("-" * 80)
+
+        user1_data, user1_token = user1_auth
+        user2_data, user2_token = user2_auth
+
+        api_client.token = user1_token
+        response = api_client.post("/feed", json={"content": "Post für Coalescing-Test", "visibility": "public"})
+        post = response.json()
+
+        # Like, Unlike, Like von User 2
+        api_client.token = user2_token
+        api_client.post(f"/feed/{user1_data['uid']}/{post['post_id']}/like")
+        api_client.delete(f"/feed/{user1_data['uid']}/{post['post_id']}/like")
+        api_client.post(f"/feed/{user1_data['uid']}/{post['post_id']}/like")
+
+        api_client.token = user1_token
+        response = api_client.get("/notifications", params={"unread_only": "true"})
+        assert response.status_code == 200
+
+        matching = [
+            n for n in response.json()["notifications"]
+            if n["type"] == "post_liked" and n["post_id"] == post["post_id"]
+        ]
+        assert len(matching) == 1, f"Expected one coalesced notification, got {len(matching)}"
+        assert matching[0]["actor_count"] == 1
+
+        logger.info(f"✅ Likes coalesced into notification {matching[0]['notification_id']}")
+
     def test_get_unread_count(self, api_client: APIClient, user1_auth):
         """Test ungelesene Benachrichtigungen zählen"""
         logger.info("\n" + "-" * 80)
@@ -687,6 +814,53 @@ class TestUserSearch:
         logger.info(f"✅ Dispute submitted successfully: {data['message']}")
         logger.info(f"   Status: {data['status']}")
 
+    def test_user_moderation_stats(self, api_client: APIClient, user1_auth):
+        """Test Moderations-Statistik: jeder indexierte Report zählt genau einen Post"""
+        logger.info("\n" + "-" * 80)
+        logger.info("TEST: User Moderation Stats")
+        logger.info("-" * 80)
+
+        # Eigener User, damit Posts anderer Tests die Zählung nicht verändern
+        suffix = int(time.time() * 1000)
+        stats_user = {
+            "username": f"statsuser_{suffix}",
+            "email": f"stats_{suffix}@example.com",
+            "password": "TestPass123!"
+        }
+        session_token = api_client.token
+        try:
+            response = api_client.post("/auth/register", json=stats_user)
+            assert response.status_code == 200, f"Registration failed: {response.text}"
+            api_client.token = response.json()["access_token"]
+            uid = api_client.get("/auth/me").json()["uid"]
+
+            response = api_client.get(f"/safespace/stats/user/{uid}")
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+            assert response.json()["total_posts"] == 0
+
+            response = api_client.post("/feed", json={"content": "Statistik-Test 📊", "visibility": "public"})
+            assert response.status_code == 200
+
+            # Der Worker moderiert asynchron und indexiert dann den Report
+            deadline = time.time() + 60
+            while True:
+                response = api_client.get(f"/safespace/stats/user/{uid}")
+                assert response.status_code == 200
+                data = response.json()
+                if data["total_posts"] or time.time() > deadline:
+                    break
+                time.sleep(2)
+        finally:
+            api_client.token = session_token
+
+        assert data["user_uid"] == uid
+        assert data["total_posts"] == 1
+        for field in ("flagged_posts", "blocked_posts", "disputed_posts", "overturned_posts"):
+            assert data[field] >= 0
+        assert isinstance(data["categories_triggered"], dict)
+
+        logger.info(f"✅ Moderation stats: {data['total_posts']} posts, {data['flagged_posts']} flagged")
+
     def test_system_status(self, api_client: APIClient, user1_auth):
         """Test System Status Endpoint (requires admin/moderator role)"""
         logger.info("\n" + "-" * 80)
@@ -727,5 +901,48 @@ class TestUserSearch:
             logger.info("⚠️  User is not admin/moderator, got 403 as expected")
 
 
+class TestEmailOutbox:
+    """
+    Tests für die E-Mail-Outbox und den Mailer-Worker.
+    Benötigt einen Mailer mit SMTP_HOST/SMTP_PORT auf diesem Rechner (SMTP_SINK_PORT).
+    """
+
+    @pytest.fixture(scope="class")
+    def smtp_sink(self):
+        port = os.environ.get("SMTP_SINK_PORT")
+        if not port:
+            pytest.skip("SMTP_SINK_PORT not set - mailer not pointed at a local sink")
+
+        from smtp_sink import SMTPSink
+        sink = SMTPSink(port=int(port))
+        sink.start()
+        yield sink
+        sink.stop()
+
+    def test_verification_email_delivered(self, api_client: APIClient, smtp_sink):
+        """Test Verifizierungs-E-Mail landet über die Outbox beim SMTP-Server"""
+        logger.info("\n" + "-" * 80)
+        logger.info("TEST: Verification Email via Outbox")
+        logger.info("-" * 80)
+
+        suffix = int(time.time() * 1000)
+        user = {
+            "username": f"mailtest_{suffix}",
+            "email": f"mailtest_{suffix}@example.com",
+            "password": "TestPass123!"
+        }
+
+        saved_token = api_client.token
+        response = api_client.post("/auth/register", json=user)
+        api_client.token = saved_token
+        assert response.status_code == 200, f"Registration failed: {response.text}"
+
+        mail = smtp_sink.wait_for(user["email"], timeout=30)
+        assert mail is not None, "Verification email was not delivered"
+        assert mail["subject"]
+
+        logger.info(f"✅ Verification email delivered: {mail['subject']}")
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "-s"])
@@ -0,0 +1,416 @@
+"""
+SafeSpace Social Network - Backend Unit Tests
+
+Tests, die Backend-Module direkt importieren und ohne laufende Services
+(PostgreSQL, Redis, Kafka) auskommen. Benötigt die Backend-Abhängigkeiten
+(backend/requirements.txt); fehlen sie, werden die Tests übersprungen.
+
+Author: SafeSpace Team
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+pytest.importorskip("pydantic_settings", reason="Backend-Abhängigkeiten nicht installiert")
+
+
+class TestEmailTemplates:
+    """Admin-Templates: gespeichert werden nur die bearbeiteten Einträge"""
+
+    @pytest.fixture
+    def templates_file(self, tmp_path, monkeypatch):
+        from app.db import email_templates
+        from app.services.email_template_registry import EmailTemplateRegistry
+
+        path = tmp_path / "email_templates.json"
+        monkeypatch.setattr(email_templates, "TEMPLATES_FILE", path)
+        EmailTemplateRegistry._clear()
+        yield path
+        EmailTemplateRegistry._clear()
+
+    def test_save_keeps_other_types_default(self, templates_file):
+        """Nach dem Speichern eines Typs gelten für alle anderen weiter die Standard-E-Mails"""
+        from app.db.email_templates import save_template, get_all_templates, NOTIFICATION_TYPES
+        from app.services.email_template_registry import EmailTemplateRegistry
+
+        asyncio.run(save_template("post_liked", "de", "Betreff {{actor}}", "<p>{{actor}}</p>"))
+
+        assert json.loads(templates_file.read_text()) == {
+            "post_liked": {"de": {"subject": "Betreff {{actor}}", "body": "<p>{{actor}}</p>"}}
+        }
+        assert EmailTemplateRegistry.get("post_liked", "de") is not None
+        assert EmailTemplateRegistry.get("post_liked", "en") is None
+        for notification_type in NOTIFICATION_TYPES:
+            if notification_type != "post_liked":
+                assert EmailTemplateRegistry.get(notification_type, "de") is None
+                assert EmailTemplateRegistry.get(notification_type, "en") is None
+
+        # Die Admin-Ansicht zeigt weiterhin alle Typen
+        assert set(NOTIFICATION_TYPES) <= set(asyncio.run(get_all_templates()))
+
+    def test_stored_defaults_are_not_custom(self, templates_file):
+        """Von älteren Versionen mitgespeicherte Standard-Templates gelten nicht als Anpassung"""
+        from app.db.email_templates import DEFAULT_TEMPLATES
+        from app.services.email_template_registry import EmailTemplateRegistry
+
+        stored = json.loads(json.dumps(DEFAULT_TEMPLATES))
+        stored["birthday"]["de"] = {"subject": "Geburtstag", "body": "<p>{{actor}}</p>"}
+        templates_file.write_text(json.dumps(stored))
+
+        assert EmailTemplateRegistry.get("birthday", "de") is not None
+        assert EmailTemplateRegistry.get("birthday", "en") is None
+        assert EmailTemplateRegistry.get("post_commented", "de") is None
+
+
+class TestConcurrentDispatcher:
+    """Abgebrochene Nachrichten geben ihren Slot frei"""
+
+    def test_cancel_before_start_releases_slot(self):
+        """Auch vor dem ersten Schritt abgebrochene Tasks verkleinern max_in_flight nicht"""
+        from app.safespace.dispatcher import ConcurrentDispatcher
+
+        async def scenario():
+            handled = []
+
+            async def handler(payload, message_id):
+                handled.append(payload)
+
+            dispatcher = ConcurrentDispatcher(handler, max_in_flight=2)
+            await dispatcher.submit(0, 0, "a", "first")
+            await dispatcher.submit(0, 1, "b", "second")
+            # Abbrechen, bevor die Tasks einmal gelaufen sind (wie drain nach Timeout)
+            tasks = list(dispatcher._partitions[0].tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks)
+            assert handled == []
+            assert dispatcher._key_tails == {}
+
+            dispatcher.forget([0])
+            await asyncio.wait_for(dispatcher.submit(0, 0, "a", "first"), timeout=1)
+            await asyncio.wait_for(dispatcher.submit(0, 1, "b", "second"), timeout=1)
+            assert await dispatcher.drain(timeout=1)
+            assert sorted(handled) == ["first", "second"]
+            assert dispatcher.commit_offsets() == {0: 2}
+
+        asyncio.run(scenario())
+
+
+class TestModerationCascade:
+    """Was keine Regel trifft, ist nicht automatisch unbedenklich"""
+
+    UNMATCHED_HATE = [
+        ("de", "Ihr gehört alle vergast"),
+        ("en", "Those people are animals and should be wiped out"),
+        ("fr", "Sales arabes, rentrez chez vous"),
+        ("de", "Die sollte man alle an die Wand stellen"),
+        ("ar", "أنتم حثالة"),
+    ]
+
+    @staticmethod
+    def _post(content: str):
+        from datetime import datetime
+        from app.safespace.models import PostMessage
+
+        return PostMessage(post_id=1, author_uid=1, author_username="test", content=content,
+                           visibility="public", created_at=datetime.utcnow())
+
+    @pytest.mark.parametrize("language,content", UNMATCHED_HATE)
+    def test_unmatched_hate_goes_to_deepseek(self, language, content):
+        """Mit den Defaults wird ohne Treffer der Regeln nichts freigegeben"""
+        from app.safespace.cascade import ModerationCascade, TIER_LLM
+
+        triage = ModerationCascade._classify(self._post(content), language)
+        assert triage.tier == TIER_LLM
+        assert triage.result is None
+
+    @pytest.mark.parametrize("language,content", [(l, c) for l, c in UNMATCHED_HATE if l != "de"])
+    def test_clean_tier_only_for_covered_languages(self, monkeypatch, language, content):
+        """Auch mit aktivierter Stufe clean gehen andere Sprachen zu DeepSeek"""
+        from app.safespace.cascade import ModerationCascade, TIER_LLM
+        from app.safespace.config import safespace_settings
+
+        monkeypatch.setattr(safespace_settings, "moderation_cascade_clean_below", 0.15)
+        triage = ModerationCascade._classify(self._post(content), language)
+        assert triage.tier == TIER_LLM
+        assert triage.result is None
+
+    def test_clean_tier_opt_in(self, monkeypatch):
+        """Freigabe ohne DeepSeek nur, wenn clean_below gesetzt ist und die Sprache abgedeckt ist"""
+        from app.safespace.cascade import ModerationCascade, TIER_CLEAN, TIER_LLM
+        from app.safespace.config import safespace_settings
+
+        post = self._post("Schönes Wetter heute im Park")
+        assert ModerationCascade._classify(post, "de").tier == TIER_LLM
+
+        monkeypatch.setattr(safespace_settings, "moderation_cascade_clean_below", 0.15)
+        triage = ModerationCascade._classify(post, "de")
+        assert triage.tier == TIER_CLEAN
+        assert not triage.result.is_hate_speech
+
+
+class _SortedSets:
+    """Die ZSET-Befehle von redis.asyncio, die CommentModeration nutzt (in-memory)"""
+
+    def __init__(self):
+        self.sets: dict[str, dict[str, float]] = {}
+
+    async def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key, member):
+        self.sets.get(key, {}).pop(member, None)
+
+    async def zrangebyscore(self, key, low, high, start=0, num=None):
+        low, high = float(low), float(high)
+        members = sorted((score, m) for m, score in self.sets.get(key, {}).items() if low <= score <= high)
+        return [m for _, m in members][start:None if num is None else start + num]
+
+
+class TestCommentModeration:
+    """Ergebnisse asynchron moderierter Kommentare: idempotent übernehmen, hängende erneut einreihen"""
+
+    @pytest.fixture
+    def env(self, tmp_path, monkeypatch):
+        from app.cache.redis_cache import RedisCache
+        from app.config import settings
+        from app.db import notifications, postgres
+
+        redis = _SortedSets()
+        monkeypatch.setattr(settings, "user_data_base", tmp_path)
+        monkeypatch.setattr(RedisCache, "client", classmethod(lambda cls: redis))
+
+        sent = []
+
+        async def create_notifications_bulk(rows):
+            sent.extend(row["type"] for row in rows)
+            return rows
+
+        async def get_user_by_uid(uid):
+            return {"uid": uid, "username": f"user{uid}"}
+
+        monkeypatch.setattr(notifications, "create_notifications_bulk", create_notifications_bulk)
+        monkeypatch.setattr(postgres, "get_user_by_uid", get_user_by_uid)
+        return redis, sent
+
+    @staticmethod
+    def _result(comment: dict, hate: bool = False):
+        from datetime import datetime
+        from app.safespace.models import ModerationResult, ModerationStatus
+
+        return ModerationResult(post_id=comment["post_id"], author_uid=comment["user_uid"],
+                                original_content=comment["content"], is_hate_speech=hate,
+                                confidence_score=0.95 if hate else 0.05, explanation="",
+                                status=ModerationStatus.FLAGGED if hate else ModerationStatus.APPROVED,
+                                moderated_at=datetime.utcnow(), comment_id=comment["comment_id"],
+                                post_author_uid=7)
+
+    def test_redelivered_result_sends_missing_notifications(self, env, monkeypatch):
+        """Scheitern die Benachrichtigungen nach dem Statuswechsel, holt die erneute Zustellung sie nach"""
+        from app.db import notifications
+        from app.db.sqlite_posts import UserPostsDB
+        from app.safespace.comment_moderation import CommentModeration, STATUS_PENDING
+
+        _, sent = env
+        working = notifications.create_notifications_bulk
+
+        async def failing(rows):
+            raise RuntimeError("PostgreSQL nicht erreichbar")
+
+        async def scenario():
+            posts_db = UserPostsDB(7)
+            await posts_db._ensure_db()
+            comment = await posts_db.add_comment(1, 8, "Schöner Post", moderation_status=STATUS_PENDING)
+            result = self._result(comment)
+
+            monkeypatch.setattr(notifications, "create_notifications_bulk", failing)
+            with pytest.raises(RuntimeError):
+                await CommentModeration.apply_result(result)
+            assert sent == []
+
+            monkeypatch.setattr(notifications, "create_notifications_bulk", working)
+            assert (await CommentModeration.apply_result(result))["moderation_status"] == "approved"
+            assert sent == ["post_commented", "comment_approved"]
+
+            # Danach ändern weitere Zustellungen nichts mehr
+            assert await CommentModeration.apply_result(result) is None
+            assert sent == ["post_commented", "comment_approved"]
+
+        asyncio.run(scenario())
+
+    def test_requeue_stale_pending_comments(self, env, monkeypatch):
+        """Nur vorgemerkte Kommentare, die länger als comment_pending_requeue_seconds warten"""
+        import time
+        from app.db.sqlite_posts import UserPostsDB
+        from app.safespace.comment_moderation import CommentModeration, PENDING_KEY, STATUS_PENDING
+
+        redis, _ = env
+        submitted = []
+
+        async def enqueue_comment(**kwargs):
+            submitted.append(kwargs["comment_id"])
+            return True
+
+        from app.safespace.kafka_service import PostModerationQueue
+        monkeypatch.setattr(PostModerationQueue, "enqueue_comment", enqueue_comment)
+
+        async def scenario():
+            posts_db = UserPostsDB(7)
+            await posts_db._ensure_db()
+            stale = await posts_db.add_comment(1, 8, "hängt", moderation_status=STATUS_PENDING)
+            fresh = await posts_db.add_comment(1, 8, "gerade geschrieben", moderation_status=STATUS_PENDING)
+            done = await posts_db.add_comment(1, 8, "schon moderiert", moderation_status=STATUS_PENDING)
+            for comment in (stale, fresh, done):
+                await CommentModeration.submit(7, comment, "user8")
+            await CommentModeration.apply_result(self._result(done))
+
+            hour_ago = time.time() - 3600
+            redis.sets[PENDING_KEY][f"7:{stale['comment_id']}"] = hour_ago
+            redis.sets[PENDING_KEY][f"7:{done['comment_id']}"] = hour_ago  # z.B. Redis-Fehler beim Entfernen
+            submitted.clear()
+
+            assert await CommentModeration.requeue_stale() == 1
+            assert submitted == [stale["comment_id"]]
+            assert f"7:{done['comment_id']}" not in redis.sets[PENDING_KEY]
+            # Gerade erneut eingereiht: erst nach comment_pending_requeue_seconds wieder
+            assert await CommentModeration.requeue_stale() == 0
+
+        asyncio.run(scenario())
+
+
+class TestTokenClaims:
+    """get_current_claims autorisiert nur aus dem Token"""
+
+    @pytest.fixture
+    def auth(self, monkeypatch):
+        from app.cache.redis_cache import OnlineStatus, SessionCache, UserCache
+        from app.services import auth_service
+
+        async def check_token(uid, jti):
+            return 0, False
+
+        async def no_lookup(uid):
+            raise AssertionError("get_current_claims darf den Principal nicht laden")
+
+        async def set_online(uid):
+            pass
+
+        monkeypatch.setattr(SessionCache, "check_token", check_token)
+        monkeypatch.setattr(UserCache, "get", no_lookup)
+        monkeypatch.setattr(auth_service, "get_user_by_uid", no_lookup)
+        monkeypatch.setattr(OnlineStatus, "set_online", set_online)
+        return auth_service
+
+    def test_role_from_token(self, auth):
+        token = auth.create_access_token({"sub": "42", "role": "moderator", "ban": False, "ban_until": None, "ver": 0})
+        assert asyncio.run(auth.get_current_claims(token)) == {"uid": 42, "role": "moderator"}
+
+    def test_banned_token_rejected(self, auth):
+        import time
+        from fastapi import HTTPException
+
+        token = auth.create_access_token({"sub": "42", "role": "user", "ban": True,
+                                          "ban_until": int(time.time()) + 3600, "ver": 0})
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(auth.get_current_claims(token))
+        assert error.value.status_code == 403
+
+        # Abgelaufener temporärer Bann
+        token = auth.create_access_token({"sub": "42", "role": "user", "ban": True,
+                                          "ban_until": int(time.time()) - 60, "ver": 0})
+        assert asyncio.run(auth.get_current_claims(token))["uid"] == 42
+
+
+class TestReportCompaction:
+    """Tagesarchive mit LocalStorage: Zusammenführen, nie verkleinern, Einzelabruf über den Frame-Index"""
+
+    DAY = (2025, 6, 1)
+
+    @pytest.fixture
+    def storage(self, tmp_path, monkeypatch):
+        pytest.importorskip("zstandard")
+        from app.safespace import compaction
+        from app.safespace.minio_service import MinIOService
+        from app.safespace.storage import LocalStorage
+
+        storage = LocalStorage(tmp_path)
+        monkeypatch.setattr(MinIOService, "_storage", storage)
+        # Mehrere Frames schon bei wenigen Reports
+        monkeypatch.setattr(compaction, "FRAME_REPORTS", 3)
+        return storage
+
+    def _report(self, report_id: str):
+        from datetime import datetime
+        from app.safespace.models import ModerationReport, ModerationResult, ModerationStatus, PostMessage
+
+        moment = datetime(*self.DAY, 12, 0)
+        post = PostMessage(post_id=1, author_uid=1, author_username="test", content=f"Post {report_id}",
+                           visibility="public", created_at=moment)
+        result = ModerationResult(post_id=1, author_uid=1, original_content=post.content, is_hate_speech=False,
+                                  confidence_score=0.1, explanation="ok", status=ModerationStatus.APPROVED,
+                                  moderated_at=moment)
+        return ModerationReport(report_id=report_id, post=post, result=result, model_used="rules",
+                                received_at=moment, processed_at=moment, processing_time_ms=1)
+
+    def _store(self, report_ids) -> list[str]:
+        from app.safespace.minio_service import MinIOService
+
+        async def store():
+            return [await MinIOService.store_moderation_report(self._report(i)) for i in report_ids]
+        return asyncio.run(store())
+
+    def test_recompaction_merges_with_archive(self, storage, monkeypatch):
+        """Nach dem Löschen von Einzelobjekten bleiben ihre Reports im Archiv und sind einzeln abrufbar"""
+        from datetime import date
+        from app.safespace.compaction import compact_day, load_archived_report
+        from app.safespace.config import safespace_settings
+
+        bucket = safespace_settings.minio_bucket_moderation
+        day = date(*self.DAY)
+        first = self._store([f"r{i:02d}" for i in (5, 1, 7, 3, 0, 6, 2)])
+        assert asyncio.run(compact_day(day))["object_count"] == 7
+
+        # Einzelobjekte teilweise gelöscht, neue Reports hinzugekommen
+        asyncio.run(storage.delete_many(bucket, first[:4]))
+        self._store(["r04", "r08", "r09"])
+        manifest = asyncio.run(compact_day(day, force=True))
+        assert manifest["object_count"] == 10
+        assert len(manifest["frames"]) == 4
+        assert [frame["first"] for frame in manifest["frames"]] == ["r00", "r03", "r06", "r09"]
+
+        # Einzelabruf liest nur den Frame (kein Download des ganzen Archivs)
+        async def no_download(*args, **kwargs):
+            raise AssertionError("load_archived_report soll den Frame-Index nutzen")
+        monkeypatch.setattr(storage, "get_file", no_download)
+        for key in first[:4]:
+            report = asyncio.run(load_archived_report(key))
+            assert report is not None and key.endswith(f"/{report.report_id}.json")
+        assert asyncio.run(load_archived_report(first[0].replace("r05", "r99"))) is None
+
+    def test_refuses_to_shrink_archive(self, storage):
+        """Ein Archiv wird nie durch eines mit weniger Reports ersetzt"""
+        import json
+        from datetime import date
+        from app.safespace.compaction import archive_key, compact_day, manifest_key
+        from app.safespace.config import safespace_settings
+
+        bucket = safespace_settings.minio_bucket_moderation
+        day = date(*self.DAY)
+        self._store(["r00", "r01", "r02"])
+        manifest = asyncio.run(compact_day(day))
+        archive = asyncio.run(storage.get(bucket, archive_key(day)))
+
+        manifest["object_count"] = 5
+        asyncio.run(storage.put(bucket, manifest_key(day), json.dumps(manifest).encode("utf-8")))
+        with pytest.raises(RuntimeError):
+            asyncio.run(compact_day(day, force=True))
+        assert asyncio.run(storage.get(bucket, archive_key(day))) == archive
+
+        asyncio.run(storage.delete(bucket, archive_key(day)))
+        with pytest.raises(RuntimeError):
+            asyncio.run(compact_day(day, force=True))